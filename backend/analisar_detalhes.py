@@ -1,18 +1,16 @@
 import sys
 import os
-import fitz  # PyMuPDF
-import re
 import json
+from leitor_sped import abrir_sped
+from documento_pdf import DocumentoPDF
+import ler_pdf
+from apuracao_sped import CAMPOS_E110
+from indice_valores import montar_indice_valores, TOLERANCIA_CENTAVOS
+from dinheiro import centavos, centavos_do_sped, formatar_centavos
 
 # --- DICIONÁRIO DE CABEÇALHO ---
-# Define os índices das colunas que queremos ler
+# Define os índices das colunas que queremos ler (o E110 usa apuracao_sped.CAMPOS_E110)
 HEADERS_SPED = {
-    'E110': {
-        'VL_TOT_DEBITOS': 2,
-        'VL_TOT_CREDITOS': 6,
-        'VL_SLD_CREDOR_ANT': 10,
-        'VL_ICMS_RECOLHER': 13
-    },
     'E111': { # Ajustes
         'COD_AJ_APUR': 1,
         'VL_AJ_APUR': 3
@@ -23,31 +21,8 @@ HEADERS_SPED = {
     }
 }
 
-# --- FUNÇÕES AUXILIARES ---
-
-def limpar_e_converter_numero(texto_numero):
-    """
-    Recebe um texto (ex: '2.360.524,26') e converte para um float (ex: 2360524.26).
-    """
-    if texto_numero is None: return 0.0
-    texto_limpo = re.sub(r"[^0-9,\.]", "", texto_numero) # Limpa lixo
-    if "," not in texto_limpo: return 0.0
-    try:
-        texto_limpo = texto_limpo.strip().replace(" ", "").replace(".", "").replace(",", ".")
-        if not texto_limpo: return 0.0
-        return float(texto_limpo)
-    except Exception:
-        return 0.0
-
-def formatar_para_texto_busca(valor_float):
-    """
-    Converte um float (2360524.26) de volta para o texto
-    que esperamos encontrar no PDF ('2.360.524,26').
-    """
-    if valor_float == 0.0:
-        return "0,00"
-    # Formata no padrão brasileiro
-    return f"{valor_float:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+# Quantas ocorrências de cada valor vão no JSON (o total vai em 'total_ocorrencias_livro')
+MAX_OCORRENCIAS_POR_VALOR = 20
 
 # --- FUNÇÕES DE EXTRAÇÃO ---
 
@@ -61,50 +36,47 @@ def extrair_valores_chave_do_TXT(caminho_sped_txt):
     valores_para_buscar = {} # { "2.360.524,26": "E110 - ICMS a Recolher" }
     
     try:
-        with open(caminho_sped_txt, 'r', encoding='latin-1') as f:
-            for linha in f:
-                linha_limpa = linha.strip()
-                if not linha_limpa or not linha_limpa.startswith('|'):
-                    continue
-                
-                campos = linha_limpa[1:-1].split('|')
-                registro_atual = campos[0]
-                
+        sped, deve_fechar = abrir_sped(caminho_sped_txt)
+        try:
+            for registro in sped.registros('E110', 'E111', 'E116'):
+
                 # --- Pega o E110 ---
-                if registro_atual == 'E110':
-                    headers = HEADERS_SPED['E110']
+                if registro.tipo == 'E110':
                     # Pega o ICMS a Recolher
-                    idx_recolher = headers['VL_ICMS_RECOLHER']
-                    valor_recolher_num = limpar_e_converter_numero(campos[idx_recolher])
-                    if valor_recolher_num > 0:
-                        valor_recolher_txt = formatar_para_texto_busca(valor_recolher_num)
+                    idx_recolher = CAMPOS_E110['VL_ICMS_RECOLHER']
+                    valor_recolher_centavos = centavos_do_sped(registro.campo(idx_recolher))
+                    if valor_recolher_centavos > 0:
+                        valor_recolher_txt = formatar_centavos(valor_recolher_centavos)
                         valores_para_buscar[valor_recolher_txt] = f"E110 - ICMS a Recolher ({valor_recolher_txt})"
                         print(f"  > (SPED) E110 VL_ICMS_RECOLHER encontrado: {valor_recolher_txt}", file=sys.stderr)
-                
+
                 # --- Pega o E111 ---
-                elif registro_atual == 'E111':
+                elif registro.tipo == 'E111':
                     headers = HEADERS_SPED['E111']
                     idx_cod = headers['COD_AJ_APUR']
                     idx_val = headers['VL_AJ_APUR']
-                    valor_num = limpar_e_converter_numero(campos[idx_val])
-                    if valor_num > 0:
-                        codigo_ajuste = campos[idx_cod]
-                        valor_txt = formatar_para_texto_busca(valor_num)
+                    valor_centavos = centavos_do_sped(registro.campo(idx_val))
+                    if valor_centavos > 0:
+                        codigo_ajuste = registro.campo(idx_cod)
+                        valor_txt = formatar_centavos(valor_centavos)
                         valores_para_buscar[valor_txt] = f"E111 - {codigo_ajuste} ({valor_txt})"
                         print(f"  > (SPED) E111 (Ajuste) encontrado: {valor_txt}", file=sys.stderr)
 
                 # --- Pega o E116 ---
-                elif registro_atual == 'E116':
+                elif registro.tipo == 'E116':
                     headers = HEADERS_SPED['E116']
                     idx_cod = headers['COD_OR']
                     idx_val = headers['VL_OR']
-                    valor_num = limpar_e_converter_numero(campos[idx_val])
-                    if valor_num > 0:
-                        codigo_obrigacao = campos[idx_cod]
-                        valor_txt = formatar_para_texto_busca(valor_num)
+                    valor_centavos = centavos_do_sped(registro.campo(idx_val))
+                    if valor_centavos > 0:
+                        codigo_obrigacao = registro.campo(idx_cod)
+                        valor_txt = formatar_centavos(valor_centavos)
                         valores_para_buscar[valor_txt] = f"E116 - {codigo_obrigacao} ({valor_txt})"
                         print(f"  > (SPED) E116 (Extra-Apuração) encontrado: {valor_txt}", file=sys.stderr)
-        
+        finally:
+            if deve_fechar:
+                sped.fechar()
+
         if not valores_para_buscar:
             print("  > (SPED) ERRO: Nenhum valor de Apuração (E110, E111, E116) > 0 foi encontrado no .txt.", file=sys.stderr)
             
@@ -114,62 +86,93 @@ def extrair_valores_chave_do_TXT(caminho_sped_txt):
         print(f"  > (SPED) ERRO ao ler o .txt: {e}", file=sys.stderr)
         return {}
 
-def buscar_valores_no_LIVRO(caminho_livro_pdf, valores_para_buscar):
+def buscar_valores_no_LIVRO(caminho_livro_pdf, valores_para_buscar, tolerancia_centavos=TOLERANCIA_CENTAVOS):
     """
-    (A SUA NOVA LÓGICA)
-    Abre o Livro Fiscal .PDF e apenas verifica se os valores (como texto)
-    existem em qualquer lugar do documento.
-    Retorna um dicionário com os resultados da "caça".
+    Abre o Livro Fiscal .PDF (ou usa o DocumentoPDF já aberto), monta o índice
+    de valores (indice_valores.py) e procura cada valor por busca binária:
+    primeiro o valor exato; se não existir, qualquer valor a até
+    'tolerancia_centavos' de distância (diferença de arredondamento).
+    Retorna {valor_txt: {"status", "ocorrencias": [{"pagina", "linha", "texto", "diferenca_centavos"}]}}
+    com status "Encontrado", "Encontrado (aproximado)" ou "Não Encontrado".
     """
     print("Lendo Livro Fiscal .pdf para 'caçar' os valores...", file=sys.stderr)
-    
-    # { "2.360.524,26": "Encontrado", "226.690,63": "Não Encontrado" }
-    resultados_busca = {valor_txt: "Não Encontrado" for valor_txt in valores_para_buscar.keys()}
-    
-    try:
-        doc = fitz.open(caminho_livro_pdf)
-        
-        for pagina_num, pagina in enumerate(doc):
-            texto_da_pagina = pagina.get_text("text")
-            
-            # Para cada valor que estamos caçando...
-            for valor_txt in valores_para_buscar.keys():
-                # Se já achamos, não precisa procurar de novo
-                if resultados_busca[valor_txt] == "Encontrado":
-                    continue
-                
-                # Procura o texto exato do valor na página
-                if valor_txt in texto_da_pagina:
-                    print(f"  > (LIVRO) VALOR ENCONTRADO: '{valor_txt}' na Pág. {pagina_num + 1}", file=sys.stderr)
-                    resultados_busca[valor_txt] = "Encontrado"
-                        
-        doc.close()
-        
-        return resultados_busca
 
+    resultados_busca = {valor_txt: {"status": "Não Encontrado", "ocorrencias": []} for valor_txt in valores_para_buscar.keys()}
+
+    try:
+        indice = montar_indice_valores(caminho_livro_pdf)
     except Exception as e:
         print(f"  > (LIVRO) ERRO ao ler PDF: {e}", file=sys.stderr)
         return resultados_busca
 
+    for valor_txt in valores_para_buscar.keys():
+        valor_centavos = centavos(valor_txt)
+        if valor_centavos is None:
+            continue
+        ocorrencias = indice.buscar(valor_centavos)
+        status = "Encontrado"
+        if not ocorrencias and tolerancia_centavos > 0:
+            ocorrencias = indice.buscar(valor_centavos, tolerancia_centavos)
+            status = "Encontrado (aproximado)"
+        if not ocorrencias:
+            continue
+        resultados_busca[valor_txt] = {"status": status, "ocorrencias": ocorrencias}
+        paginas = sorted({o["pagina"] for o in ocorrencias})
+        print(f"  > (LIVRO) VALOR ENCONTRADO: '{valor_txt}' ({status}) na(s) Pág. {paginas}", file=sys.stderr)
 
-# --- PONTO DE PARTIDA ---
-if __name__ == "__main__":
+    return resultados_busca
+
+
+def extrair_bloco_e_do_sped(caminho_txt):
+    """
+    Lê um arquivo SPED .txt e extrai:
+    1. O texto completo do Bloco E.
+    2. Uma lista de códigos de ajuste únicos do registro |E111|.
+    """
+    print(f"Iniciando extração do Bloco E e códigos E111 de: {caminho_txt}", file=sys.stderr)
     
-    # 1. Verifica se recebeu os 2 argumentos
-    if len(sys.argv) < 3: # script.py, sped.txt, livro.pdf
-        print(json.dumps({"error": "ERRO DE USO! Faltando caminhos de arquivo."}))
-        sys.exit(1)
+    try:
+        sped, deve_fechar = abrir_sped(caminho_txt)
+        try:
+            bloco_e_linhas = sped.linhas_entre('E001', 'E990')
+            # Códigos de ajuste únicos do E111 (usamos um 'set' para evitar duplicados)
+            codigos_e111 = {r.campo(1) for r in sped.registros('E111') if r.campo(2) is not None}
+        finally:
+            if deve_fechar:
+                sped.fechar()
+
+        print("--- Extração do Bloco E concluída ---", file=sys.stderr)
         
-    caminho_txt = sys.argv[1]
-    caminho_pdf = sys.argv[2]
-    
-    # 2. Etapa 1: Extrair valores do SPED.txt
+        texto_bloco_e = "\n".join(bloco_e_linhas) if bloco_e_linhas else None
+        lista_codigos = list(codigos_e111)
+        
+        print(f"Códigos E111 encontrados: {lista_codigos}", file=sys.stderr)
+        
+        # Retorna as duas informações
+        return texto_bloco_e, lista_codigos
+        
+    except FileNotFoundError:
+         print(f"ERRO CRÍTICO: O arquivo SPED .txt não foi encontrado em: {caminho_txt}", file=sys.stderr)
+         return None, []
+    except Exception as e:
+        print(f"ERRO CRÍTICO ao ler o arquivo TXT: {e}", file=sys.stderr)
+        return None, []
+
+
+# --- CONCILIAÇÃO COMPLETA (CHAMADA PELO SERVIDOR OU PELA LINHA DE COMANDO) ---
+def conciliar_detalhes(caminho_txt, caminho_pdf):
+    """
+    Extrai os valores-chave do SPED .txt, caça esses valores no Livro Fiscal
+    e retorna o dicionário {"conciliacao_detalhes": [...]} para o Dashboard.
+    'caminho_pdf' pode ser um caminho ou um DocumentoPDF já aberto.
+    """
+    # 1. Etapa 1: Extrair valores do SPED.txt
     valores_do_sped = extrair_valores_chave_do_TXT(caminho_txt)
     
-    # 3. Etapa 2: Caçar esses valores no Livro_Fiscal.pdf
+    # 2. Etapa 2: Caçar esses valores no Livro_Fiscal.pdf
     resultados_da_busca = buscar_valores_no_LIVRO(caminho_pdf, valores_do_sped)
     
-    # 4. Preparar o JSON de resposta para o Dashboard
+    # 3. Preparar o JSON de resposta para o Dashboard
     json_final = {
         "conciliacao_detalhes": []
     }
@@ -178,15 +181,57 @@ if __name__ == "__main__":
         print("Nenhum valor-chave encontrado no SPED, conciliação de detalhes pulada.", file=sys.stderr)
     
     for valor, descricao in valores_do_sped.items():
-        status = resultados_da_busca.get(valor, "Não Encontrado")
+        busca = resultados_da_busca.get(valor, {"status": "Não Encontrado", "ocorrencias": []})
+        status = busca["status"]
         status_ok = "[OK]" if status == "Encontrado" else "[ATENCAO]"
         
         json_final["conciliacao_detalhes"].append({
             "descricao_sped": descricao,
             "valor_procurado": valor,
             "status_livro": status,
-            "status_geral": status_ok
+            "status_geral": status_ok,
+            "ocorrencias_livro": busca["ocorrencias"][:MAX_OCORRENCIAS_POR_VALOR],
+            "total_ocorrencias_livro": len(busca["ocorrencias"])
         })
 
-    # Imprime o JSON final para o 'main_web.py' capturar
-    print(json.dumps(json_final, indent=2))
\ No newline at end of file
+    return json_final
+
+
+def analisar_livro_e_detalhes(caminho_sped_txt, caminho_livro_pdf, lista_codigos_e111):
+    """
+    ler_pdf.analisar_livro e a conciliação de detalhes (conciliar_detalhes)
+    no MESMO DocumentoPDF: cada página do Livro é extraída uma vez só, em vez
+    de uma vez em cada etapa. Retorna (dados_livro, detalhes).
+    """
+    livro = caminho_livro_pdf
+    caminho_livro = ler_pdf.encontrar_pdf(caminho_livro_pdf)
+    if caminho_livro:
+        try:
+            livro = DocumentoPDF(caminho_livro)
+        except Exception as e:
+            print(f"ERRO ao abrir o Livro '{caminho_livro}': {e}", file=sys.stderr)
+    try:
+        dados_livro = ler_pdf.analisar_livro(livro, lista_codigos_e111)
+        detalhes = conciliar_detalhes(caminho_sped_txt, livro)
+    finally:
+        if isinstance(livro, DocumentoPDF):
+            print(f"   > (PDF) Livro: {livro.paginas_extraidas} extrações e {livro.paginas_do_cache} páginas do cache ({len(livro)} páginas).", file=sys.stderr)
+            livro.fechar()
+    return dados_livro, detalhes
+
+
+# --- PONTO DE PARTIDA ---
+if __name__ == "__main__":
+    
+    # 1. Verifica se recebeu os 2 argumentos
+    if len(sys.argv) < 3: # script.py, sped.txt, livro.pdf
+        print(json.dumps({"error": "ERRO DE USO! Faltando caminhos de arquivo."}))
+        sys.exit(1)
+        
+    caminho_txt = sys.argv[1]
+    caminho_pdf = sys.argv[2]
+    
+    json_final = conciliar_detalhes(caminho_txt, caminho_pdf)
+
+    # Imprime o JSON final para quem chamou pela linha de comando
+    print(json.dumps(json_final, indent=2))
@@ -0,0 +1,206 @@
+import sys
+import json
+from leitor_sped import abrir_sped
+from totais_sped import CAMPOS_ANALITICOS
+from dinheiro import centavos_do_sped, formatar_centavos
+
+# --- APURAÇÃO DO ICMS (E110) RECALCULADA DIRETO DO SPED ---
+# Substitui a leitura do 'apuracao_do_icms.pdf' gerado pelo robô no PVA.
+# Refaz os campos do E110 a partir de:
+#   - débitos/créditos dos registros analíticos (C190/C590/D190/D590) pelo CFOP;
+#   - ajustes de documento (C197/D197) pelo 3º caractere do COD_AJ;
+#   - ajustes da apuração (E111) pelo 4º caractere do COD_AJ_APUR;
+# e confere com o E110 declarado. O E116 (obrigações a recolher) tem que
+# fechar com ICMS a recolher + débitos especiais; o E113 (documentos de cada
+# E111) só é conferido contra o valor do E111. O E115 é informativo e não
+# entra na conta.
+
+# Campos do E110 (campos = linha[1:-1].split('|'), campo 0 = 'E110')
+CAMPOS_E110 = {
+    'VL_TOT_DEBITOS': 1,
+    'VL_AJ_DEBITOS': 2,
+    'VL_TOT_AJ_DEBITOS': 3,
+    'VL_ESTORNOS_CRED': 4,
+    'VL_TOT_CREDITOS': 5,
+    'VL_AJ_CREDITOS': 6,
+    'VL_TOT_AJ_CREDITOS': 7,
+    'VL_ESTORNOS_DEB': 8,
+    'VL_SLD_CREDOR_ANT': 9,
+    'VL_SLD_APURADO': 10,
+    'VL_TOT_DED': 11,
+    'VL_ICMS_RECOLHER': 12,
+    'VL_SLD_CREDOR_TRANSPORTAR': 13,
+    'DEB_ESP': 14
+}
+
+# E111: 3º caractere do COD_AJ_APUR = '0' (ICMS próprio); o 4º diz onde o valor entra
+AJUSTES_E111 = {
+    '0': 'VL_TOT_AJ_DEBITOS',   # Outros débitos
+    '1': 'VL_ESTORNOS_CRED',    # Estorno de créditos
+    '2': 'VL_TOT_AJ_CREDITOS',  # Outros créditos
+    '3': 'VL_ESTORNOS_DEB',     # Estorno de débitos
+    '4': 'VL_TOT_DED',          # Deduções do imposto apurado
+    '5': 'DEB_ESP'              # Débitos especiais
+}
+
+# C197/D197: 3º caractere do COD_AJ (Tabela 5.3; '6', '8' e '9' são informativos).
+# Atenção: NÃO é o mesmo significado do 4º caractere do E111.
+AJUSTES_DOCUMENTO = {
+    '0': 'VL_AJ_CREDITOS',  # Outros créditos
+    '1': 'VL_AJ_CREDITOS',  # Estorno de débitos
+    '2': 'VL_AJ_CREDITOS',  # Outros créditos
+    '3': 'VL_AJ_DEBITOS',   # Outros débitos
+    '4': 'VL_AJ_DEBITOS',   # Estorno de créditos
+    '5': 'VL_AJ_DEBITOS',   # Outros débitos
+    '7': 'DEB_ESP'          # Débitos especiais
+}
+# 4º caractere do COD_AJ (tributo): só o ICMS próprio entra no E110.
+# '1' (ICMS ST) vai para o E210 e '2' (DIFAL/FCP) para o E310.
+TRIBUTOS_ICMS_PROPRIO = frozenset('0345678')
+# |C197|COD_AJ|DESCR_COMPL_AJ|COD_ITEM|VL_BC_ICMS|ALIQ_ICMS|VL_ICMS|VL_OUTROS| (D197 igual)
+CAMPOS_AJUSTE_DOCUMENTO = {'C197': {'COD_AJ': 1, 'VL_ICMS': 6}, 'D197': {'COD_AJ': 1, 'VL_ICMS': 6}}
+
+# CFOP 1605/5605 (transferência de saldo) entram "do outro lado"
+CFOP_DEBITO_EXTRA = '1605'
+CFOP_CREDITO_EXTRA = '5605'
+
+
+def _apurar(calculado):
+    """Fecha a apuração (campos 10, 12 e 13) a partir dos totais de débito/crédito."""
+    debitos = (calculado['VL_TOT_DEBITOS'] + calculado['VL_AJ_DEBITOS']
+               + calculado['VL_TOT_AJ_DEBITOS'] + calculado['VL_ESTORNOS_CRED'])
+    creditos = (calculado['VL_TOT_CREDITOS'] + calculado['VL_AJ_CREDITOS']
+                + calculado['VL_TOT_AJ_CREDITOS'] + calculado['VL_ESTORNOS_DEB']
+                + calculado['VL_SLD_CREDOR_ANT'])
+    saldo = debitos - creditos
+    calculado['VL_SLD_APURADO'] = max(saldo, 0)
+    calculado['VL_SLD_CREDOR_TRANSPORTAR'] = max(-saldo, 0)
+    calculado['VL_ICMS_RECOLHER'] = max(calculado['VL_SLD_APURADO'] - calculado['VL_TOT_DED'], 0)
+
+
+def recalcular_apuracao(caminho_sped_txt):
+    """
+    Recalcula o E110 do SPED e confere com o declarado.
+    Retorna:
+      {"sped_recolher": "2.360.524,26", "sped_saldo_credor": "0,00",
+       "status": "OK" | "Divergente" | "Falha",
+       "campos": {campo: {"calculado", "declarado", "status"}},
+       "avisos": [...]}
+    'sped_recolher'/'sped_saldo_credor' são os valores recalculados
+    (None se o .txt não tiver E110).
+    """
+    print(f"Recalculando a apuração do ICMS (E110) de: {caminho_sped_txt}", file=sys.stderr)
+    resultado = {"sped_recolher": None, "sped_saldo_credor": None, "status": "Falha", "campos": {}, "avisos": []}
+    calculado = dict.fromkeys(CAMPOS_E110, 0)
+    declarado = None
+    soma_e116 = 0
+    e113_por_e111 = []  # [(codigo, valor do E111, soma dos E113 filhos)]
+    ajustes_fora_do_e110 = 0  # C197/D197 de ICMS ST ou DIFAL/FCP (E210/E310)
+
+    try:
+        sped, deve_fechar = abrir_sped(caminho_sped_txt)
+        try:
+            tipos = list(CAMPOS_ANALITICOS) + list(CAMPOS_AJUSTE_DOCUMENTO) + ['E110', 'E111', 'E113', 'E116']
+            for registro in sped.registros(*tipos):
+                tipo = registro.tipo
+
+                if tipo in CAMPOS_ANALITICOS:
+                    cfop = registro.campo(CAMPOS_ANALITICOS[tipo]['CFOP']) or ''
+                    icms = centavos_do_sped(registro.campo(CAMPOS_ANALITICOS[tipo]['total_icms']))
+                    if cfop == CFOP_DEBITO_EXTRA or (cfop.startswith(('5', '6', '7')) and cfop != CFOP_CREDITO_EXTRA):
+                        calculado['VL_TOT_DEBITOS'] += icms
+                    elif cfop == CFOP_CREDITO_EXTRA or cfop.startswith(('1', '2', '3')):
+                        calculado['VL_TOT_CREDITOS'] += icms
+
+                elif tipo in CAMPOS_AJUSTE_DOCUMENTO:
+                    campos = CAMPOS_AJUSTE_DOCUMENTO[tipo]
+                    codigo = registro.campo(campos['COD_AJ']) or ''
+                    destino = AJUSTES_DOCUMENTO.get(codigo[2:3])
+                    if not destino:
+                        continue
+                    if codigo[3:4] not in TRIBUTOS_ICMS_PROPRIO:
+                        ajustes_fora_do_e110 += 1
+                        continue
+                    calculado[destino] += centavos_do_sped(registro.campo(campos['VL_ICMS']))
+
+                elif tipo == 'E110':
+                    if declarado is not None:
+                        resultado["avisos"].append("Mais de um E110 no arquivo: só o primeiro foi conferido.")
+                        continue
+                    declarado = {nome: centavos_do_sped(registro.campo(i)) for nome, i in CAMPOS_E110.items()}
+                    # O saldo credor anterior vem do período passado: não dá para recalcular
+                    calculado['VL_SLD_CREDOR_ANT'] = declarado['VL_SLD_CREDOR_ANT']
+
+                elif tipo == 'E111':
+                    codigo = registro.campo(1) or ''
+                    valor = centavos_do_sped(registro.campo(3))
+                    e113_por_e111.append([codigo, valor, None])
+                    if codigo[2:3] == '0' and codigo[3:4] in AJUSTES_E111:
+                        calculado[AJUSTES_E111[codigo[3:4]]] += valor
+                    else:
+                        resultado["avisos"].append(f"E111 {codigo}: código fora da apuração do ICMS próprio, ignorado.")
+
+                elif tipo == 'E113':
+                    # |E113|COD_PART|COD_MOD|SER|SUB|NUM_DOC|DT_DOC|COD_ITEM|VL_AJ_ITEM|CHV_DOCe|
+                    if e113_por_e111:
+                        ultimo = e113_por_e111[-1]
+                        ultimo[2] = (ultimo[2] or 0) + centavos_do_sped(registro.campo(8))
+
+                elif tipo == 'E116':
+                    soma_e116 += centavos_do_sped(registro.campo(2))
+        finally:
+            if deve_fechar:
+                sped.fechar()
+    except Exception as e:
+        print(f"  > (SPED) ERRO ao recalcular a apuração: {e}", file=sys.stderr)
+        resultado["avisos"].append(f"Erro ao ler o .txt: {e}")
+        return resultado
+
+    if ajustes_fora_do_e110:
+        print(f"  > (SPED) {ajustes_fora_do_e110} ajustes C197/D197 de ICMS ST ou DIFAL/FCP fora do E110 (E210/E310).",
+              file=sys.stderr)
+    if declarado is None:
+        print("  > (SPED) ERRO: Nenhum E110 encontrado no .txt.", file=sys.stderr)
+        resultado["avisos"].append("Nenhum E110 encontrado no .txt.")
+        return resultado
+
+    _apurar(calculado)
+
+    resultado["status"] = "OK"
+    for nome in CAMPOS_E110:
+        ok = calculado[nome] == declarado[nome]
+        resultado["campos"][nome] = {
+            "calculado": formatar_centavos(calculado[nome]),
+            "declarado": formatar_centavos(declarado[nome]),
+            "status": "OK" if ok else "Divergente"
+        }
+        if not ok:
+            resultado["status"] = "Divergente"
+            print(f"  > (SPED) E110 {nome}: calculado {formatar_centavos(calculado[nome])}"
+                  f" x declarado {formatar_centavos(declarado[nome])}", file=sys.stderr)
+
+    obrigacoes = calculado['VL_ICMS_RECOLHER'] + calculado['DEB_ESP']
+    if soma_e116 != obrigacoes:
+        resultado["avisos"].append(
+            f"Soma dos E116 ({formatar_centavos(soma_e116)}) diferente de ICMS a recolher"
+            f" + débitos especiais ({formatar_centavos(obrigacoes)})."
+        )
+    for codigo, valor, soma_e113 in e113_por_e111:
+        if soma_e113 is not None and soma_e113 != valor:
+            resultado["avisos"].append(
+                f"E111 {codigo}: soma dos E113 ({formatar_centavos(soma_e113)}) diferente do ajuste ({formatar_centavos(valor)})."
+            )
+
+    resultado["sped_recolher"] = formatar_centavos(calculado['VL_ICMS_RECOLHER'])
+    resultado["sped_saldo_credor"] = formatar_centavos(calculado['VL_SLD_CREDOR_TRANSPORTAR'])
+    print(f"  > (SPED) Apuração recalculada: a recolher {resultado['sped_recolher']},"
+          f" saldo credor {resultado['sped_saldo_credor']} ({resultado['status']}).", file=sys.stderr)
+    return resultado
+
+
+# --- PONTO DE PARTIDA (LINHA DE COMANDO) ---
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(json.dumps({"error": "Caminho do SPED .txt não fornecido."}))
+        sys.exit(1)
+    print(json.dumps(recalcular_apuracao(sys.argv[1]), indent=2, ensure_ascii=False))
@@ -0,0 +1,77 @@
+import os
+import sys
+import time
+import shutil
+
+# --- ÁREA DE TRABALHO DE CADA JOB ---
+# Cada job ganha uma pasta só dele, onde o robô salva os relatórios do PVA.
+# Os caminhos desses PDFs vão explicitamente de uma etapa para a outra
+# (robô -> vigia_pdf -> ler_pdf): ninguém procura 'relatorio_das_entradas.pdf'
+# pelo nome na pasta Documentos, então dois jobs em andamento nunca leem (nem
+# sobrescrevem) os relatórios um do outro.
+#
+#   trabalho/<job_id>/relatorios/relatorio_das_entradas.pdf
+#                               /relatorio_das_saidas.pdf
+#                               /apuracao_do_icms.pdf
+#
+# Os arquivos enviados continuam no armazém de uploads (somente leitura).
+# A área é apagada quando o job termina; a faxina da subida do servidor
+# apaga áreas esquecidas (servidor caiu no meio de um job).
+
+CAMINHO_DO_SCRIPT = os.path.dirname(os.path.abspath(__file__))
+PASTA_AREAS = os.environ.get("AREAS_TRABALHO_DIR", os.path.join(CAMINHO_DO_SCRIPT, "trabalho"))
+MANTER_AREAS = os.environ.get("AREAS_TRABALHO_MANTER", "") == "1"  # "1": não apaga (para depurar um job)
+IDADE_MAXIMA_AREA_S = 24 * 3600
+
+# Nomes dos relatórios dentro da área (os mesmos que o robô sempre usou)
+NOMES_RELATORIOS = {
+    "entradas": "relatorio_das_entradas.pdf",
+    "saidas": "relatorio_das_saidas.pdf",
+    "apuracao": "apuracao_do_icms.pdf",
+}
+
+
+class AreaTrabalho:
+    """A pasta de um job. Use como context manager (ou chame remover()) para apagar no fim."""
+
+    def __init__(self, job_id, pasta_base=PASTA_AREAS):
+        self.job_id = job_id
+        self.pasta = os.path.abspath(os.path.join(pasta_base, job_id))
+        self.pasta_relatorios = os.path.join(self.pasta, "relatorios")
+        os.makedirs(self.pasta_relatorios, exist_ok=True)
+
+    def caminhos_relatorios(self):
+        """{"entradas", "saidas", "apuracao"} -> onde o robô deve salvar cada PDF deste job."""
+        return {chave: os.path.join(self.pasta_relatorios, nome) for chave, nome in NOMES_RELATORIOS.items()}
+
+    def remover(self):
+        if MANTER_AREAS:
+            print(f"   > (ÁREA) Mantendo a área do job em {self.pasta}.", file=sys.stderr)
+            return
+        shutil.rmtree(self.pasta, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.remover()
+        return False
+
+
+def faxina(pasta_base=PASTA_AREAS, idade_maxima_s=IDADE_MAXIMA_AREA_S):
+    """
+    Apaga áreas de jobs esquecidas. Na subida do servidor nenhum job está
+    rodando, então idade_maxima_s=0 apaga todas.
+    """
+    if not os.path.isdir(pasta_base):
+        return 0
+    limite = time.time() - idade_maxima_s
+    apagadas = 0
+    for nome in os.listdir(pasta_base):
+        caminho = os.path.join(pasta_base, nome)
+        if os.path.isdir(caminho) and os.path.getmtime(caminho) <= limite:
+            shutil.rmtree(caminho, ignore_errors=True)
+            apagadas += 1
+    if apagadas:
+        print(f"   > (ÁREA) {apagadas} áreas de trabalho antigas removidas.", file=sys.stderr)
+    return apagadas
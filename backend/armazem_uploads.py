@@ -0,0 +1,169 @@
+import os
+import sys
+import time
+import shutil
+import hashlib
+import threading
+
+# --- ARMAZÉM DE UPLOADS ENDEREÇADO POR CONTEÚDO ---
+# Cada arquivo enviado é gravado uma única vez, com o nome igual ao SHA-256
+# do conteúdo (calculado antes de gravar). Se o mesmo SPED ou Livro chegar
+# de novo, nada é gravado e o job usa o arquivo que já existe: nada de
+# 'temp_uploads' cheio de cópias iguais. O
+# hash também serve de chave estável para os caches que vêm depois.
+#
+# Os jobs "pegam" o arquivo (contagem de referências) e o "soltam" no fim.
+# Arquivos sem nenhum job usando ficam guardados (um reenvio sai de graça)
+# até o armazém passar da cota: aí a faxina apaga os usados há mais tempo.
+#
+#   uploads/blobs/ab/ab12...ef.txt   <- arquivos, por hash
+#   uploads/tmp/                     <- uploads sendo gravados
+
+CAMINHO_DO_SCRIPT = os.path.dirname(os.path.abspath(__file__))
+PASTA_ARMAZEM = os.environ.get("ARMAZEM_UPLOADS_DIR", os.path.join(CAMINHO_DO_SCRIPT, "uploads"))
+COTA_MB = float(os.environ.get("ARMAZEM_UPLOADS_MAX_MB", "2048"))
+TAMANHO_BLOCO_GRAVACAO = 1024 * 1024
+IDADE_MAXIMA_TEMPORARIO_S = 3600  # Sobras de uploads interrompidos (ex: servidor caiu no meio)
+
+
+class ArmazemUploads:
+    """Arquivos por hash do conteúdo, com contagem de referências e cota de disco."""
+
+    def __init__(self, pasta, cota_bytes):
+        self.pasta = pasta
+        self.cota_bytes = cota_bytes
+        self._pasta_blobs = os.path.join(pasta, "blobs")
+        self._pasta_tmp = os.path.join(pasta, "tmp")
+        os.makedirs(self._pasta_blobs, exist_ok=True)
+        os.makedirs(self._pasta_tmp, exist_ok=True)
+        self._referencias = {}  # caminho -> quantos jobs estão usando
+        self._trava = threading.Lock()
+
+    def caminho_do_blob(self, digest, extensao):
+        return os.path.join(self._pasta_blobs, digest[:2], f"{digest}{extensao}")
+
+    def guardar(self, arquivo, extensao):
+        """
+        Calcula o SHA-256 de 'arquivo' (objeto com .read() e .seek(), como o
+        upload do FastAPI) e só grava se esse conteúdo ainda não estiver no
+        armazém. Já pega uma referência para quem chamou.
+        Retorna (digest, caminho_do_blob). Devolva com liberar(caminho).
+        """
+        hasher = hashlib.sha256()
+        for bloco in iter(lambda: arquivo.read(TAMANHO_BLOCO_GRAVACAO), b""):
+            hasher.update(bloco)
+        arquivo.seek(0)
+        digest = hasher.hexdigest()
+        caminho = self.caminho_do_blob(digest, extensao)
+
+        # Já está no armazém: a referência é pega sob a trava, então a faxina não apaga o blob
+        with self._trava:
+            if self._pegar_se_existir(caminho):
+                print(f"   > (UPLOADS) {digest[:12]}{extensao} já estava no armazém: reaproveitado.", file=sys.stderr)
+                return digest, caminho
+
+        # Conteúdo novo: grava numa temporária e move para o lugar (fora da trava, pode ser grande)
+        caminho_tmp = os.path.join(self._pasta_tmp, f"{os.getpid()}_{threading.get_ident()}_{time.time_ns()}{extensao}")
+        try:
+            with open(caminho_tmp, "wb") as destino:
+                shutil.copyfileobj(arquivo, destino, TAMANHO_BLOCO_GRAVACAO)
+            with self._trava:
+                if not self._pegar_se_existir(caminho):  # Outro job pode ter gravado o mesmo conteúdo
+                    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+                    os.replace(caminho_tmp, caminho)
+                    self._referencias[caminho] = self._referencias.get(caminho, 0) + 1
+                    print(f"   > (UPLOADS) {digest[:12]}{extensao} guardado ({os.path.getsize(caminho)} bytes).", file=sys.stderr)
+        finally:
+            if os.path.exists(caminho_tmp):
+                os.remove(caminho_tmp)
+
+        self.faxina()
+        return digest, caminho
+
+    def _pegar_se_existir(self, caminho):
+        """Com a trava: se o blob existe, pega uma referência e marca o uso. Retorna se existia."""
+        if not os.path.exists(caminho):
+            return False
+        os.utime(caminho)  # Conta como uso recente para a faxina
+        self._referencias[caminho] = self._referencias.get(caminho, 0) + 1
+        return True
+
+    def liberar(self, caminho):
+        """Solta a referência de um job. O arquivo fica até a faxina precisar do espaço."""
+        if not caminho:
+            return
+        with self._trava:
+            restantes = self._referencias.get(caminho, 0) - 1
+            if restantes > 0:
+                self._referencias[caminho] = restantes
+            else:
+                self._referencias.pop(caminho, None)
+            if os.path.exists(caminho):
+                os.utime(caminho)
+        self.faxina()
+
+    def _blobs(self):
+        """[(caminho, tamanho, ultimo_uso)] de todos os arquivos do armazém."""
+        blobs = []
+        for pasta in os.scandir(self._pasta_blobs):
+            if not pasta.is_dir():
+                continue
+            for arquivo in os.scandir(pasta.path):
+                info = arquivo.stat()
+                blobs.append((arquivo.path, info.st_size, info.st_mtime))
+        return blobs
+
+    def uso(self):
+        """{"arquivos", "bytes", "em_uso", "cota_bytes"}."""
+        with self._trava:
+            blobs = self._blobs()
+            em_uso = len(self._referencias)
+        return {"arquivos": len(blobs), "bytes": sum(b[1] for b in blobs), "em_uso": em_uso, "cota_bytes": self.cota_bytes}
+
+    def faxina(self):
+        """
+        Apaga sobras de uploads interrompidos e, se o armazém passou da cota,
+        os arquivos sem referência usados há mais tempo. Arquivo em uso nunca é apagado.
+        Retorna quantos bytes foram liberados.
+        """
+        liberados = 0
+        with self._trava:
+            agora = time.time()
+            for arquivo in os.scandir(self._pasta_tmp):
+                try:
+                    if agora - arquivo.stat().st_mtime > IDADE_MAXIMA_TEMPORARIO_S:
+                        os.remove(arquivo.path)
+                except OSError:
+                    pass
+
+            blobs = self._blobs()
+            total = sum(b[1] for b in blobs)
+            if total <= self.cota_bytes:
+                return 0
+            livres = sorted((b for b in blobs if b[0] not in self._referencias), key=lambda b: b[2])
+            for caminho, tamanho, _ in livres:
+                if total <= self.cota_bytes:
+                    break
+                try:
+                    os.remove(caminho)
+                except OSError as e:
+                    print(f"   > (UPLOADS) AVISO: Não foi possível apagar {caminho}: {e}", file=sys.stderr)
+                    continue
+                total -= tamanho
+                liberados += tamanho
+        if liberados:
+            print(f"   > (UPLOADS) Faxina: {liberados / 1024 / 1024:.1f} MB liberados (cota {self.cota_bytes / 1024 / 1024:.0f} MB).", file=sys.stderr)
+        if total > self.cota_bytes:
+            print(f"   > (UPLOADS) AVISO: Armazém acima da cota mesmo após a faxina (arquivos em uso).", file=sys.stderr)
+        return liberados
+
+
+_armazem_padrao = None
+
+
+def armazem_padrao():
+    """O armazém do processo (criado na primeira chamada)."""
+    global _armazem_padrao
+    if _armazem_padrao is None:
+        _armazem_padrao = ArmazemUploads(PASTA_ARMAZEM, int(COTA_MB * 1024 * 1024))
+    return _armazem_padrao
@@ -0,0 +1,67 @@
+import os
+import re
+import sys
+import time
+import random
+
+# Permite rodar de dentro da pasta 'benchmarks'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from documento_pdf import DocumentoPDF
+from busca_codigos import BuscadorCodigos
+
+# --- BENCHMARK: CROSS-CHECK DOS CÓDIGOS E111 ---
+# Compara o jeito antigo ('codigo in texto_completo' para cada código) com o
+# autômato de busca_codigos.py, com 2 a 1000 códigos no formato do E111
+# (UF + 6 dígitos): os que existem no Livro mais códigos inventados. O texto
+# é extraído antes de medir, então só a busca entra no tempo.
+
+QUANTIDADES_CODIGOS = (2, 10, 100, 300, 1000)
+UFS = ("MG", "SP", "RJ", "BA", "PR", "PA")
+
+
+def gerar_codigos(texto, quantidade):
+    """Os códigos de ajuste que aparecem no Livro, completados com códigos inventados."""
+    codigos = sorted(set(re.findall(r"\b[A-Z]{2}\d{6}\b", texto)))[:quantidade]
+    random.seed(quantidade)
+    while len(codigos) < quantidade:
+        codigos.append(f"{random.choice(UFS)}{random.randint(0, 999999):06d}")
+    return codigos
+
+
+def busca_antiga(texto_completo, codigos):
+    return [codigo for codigo in codigos if codigo not in texto_completo]
+
+
+def busca_nova(paginas, codigos):
+    paginas_por_codigo = BuscadorCodigos(codigos).localizar_em_paginas(paginas)
+    return [codigo for codigo in codigos if not paginas_por_codigo[codigo]]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("USO: python benchmarks/bench_busca_codigos.py livro.pdf")
+        sys.exit(1)
+
+    sys.stderr = open(os.devnull, "w")  # Silencia os logs da extração
+    with DocumentoPDF(sys.argv[1], cache=None) as doc:
+        paginas = list(doc.paginas())
+    texto_completo = "".join(texto for _, texto in paginas)
+    print(f"Livro: {len(paginas)} páginas, {len(texto_completo) / 1024 / 1024:.1f} MB de texto\n")
+
+    print(f"{'códigos':>8} {'antigo (s)':>11} {'novo (s)':>9} {'ganho':>7}  ausentes (antigo / novo)")
+    for quantidade in QUANTIDADES_CODIGOS:
+        codigos = gerar_codigos(texto_completo, quantidade)
+
+        inicio = time.perf_counter()
+        ausentes_antigo = busca_antiga(texto_completo, codigos)
+        tempo_antigo = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        ausentes_novo = busca_nova(paginas, codigos)
+        tempo_novo = time.perf_counter() - inicio
+
+        # O novo só pode achar menos (códigos dentro de tokens maiores não contam mais)
+        assert set(ausentes_antigo) <= set(ausentes_novo), "A busca nova achou código que a antiga não acha"
+        print(f"{quantidade:>8} {tempo_antigo:>11.3f} {tempo_novo:>9.3f} {tempo_antigo / tempo_novo:>6.1f}x"
+              f"  {len(ausentes_antigo)} / {len(ausentes_novo)}")
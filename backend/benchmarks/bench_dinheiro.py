@@ -0,0 +1,130 @@
+import os
+import re
+import sys
+import time
+
+# Permite rodar de dentro da pasta 'benchmarks'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from documento_pdf import DocumentoPDF
+from indice_valores import _valores_no_texto
+from dinheiro import centavos, centavos_do_sped, centavos_em_lote, formatar_centavos
+
+# --- BENCHMARK: CONVERSÃO DE VALORES (dinheiro.py x funções antigas) ---
+# Compara, nas palavras e nos valores reais de um Livro (e em campos no
+# formato do SPED gerados a partir deles):
+#   - ler_pdf.limpar_e_converter_numero (regex + float) x centavos() e o lote;
+#   - totais_sped.valor_sped_em_centavos x centavos_do_sped();
+#   - indice_valores._centavos (grupos do regex) x centavos_em_lote();
+#   - analisar_detalhes.formatar_para_texto_busca (float) x formatar_centavos().
+# O texto é extraído antes de medir. Também confere que os resultados batem
+# (a menos do sinal: a função antiga jogava o '-' fora).
+# Uso: python bench_dinheiro.py livro.pdf [repeticoes]
+
+
+def limpar_e_converter_numero_antigo(texto_numero):
+    """A antiga de ler_pdf.py."""
+    if texto_numero is None:
+        return 0.0
+    if "," not in texto_numero:
+        return 0.0
+    try:
+        texto_limpo = texto_numero.strip().replace(" ", "")
+        texto_limpo = texto_limpo.replace(".", "")
+        texto_limpo = texto_limpo.replace(",", ".")
+        texto_limpo = re.sub(r"[^0-9\.]", "", texto_limpo)
+        if not texto_limpo:
+            return 0.0
+        return float(texto_limpo)
+    except Exception:
+        return 0.0
+
+
+def valor_sped_em_centavos_antigo(texto):
+    """A antiga de totais_sped.py."""
+    if not texto:
+        return 0
+    negativo = texto.startswith('-')
+    inteiro, _, decimais = texto.lstrip('+-').partition(',')
+    try:
+        centavos = int(inteiro or '0') * 100 + int((decimais + '00')[:2])
+    except ValueError:
+        return 0
+    return -centavos if negativo else centavos
+
+
+def centavos_do_match_antigo(achou):
+    """A antiga indice_valores._centavos."""
+    sinal, inteiro, decimais = achou.groups()
+    valor = int(inteiro.replace(".", "")) * 100 + int(decimais)
+    return -valor if sinal else valor
+
+
+def formatar_para_texto_busca_antigo(valor_float):
+    """A antiga de analisar_detalhes.py."""
+    if valor_float == 0.0:
+        return "0,00"
+    return f"{valor_float:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+def medir(funcao, repeticoes):
+    melhor = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempo = time.perf_counter() - inicio
+        melhor = tempo if melhor is None else min(melhor, tempo)
+    return melhor, resultado
+
+
+def linha(nome, itens, tempo_antigo, tempo_novo):
+    print(f"{nome:<38} {itens:>9} {tempo_antigo * 1e3:>11.1f} {tempo_novo * 1e3:>10.1f} {tempo_antigo / tempo_novo:>6.1f}x")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("USO: python benchmarks/bench_dinheiro.py livro.pdf [repeticoes]")
+        sys.exit(1)
+    repeticoes = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    sys.stderr = open(os.devnull, "w")  # Silencia os logs da extração
+    with DocumentoPDF(sys.argv[1], cache=None) as doc:
+        paginas = [texto for _, texto in doc.paginas()]
+    palavras = [p for texto in paginas for p in texto.split()]
+    matches = [achou for texto in paginas for achou in _valores_no_texto(texto)]
+    valores = [achou.group() for achou in matches]
+    campos_sped = [v.replace(".", "") for v in valores]  # '1234,56': o formato dos campos do SPED
+    print(f"Livro: {len(paginas)} páginas, {len(palavras)} palavras, {len(valores)} valores\n")
+
+    # Os resultados têm que bater (a antiga perdia o sinal e aceitava 3+ decimais)
+    antigos = [limpar_e_converter_numero_antigo(p) for p in palavras]
+    novos = [centavos(p) for p in palavras]
+    lote, validos = centavos_em_lote(palavras)
+    assert novos == [int(v) if ok else None for v, ok in zip(lote.tolist(), validos.tolist())]
+    divergentes = sum(1 for a, n in zip(antigos, novos)
+                      if a > 0 and (n is None or abs(n) != round(a * 100)))
+    print(f"Palavras com valor diferente da função antiga: {divergentes} (3+ decimais não são mais dinheiro)\n")
+    assert [valor_sped_em_centavos_antigo(c) for c in campos_sped] == [centavos_do_sped(c) for c in campos_sped]
+    assert [centavos_do_match_antigo(a) for a in matches] == centavos_em_lote(valores)[0].tolist()
+    assert ([formatar_para_texto_busca_antigo(valor_sped_em_centavos_antigo(c) / 100) for c in campos_sped]
+            == [formatar_centavos(centavos_do_sped(c)) for c in campos_sped])
+
+    print(f"{'':<38} {'itens':>9} {'antigo (ms)':>11} {'novo (ms)':>10} {'ganho':>7}")
+    tempo_antigo, _ = medir(lambda: [limpar_e_converter_numero_antigo(p) for p in palavras], repeticoes)
+    tempo_novo, _ = medir(lambda: [centavos(p) for p in palavras], repeticoes)
+    linha("palavras do PDF: um a um", len(palavras), tempo_antigo, tempo_novo)
+    tempo_novo, _ = medir(lambda: centavos_em_lote(palavras), repeticoes)
+    linha("palavras do PDF: em lote (NumPy)", len(palavras), tempo_antigo, tempo_novo)
+
+    tempo_antigo, _ = medir(lambda: [valor_sped_em_centavos_antigo(c) for c in campos_sped], repeticoes)
+    tempo_novo, _ = medir(lambda: [centavos_do_sped(c) for c in campos_sped], repeticoes)
+    linha("campos do SPED", len(campos_sped), tempo_antigo, tempo_novo)
+
+    tempo_antigo, _ = medir(lambda: [centavos_do_match_antigo(a) for a in matches], repeticoes)
+    tempo_novo, _ = medir(lambda: centavos_em_lote(valores), repeticoes)
+    linha("índice de valores do Livro (lote)", len(valores), tempo_antigo, tempo_novo)
+
+    centavos_sped = [centavos_do_sped(c) for c in campos_sped]
+    tempo_antigo, _ = medir(lambda: [formatar_para_texto_busca_antigo(c / 100) for c in centavos_sped], repeticoes)
+    tempo_novo, _ = medir(lambda: [formatar_centavos(c) for c in centavos_sped], repeticoes)
+    linha("formatar '1.234,56'", len(centavos_sped), tempo_antigo, tempo_novo)
@@ -0,0 +1,77 @@
+import os
+import sys
+import time
+import fitz  # PyMuPDF
+
+# O cache em disco (cache_paginas.py) esconderia as extrações repetidas
+os.environ["CACHE_PAGINAS_DESATIVADO"] = "1"
+
+# Permite rodar de dentro da pasta 'benchmarks'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ler_pdf
+import analisar_detalhes
+from documento_pdf import DocumentoPDF
+
+# --- BENCHMARK: PÁGINAS EXTRAÍDAS POR JOB ---
+# Roda todas as análises do Livro de um job duas vezes:
+#   1. "por caminho": cada função abre o PDF sozinha (como era antes)
+#   2. "compartilhado": um único DocumentoPDF passado para todas
+# e conta quantas vezes o get_text() do PyMuPDF foi chamado.
+
+contador = {"get_text": 0}
+_get_text_original = fitz.Page.get_text
+
+
+def _get_text_contado(self, *args, **kwargs):
+    contador["get_text"] += 1
+    return _get_text_original(self, *args, **kwargs)
+
+
+def rodar_job(livro, codigos_e111, valores_para_buscar):
+    ler_pdf.encontrar_e_extrair_totais_es(livro, ler_pdf.MARCADOR_PAGINA_ENTRADAS, ler_pdf.ETIQUETA_TOTAIS_LIVRO, ler_pdf.CHAVES_COMPLETAS_ES)
+    ler_pdf.encontrar_e_extrair_totais_es(livro, ler_pdf.MARCADOR_PAGINA_SAIDAS, ler_pdf.ETIQUETA_TOTAIS_LIVRO, ler_pdf.CHAVES_LAYOUT_HORIZONTAL_SAIDAS)
+    ler_pdf.encontrar_apuracao_LIVRO(livro, ler_pdf.MARCADOR_SECAO_APURACAO_LIVRO, ler_pdf.MARCADOR_PARADA_LIVRO, ler_pdf.CODIGOS_APURACAO_LIVRO)
+    ler_pdf.somar_informacoes_complementares(livro, ler_pdf.MARCADOR_SECAO_INF_COMP, ler_pdf.MARCADOR_PARADA_LIVRO)
+    ler_pdf.analisar_detalhamento_por_codigo(livro)
+    ler_pdf.verificar_codigos_no_livro(livro, codigos_e111)
+    analisar_detalhes.buscar_valores_no_LIVRO(livro, valores_para_buscar)
+
+
+def medir(descricao, funcao):
+    contador["get_text"] = 0
+    inicio = time.perf_counter()
+    funcao()
+    duracao = time.perf_counter() - inicio
+    print(f"{descricao:<15} páginas extraídas: {contador['get_text']:>6}   tempo: {duracao:.3f}s")
+    return contador["get_text"]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("USO: python benchmarks/bench_extracao_livro.py livro.pdf [sped.txt]")
+        sys.exit(1)
+
+    caminho_livro = os.path.abspath(sys.argv[1])
+    valores = analisar_detalhes.extrair_valores_chave_do_TXT(sys.argv[2]) if len(sys.argv) > 2 else {}
+    codigos = ["XX0000000"]  # Código inexistente: força a leitura do Livro inteiro
+
+    # Silencia os logs das funções de análise
+    stderr_original = sys.stderr
+    sys.stderr = open(os.devnull, "w")
+    fitz.Page.get_text = _get_text_contado
+    try:
+        with DocumentoPDF(caminho_livro) as doc:
+            n_paginas = len(doc)
+        antes = medir("por caminho", lambda: rodar_job(caminho_livro, codigos, valores))
+
+        def _compartilhado():
+            with DocumentoPDF(caminho_livro) as doc:
+                rodar_job(doc, codigos, valores)
+        depois = medir("compartilhado", _compartilhado)
+    finally:
+        fitz.Page.get_text = _get_text_original
+        sys.stderr.close()
+        sys.stderr = stderr_original
+
+    print(f"\nLivro com N = {n_paginas} páginas: {antes / n_paginas:.1f}N -> {depois / n_paginas:.1f}N")
@@ -0,0 +1,60 @@
+import os
+import sys
+import time
+
+# O cache em disco (cache_paginas.py) mediria o SQLite, não a extração
+os.environ["CACHE_PAGINAS_DESATIVADO"] = "1"
+
+# Permite rodar de dentro da pasta 'benchmarks'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import documento_pdf
+from documento_pdf import DocumentoPDF
+
+# --- BENCHMARK: EXTRAÇÃO PARALELA POR PÁGINA ---
+# Extrai o Livro inteiro com 1, 2, 4 e 8 processos e mostra o tempo e o
+# ganho em relação a 1 processo. Confere também que o texto é idêntico.
+# O pool é criado (e aquecido) antes de medir, como acontece no servidor.
+
+WORKERS_TESTADOS = (1, 2, 4, 8)
+
+
+def extrair(caminho_livro, num_workers):
+    with DocumentoPDF(caminho_livro, cache=None) as doc:
+        doc.extrair_em_paralelo(num_workers)
+        return [doc.texto(i) for i in range(len(doc))]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("USO: python benchmarks/bench_extracao_paralela.py livro.pdf")
+        sys.exit(1)
+
+    caminho_livro = os.path.abspath(sys.argv[1])
+    with DocumentoPDF(caminho_livro, cache=None) as doc:
+        n_paginas = len(doc)
+    print(f"Livro: {n_paginas} páginas, {os.path.getsize(caminho_livro) / 1024 / 1024:.1f} MB (CPUs: {os.cpu_count()})\n")
+
+    # Silencia os logs da extração
+    stderr_original = sys.stderr
+    sys.stderr = open(os.devnull, "w")
+    referencia = None
+    tempo_1 = None
+    try:
+        for num_workers in WORKERS_TESTADOS:
+            if num_workers > 1:
+                # Aquece o pool (spawn + import do fitz) fora da medição
+                documento_pdf._pool_extracao(num_workers).map(abs, range(num_workers))
+            inicio = time.perf_counter()
+            textos = extrair(caminho_livro, num_workers)
+            duracao = time.perf_counter() - inicio
+
+            if referencia is None:
+                referencia, tempo_1 = textos, duracao
+            igual = "ok" if textos == referencia else "DIFERENTE!"
+            print(f"{num_workers} worker(s): {duracao:7.3f}s   {n_paginas / duracao:8.1f} pág/s   "
+                  f"ganho: {tempo_1 / duracao:4.2f}x   texto: {igual}")
+    finally:
+        documento_pdf.encerrar_pool_extracao()
+        sys.stderr.close()
+        sys.stderr = stderr_original
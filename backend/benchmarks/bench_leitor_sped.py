@@ -0,0 +1,78 @@
+import os
+import sys
+import time
+import tempfile
+
+# Permite rodar de dentro da pasta 'benchmarks'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from leitor_sped import IndiceSped
+
+# --- BENCHMARK: LEITOR INDEXADO x LAÇO LINHA A LINHA ---
+# Gera SPEDs sintéticos de 5 MB a 500 MB (repetindo o bloco C de um SPED real,
+# com o bloco E no final, como num arquivo de verdade) e compara:
+#   1. "laço": o jeito antigo, decodifica/limpa/quebra todas as linhas
+#   2. "índice": IndiceSped (mmap + índice) e leitura só de E110/E111/E116
+# As duas formas têm que achar os mesmos campos.
+
+TAMANHOS_MB = (5, 50, 500)
+TIPOS_LIDOS = ('E110', 'E111', 'E116')
+
+
+def gerar_sped(caminho_modelo, tamanho_mb, caminho_saida):
+    with open(caminho_modelo, 'rb') as f:
+        linhas = f.read().splitlines(keepends=True)
+    corpo = b"".join(l for l in linhas if not l.startswith((b'|E', b'|9', b'|1')))
+    final = b"".join(l for l in linhas if l.startswith((b'|E', b'|9', b'|1')))
+    alvo = tamanho_mb * 1024 * 1024
+    with open(caminho_saida, 'wb') as f:
+        escrito = 0
+        while escrito < alvo:
+            f.write(corpo)
+            escrito += len(corpo)
+        f.write(final)
+
+
+def ler_com_laco(caminho):
+    encontrados = []
+    with open(caminho, 'r', encoding='latin-1') as f:
+        for linha in f:
+            linha_limpa = linha.strip()
+            if not linha_limpa or not linha_limpa.startswith('|'):
+                continue
+            campos = linha_limpa[1:-1].split('|')
+            if campos[0] in TIPOS_LIDOS:
+                encontrados.append((campos[0], campos[1], campos[2], campos[3]))
+    return encontrados
+
+
+def ler_com_indice(caminho):
+    with IndiceSped(caminho) as sped:
+        return [(r.tipo, r.campo(1), r.campo(2), r.campo(3)) for r in sped.registros(*TIPOS_LIDOS)]
+
+
+def medir(funcao, caminho):
+    inicio = time.perf_counter()
+    resultado = funcao(caminho)
+    return time.perf_counter() - inicio, resultado
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("USO: python benchmarks/bench_leitor_sped.py sped_modelo.txt [tamanho_mb ...]")
+        sys.exit(1)
+
+    caminho_modelo = sys.argv[1]
+    tamanhos = [int(t) for t in sys.argv[2:]] or TAMANHOS_MB
+
+    with tempfile.TemporaryDirectory() as pasta:
+        for tamanho_mb in tamanhos:
+            caminho = os.path.join(pasta, f"sped_{tamanho_mb}mb.txt")
+            gerar_sped(caminho_modelo, tamanho_mb, caminho)
+
+            tempo_laco, resultado_laco = medir(ler_com_laco, caminho)
+            tempo_indice, resultado_indice = medir(ler_com_indice, caminho)
+            igual = "ok" if resultado_laco == resultado_indice else "DIFERENTE!"
+            print(f"{tamanho_mb:>4} MB   laço: {tempo_laco:7.3f}s   índice: {tempo_indice:7.3f}s   "
+                  f"ganho: {tempo_laco / tempo_indice:5.1f}x   campos: {igual}")
+            os.remove(caminho)
@@ -0,0 +1,103 @@
+import os
+import sys
+import json
+import tempfile
+import cv2
+import numpy as np
+from PIL import Image
+
+# Permite rodar de dentro da pasta 'benchmarks'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import replay_robo
+from bench_visao_robo import tela_sintetica
+
+# --- BENCHMARK: EXECUÇÃO COMPLETA DO WALL-E, SEM O PVA ---
+# Com uma pasta gravada (replay_robo.py gravar ...), reproduz essa gravação:
+#   python bench_replay_robo.py pasta_gravacao
+# Sem argumentos, monta uma gravação sintética de um SPED novo (importação +
+# validação + 3 relatórios) com as imagens do robô coladas numa tela falsa e
+# os tempos típicos do PVA, e reproduz. Serve para medir no CI quanto do
+# tempo do robô é pausa fixa e quanto é trabalho do PVA.
+
+CAMINHO_BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROBO = os.path.join(CAMINHO_BACKEND, "imagens_robo")
+PDF = os.path.join(CAMINHO_BACKEND, "imagens_pdf")
+
+# (ação que o robô faz, [(atraso em segundos, imagens na tela depois disso)])
+# Uma tela sem imagens é o PVA trabalhando ou uma janela fechando.
+ROTEIRO_PVA = [
+    (None, [(0.0, [])]),
+    ("abrir_programa", [(12.0, [(ROBO, "menu_escrituracao.png")])]),
+    ("clicar", [(0.4, [(ROBO, "submenu_nova.png")])]),
+    ("clicar", [(0.4, [(ROBO, "submenu_importar.png")])]),
+    ("clicar", [(1.5, [])]),                                  # Janela de escolher o arquivo
+    ("escrever", []),
+    ("tecla", [(2.5, [(ROBO, "sim_intermediario.png")])]),
+    ("clicar", [(0.3, []), (2.0, [(ROBO, "sim_intermediario.png")])]),
+    ("clicar", [(0.3, []), (45.0, [(ROBO, "ok_intermediario.png")])]),  # Validação
+    ("clicar", [(0.5, [(PDF, "menu_relatorios.png")])]),
+    ("clicar", [(0.4, [(PDF, "documentos.png")])]),
+    ("clicar", [(0.4, [(PDF, "menu_entradas.png")])]),
+    ("clicar", [(2.5, [(PDF, "botao_imprimir_pva.png")])]),
+    ("clicar", [(0.8, [(PDF, "ok_imprimir.png")])]),
+    ("clicar", [(0.3, []), (12.0, [(PDF, "janela_salvar_como.png")])]),
+    ("copiar", []),
+    ("atalho", []),
+    ("tecla", [(1.5, [(PDF, "menu_saidas.png")])]),
+    ("clicar", [(2.5, [(PDF, "botao_imprimir_pva.png")])]),
+    ("clicar", [(0.8, [(PDF, "ok_imprimir.png")])]),
+    ("clicar", [(0.3, []), (10.0, [(PDF, "janela_salvar_como.png")])]),
+    ("copiar", []),
+    ("atalho", []),
+    ("tecla", [(1.5, [(PDF, "menu_apuracao_icms.png")])]),
+    ("clicar", [(0.4, [(PDF, "operacoes_proprias.png")])]),
+    ("clicar", [(2.0, [(PDF, "botao_imprimir_pva.png")])]),
+    ("clicar", [(0.8, [(PDF, "ok_imprimir.png")])]),
+    ("clicar", [(0.3, []), (6.0, [(PDF, "janela_salvar_como.png")])]),
+    ("copiar", []),
+    ("atalho", []),
+    ("tecla", [(1.5, [])]),
+]
+
+
+def gravacao_sintetica(pasta, semente=0):
+    """Escreve em 'pasta' uma gravação no formato do replay_robo a partir do ROTEIRO_PVA."""
+    rng = np.random.default_rng(semente)
+    fundo = cv2.cvtColor(tela_sintetica(rng), cv2.COLOR_RGB2GRAY)
+    posicoes = {}
+    linhas = [{"t": 0.0, "tipo": "inicio", "sped": "sintetico.txt", "tamanho_sped": 1024 * 1024}]
+    t, quadros = 0.0, 0
+    for acao, telas in ROTEIRO_PVA:
+        if acao is not None:
+            t += 0.5
+            linhas.append({"t": round(t, 3), "tipo": "acao", "acao": acao, "args": []})
+        inicio_acao = t
+        for atraso, imagens in telas:
+            tela = fundo.copy()
+            for pasta_imagem, nome in imagens:
+                imagem = np.asarray(Image.open(os.path.join(pasta_imagem, nome)).convert("L"))
+                if nome not in posicoes:  # O PVA abre cada janela sempre no mesmo lugar
+                    posicoes[nome] = (int(rng.integers(0, tela.shape[1] - imagem.shape[1])),
+                                      int(rng.integers(0, tela.shape[0] - imagem.shape[0])))
+                x, y = posicoes[nome]
+                tela[y:y + imagem.shape[0], x:x + imagem.shape[1]] = imagem
+            quadros += 1
+            arquivo = f"quadro_{quadros:05d}.png"
+            cv2.imwrite(os.path.join(pasta, arquivo), tela)
+            t = max(t, inicio_acao + atraso)
+            linhas.append({"t": round(inicio_acao + atraso, 3), "tipo": "quadro", "arquivo": arquivo})
+    with open(os.path.join(pasta, replay_robo.ARQUIVO_ROTEIRO), "w", encoding="utf-8") as arquivo:
+        for linha in linhas:
+            arquivo.write(json.dumps(linha) + "\n")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        relatorio = replay_robo.reproduzir_execucao(sys.argv[1])
+    else:
+        with tempfile.TemporaryDirectory() as pasta:
+            gravacao_sintetica(pasta)
+            relatorio = replay_robo.reproduzir_execucao(pasta)
+    print("\n")
+    replay_robo.imprimir_relatorio(relatorio)
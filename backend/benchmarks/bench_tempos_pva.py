@@ -0,0 +1,62 @@
+import os
+import sys
+import numpy as np
+
+# Permite rodar de dentro da pasta 'benchmarks'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tempos_pva
+
+# --- BENCHMARK: TIMEOUTS PELA PREVISÃO x REGRA DOS 5 MB ---
+# Simula um histórico de execuções em que a validação do PVA cresce com os
+# C170/D100 (e não só com o tamanho do arquivo) e compara, em SPEDs novos:
+#   - quantas validações estourariam o timeout (job perdido);
+#   - quanto tempo o robô esperaria à toa num PVA travado (timeout - duração real).
+# Uso: python bench_tempos_pva.py [execucoes_no_historico]
+
+MB = 1024 * 1024
+
+
+def sped_aleatorio(rng):
+    c100 = int(rng.lognormal(7.5, 1.0))
+    c170 = int(c100 * rng.uniform(1.0, 8.0))
+    d100 = int(rng.lognormal(5.0, 1.5))
+    bytes_ = int((c100 * 180 + c170 * 160 + d100 * 170) * rng.uniform(1.1, 1.6))
+    return {"bytes": bytes_, "C100": c100, "C170": c170, "C190": int(c100 * 1.5), "D100": d100,
+            "D190": int(d100 * 1.2), "E111": int(rng.integers(0, 30))}
+
+
+def validacao_real(c, rng):
+    """Duração 'verdadeira' da importação (s): C170 e D100 pesam mais que o tamanho."""
+    return (20 + c["C170"] * 0.012 + c["D100"] * 0.05 + c["bytes"] / MB * 2) * rng.lognormal(0, 0.15)
+
+
+def timeout_regra_antiga(c):
+    return 1800 if c["bytes"] / MB > 5 else 900
+
+
+if __name__ == "__main__":
+    execucoes = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    rng = np.random.default_rng(0)
+    historico = tempos_pva.HistoricoTempos(":memory:")
+    for _ in range(execucoes):
+        c = sped_aleatorio(rng)
+        historico.registrar(c, {tempos_pva.PASSO_IMPORTACAO: validacao_real(c, rng)})
+
+    novos = [sped_aleatorio(rng) for _ in range(2000)]
+    reais = np.array([validacao_real(c, rng) for c in novos])
+    previsoes = [historico.prever(c)[tempos_pva.PASSO_IMPORTACAO] for c in novos]
+    esperado = np.array([p["esperado_s"] for p in previsoes])
+    antigo = np.array([timeout_regra_antiga(c) for c in novos])
+    # Como no wall_e: SPED maior que todos do histórico não baixa o timeout da regra antiga
+    previsto = np.array([max(p["pior_caso_s"], a if p["extrapolado"] else 0) for p, a in zip(previsoes, antigo)])
+
+    erro = np.abs(esperado - reais) / reais
+    print(f"Histórico: {execucoes} execuções | SPEDs novos: {len(novos)} "
+          f"(validação real: mediana {np.median(reais):.0f}s, máx {reais.max():.0f}s)")
+    print(f"Erro da previsão (esperado x real): mediana {np.median(erro):.1%}, p95 {np.quantile(erro, 0.95):.1%}")
+    print(f"{'':<22} {'estouros':>9} {'espera à toa (mediana)':>24}")
+    for nome, timeouts in (("regra dos 5 MB", antigo), ("previsão (pior caso)", previsto)):
+        estouros = int((reais > timeouts).sum())
+        folga = np.median(np.maximum(timeouts - reais, 0))
+        print(f"{nome:<22} {estouros:>9} {folga:>23.0f}s")
@@ -0,0 +1,94 @@
+import os
+import sys
+import time
+import cv2
+import numpy as np
+from PIL import Image
+
+# Permite rodar de dentro da pasta 'benchmarks'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from visao_robo import MotorTemplates, FonteTelaArquivos, em_cinza
+
+# --- BENCHMARK: BUSCA DE IMAGENS DO WALL-E ---
+# Mede o custo de UMA tentativa de busca (o que o robô faz a cada poucos
+# décimos de segundo) para cada imagem de 'imagens_robo' e 'imagens_pdf':
+#   1. "pyautogui": relê o PNG e compara colorido, na resolução cheia, contra
+#      a tela inteira (o que o locateOnScreen com 'confidence' faz);
+#   2. "motor (tela inteira)": template já carregado, busca na tela reduzida;
+#   3. "motor (última região)": a imagem já foi vista antes, busca só em volta.
+# Sem argumentos, monta uma tela 1920x1080 sintética com cada imagem colada
+# num lugar aleatório; com um print salvo (python bench_visao_robo.py tela.png)
+# mede nesse print (imagens ausentes contam como "não achou").
+
+CAMINHO_BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASTAS = [os.path.join(CAMINHO_BACKEND, "imagens_robo"), os.path.join(CAMINHO_BACKEND, "imagens_pdf")]
+REPETICOES = 5
+
+
+def tela_sintetica(rng, largura=1920, altura=1080):
+    """Fundo claro com blocos coloridos e texto, parecido com uma tela do Windows."""
+    tela = np.full((altura, largura, 3), 235, np.uint8)
+    for _ in range(300):
+        x, y = int(rng.integers(0, largura - 20)), int(rng.integers(0, altura - 20))
+        tela[y:y + int(rng.integers(10, 60)), x:x + int(rng.integers(20, 300))] = rng.integers(0, 255, 3)
+    for _ in range(400):
+        posicao = (int(rng.integers(0, largura - 120)), int(rng.integers(20, altura - 10)))
+        cv2.putText(tela, f"Registro {int(rng.integers(1e6))}", posicao, cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 1)
+    return tela
+
+
+def busca_pyautogui(tela_rgb, caminho, confianca):
+    """O que o pyscreeze faz por tentativa: lê o arquivo e compara colorido na tela inteira."""
+    imagem = cv2.imread(caminho, cv2.IMREAD_COLOR)
+    resultado = cv2.matchTemplate(cv2.cvtColor(tela_rgb, cv2.COLOR_RGB2BGR), imagem, cv2.TM_CCOEFF_NORMED)
+    _, nota, _, posicao = cv2.minMaxLoc(resultado)
+    return posicao if nota >= confianca else None
+
+
+def medir(funcao):
+    inicio = time.perf_counter()
+    for _ in range(REPETICOES):
+        resultado = funcao()
+    return (time.perf_counter() - inicio) / REPETICOES * 1000, resultado
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    print_salvo = sys.argv[1] if len(sys.argv) > 1 else None
+    fundo = np.asarray(Image.open(print_salvo).convert("RGB")) if print_salvo else tela_sintetica(rng)
+
+    motor = MotorTemplates(FonteTelaArquivos([]))
+    carregar_inicio = time.perf_counter()
+    for pasta in PASTAS:
+        motor.carregar_pasta(pasta)
+    print(f"Pré-carga das imagens: {(time.perf_counter() - carregar_inicio) * 1000:.1f} ms (uma vez por processo)\n")
+
+    print(f"{'imagem':<26} {'pyautogui':>10} {'tela inteira':>13} {'última região':>14}  achou")
+    totais = [0.0, 0.0, 0.0]
+    for pasta in PASTAS:
+        for nome in sorted(os.listdir(pasta)):
+            caminho = os.path.join(pasta, nome)
+            tela = fundo.copy()
+            if not print_salvo:
+                colada = np.asarray(Image.open(caminho).convert("RGB"))
+                x = int(rng.integers(0, tela.shape[1] - colada.shape[1]))
+                y = int(rng.integers(0, tela.shape[0] - colada.shape[0]))
+                tela[y:y + colada.shape[0], x:x + colada.shape[1]] = colada
+            tela_cinza = em_cinza(tela)
+
+            t_antigo, achou_antigo = medir(lambda: busca_pyautogui(tela, caminho, 0.8))
+
+            def busca_fria():
+                motor.template(caminho).ultima_posicao = None
+                return motor.localizar(caminho, 0.8, tela=tela_cinza)
+            t_frio, achou_frio = medir(busca_fria)
+            t_quente, achou_quente = medir(lambda: motor.localizar(caminho, 0.8, tela=tela_cinza))
+
+            mesmo_lugar = (achou_antigo is None and achou_frio is None) or (
+                achou_frio is not None and achou_antigo == tuple(achou_frio[:2]) == tuple(achou_quente[:2]))
+            totais = [totais[0] + t_antigo, totais[1] + t_frio, totais[2] + t_quente]
+            print(f"{nome:<26} {t_antigo:>8.1f}ms {t_frio:>11.1f}ms {t_quente:>12.2f}ms  "
+                  f"{'sim' if achou_frio else 'não'}{'' if mesmo_lugar else ' (posição diferente do pyautogui!)'}")
+    print(f"\n{'TOTAL':<26} {totais[0]:>8.1f}ms {totais[1]:>11.1f}ms {totais[2]:>12.2f}ms")
+    print(f"Ganho: {totais[0] / totais[1]:.1f}x na tela inteira, {totais[0] / totais[2]:.0f}x na última região")
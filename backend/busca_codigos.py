@@ -0,0 +1,103 @@
+import re
+from collections import deque
+
+# --- BUSCA DE VÁRIOS CÓDIGOS NUMA PASSADA SÓ (AHO-CORASICK) ---
+# O cross-check dos códigos E111 procurava cada código no texto inteiro do
+# Livro ('codigo in texto'): custo = códigos x tamanho do texto, e um código
+# dentro de um token maior (ex: 'MG020002' em 'XMG0200021') contava como
+# encontrado. Aqui todos os códigos viram um único autômato Aho-Corasick e o
+# texto de cada página é percorrido uma vez, não importa quantos códigos
+# existam. Um código só conta se estiver isolado: o caractere antes e o
+# depois não podem ser letra nem dígito.
+
+
+_ALFANUMERICO = re.compile(r"[^\W_]")  # Letra ou dígito (\w sem o '_')
+
+
+def _eh_fronteira(texto, posicao):
+    """True se 'posicao' está fora do texto ou não é letra/dígito."""
+    return posicao < 0 or posicao >= len(texto) or not _ALFANUMERICO.match(texto, posicao)
+
+
+class BuscadorCodigos:
+    """
+    Autômato montado uma vez com todos os códigos.
+    buscar(texto) acha todas as ocorrências isoladas; localizar_em_paginas()
+    diz em quais páginas cada código aparece.
+    """
+
+    def __init__(self, codigos):
+        self.codigos = list(dict.fromkeys(c for c in codigos if c))  # Sem vazios e sem repetidos, na ordem
+        self._transicoes = [{}]  # Estado -> {caractere: próximo estado}
+        self._falha = [0]        # Estado -> estado do maior sufixo que também é prefixo de algum código
+        self._saidas = [()]      # Estado -> códigos que terminam nele
+
+        for codigo in self.codigos:
+            estado = 0
+            for caractere in codigo:
+                proximo = self._transicoes[estado].get(caractere)
+                if proximo is None:
+                    proximo = len(self._transicoes)
+                    self._transicoes[estado][caractere] = proximo
+                    self._transicoes.append({})
+                    self._falha.append(0)
+                    self._saidas.append(())
+                estado = proximo
+            self._saidas[estado] = self._saidas[estado] + (codigo,)
+
+        # Ligações de falha em largura (os filhos da raiz falham para a raiz)
+        fila = deque(self._transicoes[0].values())
+        while fila:
+            estado = fila.popleft()
+            for caractere, proximo in self._transicoes[estado].items():
+                fila.append(proximo)
+                falha = self._falha[estado]
+                while falha and caractere not in self._transicoes[falha]:
+                    falha = self._falha[falha]
+                destino = self._transicoes[falha].get(caractere, 0)
+                self._falha[proximo] = destino if destino != proximo else 0
+                self._saidas[proximo] = self._saidas[proximo] + self._saidas[self._falha[proximo]]
+
+        # Parado na raiz, pula direto (em C) para o próximo ponto onde uma ocorrência
+        # isolada pode começar: um caractere inicial de algum código logo depois
+        # de uma fronteira. O resto do texto (a maior parte) nem passa pelo laço.
+        # (A classe vem antes do lookbehind: assim o 're' varre pelo caractere, bem mais rápido.)
+        primeiros = ''.join(re.escape(c) for c in sorted(self._transicoes[0]))
+        self._proximo_inicio = re.compile(f"[{primeiros}](?<![^\\W_].)") if primeiros else None
+
+    def buscar(self, texto):
+        """Itera por (codigo, posicao_inicial) de cada ocorrência isolada, na ordem do texto."""
+        if self._proximo_inicio is None or not texto:
+            return
+        transicoes, falha, saidas = self._transicoes, self._falha, self._saidas
+        estado = 0
+        i, n = 0, len(texto)
+        while i < n:
+            if estado == 0:
+                achou = self._proximo_inicio.search(texto, i)
+                if achou is None:
+                    return
+                i = achou.start()
+            caractere = texto[i]
+            while estado and caractere not in transicoes[estado]:
+                estado = falha[estado]
+            estado = transicoes[estado].get(caractere, 0)
+            for codigo in saidas[estado]:
+                inicio = i - len(codigo) + 1
+                if _eh_fronteira(texto, inicio - 1) and _eh_fronteira(texto, i + 1):
+                    yield codigo, inicio
+            i += 1
+
+    def localizar_em_paginas(self, paginas):
+        """
+        Recebe um iterável de (pagina_num, texto) (ex: DocumentoPDF.paginas(),
+        páginas a partir de 0) e retorna {codigo: [páginas, a partir de 1]}.
+        Códigos não encontrados ficam com lista vazia.
+        """
+        paginas_por_codigo = {codigo: [] for codigo in self.codigos}
+        for pagina_num, texto in paginas:
+            for codigo, _ in self.buscar(texto):
+                encontradas = paginas_por_codigo[codigo]
+                if not encontradas or encontradas[-1] != pagina_num + 1:
+                    encontradas.append(pagina_num + 1)
+        return paginas_por_codigo
@@ -0,0 +1,178 @@
+import os
+import sys
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import threading
+import fitz  # PyMuPDF
+
+# --- CACHE PERSISTENTE DE TEXTO POR PÁGINA ---
+# Guarda em SQLite o texto (e as palavras com suas caixas) de cada página já
+# extraída, indexado pelo hash do CONTEÚDO da página. Assim, reenviar o mesmo
+# Livro (ou um Livro com poucas páginas alteradas) só re-extrai o que mudou.
+
+CAMINHO_DO_SCRIPT = os.path.dirname(os.path.abspath(__file__))
+PASTA_CACHE = os.environ.get("CACHE_PAGINAS_DIR", os.path.join(CAMINHO_DO_SCRIPT, "cache"))
+TAMANHO_MAXIMO_MB = float(os.environ.get("CACHE_PAGINAS_MAX_MB", "512"))
+CACHE_DESATIVADO = os.environ.get("CACHE_PAGINAS_DESATIVADO", "") == "1"
+
+# Muda se o formato do que guardamos (ou o extrator) mudar
+VERSAO_CACHE = f"v1-pymupdf{fitz.VersionBind}"
+
+
+class CachePaginas:
+    """
+    Cache LRU em disco (SQLite, modo WAL) de páginas extraídas.
+    Cada entrada guarda o texto e, opcionalmente, as palavras (get_text("words")),
+    ambos comprimidos com zlib. Quando o total passa de 'tamanho_maximo_bytes',
+    as páginas acessadas há mais tempo são apagadas. O total fica numa tabela
+    de uma linha ('uso'), mantida por triggers a cada inserção e remoção (de
+    qualquer processo): a tabela de páginas só é percorrida para despejar.
+    Pode ser usado por várias threads (o vigia_pdf lê relatórios em paralelo).
+    """
+
+    def __init__(self, caminho_db, tamanho_maximo_bytes):
+        self.caminho_db = caminho_db
+        self.tamanho_maximo_bytes = tamanho_maximo_bytes
+        self._trava = threading.Lock()
+        self._conexao = sqlite3.connect(caminho_db, timeout=30, check_same_thread=False)
+        self._conexao.execute("PRAGMA journal_mode=WAL")
+        self._conexao.execute("PRAGMA synchronous=NORMAL")
+        self._conexao.execute("""
+            CREATE TABLE IF NOT EXISTS paginas (
+                chave TEXT PRIMARY KEY,
+                texto BLOB NOT NULL,
+                palavras BLOB,
+                tamanho INTEGER NOT NULL,
+                ultimo_acesso REAL NOT NULL
+            )
+        """)
+        self._conexao.execute("CREATE INDEX IF NOT EXISTS idx_paginas_acesso ON paginas (ultimo_acesso)")
+        self._conexao.commit()
+        # Tabela, triggers e o total inicial numa transação só, para outro processo não inserir no meio
+        self._conexao.executescript("""
+            BEGIN IMMEDIATE;
+            CREATE TABLE IF NOT EXISTS uso (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                total_bytes INTEGER NOT NULL
+            );
+            INSERT OR IGNORE INTO uso (id, total_bytes) SELECT 1, COALESCE(SUM(tamanho), 0) FROM paginas;
+            CREATE TRIGGER IF NOT EXISTS uso_inserir AFTER INSERT ON paginas
+                BEGIN UPDATE uso SET total_bytes = total_bytes + NEW.tamanho WHERE id = 1; END;
+            CREATE TRIGGER IF NOT EXISTS uso_remover AFTER DELETE ON paginas
+                BEGIN UPDATE uso SET total_bytes = total_bytes - OLD.tamanho WHERE id = 1; END;
+            CREATE TRIGGER IF NOT EXISTS uso_atualizar AFTER UPDATE OF tamanho ON paginas
+                BEGIN UPDATE uso SET total_bytes = total_bytes + NEW.tamanho - OLD.tamanho WHERE id = 1; END;
+            COMMIT;
+        """)
+
+    def buscar(self, chave):
+        """Retorna (texto, palavras) ou None. 'palavras' é None se nunca foram extraídas."""
+        with self._trava:
+            linha = self._conexao.execute(
+                "SELECT texto, palavras FROM paginas WHERE chave = ?", (chave,)
+            ).fetchone()
+            if linha is None:
+                return None
+            with self._conexao:
+                self._conexao.execute("UPDATE paginas SET ultimo_acesso = ? WHERE chave = ?", (time.time(), chave))
+        texto = zlib.decompress(linha[0]).decode("utf-8")
+        palavras = None
+        if linha[1] is not None:
+            palavras = [tuple(p) for p in json.loads(zlib.decompress(linha[1]))]
+        return texto, palavras
+
+    def salvar(self, chave, texto, palavras=None):
+        texto_blob = zlib.compress(texto.encode("utf-8"))
+        palavras_blob = None
+        if palavras is not None:
+            palavras_blob = zlib.compress(json.dumps(palavras, separators=(",", ":")).encode("utf-8"))
+        tamanho = len(texto_blob) + (len(palavras_blob) if palavras_blob else 0)
+        with self._trava:
+            with self._conexao:
+                # Upsert (e não INSERT OR REPLACE): a troca de uma página dispara o trigger de UPDATE
+                self._conexao.execute(
+                    "INSERT INTO paginas (chave, texto, palavras, tamanho, ultimo_acesso) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT (chave) DO UPDATE SET texto = excluded.texto, palavras = excluded.palavras, "
+                    "tamanho = excluded.tamanho, ultimo_acesso = excluded.ultimo_acesso",
+                    (chave, texto_blob, palavras_blob, tamanho, time.time())
+                )
+            self._despejar_se_necessario()
+
+    def tamanho_total(self):
+        """Bytes guardados no cache (soma de 'tamanho' de todas as páginas)."""
+        with self._trava:
+            return self._total()
+
+    def _total(self):
+        return self._conexao.execute("SELECT total_bytes FROM uso WHERE id = 1").fetchone()[0]
+
+    def _despejar_se_necessario(self):
+        total = self._total()
+        if total <= self.tamanho_maximo_bytes:
+            return
+        # Apaga as menos usadas até ficar com 90% do limite (evita despejar a cada inserção)
+        alvo = self.tamanho_maximo_bytes * 0.9
+        apagar = []
+        for chave, tamanho in self._conexao.execute("SELECT chave, tamanho FROM paginas ORDER BY ultimo_acesso"):
+            if total <= alvo:
+                break
+            apagar.append((chave,))
+            total -= tamanho
+        with self._conexao:
+            self._conexao.executemany("DELETE FROM paginas WHERE chave = ?", apagar)
+        print(f"   > (CACHE) {len(apagar)} páginas antigas removidas do cache.", file=sys.stderr)
+
+    def fechar(self):
+        self._conexao.close()
+
+
+def hash_pagina(doc, pagina, hashes_fontes):
+    """
+    Hash do conteúdo de uma página: o content stream, os XObjects usados,
+    o tamanho/rotação e o mapa ToUnicode de cada fonte (que define o texto extraído).
+    'hashes_fontes' é um dicionário {xref: digest} reaproveitado entre páginas do mesmo doc.
+    """
+    h = hashlib.sha256(VERSAO_CACHE.encode())
+    h.update(f"{tuple(pagina.rect)}|{pagina.rotation}".encode())
+    h.update(pagina.read_contents())
+    for xobjeto in pagina.get_xobjects():
+        h.update(doc.xref_stream(xobjeto[0]) or b"")
+    for fonte in pagina.get_fonts():
+        xref = fonte[0]
+        if xref not in hashes_fontes:
+            h_fonte = hashlib.sha256(repr(fonte[1:]).encode())
+            tipo, valor = doc.xref_get_key(xref, "ToUnicode")
+            if tipo == "xref":
+                h_fonte.update(doc.xref_stream(int(valor.split()[0])) or b"")
+            hashes_fontes[xref] = h_fonte.digest()
+        h.update(hashes_fontes[xref])
+    return h.hexdigest()
+
+
+_cache_padrao = None
+_pid_cache_padrao = None
+
+
+def cache_padrao():
+    """
+    Retorna o cache compartilhado do processo (ou None se estiver desativado).
+    Cada processo abre a sua própria conexão com o mesmo arquivo SQLite.
+    """
+    global _cache_padrao, _pid_cache_padrao
+    if CACHE_DESATIVADO:
+        return None
+    if _cache_padrao is None or _pid_cache_padrao != os.getpid():
+        try:
+            os.makedirs(PASTA_CACHE, exist_ok=True)
+            _cache_padrao = CachePaginas(
+                os.path.join(PASTA_CACHE, "paginas.sqlite3"),
+                int(TAMANHO_MAXIMO_MB * 1024 * 1024)
+            )
+            _pid_cache_padrao = os.getpid()
+        except Exception as e:
+            print(f"   > (CACHE) AVISO: Não foi possível abrir o cache de páginas: {e}", file=sys.stderr)
+            return None
+    return _cache_padrao
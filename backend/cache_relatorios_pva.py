@@ -0,0 +1,206 @@
+import os
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+# --- CACHE DOS RELATÓRIOS DO PVA POR HASH DO SPED ---
+# A etapa mais lenta do job é o robô importar/validar o SPED no PVA e gerar os
+# três relatórios. Os relatórios só dependem do SPED, e é comum reenviar o
+# MESMO SPED com um Livro corrigido. Então os totais já lidos dos três PDFs
+# (o retorno de ler_pdf.ler_relatorio_pva para entradas, saídas e apuração)
+# ficam guardados em SQLite pelo SHA-256 do conteúdo do SPED (o mesmo hash do
+# armazém de uploads). Com o hash no cache, o job nem chama o robô.
+#
+# - Só entra no cache uma leitura completa dos três relatórios (um PDF que
+#   falhou não pode virar resposta "certa" nos próximos jobs).
+# - Despejo: entradas mais velhas que IDADE_MAXIMA_DIAS (o PVA pode ser
+#   atualizado e mudar os relatórios) e, passando de MAX_ENTRADAS, as usadas
+#   há mais tempo.
+# - "Forçar": o job pode pedir para ignorar o cache; o robô roda e a entrada
+#   é regravada com o resultado novo.
+
+CAMINHO_DO_SCRIPT = os.path.dirname(os.path.abspath(__file__))
+PASTA_CACHE = os.environ.get("CACHE_RELATORIOS_PVA_DIR", os.path.join(CAMINHO_DO_SCRIPT, "cache"))
+MAX_ENTRADAS = int(os.environ.get("CACHE_RELATORIOS_PVA_MAX", "2000"))
+IDADE_MAXIMA_DIAS = float(os.environ.get("CACHE_RELATORIOS_PVA_DIAS", "30"))
+CACHE_DESATIVADO = os.environ.get("CACHE_RELATORIOS_PVA_DESATIVADO", "") == "1"
+TAMANHO_BLOCO_HASH = 1024 * 1024
+
+# Muda se o formato do que ler_relatorio_pva devolve mudar
+VERSAO_CACHE = "v1"
+
+CHAVES_RELATORIOS = ("entradas", "saidas", "apuracao")
+
+
+def hash_arquivo(caminho):
+    """SHA-256 (hex) do conteúdo do arquivo, lido em blocos."""
+    hasher = hashlib.sha256()
+    with open(caminho, "rb") as arquivo:
+        for bloco in iter(lambda: arquivo.read(TAMANHO_BLOCO_HASH), b""):
+            hasher.update(bloco)
+    return hasher.hexdigest()
+
+
+def relatorios_completos(lidos):
+    """True se os três relatórios foram lidos e nenhum voltou vazio."""
+    if not lidos or any(chave not in lidos for chave in CHAVES_RELATORIOS):
+        return False
+    apuracao = lidos["apuracao"] or {}
+    return (bool(lidos["entradas"]) and bool(lidos["saidas"])
+            and apuracao.get("recolher") is not None and apuracao.get("saldo_credor") is not None)
+
+
+class CacheRelatoriosPVA:
+    """
+    Relatórios do PVA já lidos, por hash do SPED (SQLite, modo WAL).
+    Pode ser usado por várias threads.
+    """
+
+    def __init__(self, caminho_db, max_entradas=MAX_ENTRADAS, idade_maxima_s=IDADE_MAXIMA_DIAS * 86400):
+        self.caminho_db = caminho_db
+        self.max_entradas = max_entradas
+        self.idade_maxima_s = idade_maxima_s
+        self._trava = threading.Lock()
+        self._conexao = sqlite3.connect(caminho_db, timeout=30, check_same_thread=False)
+        self._conexao.execute("PRAGMA journal_mode=WAL")
+        self._conexao.execute("PRAGMA synchronous=NORMAL")
+        self._conexao.execute("""
+            CREATE TABLE IF NOT EXISTS relatorios_pva (
+                hash_sped TEXT PRIMARY KEY,
+                versao TEXT NOT NULL,
+                lidos TEXT NOT NULL,
+                criado_em REAL NOT NULL,
+                ultimo_acesso REAL NOT NULL
+            )
+        """)
+        self._conexao.execute("CREATE INDEX IF NOT EXISTS idx_relatorios_acesso ON relatorios_pva (ultimo_acesso)")
+        self._conexao.commit()
+
+    def buscar(self, hash_sped):
+        """{chave: relatório lido} do SPED com esse hash, ou None se não está no cache (ou venceu)."""
+        agora = time.time()
+        with self._trava:
+            linha = self._conexao.execute(
+                "SELECT lidos, criado_em FROM relatorios_pva WHERE hash_sped = ? AND versao = ?",
+                (hash_sped, VERSAO_CACHE)
+            ).fetchone()
+            if linha is None:
+                return None
+            with self._conexao:
+                if agora - linha[1] > self.idade_maxima_s:
+                    self._conexao.execute("DELETE FROM relatorios_pva WHERE hash_sped = ?", (hash_sped,))
+                    return None
+                self._conexao.execute("UPDATE relatorios_pva SET ultimo_acesso = ? WHERE hash_sped = ?", (agora, hash_sped))
+        return json.loads(linha[0])
+
+    def salvar(self, hash_sped, lidos):
+        """Guarda os relatórios lidos de um SPED. Leituras incompletas são ignoradas (retorna False)."""
+        if not relatorios_completos(lidos):
+            print(f"   > (CACHE PVA) Relatórios de {hash_sped[:12]} incompletos: não vão para o cache.", file=sys.stderr)
+            return False
+        agora = time.time()
+        texto = json.dumps({chave: lidos[chave] for chave in CHAVES_RELATORIOS}, sort_keys=True)
+        with self._trava:
+            with self._conexao:
+                self._conexao.execute(
+                    "INSERT OR REPLACE INTO relatorios_pva (hash_sped, versao, lidos, criado_em, ultimo_acesso) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (hash_sped, VERSAO_CACHE, texto, agora, agora)
+                )
+            self._despejar_se_necessario()
+        return True
+
+    def remover(self, hash_sped):
+        with self._trava, self._conexao:
+            self._conexao.execute("DELETE FROM relatorios_pva WHERE hash_sped = ?", (hash_sped,))
+
+    def _despejar_se_necessario(self):
+        with self._conexao:
+            vencidas = self._conexao.execute(
+                "DELETE FROM relatorios_pva WHERE criado_em < ? OR versao != ?",
+                (time.time() - self.idade_maxima_s, VERSAO_CACHE)
+            ).rowcount
+            total = self._conexao.execute("SELECT COUNT(*) FROM relatorios_pva").fetchone()[0]
+            excesso = max(0, total - self.max_entradas)
+            if excesso:
+                self._conexao.execute(
+                    "DELETE FROM relatorios_pva WHERE hash_sped IN "
+                    "(SELECT hash_sped FROM relatorios_pva ORDER BY ultimo_acesso LIMIT ?)", (excesso,)
+                )
+        if vencidas or excesso:
+            print(f"   > (CACHE PVA) {vencidas + excesso} entradas antigas removidas do cache.", file=sys.stderr)
+
+    def fechar(self):
+        self._conexao.close()
+
+
+_cache_padrao = None
+_trava_padrao = threading.Lock()
+
+
+def cache_padrao():
+    """O cache do processo (ou None se estiver desativado ou não puder ser aberto)."""
+    global _cache_padrao
+    if CACHE_DESATIVADO:
+        return None
+    with _trava_padrao:
+        if _cache_padrao is None:
+            try:
+                os.makedirs(PASTA_CACHE, exist_ok=True)
+                _cache_padrao = CacheRelatoriosPVA(os.path.join(PASTA_CACHE, "relatorios_pva.sqlite3"))
+            except Exception as e:
+                print(f"   > (CACHE PVA) AVISO: Não foi possível abrir o cache dos relatórios do PVA: {e}", file=sys.stderr)
+                return None
+        return _cache_padrao
+
+
+def buscar_relatorios(hash_sped, forcar=False):
+    """
+    Relatórios do PVA já lidos para este SPED, ou None (robô precisa rodar).
+    'forcar': ignora o cache. Não lança exceção: sem cache, o robô roda.
+    """
+    if forcar or not hash_sped:
+        return None
+    cache = cache_padrao()
+    if cache is None:
+        return None
+    try:
+        lidos = cache.buscar(hash_sped)
+    except Exception as e:
+        print(f"   > (CACHE PVA) AVISO: Falha ao consultar o cache: {e}", file=sys.stderr)
+        return None
+    if lidos is not None:
+        print(f"   > (CACHE PVA) SPED {hash_sped[:12]} já validado no PVA: o robô não vai rodar.", file=sys.stderr)
+    return lidos
+
+
+def guardar_relatorios(hash_sped, lidos):
+    """Guarda os relatórios lidos pelo robô. Não lança exceção."""
+    cache = cache_padrao()
+    if cache is None or not hash_sped:
+        return False
+    try:
+        return cache.salvar(hash_sped, lidos)
+    except Exception as e:
+        print(f"   > (CACHE PVA) AVISO: Falha ao gravar no cache: {e}", file=sys.stderr)
+        return False
+
+
+if __name__ == "__main__":
+    # python cache_relatorios_pva.py sped.txt [--remover]  -> mostra (ou apaga) a entrada do SPED
+    if len(sys.argv) < 2:
+        print("Uso: python cache_relatorios_pva.py <sped.txt> [--remover]")
+        sys.exit(1)
+    digest = hash_arquivo(sys.argv[1])
+    cache = cache_padrao()
+    if cache is None:
+        print("Cache desativado.")
+        sys.exit(1)
+    if "--remover" in sys.argv[2:]:
+        cache.remover(digest)
+        print(f"{digest}: removido")
+    else:
+        print(json.dumps({"hash_sped": digest, "lidos": cache.buscar(digest)}, indent=2, ensure_ascii=False))
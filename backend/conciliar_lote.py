@@ -0,0 +1,304 @@
+import os
+import re
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import ler_pdf
+import analisar_detalhes
+import totais_sped
+import apuracao_sped
+import resultados_db
+from leitor_sped import identificar_empresa
+from documento_pdf import DocumentoPDF
+
+# --- CONCILIAÇÃO EM LOTE (LINHA DE COMANDO) ---
+# Concilia uma pasta inteira de empresas sem passar pelo formulário web:
+#   python conciliar_lote.py PASTA [--workers N] [--saida resultado.json] [--do-zero]
+#
+# Cada SPED .txt é casado com o seu Livro .pdf pelo CNPJ e pelo período
+# (registro |0000| do SPED; cabeçalho da 1ª página do Livro). Cada empresa
+# é conciliada inteira num processo do pool (as mesmas análises do job web,
+# sem o robô) e vai para o arquivo de progresso assim que termina: se o lote
+# for interrompido, rodar de novo continua de onde parou. No fim, tudo vai
+# para um único arquivo de resultado, com o tempo de cada etapa por empresa.
+# O resumo de cada empresa também vai para o banco de resultados do painel
+# de progresso (resultados_db.py), como os jobs do site.
+
+NUM_WORKERS_LOTE = int(os.environ.get("NUM_WORKERS_LOTE", str(os.cpu_count() or 2)))
+NOME_RESULTADO_PADRAO = "resultado_lote.json"
+
+REGEX_CNPJ_LIVRO = re.compile(r"CNPJ\s*:\s*([\d./-]+)")
+REGEX_PERIODO_LIVRO = re.compile(r"Per[ií]odo/Ano\s*:\s*(\d{2})\.(\d{2})\.(\d{4})\s*-\s*(\d{2})\.(\d{2})\.(\d{4})")
+
+
+# --- IDENTIFICAÇÃO DOS ARQUIVOS ---
+
+def identificar_sped(caminho_txt):
+    """Lê o |0000| e retorna (chave, empresa) ou (None, None). Chave = 'CNPJ_DTINI_DTFIN'."""
+    try:
+        empresa = identificar_empresa(caminho_txt)
+        if empresa is None:
+            return None, None
+        return f"{empresa['cnpj']}_{empresa['dt_ini']}_{empresa['dt_fin']}", empresa
+    except Exception as e:
+        print(f"  > (LOTE) ERRO ao identificar o SPED {caminho_txt}: {e}", file=sys.stderr)
+        return None, None
+
+
+def identificar_livro(caminho_pdf):
+    """Lê o cabeçalho da 1ª página do Livro e retorna a chave 'CNPJ_DTINI_DTFIN' ou None."""
+    try:
+        with DocumentoPDF(caminho_pdf) as doc:
+            if len(doc) == 0:
+                return None
+            texto = doc.texto(0)
+        cnpj = REGEX_CNPJ_LIVRO.search(texto)
+        periodo = REGEX_PERIODO_LIVRO.search(texto)
+        if not cnpj or not periodo:
+            return None
+        d = periodo.groups()
+        return f"{re.sub(r'[^0-9]', '', cnpj.group(1))}_{d[0]}{d[1]}{d[2]}_{d[3]}{d[4]}{d[5]}"
+    except Exception as e:
+        print(f"  > (LOTE) ERRO ao identificar o Livro {caminho_pdf}: {e}", file=sys.stderr)
+        return None
+
+
+def _mais_recente(caminhos):
+    return max(caminhos, key=lambda c: (os.path.getmtime(c), c))
+
+
+def montar_pares(pasta):
+    """
+    Procura SPEDs (.txt) e Livros (.pdf) na pasta (e subpastas) e casa pelo CNPJ + período.
+    Retorna (pares, sem_par, duplicados):
+      pares: [{"chave", "nome", "empresa", "sped", "livro"}] (ordenados pela chave)
+      sem_par: {"sped": [...], "livro": [...], "nao_identificados": [...]}
+      duplicados: [caminhos ignorados porque havia outro arquivo mais recente da mesma empresa/período]
+    """
+    speds, livros, empresas = {}, {}, {}
+    sem_par = {"sped": [], "livro": [], "nao_identificados": []}
+    for raiz, _, arquivos in os.walk(pasta):
+        for arquivo in sorted(arquivos):
+            caminho = os.path.abspath(os.path.join(raiz, arquivo))
+            extensao = os.path.splitext(arquivo)[1].lower()
+            if extensao == ".txt":
+                chave, empresa = identificar_sped(caminho)
+                if chave:
+                    speds.setdefault(chave, []).append(caminho)
+                    empresas.setdefault(chave, empresa)
+                else:
+                    sem_par["nao_identificados"].append(caminho)
+            elif extensao == ".pdf":
+                chave = identificar_livro(caminho)
+                if chave:
+                    livros.setdefault(chave, []).append(caminho)
+                else:
+                    sem_par["nao_identificados"].append(caminho)
+
+    pares, duplicados = [], []
+    for chave in sorted(set(speds) | set(livros)):
+        if chave not in livros:
+            sem_par["sped"].extend(speds[chave])
+            continue
+        if chave not in speds:
+            sem_par["livro"].extend(livros[chave])
+            continue
+        sped, livro = _mais_recente(speds[chave]), _mais_recente(livros[chave])
+        duplicados.extend(c for c in speds[chave] + livros[chave] if c not in (sped, livro))
+        pares.append({"chave": chave, "nome": empresas[chave]["nome"], "empresa": empresas[chave],
+                      "sped": sped, "livro": livro})
+    return pares, sem_par, duplicados
+
+
+# --- CONCILIAÇÃO DE UMA EMPRESA (RODA NO WORKER) ---
+
+def _inicializar_worker_lote(caminho_log):
+    """Manda os logs das análises para o arquivo de log e desliga a extração paralela por página."""
+    import documento_pdf
+    # O lote já ocupa todos os núcleos com uma empresa por processo
+    documento_pdf.LIMITE_PAGINAS_PARALELO = float("inf")
+    sys.stderr = open(caminho_log, "a", encoding="utf-8", buffering=1)
+
+
+def conciliar_empresa(par):
+    """
+    Roda a conciliação completa de um par SPED/Livro, em sequência, e
+    mede cada etapa. Retorna o registro da empresa para o resultado do lote.
+    """
+    tempos = {}
+    inicio_total = time.perf_counter()
+
+    def _medir(nome, funcao, *args):
+        inicio = time.perf_counter()
+        try:
+            return funcao(*args)
+        finally:
+            tempos[nome] = round(time.perf_counter() - inicio, 3)
+
+    registro = dict(par, status="erro", erro=None, tempos=tempos, resultado=None)
+    print(f"\n=== LOTE: {par['chave']} ({par['nome']}) ===", file=sys.stderr)
+    try:
+        texto_bloco_e, codigos_e111 = _medir("bloco_e", analisar_detalhes.extrair_bloco_e_do_sped, par["sped"])
+        totais_es = _medir("totais_sped", totais_sped.calcular_totais_es, par["sped"])
+        apuracao = _medir("apuracao_sped", apuracao_sped.recalcular_apuracao, par["sped"])
+        dados_livro, detalhes = _medir("livro", analisar_detalhes.analisar_livro_e_detalhes, par["sped"], par["livro"], codigos_e111)
+        dados_sped = ler_pdf.analisar_relatorios_sped(None, totais_es, apuracao, False)
+        registro["resultado"] = {
+            "conciliacao_totais": ler_pdf.montar_resultados(dados_livro, dados_sped),
+            "conciliacao_detalhes": detalhes,
+            "bloco_e_texto": texto_bloco_e if texto_bloco_e else "Bloco E não encontrado ou vazio."
+        }
+        registro["status"] = "concluido"
+    except Exception as e:
+        print(f"ERRO no lote ({par['chave']}): {e}", file=sys.stderr)
+        registro["erro"] = str(e)
+    tempos["total"] = round(time.perf_counter() - inicio_total, 3)
+    return registro
+
+
+def _resumo_status(registro):
+    """'OK' se entradas, saídas e apuração bateram; senão lista o que divergiu."""
+    if registro["status"] != "concluido":
+        return "ERRO"
+    totais = registro["resultado"]["conciliacao_totais"]
+    divergentes = [lado for lado in ("entradas", "saidas") if totais[lado]["status"] != "OK"]
+    if totais["apuracao"]["status_recolher"] != "OK" or totais["apuracao"]["status_saldo_credor"] != "OK":
+        divergentes.append("apuracao")
+    return "OK" if not divergentes else "Divergente (" + ", ".join(divergentes) + ")"
+
+
+# --- PROGRESSO (RETOMÁVEL) ---
+
+def carregar_progresso(caminho_progresso):
+    """Lê o arquivo de progresso (uma empresa concluída por linha, JSON) -> {chave: registro}."""
+    concluidas = {}
+    if not os.path.exists(caminho_progresso):
+        return concluidas
+    with open(caminho_progresso, "r", encoding="utf-8") as f:
+        for linha in f:
+            try:
+                registro = json.loads(linha)
+            except json.JSONDecodeError:
+                continue  # Última linha cortada por uma interrupção
+            concluidas[registro["chave"]] = registro
+    return concluidas
+
+
+def concluidas_do_mesmo_par(concluidas, pares):
+    """Só reaproveita uma empresa concluída se o par de arquivos (SPED e Livro) for o mesmo."""
+    return {
+        chave: r for chave, r in concluidas.items()
+        if any(p["chave"] == chave and p["sped"] == r["sped"] and p["livro"] == r["livro"] for p in pares)
+    }
+
+
+def _abrir_progresso(caminho_progresso):
+    """
+    Abre o arquivo de progresso para acrescentar. Se a última linha foi
+    cortada por uma interrupção, começa numa linha nova (senão o próximo
+    registro grudaria nela e se perderia junto).
+    """
+    linha_cortada = False
+    if os.path.exists(caminho_progresso) and os.path.getsize(caminho_progresso) > 0:
+        with open(caminho_progresso, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            linha_cortada = f.read(1) != b"\n"
+    arquivo = open(caminho_progresso, "a", encoding="utf-8")
+    if linha_cortada:
+        arquivo.write("\n")
+    return arquivo
+
+
+def _gravar_progresso(arquivo, registro):
+    arquivo.write(json.dumps(registro, ensure_ascii=False) + "\n")
+    arquivo.flush()
+    os.fsync(arquivo.fileno())
+
+
+# --- LOTE ---
+
+def conciliar_pasta(pasta, caminho_saida=None, num_workers=NUM_WORKERS_LOTE, do_zero=False):
+    """
+    Concilia todas as empresas da pasta e grava o resultado consolidado em
+    'caminho_saida'. Empresas já concluídas no arquivo de progresso
+    ('<saida>.progresso.jsonl') não são refeitas, a menos que 'do_zero'.
+    Retorna o dicionário do resultado.
+    """
+    inicio = time.perf_counter()
+    caminho_saida = os.path.abspath(caminho_saida or os.path.join(pasta, NOME_RESULTADO_PADRAO))
+    caminho_progresso = caminho_saida + ".progresso.jsonl"
+    caminho_log = caminho_saida + ".log"
+    if do_zero and os.path.exists(caminho_progresso):
+        os.remove(caminho_progresso)
+
+    print(f"Procurando pares SPED/Livro em: {pasta}")
+    pares, sem_par, duplicados = montar_pares(pasta)
+    concluidas = concluidas_do_mesmo_par(carregar_progresso(caminho_progresso), pares)
+    pendentes = [p for p in pares if p["chave"] not in concluidas]
+    print(f"{len(pares)} empresas/períodos encontrados: {len(concluidas)} já concluídos, {len(pendentes)} a fazer "
+          f"({num_workers} workers). Logs das análises em: {caminho_log}")
+    if sem_par["sped"] or sem_par["livro"]:
+        print(f"Sem par: {len(sem_par['sped'])} SPED(s) e {len(sem_par['livro'])} Livro(s).")
+
+    registros = dict(concluidas)
+    if pendentes:
+        with _abrir_progresso(caminho_progresso) as progresso, \
+             ProcessPoolExecutor(max_workers=num_workers, initializer=_inicializar_worker_lote,
+                                 initargs=(caminho_log,)) as pool:
+            futuros = {pool.submit(conciliar_empresa, par): par for par in pendentes}
+            for n, futuro in enumerate(as_completed(futuros), start=len(concluidas) + 1):
+                par = futuros[futuro]
+                try:
+                    registro = futuro.result()
+                except Exception as e:  # O worker morreu (ex: falta de memória)
+                    registro = dict(par, status="erro", erro=str(e), tempos={}, resultado=None)
+                registros[par["chave"]] = registro
+                if registro["status"] == "concluido":
+                    _gravar_progresso(progresso, registro)
+                finalizado_em = time.time()
+                resultados_db.registrar_job(
+                    f"lote-{par['chave']}-{int(finalizado_em)}", par["empresa"], registro["resultado"],
+                    registro["tempos"], finalizado_em - registro["tempos"].get("total", 0), finalizado_em,
+                    registro["erro"] or (None if registro["status"] == "concluido" else "erro"), origem="lote"
+                )
+                print(f"[{n}/{len(pares)}] {par['chave']} {par['nome'] or ''}: {_resumo_status(registro)}"
+                      f" ({registro['tempos'].get('total', 0):.1f}s)")
+
+    empresas = [registros[p["chave"]] for p in pares]
+    resultado = {
+        "pasta": os.path.abspath(pasta),
+        "gerado_em": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "workers": num_workers,
+        "duracao_s": round(time.perf_counter() - inicio, 3),
+        "resumo": {
+            "empresas": len(empresas),
+            "ok": sum(1 for r in empresas if _resumo_status(r) == "OK"),
+            "divergentes": sum(1 for r in empresas if _resumo_status(r).startswith("Divergente")),
+            "erros": sum(1 for r in empresas if r["status"] != "concluido")
+        },
+        "empresas": [dict(r, resumo_status=_resumo_status(r)) for r in empresas],
+        "sem_par": sem_par,
+        "duplicados_ignorados": duplicados
+    }
+    with open(caminho_saida, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, ensure_ascii=False, indent=2)
+    print(f"\nResultado: {resultado['resumo']} em {resultado['duracao_s']:.1f}s -> {caminho_saida}")
+    return resultado
+
+
+# --- PONTO DE PARTIDA (LINHA DE COMANDO) ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concilia uma pasta de pares SPED/Livro (casados por CNPJ e período).")
+    parser.add_argument("pasta", help="Pasta com os SPEDs (.txt) e Livros (.pdf)")
+    parser.add_argument("--workers", type=int, default=NUM_WORKERS_LOTE, help="Processos em paralelo (padrão: nº de CPUs)")
+    parser.add_argument("--saida", help=f"Arquivo de resultado (padrão: PASTA/{NOME_RESULTADO_PADRAO})")
+    parser.add_argument("--do-zero", action="store_true", help="Ignora o progresso salvo e refaz todas as empresas")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.pasta):
+        print(f"ERRO: Pasta não encontrada: {args.pasta}")
+        sys.exit(1)
+    conciliar_pasta(args.pasta, args.saida, max(1, args.workers), args.do_zero)
@@ -0,0 +1,156 @@
+import numpy as np  # Dependência obrigatória do backend (requirements.txt), como no leitor_sped
+
+# --- VALORES EM REAIS COMO CENTAVOS INTEIROS ---
+# Todo valor monetário do projeto ('1.234.567,89' no Livro e nos relatórios
+# do PVA, '1234567,89' nos campos do SPED) passa por aqui e vira centavos
+# inteiros: soma e comparação exatas, sem float e sem 'abs(a - b) < 0.01'.
+#
+#   centavos('1.234,56')           -> 123456
+#   centavos('PA10000025')         -> None   (sem vírgula não é dinheiro)
+#   centavos_do_sped('1234')       -> 123400 (no SPED a vírgula é opcional)
+#   formatar_centavos(123456)      -> '1.234,56'
+#   centavos_em_lote(['1,00', 'x']) -> (array([100, 0]), array([True, False]))
+#
+# O leitor não usa regex: 'str.partition' + 'isdigit' resolvem o caso comum
+# (só dígitos, '.' de milhar, ',' e até 2 decimais, '-' na frente). Só um
+# texto com lixo em volta ('R$1.234,56', '(1.234,56)') passa pela limpeza
+# caractere a caractere. O lote faz a mesma leitura em NumPy para a coluna
+# de textos inteira (um caractere por vez em todas as linhas juntas) e manda
+# para o leitor escalar só as linhas com lixo.
+
+DIGITOS_MAXIMOS = 16      # Dígitos da parte inteira que cabem em int64 como centavos
+TAMANHO_BLOCO_LOTE = 65536
+_CARACTERES_NUMERICOS = frozenset("0123456789.,")
+_LIMITE_INT64 = 2 ** 63
+_ESCALA_DECIMAIS = (100, 10, 1)  # Quantas casas decimais o texto tinha -> fator para centavos
+
+
+def _centavos_limpo(texto, exigir_virgula):
+    """O caso comum: '-'? dígitos com '.' de milhar, ',' e até 2 decimais. None se não for isso."""
+    negativo = texto[:1] == "-"
+    inteiro, virgula, decimais = (texto[1:] if negativo else texto).partition(",")
+    if not virgula and exigir_virgula:
+        return None
+    digitos = inteiro.replace(".", "") + decimais
+    if len(decimais) > 2 or not (digitos.isdigit() and digitos.isascii()):
+        return None
+    valor = int(digitos) * _ESCALA_DECIMAIS[len(decimais)]
+    return -valor if negativo else valor
+
+
+def _centavos_com_lixo(texto, exigir_virgula):
+    """Tira tudo o que não é dígito, '.' ou ',' ('R$', parênteses, letras) e tenta de novo."""
+    limpo = "".join(c for c in texto if c in _CARACTERES_NUMERICOS)
+    primeiro_digito = next((i for i, c in enumerate(texto) if c.isdigit()), len(texto))
+    if "-" in texto[:primeiro_digito]:
+        limpo = "-" + limpo
+    return _centavos_limpo(limpo, exigir_virgula)
+
+
+def centavos(texto, exigir_virgula=True):
+    """
+    '1.234.567,89' -> 123456789. None se o texto não for um valor.
+    Com 'exigir_virgula' (o padrão, para texto de PDF) um número sem vírgula
+    não é dinheiro (é código, CFOP, página...). Mais de 2 decimais também não.
+    """
+    if not texto or (exigir_virgula and "," not in texto):
+        return None
+    valor = _centavos_limpo(texto, exigir_virgula)
+    if valor is None:
+        texto = texto.strip()
+        valor = _centavos_limpo(texto, exigir_virgula)
+        if valor is None:
+            valor = _centavos_com_lixo(texto, exigir_virgula)
+    return valor
+
+
+def centavos_ou_zero(texto, exigir_virgula=True):
+    """Como centavos(), mas um texto vazio ou que não é valor vale 0."""
+    valor = centavos(texto, exigir_virgula)
+    return 0 if valor is None else valor
+
+
+def centavos_do_sped(texto):
+    """Campo de valor do SPED ('1234,56', '1234' ou vazio) -> centavos. Vazio ou inválido vale 0."""
+    if not texto:
+        return 0
+    valor = _centavos_limpo(texto, False)  # Os campos do SPED quase sempre já vêm limpos
+    if valor is None:
+        valor = centavos(texto, exigir_virgula=False)
+    return valor or 0
+
+
+def formatar_centavos(centavos):
+    """123456 -> '1.234,56' (o formato dos relatórios do PVA e do Livro)."""
+    if centavos < 0:
+        return "-" + formatar_centavos(-centavos)
+    return f"{centavos // 100:,}".replace(",", ".") + "," + str(centavos % 100).zfill(2)
+
+
+def _bloco_em_centavos(textos):
+    """
+    Um bloco do lote em NumPy: o mesmo leitor de centavos(), andando uma
+    coluna (caractere) por vez em todas as linhas juntas. Retorna
+    (centavos, validos, decididos): 'decididos' False são as linhas com lixo,
+    que ficam para o leitor escalar.
+    """
+    n = len(textos)
+    matriz = np.array(textos)  # Unicode de largura fixa: cada caractere é um uint32
+    largura = matriz.dtype.itemsize // 4
+    if largura == 0:
+        return np.zeros(n, np.int64), np.zeros(n, bool), np.ones(n, bool)
+    colunas = np.ascontiguousarray(matriz.view(np.uint32).reshape(n, largura).T)
+    valores = np.zeros(n, np.int64)    # Todos os dígitos lidos até aqui, como um número só
+    n_digitos = np.zeros(n, np.int64)
+    n_decimais = np.zeros(n, np.int64)
+    n_virgulas = np.zeros(n, np.int64)
+    depois_da_virgula = np.zeros(n, bool)
+    negativo = colunas[0] == 45
+    lixo = np.zeros(n, bool)
+    for coluna, caracteres in enumerate(colunas):
+        digito = caracteres - 48  # uint32: o que não é dígito dá volta e fica >= 10
+        e_digito = digito < 10
+        e_virgula = caracteres == 44
+        valores = np.where(e_digito, valores * 10 + digito, valores)
+        n_digitos += e_digito
+        n_decimais += e_digito & depois_da_virgula
+        n_virgulas += e_virgula
+        depois_da_virgula |= e_virgula
+        # Aceito: dígito, ',', '.' antes da vírgula, o preenchimento (0) do fim e '-' na 1ª posição
+        aceito = e_digito | e_virgula | (caracteres == 0) | ((caracteres == 46) & ~depois_da_virgula)
+        if coluna == 0:
+            aceito |= negativo
+        lixo |= ~aceito
+    decididos = ~lixo & (n_virgulas <= 1) & (n_digitos - n_decimais <= DIGITOS_MAXIMOS)
+    validos = decididos & (n_decimais <= 2) & (n_digitos > 0)
+    valores *= np.array(_ESCALA_DECIMAIS)[np.minimum(n_decimais, 2)]
+    valores = np.where(negativo, -valores, valores)
+    return np.where(validos, valores, 0), validos, decididos
+
+
+def centavos_em_lote(textos, exigir_virgula=True):
+    """
+    Converte uma coluna de textos de uma vez. Retorna (centavos, validos):
+    dois arrays NumPy (int64 e bool) do tamanho de 'textos'; onde validos é
+    False o texto não era um valor e centavos vale 0. Mesmo resultado que
+    centavos() item a item (valores acima de 16 dígitos, que não cabem em
+    int64, ficam inválidos).
+    """
+    valores = np.zeros(len(textos), np.int64)
+    validos = np.zeros(len(textos), bool)
+    # Sem vírgula não é dinheiro: só os candidatos vão para o NumPy. Espaços
+    # em volta contam como lixo no bloco e ficam para o leitor escalar.
+    candidatos = [i for i, t in enumerate(textos) if t and (not exigir_virgula or "," in t)]
+    for inicio in range(0, len(candidatos), TAMANHO_BLOCO_LOTE):
+        indices = candidatos[inicio:inicio + TAMANHO_BLOCO_LOTE]
+        bloco = [textos[i] for i in indices]
+        valores_bloco, validos_bloco, decididos = _bloco_em_centavos(bloco)
+        for i in np.flatnonzero(~decididos).tolist():
+            valor = centavos(bloco[i], exigir_virgula)
+            if valor is not None and abs(valor) >= _LIMITE_INT64:
+                valor = None  # Não cabe no array (mais de DIGITOS_MAXIMOS dígitos e lixo em volta)
+            validos_bloco[i] = valor is not None
+            valores_bloco[i] = valor or 0
+        valores[indices] = valores_bloco
+        validos[indices] = validos_bloco
+    return valores, validos
@@ -0,0 +1,210 @@
+import os
+import sys
+import mmap
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import fitz  # PyMuPDF
+import cache_paginas
+
+
+# --- DOCUMENTO PDF COMPARTILHADO ---
+# Abre o PDF uma única vez e guarda o texto de cada página já extraído.
+# Todas as funções de análise (ler_pdf.py e analisar_detalhes.py) recebem
+# este objeto em vez do caminho, assim cada página é lida só uma vez por job.
+# Se o cache de páginas (cache_paginas.py) estiver ativo, páginas já vistas em
+# jobs anteriores nem chegam a ser extraídas.
+
+# Livros muito grandes (acima de LIMITE_PAGINAS_PARALELO páginas) são extraídos
+# em paralelo: as páginas são divididas entre NUM_WORKERS_EXTRACAO processos,
+# cada um lendo o PDF por um mmap do arquivo (o SO compartilha as páginas da
+# memória entre eles, sem copiar os bytes), e os textos voltam na ordem.
+
+CACHE_PADRAO = object()  # Marcador: "use o cache compartilhado do processo"
+LIMITE_PAGINAS_PARALELO = int(os.environ.get("LIMITE_PAGINAS_PARALELO", "300"))
+NUM_WORKERS_EXTRACAO = int(os.environ.get("NUM_WORKERS_EXTRACAO", str(os.cpu_count() or 2)))
+
+
+class DocumentoPDF:
+    """
+    Envolve um PDF aberto com o fitz e guarda, por página, o texto e a
+    lista de linhas. A extração é preguiçosa: a página só é lida na
+    primeira vez que alguém pede por ela. Com cache=None o cache em
+    disco não é usado.
+    """
+
+    def __init__(self, caminho_pdf, cache=CACHE_PADRAO):
+        self.caminho = caminho_pdf
+        self._doc = fitz.open(caminho_pdf)
+        self._textos = [None] * len(self._doc)
+        self._linhas = [None] * len(self._doc)
+        self._palavras = [None] * len(self._doc)
+        self._chaves = [None] * len(self._doc)
+        self._hashes_fontes = {}
+        self._cache = cache_paginas.cache_padrao() if cache is CACHE_PADRAO else cache
+        self._extracao_paralela_feita = False
+        self.paginas_extraidas = 0  # Quantas vezes o get_text() foi chamado
+        self.paginas_do_cache = 0   # Quantas páginas vieram do cache em disco
+
+    def __len__(self):
+        return len(self._textos)
+
+    def __str__(self):
+        return self.caminho
+
+    def _chave(self, pagina_num):
+        if self._chaves[pagina_num] is None:
+            pagina = self._doc.load_page(pagina_num)
+            self._chaves[pagina_num] = cache_paginas.hash_pagina(self._doc, pagina, self._hashes_fontes)
+        return self._chaves[pagina_num]
+
+    def _carregar_do_cache(self, pagina_num):
+        if self._cache is None:
+            return False
+        entrada = self._cache.buscar(self._chave(pagina_num))
+        if entrada is None:
+            return False
+        self._textos[pagina_num], palavras = entrada
+        if palavras is not None:
+            self._palavras[pagina_num] = palavras
+        self.paginas_do_cache += 1
+        return True
+
+    def texto(self, pagina_num):
+        """Retorna o texto da página (índice começando em 0)."""
+        if self._textos[pagina_num] is None and not self._carregar_do_cache(pagina_num):
+            self._textos[pagina_num] = self._doc.load_page(pagina_num).get_text()
+            self.paginas_extraidas += 1
+            if self._cache is not None:
+                self._cache.salvar(self._chave(pagina_num), self._textos[pagina_num])
+        return self._textos[pagina_num]
+
+    def palavras(self, pagina_num):
+        """
+        Retorna as palavras da página com suas caixas:
+        [(x0, y0, x1, y1, palavra, bloco, linha, n_palavra), ...]
+        """
+        if self._palavras[pagina_num] is None:
+            texto = self.texto(pagina_num)
+            if self._palavras[pagina_num] is None:
+                palavras = self._doc.load_page(pagina_num).get_text("words")
+                self._palavras[pagina_num] = [tuple(p) for p in palavras]
+                if self._cache is not None:
+                    self._cache.salvar(self._chave(pagina_num), texto, self._palavras[pagina_num])
+        return self._palavras[pagina_num]
+
+    def linhas(self, pagina_num):
+        """Retorna o texto da página já quebrado em linhas (split por '\\n')."""
+        if self._linhas[pagina_num] is None:
+            self._linhas[pagina_num] = self.texto(pagina_num).split('\n')
+        return self._linhas[pagina_num]
+
+    def paginas(self):
+        """
+        Itera por (pagina_num, texto_da_pagina), na ordem do documento.
+        Em documentos acima de LIMITE_PAGINAS_PARALELO páginas, a primeira
+        varredura extrai tudo o que falta em paralelo antes de começar.
+        """
+        if not self._extracao_paralela_feita and len(self) > LIMITE_PAGINAS_PARALELO:
+            self.extrair_em_paralelo()
+        for pagina_num in range(len(self)):
+            yield pagina_num, self.texto(pagina_num)
+
+    def extrair_em_paralelo(self, num_workers=None):
+        """
+        Extrai, num pool de processos, o texto de todas as páginas que ainda
+        não estão em memória nem no cache. O resultado é igual ao da extração
+        página a página.
+        """
+        self._extracao_paralela_feita = True
+        num_workers = num_workers or NUM_WORKERS_EXTRACAO
+        faltando = [i for i in range(len(self)) if self._textos[i] is None and not self._carregar_do_cache(i)]
+        if num_workers <= 1 or len(faltando) < 2:
+            for pagina_num in faltando:
+                self.texto(pagina_num)
+            return
+
+        # Blocos de páginas seguidas: poucos blocos por worker para equilibrar a carga
+        num_blocos = min(len(faltando), num_workers * 2)
+        tamanho = -(-len(faltando) // num_blocos)
+        blocos = [faltando[i:i + tamanho] for i in range(0, len(faltando), tamanho)]
+        print(f"   > (PDF) Extraindo {len(faltando)} páginas em paralelo ({num_workers} processos)...", file=sys.stderr)
+
+        pool = _pool_extracao(num_workers)
+        caminho_abs = os.path.abspath(self.caminho)
+        for bloco, textos in zip(blocos, pool.map(_extrair_paginas_no_worker, [caminho_abs] * len(blocos), blocos)):
+            for pagina_num, texto in zip(bloco, textos):
+                self._textos[pagina_num] = texto
+                self.paginas_extraidas += 1
+                if self._cache is not None:
+                    self._cache.salvar(self._chave(pagina_num), texto)
+
+    def texto_completo(self):
+        """Junta o texto de todas as páginas (equivalente ao antigo '+=' página a página)."""
+        return "".join(texto for _, texto in self.paginas())
+
+    def fechar(self):
+        if self._doc is not None:
+            self._doc.close()
+            self._doc = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+        return False
+
+
+def abrir_documento(caminho_ou_documento):
+    """
+    Aceita um caminho ou um DocumentoPDF já aberto.
+    Retorna (documento, deve_fechar): só fecha quem abriu.
+    """
+    if isinstance(caminho_ou_documento, DocumentoPDF):
+        return caminho_ou_documento, False
+    print(f"   > (PDF) Abrindo documento: {caminho_ou_documento}", file=sys.stderr)
+    return DocumentoPDF(caminho_ou_documento), True
+
+
+# --- POOL DE EXTRAÇÃO PARALELA ---
+
+_pool = None
+_pool_num_workers = None
+
+
+def _pool_extracao(num_workers):
+    """Pool de processos compartilhado (recriado só se o número de workers mudar)."""
+    global _pool, _pool_num_workers
+    if _pool is None or _pool_num_workers != num_workers:
+        encerrar_pool_extracao()
+        # 'spawn' em todos os sistemas: o servidor tem threads e o fitz não gosta de fork
+        _pool = ProcessPoolExecutor(max_workers=num_workers, mp_context=multiprocessing.get_context("spawn"))
+        _pool_num_workers = num_workers
+    return _pool
+
+
+def encerrar_pool_extracao():
+    global _pool, _pool_num_workers
+    if _pool is not None:
+        _pool.shutdown()
+        _pool = None
+        _pool_num_workers = None
+
+
+def _extrair_paginas_no_worker(caminho_pdf, paginas):
+    """
+    Roda dentro do worker: mapeia o arquivo na memória (mmap, somente leitura),
+    abre o PDF direto desse buffer e devolve o texto das páginas pedidas.
+    O mapeamento é fechado no fim para o arquivo poder ser apagado (Windows).
+    """
+    with open(caminho_pdf, "rb") as f:
+        mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    buffer = memoryview(mapa)
+    doc = fitz.open(stream=buffer, filetype="pdf")
+    try:
+        return [doc.load_page(pagina_num).get_text() for pagina_num in paginas]
+    finally:
+        doc.close()
+        del doc
+        buffer.release()
+        mapa.close()
@@ -0,0 +1,95 @@
+import os
+import re
+import sys
+import numpy as np
+from documento_pdf import abrir_documento
+from dinheiro import centavos_em_lote
+
+# --- ÍNDICE DE VALORES DO LIVRO ---
+# Cada valor monetário do Livro ('2.360.524,26', '1234,56', '-10,00') é lido
+# UMA vez e vira centavos inteiros num array ordenado, junto com a página e a
+# linha onde apareceu. Procurar um valor é uma busca binária (np.searchsorted),
+# exata ou com tolerância (±N centavos), e o custo não cresce com a
+# quantidade de valores procurados nem depende de como o texto foi formatado.
+
+# Valor no formato brasileiro: milhar com '.' (opcional) e sempre 2 decimais com ','.
+# Não pode estar grudado em outro número (antes ou depois).
+PADRAO_VALOR = re.compile(r"(?<![\d.,])(-?)(\d{1,3}(?:\.\d{3})+|\d+),(\d{2})(?!\d)")
+
+# O 're' só varre rápido quando o padrão começa por um literal: primeiro acha
+# cada ',dd' e só então confere, a partir do começo do número, o PADRAO_VALOR.
+_FIM_VALOR = re.compile(r",\d{2}(?!\d)")
+
+# Diferença aceita (em centavos) quando o valor exato não existe no Livro (arredondamento)
+TOLERANCIA_CENTAVOS = int(os.environ.get("TOLERANCIA_BUSCA_VALORES", "1"))
+
+
+def _valores_no_texto(texto):
+    """Itera pelos matches de PADRAO_VALOR no texto (o mesmo que PADRAO_VALOR.finditer, mais rápido)."""
+    for fim in _FIM_VALOR.finditer(texto):
+        inicio = fim.start()
+        while inicio > 0 and (texto[inicio - 1].isdigit() or texto[inicio - 1] == "."):
+            inicio -= 1
+        inicios = (inicio - 1, inicio) if inicio > 0 and texto[inicio - 1] == "-" else (inicio,)
+        for inicio in inicios:
+            achou = PADRAO_VALOR.match(texto, inicio, fim.end())
+            if achou is not None and achou.end() == fim.end():
+                yield achou
+                break
+
+
+class IndiceValores:
+    """
+    Valores do Livro ordenados por centavos. Cada ocorrência guarda a página
+    e a linha (ambas a partir de 1) e o texto como estava no PDF.
+    """
+
+    def __init__(self, centavos, paginas, linhas, textos):
+        ordem = np.argsort(np.asarray(centavos, dtype=np.int64), kind='stable')  # Empates na ordem do documento
+        self.centavos = np.asarray(centavos, dtype=np.int64)[ordem]
+        self.paginas = np.asarray(paginas, dtype=np.int32)[ordem]
+        self.linhas = np.asarray(linhas, dtype=np.int32)[ordem]
+        self.textos = [textos[i] for i in ordem.tolist()]
+
+    def __len__(self):
+        return len(self.centavos)
+
+    def buscar(self, centavos, tolerancia=0):
+        """
+        Ocorrências com valor entre centavos - tolerancia e centavos + tolerancia,
+        da mais próxima para a mais distante (empate: ordem do documento).
+        Cada uma: {"pagina", "linha", "texto", "diferenca_centavos"}.
+        """
+        inicio = int(np.searchsorted(self.centavos, centavos - tolerancia, side='left'))
+        fim = int(np.searchsorted(self.centavos, centavos + tolerancia, side='right'))
+        ocorrencias = [
+            {
+                "pagina": int(self.paginas[i]),
+                "linha": int(self.linhas[i]),
+                "texto": self.textos[i],
+                "diferenca_centavos": int(self.centavos[i]) - centavos
+            }
+            for i in range(inicio, fim)
+        ]
+        ocorrencias.sort(key=lambda o: abs(o["diferenca_centavos"]))  # sort é estável
+        return ocorrencias
+
+
+def montar_indice_valores(caminho_ou_documento):
+    """Lê todas as páginas (ou usa o DocumentoPDF já aberto) e monta o IndiceValores."""
+    paginas, linhas, textos = [], [], []
+    doc, deve_fechar = abrir_documento(caminho_ou_documento)
+    try:
+        for pagina_num, texto in doc.paginas():
+            linha_num, ultima_posicao = 1, 0
+            for achou in _valores_no_texto(texto):
+                linha_num += texto.count("\n", ultima_posicao, achou.start())
+                ultima_posicao = achou.start()
+                paginas.append(pagina_num + 1)
+                linhas.append(linha_num)
+                textos.append(achou.group())
+        print(f"   > (LIVRO) Índice de valores: {len(textos)} valores em {len(doc)} páginas.", file=sys.stderr)
+    finally:
+        if deve_fechar: doc.fechar()
+    centavos, _ = centavos_em_lote(textos)  # Todos batem com PADRAO_VALOR: nenhum é inválido
+    return IndiceValores(centavos, paginas, linhas, textos)
@@ -0,0 +1,204 @@
+import os
+import sys
+import mmap
+import numpy as np
+
+# --- LEITOR DE SPED INDEXADO ---
+# Mapeia o .txt do SPED na memória (mmap) e, numa única passada pelos bytes,
+# monta um índice {registro: posições (byte) das linhas}. Quem precisa de
+# E110/E111/C190/... vai direto às linhas daquele registro, e só os campos
+# que forem lidos são decodificados (latin-1). Nada de decodificar, limpar
+# e quebrar as 20 mil linhas de C110/C170 que ninguém usa.
+#
+# Os índices dos campos seguem a convenção do resto do backend:
+# campos = linha[1:-1].split('|'), ou seja, campo 0 é o nome do registro.
+
+TAMANHO_BLOCO_INDICE = 32 * 1024 * 1024  # Procura os '\n' em blocos de 32 MB (limita a memória)
+CODIFICACAO_SPED = 'latin-1'
+
+_BARRA = ord('|')
+BOM_UTF8 = b'\xef\xbb\xbf'  # Alguns editores gravam o .txt com BOM: a 1ª linha começa depois dele
+_QUEBRA = ord('\n')
+
+
+class RegistroSped:
+    """
+    Uma linha do SPED. Os bytes já vêm separados por '|', mas cada campo
+    só é decodificado quando alguém pede por ele.
+    """
+    __slots__ = ('tipo', 'posicao', '_partes')
+
+    def __init__(self, tipo, posicao, partes):
+        self.tipo = tipo
+        self.posicao = posicao  # Byte onde a linha começa no arquivo
+        self._partes = partes
+
+    def campo(self, indice):
+        """Retorna o campo 'indice' (0 = nome do registro) ou None se a linha for mais curta."""
+        if 0 <= indice < len(self._partes) - 2:
+            return self._partes[indice + 1].decode(CODIFICACAO_SPED)
+        return None
+
+    def campos(self):
+        """Todos os campos da linha (equivalente a linha[1:-1].split('|'))."""
+        return [p.decode(CODIFICACAO_SPED) for p in self._partes[1:-1]]
+
+
+class IndiceSped:
+    """
+    SPED .txt mapeado na memória com o índice de linhas por registro.
+    Use como context manager (ou chame fechar()) para liberar o arquivo.
+    """
+
+    def __init__(self, caminho_sped):
+        self.caminho = caminho_sped
+        self.tamanho_bytes = os.path.getsize(caminho_sped)
+        self._arquivo = open(caminho_sped, 'rb')
+        self._mapa = None
+        self._bytes = np.zeros(0, dtype=np.uint8)
+        if self.tamanho_bytes > 0:
+            self._mapa = mmap.mmap(self._arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+            self._bytes = np.frombuffer(self._mapa, dtype=np.uint8)
+        self._indice = self._montar_indice()
+
+    def _montar_indice(self):
+        """Uma passada pelos bytes: acha o começo de cada linha '|XXXX|' e agrupa por registro."""
+        b = self._bytes
+        n = len(b)
+        quebras = [np.flatnonzero(b[i:i + TAMANHO_BLOCO_INDICE] == _QUEBRA) + i
+                   for i in range(0, n, TAMANHO_BLOCO_INDICE)]
+        primeira = len(BOM_UTF8) if b[:len(BOM_UTF8)].tobytes() == BOM_UTF8 else 0
+        inicios = np.concatenate([np.full(1, primeira, dtype=np.int64)] + [q + 1 for q in quebras])
+
+        # Só linhas no formato '|REG|...' (4 caracteres entre as barras)
+        inicios = inicios[inicios + 5 < n]
+        inicios = inicios[(b[inicios] == _BARRA) & (b[inicios + 5] == _BARRA)]
+        if len(inicios) == 0:
+            return {}
+
+        # Os 4 bytes do nome viram um inteiro, para agrupar tudo de uma vez
+        codigos = np.zeros(len(inicios), dtype=np.uint32)
+        for deslocamento in range(1, 5):
+            codigos = (codigos << 8) | b[inicios + deslocamento]
+        ordem = np.argsort(codigos, kind='stable')  # 'stable' mantém a ordem do arquivo
+        codigos_ordenados = codigos[ordem]
+        unicos, primeiros = np.unique(codigos_ordenados, return_index=True)
+        grupos = np.split(inicios[ordem], primeiros[1:])
+        return {
+            int(codigo).to_bytes(4, 'big').decode(CODIFICACAO_SPED): grupo
+            for codigo, grupo in zip(unicos, grupos)
+        }
+
+    def _linha_bytes(self, posicao):
+        fim = self._mapa.find(b'\n', posicao)
+        if fim < 0:
+            fim = self.tamanho_bytes
+        return self._mapa[posicao:fim].strip()
+
+    def tipos(self):
+        """Registros presentes no arquivo."""
+        return sorted(self._indice)
+
+    def contagem(self, tipo):
+        return len(self._indice.get(tipo, ()))
+
+    def contagens(self):
+        """{registro: quantidade de linhas}."""
+        return {tipo: len(posicoes) for tipo, posicoes in sorted(self._indice.items())}
+
+    def registros(self, *tipos):
+        """
+        Itera pelos registros dos tipos pedidos (ex: 'E110', 'E111'), na ordem
+        em que aparecem no arquivo. Cada item é um RegistroSped.
+        """
+        grupos = [(tipo, self._indice[tipo]) for tipo in tipos if tipo in self._indice]
+        if not grupos:
+            return
+        if len(grupos) == 1:
+            tipo, posicoes = grupos[0]
+            for posicao in posicoes.tolist():
+                yield RegistroSped(tipo, posicao, self._linha_bytes(posicao).split(b'|'))
+            return
+        posicoes = np.concatenate([p for _, p in grupos])
+        nomes = np.concatenate([np.full(len(p), i) for i, (_, p) in enumerate(grupos)])
+        ordem = np.argsort(posicoes, kind='stable')
+        for posicao, i in zip(posicoes[ordem].tolist(), nomes[ordem].tolist()):
+            yield RegistroSped(grupos[i][0], posicao, self._linha_bytes(posicao).split(b'|'))
+
+    def primeiro(self, tipo):
+        """O primeiro registro do tipo pedido, ou None."""
+        return next(self.registros(tipo), None)
+
+    def linhas_entre(self, tipo_inicio, tipo_fim):
+        """
+        Linhas (texto, sem espaços nas pontas, sem linhas vazias) desde o primeiro
+        registro 'tipo_inicio' até o primeiro 'tipo_fim' depois dele, inclusive.
+        Se 'tipo_fim' não existir, vai até o fim do arquivo. Ex: ('E001', 'E990').
+        """
+        if tipo_inicio not in self._indice:
+            return []
+        inicio = int(self._indice[tipo_inicio][0])
+        fim = self.tamanho_bytes
+        if tipo_fim in self._indice:
+            posicoes_fim = self._indice[tipo_fim]
+            depois = posicoes_fim[posicoes_fim >= inicio]
+            if len(depois):
+                fim_linha = self._mapa.find(b'\n', int(depois[0]))
+                fim = self.tamanho_bytes if fim_linha < 0 else fim_linha
+        texto = self._mapa[inicio:fim].decode(CODIFICACAO_SPED)
+        return [linha.strip() for linha in texto.split('\n') if linha.strip()]
+
+    def fechar(self):
+        # O array do numpy aponta para o mmap: tem que soltar antes de fechar
+        self._bytes = None
+        self._indice = {}
+        if self._mapa is not None:
+            self._mapa.close()
+            self._mapa = None
+        if self._arquivo is not None:
+            self._arquivo.close()
+            self._arquivo = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+        return False
+
+
+def identificar_empresa(caminho_ou_indice):
+    """
+    Lê o |0000| (|0000|COD_VER|COD_FIN|DT_INI|DT_FIN|NOME|CNPJ|...) e retorna
+    {"cnpj", "nome", "dt_ini", "dt_fin", "competencia": "AAAA-MM"} ou None.
+    Com um caminho, só a 1ª linha é lida (o |0000| é sempre o primeiro registro).
+    """
+    if isinstance(caminho_ou_indice, IndiceSped):
+        registro = caminho_ou_indice.primeiro('0000')
+    else:
+        with open(caminho_ou_indice, 'rb') as f:
+            primeira_linha = f.readline(64 * 1024).removeprefix(BOM_UTF8).strip()
+        registro = None
+        if primeira_linha.startswith(b'|0000|'):
+            registro = RegistroSped('0000', 0, primeira_linha.split(b'|'))
+    if registro is None:
+        return None
+    dt_ini = registro.campo(3) or ''
+    return {
+        "cnpj": ''.join(c for c in (registro.campo(6) or '') if c.isdigit()),
+        "nome": registro.campo(5),
+        "dt_ini": dt_ini,
+        "dt_fin": registro.campo(4),
+        "competencia": f"{dt_ini[4:8]}-{dt_ini[2:4]}" if len(dt_ini) == 8 else None
+    }
+
+
+def abrir_sped(caminho_ou_indice):
+    """
+    Aceita um caminho ou um IndiceSped já aberto.
+    Retorna (indice, deve_fechar): só fecha quem abriu.
+    """
+    if isinstance(caminho_ou_indice, IndiceSped):
+        return caminho_ou_indice, False
+    print(f"   > (SPED) Indexando registros de: {caminho_ou_indice}", file=sys.stderr)
+    return IndiceSped(caminho_ou_indice), True
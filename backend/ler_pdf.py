@@ -1,10 +1,11 @@
 import os
-import fitz  # Este é o PyMuPDF
 import re    # Para extrair números das tabelas
 import sys   # Para receber os argumentos
 import json  # Para gerar o JSON
-from decimal import Decimal, InvalidOperation
 from collections import defaultdict
+from documento_pdf import DocumentoPDF, abrir_documento
+from busca_codigos import BuscadorCodigos
+from dinheiro import centavos, centavos_ou_zero, centavos_em_lote
 
 # --- CONFIGURAÇÕES GLOBAIS ---
 NOME_PDF_ENTRADAS_SPED = "relatorio_das_entradas.pdf"
@@ -44,6 +45,11 @@ MARCADOR_PAGINA_SAIDAS = "SAÍDAS"
 ETIQUETA_APURACAO_SPED_1 = "VALOR TOTAL DO ICMS A RECOLHER"
 ETIQUETA_APURACAO_SPED_2 = "VALOR TOTAL DO SALDO CREDOR A TRANSPORTAR PARA O PERÍODO SEGUINTE"
 
+# Os totais de Entradas/Saídas (totais_sped.py) e a Apuração (apuracao_sped.py)
+# do SPED são calculados direto do .txt. Com VALIDAR_TOTAIS_COM_PVA=1, os
+# relatórios do PVA também são lidos e comparados com o cálculo (validação cruzada).
+VALIDAR_TOTAIS_COM_PVA = os.environ.get("VALIDAR_TOTAIS_COM_PVA", "") == "1"
+
 
 # --- FUNÇÕES AUXILIARES ---
 
@@ -68,34 +74,6 @@ def encontrar_pdf(nome_arquivo):
         print(f"ERRO: Arquivo '{nome_arquivo}' não encontrado em: {caminho_completo}", file=sys.stderr)
         return None
 
-# --- [MUDANÇA V7] ---
-# A função de soma E116 (somar_informacoes_complementares) 
-# precisa de uma lógica de conversão mais rigorosa para não somar CÓDIGOS.
-# Ela só deve somar valores que parecem dinheiro (ex: 1.234,56)
-def limpar_e_converter_numero(texto_numero):
-    if texto_numero is None:
-        return 0.0
-    
-    # Rigor para a soma do E116: SÓ converte se tiver vírgula.
-    # Isso impede que códigos (ex: "PA10000025") sejam convertidos e somados.
-    # As outras funções estão seguras, pois sempre recebem "0,00" ou "1.234,56"
-    if "," not in texto_numero:
-        return 0.0
-        
-    try:
-        texto_limpo = texto_numero.strip().replace(" ", "")
-        texto_limpo = texto_limpo.replace(".", "")
-        texto_limpo = texto_limpo.replace(",", ".")
-        # Remove caracteres não numéricos, exceto o ponto decimal
-        # (Remove "R$", "PA", etc.)
-        texto_limpo = re.sub(r"[^0-9\.]", "", texto_limpo)
-        if not texto_limpo:
-            return 0.0
-        valor_float = float(texto_limpo)
-        return valor_float
-    except Exception:
-        return 0.0
-
 # Função auxiliar para a V4/V6, para extrair o valor da linha
 def _extrair_valor_da_linha(linha, regex_valor):
     match = re.search(regex_valor, linha)
@@ -113,82 +91,75 @@ def _extrair_valor_da_linha(linha, regex_valor):
 
 # --- FUNÇÕES DE DETALHAMENTO (Sem Mudança) ---
 
-def _limpar_valor_decimal(valor_str):
-    try:
-        valor_sem_ponto = valor_str.replace('.', '')
-        valor_com_ponto = valor_sem_ponto.replace(',', '.')
-        valor_limpo = re.sub(r"[^0-9\.]", "", valor_com_ponto)
-        if not valor_limpo:
-            return Decimal('0.0')
-        return Decimal(valor_limpo)
-    except InvalidOperation:
-        print(f"   > (DETALHAMENTO) Aviso: falha ao converter valor decimal: {valor_str}", file=sys.stderr)
-        return Decimal('0.0')
-
 def analisar_detalhamento_por_codigo(caminho_pdf):
     if not caminho_pdf:
         print("   > (DETALHAMENTO) ERRO: Caminho do Livro Fiscal está vazio.", file=sys.stderr)
         return {}
     print(f"Iniciando Análise de Detalhamento por Código (fitz) em: {caminho_pdf}", file=sys.stderr)
-    somas_por_codigo = defaultdict(Decimal)
+    somas_por_codigo = defaultdict(int)  # centavos
     regex_codigo = r'\b([A-Z]{2}\d{5,12})\b'
     regex_valor = r'(\d{1,3}(?:\.\d{3})*,\d{2})'
     try:
-        doc = fitz.open(caminho_pdf)
+        doc, deve_fechar = abrir_documento(caminho_pdf)
         print(f"   > (DETALHAMENTO) Total de páginas no PDF: {len(doc)}", file=sys.stderr)
-        for pagina_num, pagina in enumerate(doc):
-            texto_da_pagina = pagina.get_text()
+        for pagina_num, texto_da_pagina in doc.paginas():
             if not texto_da_pagina:
                 continue
-            for linha in texto_da_pagina.split('\n'):
+            for linha in doc.linhas(pagina_num):
                 match_codigo = re.search(regex_codigo, linha)
                 if match_codigo:
                     codigo_encontrado = match_codigo.group(1)
                     matches_valor = re.findall(regex_valor, linha)
                     if matches_valor:
-                        valor_str = matches_valor[-1]
-                        try:
-                            valor_decimal = _limpar_valor_decimal(valor_str)
-                            if valor_decimal > Decimal('0.0'):
-                                somas_por_codigo[codigo_encontrado] += valor_decimal
-                        except Exception as e:
-                            print(f"   > (DETALHAMENTO) Erro ao somar valor: {valor_str} na linha: {linha} ({e})", file=sys.stderr)
+                        valor_centavos = centavos(matches_valor[-1])
+                        if valor_centavos:
+                            somas_por_codigo[codigo_encontrado] += valor_centavos
         print(f"   > (DETALHAMENTO) Análise de códigos concluída. {len(somas_por_codigo)} códigos somados.", file=sys.stderr)
-        doc.close()
+        if deve_fechar: doc.fechar()
         return dict(somas_por_codigo)
     except Exception as e:
         print(f"   > (DETALHAMENTO) ERRO CRÍTICO ao processar o PDF: {e}", file=sys.stderr)
         return {}
 
-def verificar_codigos_no_livro(caminho_pdf, lista_codigos_sped):
+def localizar_codigos_no_livro(caminho_pdf, lista_codigos_sped):
+    """
+    Procura todos os códigos E111 no Livro numa única passada pelas páginas
+    (busca_codigos.BuscadorCodigos). Só conta o código isolado, não dentro de
+    um token maior.
+    Retorna {"ausentes": [...], "paginas": {codigo: [páginas, a partir de 1]}}.
+    """
     if not caminho_pdf:
         print("   > (CROSS-CHECK) ERRO: Caminho do Livro Fiscal está vazio.", file=sys.stderr)
-        return lista_codigos_sped
+        return {"ausentes": lista_codigos_sped, "paginas": {}}
     if not lista_codigos_sped:
         print("   > (CROSS-CHECK) Nenhum código E111 para verificar.", file=sys.stderr)
-        return []
+        return {"ausentes": [], "paginas": {}}
     print(f"Iniciando Cross-Check de {len(lista_codigos_sped)} códigos E111 no Livro Fiscal...", file=sys.stderr)
-    full_text_livro = ""
+    buscador = BuscadorCodigos(lista_codigos_sped)
     try:
-        doc = fitz.open(caminho_pdf)
-        for pagina in doc:
-            full_text_livro += pagina.get_text()
-        doc.close()
+        doc, deve_fechar = abrir_documento(caminho_pdf)
+        try:
+            paginas_por_codigo = buscador.localizar_em_paginas(doc.paginas())
+            texto_lido = any(doc.texto(pagina_num) for pagina_num in range(len(doc)))
+        finally:
+            if deve_fechar: doc.fechar()
     except Exception as e:
         print(f"   > (CROSS-CHECK) ERRO ao ler PDF do Livro: {e}", file=sys.stderr)
-        return ["Erro ao ler PDF do Livro"]
-    if not full_text_livro:
+        return {"ausentes": ["Erro ao ler PDF do Livro"], "paginas": {}}
+    if not texto_lido:
         print("   > (CROSS-CHECK) ERRO: PDF do Livro Fiscal está vazio ou ilegível.", file=sys.stderr)
-        return lista_codigos_sped
-    codigos_ausentes = []
-    for codigo in lista_codigos_sped:
-        if codigo not in full_text_livro:
-            codigos_ausentes.append(codigo)
+        return {"ausentes": lista_codigos_sped, "paginas": {}}
+    codigos_ausentes = [codigo for codigo in lista_codigos_sped if not paginas_por_codigo.get(codigo)]
     if codigos_ausentes:
         print(f"   > (CROSS-CHECK) ALERTA! Códigos ausentes no Livro: {codigos_ausentes}", file=sys.stderr)
     else:
         print("   > (CROSS-CHECK) SUCESSO! Todos os códigos E111 foram encontrados no Livro.", file=sys.stderr)
-    return codigos_ausentes
+    return {"ausentes": codigos_ausentes, "paginas": paginas_por_codigo}
+
+
+def verificar_codigos_no_livro(caminho_pdf, lista_codigos_sped):
+    """Lista dos códigos E111 que não aparecem no Livro (ver localizar_codigos_no_livro)."""
+    return localizar_codigos_no_livro(caminho_pdf, lista_codigos_sped)["ausentes"]
 
 
 # --- FUNÇÕES DE EXTRAÇÃO (PRINCIPAL) ---
@@ -202,38 +173,32 @@ def encontrar_e_extrair_totais_es(caminho_pdf, marcador_pagina, etiqueta_valor,
     regex_valor = r'(\d{1,3}(?:\.\d{3})*,\d{2})'
     
     try:
-        doc = fitz.open(caminho_pdf)
+        doc, deve_fechar = abrir_documento(caminho_pdf)
         pagina_alvo = -1
-        texto_pagina_alvo = ""
         pagina_candidata = -1
-        texto_pagina_candidata = ""
 
         # 1. Acha a página
-        for pagina_num, pagina in enumerate(doc):
-            texto_da_pagina = pagina.get_text()
+        for pagina_num, texto_da_pagina in doc.paginas():
             if marcador_pagina.upper() in texto_da_pagina.upper():
                 if etiqueta_valor in texto_da_pagina: 
                     print(f"   > (E/S) Página '{marcador_pagina}' E etiqueta '{etiqueta_valor}' encontradas (Pág. {pagina_num + 1}).", file=sys.stderr)
                     pagina_alvo = pagina_num
-                    texto_pagina_alvo = texto_da_pagina
                     break 
                 if pagina_candidata == -1:
                     print(f"   > (E/S) Página '{marcador_pagina}' encontrada (Pág. {pagina_num + 1}), mas sem etiqueta. Continuando a busca...", file=sys.stderr)
                     pagina_candidata = pagina_num
-                    texto_pagina_candidata = texto_da_pagina
         
         if pagina_alvo == -1:
             if pagina_candidata != -1:
                 print(f"   > (E/S) Usando a primeira página candidata encontrada (Pág. {pagina_candidata + 1}).", file=sys.stderr)
                 pagina_alvo = pagina_candidata
-                texto_pagina_alvo = texto_pagina_candidata
             else:
                 print(f"   > (E/S) ERRO: Não encontrei nenhuma página com o marcador '{marcador_pagina}'.", file=sys.stderr)
-                doc.close()
+                if deve_fechar: doc.fechar()
                 return {}
             
         # 2. Acha a etiqueta e o valor
-        linhas = texto_pagina_alvo.split('\n')
+        linhas = doc.linhas(pagina_alvo)
         
         # Cenário 1: LIVRO FISCAL (etiqueta "Totais" - MODO HORIZONTAL)
         if etiqueta_valor == "Totais":
@@ -252,7 +217,7 @@ def encontrar_e_extrair_totais_es(caminho_pdf, marcador_pagina, etiqueta_valor,
                             elif chaves[k] not in valores_encontrados:
                                 valores_encontrados[chaves[k]] = "0,00"
                                 
-                        doc.close()
+                        if deve_fechar: doc.fechar()
                         return valores_encontrados
                     else:
                         print(f"   > (E/S) [Modo Horizontal] Linha ignorada (só {len(valores)} valores).", file=sys.stderr)
@@ -295,7 +260,7 @@ def encontrar_e_extrair_totais_es(caminho_pdf, marcador_pagina, etiqueta_valor,
 
                         else:
                             print(f"   > (E/S) ERRO: Marcador de página desconhecido: {marcador_pagina}", file=sys.stderr)
-                            doc.close()
+                            if deve_fechar: doc.fechar()
                             return {}
                         # --- [FIM DA LÓGICA V6] ---
                         
@@ -308,21 +273,21 @@ def encontrar_e_extrair_totais_es(caminho_pdf, marcador_pagina, etiqueta_valor,
                         valores_encontrados["total_ipi"] = val_ipi
                         
                         print(f"   > (E/S) SUCESSO! Leitura [Modo Vertical V6] concluída.", file=sys.stderr)
-                        doc.close()
+                        if deve_fechar: doc.fechar()
                         return valores_encontrados
                         
                     except IndexError:
                         print(f"   > (E/S) ERRO: [Modo Vertical V6] falhou. A etiqueta 'TOTAL' está muito perto do fim/início da página.", file=sys.stderr)
-                        doc.close()
+                        if deve_fechar: doc.fechar()
                         return {}
                     except Exception as e:
                         print(f"   > (E/SAP) ERRO: [Modo Vertical V6] falhou: {e}", file=sys.stderr)
-                        doc.close()
+                        if deve_fechar: doc.fechar()
                         return {}
 
         
         print(f"   > (E/S) ERRO FINAL: Achei a página, mas não a linha '{etiqueta_valor}'.", file=sys.stderr)
-        doc.close()
+        if deve_fechar: doc.fechar()
         return {}
     except Exception as e:
         print(f"   > (E/S) ERRO CRÍTICO ao ler PDF: {e}", file=sys.stderr)
@@ -335,10 +300,9 @@ def encontrar_valor_apuracao_SPED(caminho_pdf, etiqueta):
     print(f"Lendo Apuração... Procurando por: '{etiqueta}'", file=sys.stderr)
     regex_valor = r'(\d{1,3}(?:\.\d{3})*,\d{2})'
     try:
-        doc = fitz.open(caminho_pdf)
-        for pagina_num, pagina in enumerate(doc):
-            texto_da_pagina = pagina.get_text()
-            linhas = texto_da_pagina.split('\n')
+        doc, deve_fechar = abrir_documento(caminho_pdf)
+        for pagina_num, texto_da_pagina in doc.paginas():
+            linhas = doc.linhas(pagina_num)
             for i in range(len(linhas)):
                 linha_atual = linhas[i].strip()
                 
@@ -349,7 +313,7 @@ def encontrar_valor_apuracao_SPED(caminho_pdf, etiqueta):
                     if match_mesma_linha:
                         valor_extraido = match_mesma_linha.group(0)
                         print(f"   > (SPED Apuração) Valor encontrado (mesma linha): '{valor_extraido}'", file=sys.stderr)
-                        doc.close()
+                        if deve_fechar: doc.fechar()
                         return valor_extraido
                         
                     if i + 1 < len(linhas):
@@ -358,14 +322,14 @@ def encontrar_valor_apuracao_SPED(caminho_pdf, etiqueta):
                         if match_linha_seguinte:
                             valor_extraido = match_linha_seguinte.group(0)
                             print(f"   > (SPED Apuração) Valor encontrado (linha seguinte): '{valor_extraido}'", file=sys.stderr)
-                            doc.close()
+                            if deve_fechar: doc.fechar()
                             return valor_extraido
                             
                     print(f"   > (SPED Apuração) ERRO: Achei a etiqueta, mas não um valor.", file=sys.stderr)
-                    doc.close()
+                    if deve_fechar: doc.fechar()
                     return None
                     
-        doc.close()
+        if deve_fechar: doc.fechar()
         print(f"   > (SPED Apuração) ERRO: Etiqueta '{etiqueta}' não encontrada.", file=sys.stderr)
         return None
     except Exception as e:
@@ -380,22 +344,19 @@ def encontrar_apuracao_LIVRO(caminho_pdf, marcador_secao, marcador_parada, codig
     regex_valor = r'(\d{1,3}(?:\.\d{3})*,\d{2})'
     
     try:
-        doc = fitz.open(caminho_pdf)
+        doc, deve_fechar = abrir_documento(caminho_pdf)
         pagina_alvo = -1
-        for pagina_num, pagina in enumerate(doc):
-            texto_da_pagina = pagina.get_text()
+        for pagina_num, texto_da_pagina in doc.paginas():
             if marcador_secao in texto_da_pagina:
                 print(f"   > (APURAÇÃO - LIVRO) Seção '{marcador_secao}' encontrada (Pág. {pagina_num + 1}).", file=sys.stderr)
                 pagina_alvo = pagina_num
                 break
         if pagina_alvo == -1:
             print(f"   > (APURAÇÃO - LIVRO) ERRO: Não encontrei a seção '{marcador_secao}'.", file=sys.stderr)
-            doc.close()
+            if deve_fechar: doc.fechar()
             return {}
 
-        pagina = doc.load_page(pagina_alvo)
-        texto_da_pagina = pagina.get_text()
-        linhas = texto_da_pagina.split('\n')
+        linhas = doc.linhas(pagina_alvo)
         processando_linhas_de_dados = False
         
         for linha in linhas:
@@ -427,11 +388,11 @@ def encontrar_apuracao_LIVRO(caminho_pdf, marcador_secao, marcador_parada, codig
         
         if not valores_encontrados_dict:
             print(f"   > (APURAÇÃO - LIVRO) ERRO: Achei a seção, mas não extraí nenhum valor para os códigos {codigos_alvo}.", file=sys.stderr)
-            doc.close()
+            if deve_fechar: doc.fechar()
             return {}
             
         print(f"   > (APURAÇÃO - LIVRO) Total de códigos/valores encontrados: {len(valores_encontrados_dict)}", file=sys.stderr)
-        doc.close()
+        if deve_fechar: doc.fechar()
         return valores_encontrados_dict
         
     except Exception as e:
@@ -443,25 +404,22 @@ def somar_informacoes_complementares(caminho_pdf, marcador_secao, marcador_parad
     if not caminho_pdf: return 0.0
     print(f"Lendo Soma (Livro)... Procurando Seção '{marcador_secao}'", file=sys.stderr)
     
-    total_soma = 0.0
+    palavras_da_secao = []
     
     try:
-        doc = fitz.open(caminho_pdf)
+        doc, deve_fechar = abrir_documento(caminho_pdf)
         pagina_alvo = -1
-        for pagina_num, pagina in enumerate(doc):
-            texto_da_pagina = pagina.get_text()
+        for pagina_num, texto_da_pagina in doc.paginas():
             if marcador_secao.upper() in texto_da_pagina.upper():
                 print(f"   > (SOMA INF-COMP) Seção '{marcador_secao}' encontrada (Pág. {pagina_num + 1}).", file=sys.stderr)
                 pagina_alvo = pagina_num
                 break
         if pagina_alvo == -1:
             print(f"   > (SOMA INF-COMP) ERRO: Não encontrei a seção '{marcador_secao}'.", file=sys.stderr)
-            doc.close()
+            if deve_fechar: doc.fechar()
             return 0.0
 
-        pagina = doc.load_page(pagina_alvo)
-        texto_da_pagina = pagina.get_text()
-        linhas = texto_da_pagina.split('\n')
+        linhas = doc.linhas(pagina_alvo)
         processando_linhas_de_dados = False
         
         for linha in linhas:
@@ -477,19 +435,15 @@ def somar_informacoes_complementares(caminho_pdf, marcador_secao, marcador_parad
                     print(f"   > (SOMA INF-COMP) Fim da tabela (marcador de parada encontrado).", file=sys.stderr)
                     break
                 
-                palavras = linha_limpa.split()
-                if not palavras:
-                    continue
-                
-                # [MUDANÇA V7] - Agora usamos a função de limpeza rigorosa (com vírgula)
-                for palavra in palavras:
-                    valor_num = limpar_e_converter_numero(palavra)
-                    if valor_num > 0:
-                        # print(f"   > (SOMA INF-COMP) Valor encontrado: {valor_num} (da palavra: '{palavra}')", file=sys.stderr)
-                        total_soma += valor_num
-                            
+                palavras_da_secao.extend(linha_limpa.split())
+        
+        # [MUDANÇA V7] - Só soma o que parece dinheiro (com vírgula): códigos
+        # como "PA10000025" não são valores. Todas as palavras vão de uma vez.
+        valores_centavos, validos = centavos_em_lote(palavras_da_secao)
+        total_centavos = int(valores_centavos[validos & (valores_centavos > 0)].sum())
+        total_soma = total_centavos / 100
         print(f"   > (SOMA INF-COMP) Soma total da seção: {total_soma:.2f}", file=sys.stderr)
-        doc.close()
+        if deve_fechar: doc.fechar()
         return total_soma
         
     except Exception as e:
@@ -497,159 +451,310 @@ def somar_informacoes_complementares(caminho_pdf, marcador_secao, marcador_parad
         return 0.0
 
 
-# --- PONTO DE PARTIDA (ATUALIZADO V6/V7) ---
-if __name__ == "__main__":
-    
-    if len(sys.argv) < 3: 
-        print(json.dumps({"error": "Caminho do Livro Fiscal ou lista de Códigos E111 não fornecidos."})) 
-        sys.exit(1) 
-
-    NOME_PDF_LIVRO_FISCAL = sys.argv[1]
-    codigos_e111_str = sys.argv[2] 
-    LISTA_CODIGOS_E111_SPED = codigos_e111_str.split(',') if codigos_e111_str else []
-    
-    resultados = {
-        "entradas": {
-            "sped": {}, 
-            "livro": {},
-            "status": "Falha", 
-            "status_detalhado": {}
-        },
-        "saidas": {
-            "sped": {}, 
-            "livro": {},
-            "status": "Falha",
-            "status_detalhado": {}
-        },
-        "apuracao": {
-            "sped_recolher": "ERRO",
-            "sped_saldo_credor": "ERRO",
-            "livro_valores": {},
-            "status_recolher": "Falha",
-            "status_saldo_credor": "Falha"
-        },
+# --- ANÁLISE EM 3 PARTES ---
+# O lado do Livro só depende do Livro (e dos códigos E111 do .txt), então o
+# servidor roda 'analisar_livro' em paralelo com o robô e só espera o robô
+# para 'analisar_relatorios_sped'. 'montar_resultados' junta as duas partes.
+
+def analisar_livro(caminho_livro_pdf, lista_codigos_e111):
+    """
+    Lê tudo o que vem do Livro Fiscal: totais de Entradas/Saídas, códigos de
+    apuração 013/014, soma das INFORMAÇÕES COMPLEMENTARES, detalhamento por
+    código e o cross-check dos códigos E111.
+    'caminho_livro_pdf' pode ser um caminho ou um DocumentoPDF já aberto
+    (que fica aberto para quem chamou).
+    """
+    dados_livro = {
+        "entradas": {},
+        "saidas": {},
+        "apuracao": {},
+        "soma_inf_comp": 0.0,
         "detalhamento_codigos": {},
-        "codigos_ausentes_livro": None,
-        "soma_livro_inf_comp": 0.0
+        "codigos_ausentes": None,
+        "paginas_codigos": {}
     }
+    caminho_livro = None
+    deve_fechar = False
 
     try:
-        # 1. Processar SPED
-        caminho_entradas_sped = encontrar_pdf(NOME_PDF_ENTRADAS_SPED)
-        valores_sped_entradas = encontrar_e_extrair_totais_es(
-            caminho_entradas_sped, MARCADOR_PAGINA_ENTRADAS, ETIQUETA_TOTAIS_SPED, CHAVES_COMPLETAS_ES
-        )
-        
-        caminho_saidas_sped = encontrar_pdf(NOME_PDF_SAIDAS_SPED)
-        valores_sped_saidas = encontrar_e_extrair_totais_es(
-            caminho_saidas_sped, 
-            MARCADOR_PAGINA_SAIDAS, 
-            ETIQUETA_TOTAIS_SPED,  # Usando "TOTAL" (Vertical V6)
-            CHAVES_COMPLETAS_ES
-        )
-        
-        caminho_apuracao_sped = encontrar_pdf(NOME_PDF_APURACAO_SPED)
-        valor_apuracao_sped_1 = encontrar_valor_apuracao_SPED(
-            caminho_apuracao_sped, ETIQUETA_APURACAO_SPED_1
-        )
-        valor_apuracao_sped_2 = encontrar_valor_apuracao_SPED(
-            caminho_apuracao_sped, ETIQUETA_APURACAO_SPED_2
-        )
-        
-        # 2. Processar Livro Fiscal
-        caminho_livro = encontrar_pdf(NOME_PDF_LIVRO_FISCAL)
+        # O Livro é aberto UMA vez e o mesmo documento é passado para todas as funções
+        if isinstance(caminho_livro_pdf, DocumentoPDF):
+            caminho_livro = caminho_livro_pdf
+        else:
+            caminho_livro = encontrar_pdf(caminho_livro_pdf)
+            if caminho_livro:
+                caminho_livro = DocumentoPDF(caminho_livro)
+                deve_fechar = True
         
         # Livro de Entradas (Modo Horizontal "Totais")
-        valores_livro_entradas_dict = encontrar_e_extrair_totais_es(
+        dados_livro["entradas"] = encontrar_e_extrair_totais_es(
             caminho_livro, MARCADOR_PAGINA_ENTRADAS, ETIQUETA_TOTAIS_LIVRO, CHAVES_COMPLETAS_ES
         )
 
         # Livro de Saídas (Modo Horizontal "Totais")
-        valores_livro_saidas_dict = encontrar_e_extrair_totais_es(
+        dados_livro["saidas"] = encontrar_e_extrair_totais_es(
             caminho_livro, MARCADOR_PAGINA_SAIDAS, ETIQUETA_TOTAIS_LIVRO, CHAVES_LAYOUT_HORIZONTAL_SAIDAS
         )
         
-        dict_apuracao_livro = encontrar_apuracao_LIVRO(
+        dados_livro["apuracao"] = encontrar_apuracao_LIVRO(
             caminho_livro, MARCADOR_SECAO_APURACAO_LIVRO, MARCADOR_PARADA_LIVRO, CODIGOS_APURACAO_LIVRO
         )
 
-        soma_inf_comp = somar_informacoes_complementares(
+        dados_livro["soma_inf_comp"] = somar_informacoes_complementares(
             caminho_livro,
             MARCADOR_SECAO_INF_COMP,
             MARCADOR_PARADA_LIVRO 
         )
 
-        somas_detalhamento_decimal = analisar_detalhamento_por_codigo(caminho_livro)
+        somas_detalhamento_centavos = analisar_detalhamento_por_codigo(caminho_livro)
         somas_detalhamento_str = {}
-        if somas_detalhamento_decimal:
-            for codigo, soma in somas_detalhamento_decimal.items():
-                somas_detalhamento_str[codigo] = f"{soma:.2f}"
-        resultados["detalhamento_codigos"] = somas_detalhamento_str
+        if somas_detalhamento_centavos:
+            for codigo, soma in somas_detalhamento_centavos.items():
+                somas_detalhamento_str[codigo] = f"{soma // 100}.{soma % 100:02d}"  # '1234.56' (o frontend lê como número)
+        dados_livro["detalhamento_codigos"] = somas_detalhamento_str
+
+        cross_check = localizar_codigos_no_livro(caminho_livro, lista_codigos_e111)
+        dados_livro["codigos_ausentes"] = cross_check["ausentes"]
+        dados_livro["paginas_codigos"] = cross_check["paginas"]
+
+    except Exception as e:
+        print(f"ERRO GERAL NO 'ler_pdf.py' (Livro): {e}", file=sys.stderr)
+    
+    finally:
+        if deve_fechar:
+            print(f"   > (PDF) Livro: {caminho_livro.paginas_extraidas} extrações e {caminho_livro.paginas_do_cache} páginas do cache ({len(caminho_livro)} páginas).", file=sys.stderr)
+            caminho_livro.fechar()
+
+    return dados_livro
+
+
+def ler_relatorio_pva(chave, caminho_pdf):
+    """
+    Lê UM relatório do PVA ('entradas', 'saidas' ou 'apuracao'). Chamada pelo
+    vigia_pdf assim que o robô termina de salvar aquele PDF.
+    Entradas/Saídas -> dicionário de totais; Apuração -> {"recolher", "saldo_credor"}.
+    """
+    if chave == "entradas":
+        return encontrar_e_extrair_totais_es(caminho_pdf, MARCADOR_PAGINA_ENTRADAS, ETIQUETA_TOTAIS_SPED, CHAVES_COMPLETAS_ES)
+    if chave == "saidas":
+        return encontrar_e_extrair_totais_es(caminho_pdf, MARCADOR_PAGINA_SAIDAS, ETIQUETA_TOTAIS_SPED, CHAVES_COMPLETAS_ES)
+    if chave == "apuracao":
+        return {
+            "recolher": encontrar_valor_apuracao_SPED(caminho_pdf, ETIQUETA_APURACAO_SPED_1),
+            "saldo_credor": encontrar_valor_apuracao_SPED(caminho_pdf, ETIQUETA_APURACAO_SPED_2)
+        }
+    raise ValueError(f"Relatório do PVA desconhecido: {chave}")
+
+
+def analisar_relatorios_sped(caminhos_sped=None, totais_es=None, apuracao=None, validar_com_pva=VALIDAR_TOTAIS_COM_PVA,
+                             lidos=None):
+    """
+    Monta o lado SPED da comparação.
+    - Entradas/Saídas: vêm de 'totais_es' (totais_sped.calcular_totais_es).
+    - Apuração: vem de 'apuracao' (apuracao_sped.recalcular_apuracao).
+    Os relatórios do PVA só são lidos para o que não foi passado, ou para tudo
+    em modo de validação cruzada ('validar_com_pva').
+    'caminhos_sped' é um dicionário {"entradas", "saidas", "apuracao"} com os
+    PDFs gerados pelo robô (na área de trabalho do job); um relatório com
+    caminho None não foi gerado e NÃO é procurado em outro lugar. Só sem o
+    dicionário (linha de comando) os PDFs são procurados pelo nome padrão na
+    pasta Documentos. 'lidos' tem os relatórios que o vigia_pdf já leu
+    enquanto o robô trabalhava ({chave: retorno de ler_relatorio_pva}).
+    """
+    lidos = lidos or {}
+
+    def _relatorio(chave, nome_padrao):
+        if chave in lidos:
+            print(f"   > (PVA) Relatório '{chave}' já lido enquanto o robô trabalhava.", file=sys.stderr)
+            return lidos[chave]
+        if caminhos_sped is None:
+            return ler_relatorio_pva(chave, encontrar_pdf(nome_padrao))
+        caminho = caminhos_sped.get(chave)
+        if caminho is None:
+            print(f"   > (PVA) ERRO: O robô não gerou o relatório '{chave}'.", file=sys.stderr)
+        return ler_relatorio_pva(chave, encontrar_pdf(caminho) if caminho else None)
+
+    dados_sped = {
+        "entradas": {},
+        "saidas": {},
+        "apuracao_recolher": None,
+        "apuracao_saldo_credor": None
+    }
 
-        codigos_ausentes = verificar_codigos_no_livro(caminho_livro, LISTA_CODIGOS_E111_SPED)
-        resultados["codigos_ausentes_livro"] = codigos_ausentes
+    try:
+        if totais_es is None or validar_com_pva:
+            entradas_pva = _relatorio("entradas", NOME_PDF_ENTRADAS_SPED)
+            saidas_pva = _relatorio("saidas", NOME_PDF_SAIDAS_SPED)
 
+            if totais_es is None:
+                dados_sped["entradas"] = entradas_pva
+                dados_sped["saidas"] = saidas_pva
+            else:
+                dados_sped["pva_entradas"] = entradas_pva
+                dados_sped["pva_saidas"] = saidas_pva
 
-        # --- ETAPA 3: POPULAR O DICIONÁRIO DE RESULTADOS ---
-        
-        resultados["entradas"]["sped"] = valores_sped_entradas if valores_sped_entradas else {}
-        resultados["entradas"]["livro"] = valores_livro_entradas_dict if valores_livro_entradas_dict else {}
-        
-        status_detalhado_e = {}
-        status_geral_e = "OK"
-        # Garante que chaves ausentes sejam tratadas como 0
-        for key in CHAVES_PRINCIPAIS_ES:
-            # [MUDANÇA V7] - As strings de valor (ex: "0,00") passam pela nova
-            # função de limpeza
-            val_sped = limpar_e_converter_numero(valores_sped_entradas.get(key, "0,00"))
-            val_livro = limpar_e_converter_numero(valores_livro_entradas_dict.get(key, "0,00"))
-            if abs(val_sped - val_livro) < 0.01:
-                status_detalhado_e[key] = "OK"
+        if totais_es is not None:
+            dados_sped["entradas"] = totais_es.get("entradas") or {}
+            dados_sped["saidas"] = totais_es.get("saidas") or {}
+
+        if apuracao is None or validar_com_pva:
+            apuracao_pva = _relatorio("apuracao", NOME_PDF_APURACAO_SPED)
+            recolher_pva, saldo_credor_pva = apuracao_pva["recolher"], apuracao_pva["saldo_credor"]
+
+            if apuracao is None:
+                dados_sped["apuracao_recolher"] = recolher_pva
+                dados_sped["apuracao_saldo_credor"] = saldo_credor_pva
             else:
-                status_detalhado_e[key] = "Divergente"
-                status_geral_e = "Divergente"
-        resultados["entradas"]["status"] = status_geral_e
-        resultados["entradas"]["status_detalhado"] = status_detalhado_e
+                dados_sped["pva_apuracao_recolher"] = recolher_pva
+                dados_sped["pva_apuracao_saldo_credor"] = saldo_credor_pva
+
+        if apuracao is not None:
+            dados_sped["apuracao_recolher"] = apuracao.get("sped_recolher")
+            dados_sped["apuracao_saldo_credor"] = apuracao.get("sped_saldo_credor")
+            dados_sped["apuracao_e110"] = {
+                "status": apuracao.get("status"),
+                "campos": apuracao.get("campos", {}),
+                "avisos": apuracao.get("avisos", [])
+            }
+    except Exception as e:
+        print(f"ERRO GERAL NO 'ler_pdf.py' (Relatórios SPED): {e}", file=sys.stderr)
+
+    return dados_sped
+
+
+def _comparar_totais_es(valores_sped, valores_livro, chaves=CHAVES_PRINCIPAIS_ES):
+    """Compara as 'chaves' (por padrão as CHAVES_PRINCIPAIS_ES) e retorna (status_geral, status_detalhado)."""
+    status_detalhado = {}
+    status_geral = "OK"
+    # Garante que chaves ausentes sejam tratadas como 0
+    for key in chaves:
+        # As strings de valor (ex: "1.234,56") viram centavos: comparação exata
+        val_sped = centavos_ou_zero(valores_sped.get(key, "0,00"))
+        val_livro = centavos_ou_zero(valores_livro.get(key, "0,00"))
+        if val_sped == val_livro:
+            status_detalhado[key] = "OK"
+        else:
+            status_detalhado[key] = "Divergente"
+            status_geral = "Divergente"
+    return status_geral, status_detalhado
+
+
+def montar_resultados(dados_livro, dados_sped):
+    """
+    Junta o resultado de 'analisar_livro' e 'analisar_relatorios_sped' no
+    dicionário de resultados final (o mesmo do JSON).
+    """
+    valores_sped_entradas = dados_sped["entradas"] or {}
+    valores_sped_saidas = dados_sped["saidas"] or {}
+    valores_livro_entradas_dict = dados_livro["entradas"] or {}
+    valores_livro_saidas_dict = dados_livro["saidas"] or {}
+    dict_apuracao_livro = dados_livro["apuracao"] or {}
+    valor_apuracao_sped_1 = dados_sped["apuracao_recolher"]
+    valor_apuracao_sped_2 = dados_sped["apuracao_saldo_credor"]
+
+    resultados = {
+        "entradas": {
+            "sped": valores_sped_entradas, 
+            "livro": valores_livro_entradas_dict,
+            "status": "Falha", 
+            "status_detalhado": {}
+        },
+        "saidas": {
+            "sped": valores_sped_saidas, 
+            "livro": valores_livro_saidas_dict,
+            "status": "Falha",
+            "status_detalhado": {}
+        },
+        "apuracao": {
+            "sped_recolher": valor_apuracao_sped_1 if valor_apuracao_sped_1 else "Não lido",
+            "sped_saldo_credor": valor_apuracao_sped_2 if valor_apuracao_sped_2 else "Não lido",
+            "livro_valores": dict_apuracao_livro,
+            "status_recolher": "Falha",
+            "status_saldo_credor": "Falha"
+        },
+        "detalhamento_codigos": dados_livro["detalhamento_codigos"],
+        "codigos_ausentes_livro": dados_livro["codigos_ausentes"],
+        "paginas_codigos_livro": dados_livro["paginas_codigos"],
+        "soma_livro_inf_comp": dados_livro["soma_inf_comp"]
+    }
+
+    status_e, status_detalhado_e = _comparar_totais_es(valores_sped_entradas, valores_livro_entradas_dict)
+    resultados["entradas"]["status"] = status_e
+    resultados["entradas"]["status_detalhado"] = status_detalhado_e
 
-        resultados["saidas"]["sped"] = valores_sped_saidas if valores_sped_saidas else {}
-        resultados["saidas"]["livro"] = valores_livro_saidas_dict if valores_livro_saidas_dict else {}
+    status_s, status_detalhado_s = _comparar_totais_es(valores_sped_saidas, valores_livro_saidas_dict)
+    resultados["saidas"]["status"] = status_s
+    resultados["saidas"]["status_detalhado"] = status_detalhado_s
+
+    val_sped_a_1 = centavos_ou_zero(valor_apuracao_sped_1)
+    val_sped_a_2 = centavos_ou_zero(valor_apuracao_sped_2)
+    val_livro_a_1 = centavos_ou_zero(dict_apuracao_livro.get("013"))
+    val_livro_a_2 = centavos_ou_zero(dict_apuracao_livro.get("014"))
+    
+    if val_sped_a_1 == val_livro_a_1:
+        resultados["apuracao"]["status_recolher"] = "OK"
+    else:
+        resultados["apuracao"]["status_recolher"] = "Divergente"
         
-        status_detalhado_s = {}
-        status_geral_s = "OK"
-        for key in CHAVES_PRINCIPAIS_ES:
-            val_sped = limpar_e_converter_numero(valores_sped_saidas.get(key, "0,00"))
-            val_livro = limpar_e_converter_numero(valores_livro_saidas_dict.get(key, "0,00"))
-            if abs(val_sped - val_livro) < 0.01:
-                status_detalhado_s[key] = "OK"
+    if val_sped_a_2 == val_livro_a_2:
+        resultados["apuracao"]["status_saldo_credor"] = "OK"
+    else:
+        resultados["apuracao"]["status_saldo_credor"] = "Divergente"
+
+    # Conferência do E110 recalculado x declarado (apuracao_sped.py)
+    if "apuracao_e110" in dados_sped:
+        resultados["apuracao"]["recalculo_e110"] = dados_sped["apuracao_e110"]
+
+    # Validação cruzada: valores calculados do .txt x relatórios do PVA
+    if "pva_entradas" in dados_sped:
+        resultados.setdefault("validacao_pva", {})
+        for lado in ("entradas", "saidas"):
+            valores_pva = dados_sped[f"pva_{lado}"] or {}
+            status, status_detalhado = _comparar_totais_es(resultados[lado]["sped"], valores_pva, CHAVES_COMPLETAS_ES)
+            resultados["validacao_pva"][lado] = {
+                "pva": valores_pva,
+                "status": status if valores_pva else "Falha",
+                "status_detalhado": status_detalhado
+            }
+    if "pva_apuracao_recolher" in dados_sped:
+        resultados.setdefault("validacao_pva", {})
+        validacao_apuracao = {"pva": {}, "status": "OK", "status_detalhado": {}}
+        for chave, valor_calculado in (("recolher", valor_apuracao_sped_1), ("saldo_credor", valor_apuracao_sped_2)):
+            valor_pva = dados_sped[f"pva_apuracao_{chave}"]
+            validacao_apuracao["pva"][chave] = valor_pva if valor_pva else "Não lido"
+            if valor_pva and centavos_ou_zero(valor_calculado) == centavos_ou_zero(valor_pva):
+                validacao_apuracao["status_detalhado"][chave] = "OK"
             else:
-                status_detalhado_s[key] = "Divergente"
-                status_geral_s = "Divergente"
-        resultados["saidas"]["status"] = status_geral_s
-        resultados["saidas"]["status_detalhado"] = status_detalhado_s
-
-        resultados["apuracao"]["sped_recolher"] = valor_apuracao_sped_1 if valor_apuracao_sped_1 else "Não lido"
-        resultados["apuracao"]["sped_saldo_credor"] = valor_apuracao_sped_2 if valor_apuracao_sped_2 else "Não lido"
-        resultados["apuracao"]["livro_valores"] = dict_apuracao_livro
-        
-        val_sped_a_1 = limpar_e_converter_numero(valor_apuracao_sped_1)
-        val_sped_a_2 = limpar_e_converter_numero(valor_apuracao_sped_2)
-        val_livro_a_1 = limpar_e_converter_numero(dict_apuracao_livro.get("013"))
-        val_livro_a_2 = limpar_e_converter_numero(dict_apuracao_livro.get("014"))
-        
-        if abs(val_sped_a_1 - val_livro_a_1) < 0.01:
-            resultados["apuracao"]["status_recolher"] = "OK"
-        else:
-            resultados["apuracao"]["status_recolher"] = "Divergente"
-            
-        if abs(val_sped_a_2 - val_livro_a_2) < 0.01:
-            resultados["apuracao"]["status_saldo_credor"] = "OK"
-        else:
-            resultados["apuracao"]["status_saldo_credor"] = "Divergente"
-            
-        resultados["soma_livro_inf_comp"] = soma_inf_comp
-            
-    except Exception as e:
-        print(f"ERRO GERAL NO 'ler_pdf.py': {e}", file=sys.stderr)
+                validacao_apuracao["status_detalhado"][chave] = "Divergente"
+                validacao_apuracao["status"] = "Divergente" if valor_pva else "Falha"
+        resultados["validacao_pva"]["apuracao"] = validacao_apuracao
+
+    return resultados
+
+
+# --- ANÁLISE COMPLETA (CHAMADA PELA LINHA DE COMANDO E PELO main.py) ---
+def analisar_totais(caminho_livro_pdf, lista_codigos_e111, caminhos_sped=None, totais_es=None, apuracao=None,
+                    validar_com_pva=VALIDAR_TOTAIS_COM_PVA, lidos=None):
+    """
+    Compara o lado SPED (totais de E/S e Apuração calculados do .txt, ou os
+    relatórios do PVA para o que não for passado) com o Livro Fiscal, em
+    sequência. Retorna o dicionário de resultados (o mesmo do JSON).
+    """
+    dados_sped = analisar_relatorios_sped(caminhos_sped, totais_es, apuracao, validar_com_pva, lidos)
+    dados_livro = analisar_livro(caminho_livro_pdf, lista_codigos_e111)
+    return montar_resultados(dados_livro, dados_sped)
+
+
+# --- PONTO DE PARTIDA (LINHA DE COMANDO) ---
+if __name__ == "__main__":
     
-    finally:
-        print(json.dumps(resultados, indent=2))
\ No newline at end of file
+    if len(sys.argv) < 3: 
+        print(json.dumps({"error": "Caminho do Livro Fiscal ou lista de Códigos E111 não fornecidos."})) 
+        sys.exit(1) 
+
+    NOME_PDF_LIVRO_FISCAL = sys.argv[1]
+    codigos_e111_str = sys.argv[2] 
+    LISTA_CODIGOS_E111_SPED = codigos_e111_str.split(',') if codigos_e111_str else []
+
+    resultados = analisar_totais(NOME_PDF_LIVRO_FISCAL, LISTA_CODIGOS_E111_SPED)
+    print(json.dumps(resultados, indent=2))
\ No newline at end of file
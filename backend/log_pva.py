@@ -0,0 +1,181 @@
+import os
+import re
+import sys
+import time
+from datetime import datetime
+
+# --- LEITURA INCREMENTAL DO LOG DO PVA (loggerReport.log) ---
+# O PVA (Java/Swing) registra no loggerReport.log cada janela que abre e
+# fecha, inclusive as janelas "Aguarde..." (DialogAguarde) da importação,
+# validação e geração de relatórios. Em vez de ficar tirando print da tela
+# por até TIMEOUT_VALIDACAO segundos, o robô lê só as linhas NOVAS do log
+# (a partir do último offset) e reage assim que o PVA avisa que terminou.
+#
+# Eventos gerados ({"tipo", "hora", "janela", "titulo", "texto"}):
+#   aguarde_aberto / aguarde_fechado  -> janela "Aguarde..." abriu/fechou
+#   dialogo_aberto / dialogo_fechado  -> outra janela (OK, Erro, Salvar...)
+#   mensagem                          -> texto novo numa janela (ex: "Verificando versão do PVA...")
+#   erro                              -> linha SEVERE do log
+#   pva_encerrado                     -> o Java do PVA saiu (Runtime.exit)
+#
+# Para testar no Linux: reproduzir_log() regrava um log capturado num
+# arquivo novo, no ritmo original ou acelerado, enquanto o leitor acompanha.
+
+CODIFICACAO_LOG = "cp1252"  # O PVA roda no Windows e grava em ANSI
+FORMATO_HORA = "%m/%d/%y %H:%M:%S"
+
+AGUARDE_ABERTO = "aguarde_aberto"
+AGUARDE_FECHADO = "aguarde_fechado"
+DIALOGO_ABERTO = "dialogo_aberto"
+DIALOGO_FECHADO = "dialogo_fechado"
+MENSAGEM = "mensagem"
+ERRO = "erro"
+PVA_ENCERRADO = "pva_encerrado"
+
+# '10/28/25 12:59:09  FINE mensagem...' (linhas que começam com '+' continuam a anterior)
+_LINHA = re.compile(r"^(\d\d/\d\d/\d\d \d\d:\d\d:\d\d)\s+(SEVERE|WARNING|INFO|CONFIG|FINE|FINER|FINEST)\s+(.*)$")
+# 'br.gov...DialogAguarde[dialog2,430,275,...,title=Aguarde...,' / 'javax.swing.JDialog[dialog4,...,title=Erro,'
+_JANELA = re.compile(r"\.(DialogAguarde|JDialog)\[(dialog\d+),(?:[^\[\]]*?title=([^,\]]*))?")
+_HORA = re.compile(rb"^(\d\d/\d\d/\d\d \d\d:\d\d:\d\d)")
+_EVENTO_JANELA = re.compile(r"^java\.awt\.event\.WindowEvent\[(WINDOW_OPENED|WINDOW_CLOSED),.*\] on (\S+)$")
+_TEXTO_ROTULO = re.compile(r"JLabel\[[^\[\]]*?,text=([^,\]]+)")
+
+
+class LeitorLogPVA:
+    """
+    Acompanha o loggerReport.log como um 'tail -f': cada ler_novos() lê só o
+    que foi escrito desde a última chamada e devolve os eventos dessas linhas.
+    """
+
+    def __init__(self, caminho, do_fim=True):
+        self.caminho = caminho
+        self.offset = os.path.getsize(caminho) if do_fim and os.path.exists(caminho) else 0
+        self._pedaco = b""      # Última linha ainda sem '\n'
+        self._janelas = {}      # 'dialog2' -> {"aguarde": bool, "titulo": str}
+        self._abertas = []      # Janelas abertas, da mais antiga para a mais nova
+        self._ultimo_texto = None
+
+    @property
+    def aguarde_aberto(self):
+        """True se alguma janela 'Aguarde...' está aberta (o PVA está trabalhando)."""
+        return any(self._janelas.get(nome, {}).get("aguarde") for nome in self._abertas)
+
+    def ler_novos(self):
+        """Lê as linhas novas do log e retorna a lista de eventos (pode ser vazia)."""
+        try:
+            tamanho = os.path.getsize(self.caminho)
+        except OSError:
+            return []  # O PVA ainda não criou o log
+        if tamanho < self.offset:
+            # O PVA recriou o log (nova sessão): recomeça do início
+            self.offset, self._pedaco = 0, b""
+        if tamanho == self.offset:
+            return []
+        with open(self.caminho, "rb") as arquivo:
+            arquivo.seek(self.offset)
+            bloco = arquivo.read(tamanho - self.offset)
+        self.offset += len(bloco)
+
+        linhas = (self._pedaco + bloco).split(b"\n")
+        self._pedaco = linhas.pop()
+        eventos = []
+        for linha in linhas:
+            eventos.extend(self._processar_linha(linha.rstrip(b"\r").decode(CODIFICACAO_LOG, errors="replace")))
+        return eventos
+
+    def esperar(self, condicao, timeout, intervalo=0.5, relogio=time.monotonic, dormir=time.sleep):
+        """
+        Lê o log a cada 'intervalo' segundos até aparecer um evento com
+        condicao(evento) verdadeira. Retorna o evento, ou None no timeout.
+        """
+        inicio = relogio()
+        while True:
+            for evento in self.ler_novos():
+                if condicao(evento):
+                    return evento
+            if relogio() - inicio >= timeout:
+                return None
+            dormir(intervalo)
+
+    def _processar_linha(self, linha):
+        achou = _LINHA.match(linha)
+        if achou is None:
+            return []  # Continuação ('+ ...') ou lixo
+        hora, nivel, mensagem = achou.groups()
+        eventos = []
+
+        def evento(tipo, janela=None, texto=None):
+            info = self._janelas.get(janela, {})
+            eventos.append({"tipo": tipo, "hora": hora, "janela": janela, "titulo": info.get("titulo"), "texto": texto})
+
+        for janela in _JANELA.finditer(mensagem):
+            classe, nome, titulo = janela.groups()
+            info = self._janelas.setdefault(nome, {"aguarde": classe == "DialogAguarde", "titulo": None})
+            if titulo:
+                info["titulo"] = titulo
+
+        if nivel == "SEVERE":
+            evento(ERRO, texto=mensagem.lstrip("[] ").strip())
+        elif mensagem.startswith("Runtime.exit()"):
+            evento(PVA_ENCERRADO, texto=mensagem)
+
+        janela = _EVENTO_JANELA.match(mensagem)
+        if janela is not None:
+            acao, nome = janela.groups()
+            if nome in self._janelas:  # Só diálogos: a janela principal também gera esses eventos
+                aguarde = self._janelas[nome]["aguarde"]
+                if acao == "WINDOW_OPENED":
+                    if nome not in self._abertas:
+                        self._abertas.append(nome)
+                    evento(AGUARDE_ABERTO if aguarde else DIALOGO_ABERTO, nome)
+                else:
+                    if nome in self._abertas:
+                        self._abertas.remove(nome)
+                    evento(AGUARDE_FECHADO if aguarde else DIALOGO_FECHADO, nome)
+
+        for rotulo in _TEXTO_ROTULO.finditer(mensagem):
+            texto = rotulo.group(1).strip()
+            if texto and texto != "null" and texto != self._ultimo_texto:
+                self._ultimo_texto = texto
+                evento(MENSAGEM, self._abertas[-1] if self._abertas else None, texto)
+        return eventos
+
+
+def pva_terminou(evento):
+    """Condição para esperar(): o 'Aguarde...' fechou ou o PVA abriu uma janela (OK, Erro...)."""
+    return evento["tipo"] in (AGUARDE_FECHADO, DIALOGO_ABERTO, ERRO, PVA_ENCERRADO)
+
+
+def reproduzir_log(origem, destino, velocidade=0.0, dormir=time.sleep):
+    """
+    Regrava o log 'origem' em 'destino', segundo a segundo, como o PVA
+    escreveria. velocidade=1 respeita o tempo real, 10 é dez vezes mais
+    rápido e 0 grava tudo sem esperar (só em pedaços, para o leitor pegar
+    linhas pela metade). Serve para testar o LeitorLogPVA sem o PVA.
+    """
+    with open(origem, "rb") as arquivo:
+        linhas = arquivo.read().splitlines(keepends=True)
+    hora_anterior = None
+    with open(destino, "ab") as saida:
+        for linha in linhas:
+            achou = _HORA.match(linha)
+            if achou is not None and velocidade > 0:
+                hora = datetime.strptime(achou.group(1).decode(), FORMATO_HORA)
+                if hora_anterior is not None and hora > hora_anterior:
+                    saida.flush()
+                    dormir((hora - hora_anterior).total_seconds() / velocidade)
+                hora_anterior = hora
+            meio = len(linha) // 2
+            saida.write(linha[:meio])
+            saida.flush()
+            saida.write(linha[meio:])
+
+
+if __name__ == "__main__":
+    # python log_pva.py loggerReport.log  -> lista os eventos de um log capturado
+    if len(sys.argv) < 2:
+        print("Uso: python log_pva.py <loggerReport.log>")
+        sys.exit(1)
+    leitor = LeitorLogPVA(sys.argv[1], do_fim=False)
+    for e in leitor.ler_novos():
+        print(f"{e['hora']}  {e['tipo']:<16} {e['janela'] or '':<9} {e['titulo'] or '':<12} {e['texto'] or ''}")
@@ -1,182 +1,534 @@
 import os
 import sys
-import subprocess
-import shutil
 import uuid 
-import json 
-import re   
-from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks
+import time
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException
 from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
 
+import ler_pdf
+import analisar_detalhes
+import totais_sped
+import apuracao_sped
+import resultados_db
+import armazem_uploads
+import sessao_pva
+import tempos_pva
+import vigia_pdf
+import area_trabalho
+import cache_relatorios_pva
+from leitor_sped import identificar_empresa
+
 # Inicializa o FastAPI
 app = FastAPI()
 
 # --- CAMINHOS ---
 CAMINHO_DO_SCRIPT_ATUAL = os.path.dirname(os.path.abspath(__file__))
-CAMINHO_WALL_E = os.path.join(CAMINHO_DO_SCRIPT_ATUAL, "wall-e.py")
-CAMINHO_LER_PDF = os.path.join(CAMINHO_DO_SCRIPT_ATUAL, "ler_pdf.py")
-CAMINHO_ANALISAR_DETALHES = os.path.join(CAMINHO_DO_SCRIPT_ATUAL, "analisar_detalhes.py") # Nome CORRETO
 CAMINHO_FRONTEND = os.path.join(os.path.dirname(CAMINHO_DO_SCRIPT_ATUAL), "frontend")
-PASTA_UPLOADS = os.path.join(CAMINHO_DO_SCRIPT_ATUAL, "temp_uploads")
-os.makedirs(PASTA_UPLOADS, exist_ok=True)
+# Uploads ficam no armazém por hash do conteúdo (armazem_uploads.py)
+ARMAZEM = armazem_uploads.armazem_padrao()
 
 
-def _limpar_arquivos(caminhos_dos_arquivos):
+def _liberar_arquivos(caminhos_dos_arquivos):
     """
-    Função auxiliar para apagar arquivos temporários em background.
+    Solta os arquivos do job no armazém. Eles só são apagados pela faxina,
+    quando nenhum job os usa e o armazém passou da cota.
     """
     # Imprime no log de erro (stderr) para não poluir o JSON (stdout)
-    print(f"\nTAREFA DE LIMPEZA: Apagando arquivos: {caminhos_dos_arquivos}", file=sys.stderr)
+    print(f"\nTAREFA DE LIMPEZA: Liberando arquivos: {caminhos_dos_arquivos}", file=sys.stderr)
     for caminho in caminhos_dos_arquivos:
-        if caminho and os.path.exists(caminho):
-            try:
-                os.remove(caminho)
-                print(f"Arquivo {os.path.basename(caminho)} apagado.", file=sys.stderr)
-            except Exception as e:
-                print(f"AVISO: Não foi possível apagar o arquivo {caminho}. Erro: {e}", file=sys.stderr)
+        try:
+            ARMAZEM.liberar(caminho)
+        except Exception as e:
+            print(f"AVISO: Não foi possível liberar o arquivo {caminho}. Erro: {e}", file=sys.stderr)
+
+# --- POOLS DE EXECUÇÃO (PROCESSOS "QUENTES") ---
+# Em vez de abrir um interpretador novo por etapa (subprocess + JSON no stdout),
+# as funções de análise rodam em um pool de processos criado na subida do
+# servidor. Cada worker importa o fitz e os módulos de análise UMA vez.
+# O robô roda em uma thread dedicada: ele só controla a tela (pyautogui) e
+# só pode haver um PVA aberto por vez. O PVA fica aberto entre um job e
+# outro (sessao_pva.py): só o primeiro job paga a abertura do SpedEFD.exe.
+NUM_WORKERS_ANALISE = int(os.environ.get("NUM_WORKERS_ANALISE", "2"))
+POOL_ANALISE = None
+POOL_ROBO = None
+
+
+def _inicializar_worker():
+    """
+    Roda uma vez em cada processo do pool: importa o PyMuPDF e os módulos de
+    análise para que nenhum job pague esse custo.
+    """
+    import fitz  # noqa: F401
+    import ler_pdf  # noqa: F401
+    import analisar_detalhes  # noqa: F401
+    import totais_sped  # noqa: F401
+    import apuracao_sped  # noqa: F401
+    import cache_paginas
+    cache_paginas.cache_padrao()
+    print(f"Worker de análise pronto (PID {os.getpid()}).", file=sys.stderr)
+
+
+@app.on_event("startup")
+def _iniciar_pools():
+    global POOL_ANALISE, POOL_ROBO
+    POOL_ANALISE = ProcessPoolExecutor(max_workers=NUM_WORKERS_ANALISE, initializer=_inicializar_worker)
+    # Já dispara a criação dos workers para o primeiro job não esperar
+    for _ in range(NUM_WORKERS_ANALISE):
+        POOL_ANALISE.submit(os.getpid)
+    POOL_ROBO = ThreadPoolExecutor(max_workers=1, thread_name_prefix="wall-e")
+
+
+@app.on_event("shutdown")
+def _encerrar_pools():
+    if POOL_ANALISE is not None:
+        POOL_ANALISE.shutdown(cancel_futures=True)
+    if POOL_ROBO is not None:
+        POOL_ROBO.shutdown(cancel_futures=True)
+    sessao_pva.encerrar_sessao_padrao()
+
+
+def _executar_wall_e(caminho_sped, caminhos_relatorios):
+    """
+    Roda o robô na thread dedicada, no PVA da sessão (aberto no primeiro job
+    e reaproveitado pelos seguintes). O wall_e só é importado quando o robô
+    roda, para o servidor (e os workers de análise) não precisarem dele.
+    Cada PDF salvo é lido no pool de análise assim que fica completo
+    (vigia_pdf.py), enquanto o robô gera os próximos. Os PDFs vão para
+    'caminhos_relatorios' (na área de trabalho do job).
+    Retorna {"caminhos": PDFs salvos, "lidos": relatórios já lidos}.
+    """
+    vigia = vigia_pdf.VigiaPDFs(
+        lambda chave, caminho: POOL_ANALISE.submit(ler_pdf.ler_relatorio_pva, chave, caminho).result()
+    )
+    caminhos = sessao_pva.sessao_padrao().processar(caminho_sped, vigia.vigiar, caminhos_relatorios)
+    return {"caminhos": caminhos, "lidos": vigia.resultados(vigia_pdf.TIMEOUT_PDF)}
 
-# --- FUNÇÕES DE EXECUÇÃO CORRIGIDAS ---
 
-async def _executar_wall_e(command, log_name="Wall-E"):
+async def _executar_no_pool(pool, funcao, *args, log_name="Script"):
     """
-    Função especial para o Wall-E, que NÃO retorna JSON.
+    Roda 'funcao(*args)' no pool indicado e devolve o objeto Python retornado.
     """
     try:
-        python_exe = sys.executable 
-        resultado = subprocess.run(
-            command, 
-            capture_output=True, 
-            text=True, 
-            check=True,
-            encoding='cp1252',
-            errors='ignore'
-        )
-        # Apenas imprime o log de erro (stderr) e de saída (stdout)
-        print(f"--- Log do {log_name} (stdout) ---", file=sys.stderr)
-        print(resultado.stdout, file=sys.stderr)
-        print(f"--- Log do {log_name} (stderr) ---", file=sys.stderr)
-        print(resultado.stderr, file=sys.stderr)
-        print(f"--- Fim do Log do {log_name} ---", file=sys.stderr)
-        return True # Sucesso
-        
-    except subprocess.CalledProcessError as e:
-        print(f"ERRO FATAL: O script '{log_name}' falhou:", file=sys.stderr)
-        print(e.stdout, file=sys.stderr)
-        print(e.stderr, file=sys.stderr)
-        raise Exception(f"Erro no {log_name}: {e.stderr} {e.stdout}")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(pool, funcao, *args)
     except Exception as e:
-        print(f"Erro inesperado no servidor ao rodar {log_name}: {e}", file=sys.stderr)
-        raise Exception(f"Erro inesperado no {log_name}: {e}")
+        print(f"ERRO FATAL: A etapa '{log_name}' falhou: {e}", file=sys.stderr)
+        raise Exception(f"Erro no {log_name}: {e}")
+
 
-async def _executar_script_com_json(command, log_name="Script"):
+# --- EXECUTOR DE ETAPAS COM DEPENDÊNCIAS ---
+# Cada etapa declara de quais outras depende. Uma etapa começa assim que as
+# suas dependências terminam, então tudo o que não depende do robô (Livro,
+# Bloco E, detalhes) roda em paralelo com ele, logo que o upload chega.
+
+class Etapa:
     """
-    Função para scripts (ler_pdf, analisar_detalhes) que RETORNAM JSON.
+    Uma etapa do pipeline.
+    - funcao/pool: o que rodar e onde (POOL_ANALISE ou POOL_ROBO).
+    - depende_de: nomes das etapas que precisam terminar antes.
+    - argumentos: função que recebe os resultados já prontos e devolve a tupla
+      de argumentos de 'funcao'.
+    - trava: asyncio.Lock opcional (ex.: só um robô por vez na máquina).
     """
-    try:
-        python_exe = sys.executable 
-        resultado = subprocess.run(
-            command, 
-            capture_output=True, 
-            text=True, 
-            check=True,
-            encoding='cp1252',
-            errors='ignore'
-        )
-        
-        log_de_erros = resultado.stderr
-        saida_json_string = resultado.stdout
-        
-        print(f"--- Log do {log_name} (stderr) ---", file=sys.stderr)
-        print(log_de_erros, file=sys.stderr)
-        print(f"--- Fim do Log do {log_name} ---", file=sys.stderr)
-
-        # Tenta decodificar o JSON
+
+    def __init__(self, nome, funcao, pool, depende_de=(), argumentos=lambda resultados: (), trava=None):
+        self.nome = nome
+        self.funcao = funcao
+        self.pool = pool
+        self.depende_de = tuple(depende_de)
+        self.argumentos = argumentos
+        self.trava = trava
+
+
+async def executar_etapas(etapas, ao_mudar_estado=None, tempos=None):
+    """
+    Roda as etapas respeitando as dependências e devolve {nome: resultado}.
+    'ao_mudar_estado(nome, estado)' é chamado a cada mudança:
+    aguardando -> na_fila (só com trava) -> executando -> concluida | erro | cancelada.
+    Se 'tempos' for um dicionário, recebe a duração (s) de cada etapa concluída.
+    Se uma etapa falhar, as que ainda não terminaram são canceladas e o erro sobe.
+    """
+    resultados = {}
+    tarefas = {}
+
+    def _estado(nome, estado):
+        if ao_mudar_estado:
+            ao_mudar_estado(nome, estado)
+
+    async def _rodar(etapa):
         try:
-            dados_json = json.loads(saida_json_string)
-            return dados_json
-        except json.JSONDecodeError as e:
-            print(f"ERRO FATAL: {log_name} não produziu um JSON válido.", file=sys.stderr)
-            print(f"Saída com erro: {saida_json_string}", file=sys.stderr)
-            raise Exception(f"Falha ao decodificar JSON do {log_name}: {e}")
-
-    except subprocess.CalledProcessError as e:
-        print(f"ERRO FATAL: O script '{log_name}' falhou:", file=sys.stderr)
-        print(e.stdout, file=sys.stderr)
-        print(e.stderr, file=sys.stderr)
-        raise Exception(f"Erro no {log_name}: {e.stderr} {e.stdout}")
+            for dependencia in etapa.depende_de:
+                await tarefas[dependencia]
+        except BaseException:
+            _estado(etapa.nome, "cancelada")
+            raise
+        argumentos = etapa.argumentos(resultados)
+        try:
+            if etapa.trava is not None:
+                _estado(etapa.nome, "na_fila")
+                await etapa.trava.acquire()
+            try:
+                _estado(etapa.nome, "executando")
+                inicio = time.perf_counter()
+                resultados[etapa.nome] = await _executar_no_pool(
+                    etapa.pool, etapa.funcao, *argumentos, log_name=etapa.nome
+                )
+                duracao = time.perf_counter() - inicio
+                if tempos is not None:
+                    tempos[etapa.nome] = round(duracao, 3)
+                print(f"--- ETAPA '{etapa.nome}' CONCLUÍDA em {duracao:.1f}s ---", file=sys.stderr)
+            finally:
+                if etapa.trava is not None:
+                    etapa.trava.release()
+        except asyncio.CancelledError:
+            _estado(etapa.nome, "cancelada")
+            raise
+        except BaseException:
+            _estado(etapa.nome, "erro")
+            raise
+        _estado(etapa.nome, "concluida")
+
+    for etapa in etapas:
+        _estado(etapa.nome, "aguardando")
+        tarefas[etapa.nome] = asyncio.ensure_future(_rodar(etapa))
+    try:
+        await asyncio.gather(*tarefas.values())
+    except BaseException:
+        for tarefa in tarefas.values():
+            tarefa.cancel()
+        raise
+    return resultados
+
+
+# --- SUBSISTEMA DE JOBS ---
+# O upload é salvo e o job começa na hora; a resposta sai com o 'job_id'.
+# As etapas que não dependem do robô já começam enquanto o job espera a vez
+# do PVA (TRAVA_ROBO: só existe um PVA na máquina). Tudo roda nos pools acima,
+# então o event loop do uvicorn nunca trava.
+# O frontend acompanha o andamento com GET /jobs/{job_id}.
+MAX_JOBS_GUARDADOS = 200  # Jobs finalizados mais antigos são esquecidos
+
+JOBS = {}           # { job_id: dict com status, etapas, resultado... }
+TRAVA_ROBO = None   # asyncio.Lock criado na subida do servidor
+
+
+def _novo_job(path_sped_txt, path_livro_pdf, hashes=None, forcar_robo=False):
+    job_id = str(uuid.uuid4())
+    JOBS[job_id] = {
+        "job_id": job_id,
+        "status": "processando",   # processando -> concluido | erro
+        "etapas": {},
+        "tempos": {},              # duração (s) de cada etapa concluída
+        "previsao_robo": None,     # {"esperado_s", "pior_caso_s"} do robô para este SPED (tempos_pva.py)
+        "empresa": None,           # CNPJ/nome/período do |0000|
+        "arquivos": hashes or {},  # SHA-256 do SPED e do Livro (chave estável para caches)
+        "robo_em_cache": False,    # True: relatórios do PVA vieram do cache (cache_relatorios_pva.py), sem robô
+        "criado_em": time.time(),
+        "finalizado_em": None,
+        "resultado": None,
+        "erro": None,
+        "_arquivos": [path_sped_txt, path_livro_pdf],
+        "_area": None,             # area_trabalho.AreaTrabalho do job (relatórios do PVA)
+        "_forcar_robo": forcar_robo,  # Ignora o cache dos relatórios do PVA e roda o robô de novo
+        "_tarefa": None,
+        "_inicio_etapas": {},      # nome -> time.time() em que a etapa começou a executar
+    }
+    _esquecer_jobs_antigos()
+    return JOBS[job_id]
+
+
+def _esquecer_jobs_antigos():
+    finalizados = [j for j in JOBS.values() if j["status"] in ("concluido", "erro")]
+    excesso = len(JOBS) - MAX_JOBS_GUARDADOS
+    for job in sorted(finalizados, key=lambda j: j["finalizado_em"])[:max(excesso, 0)]:
+        del JOBS[job["job_id"]]
+
+
+def _robo_restante(job, agora):
+    """Segundos que faltam para o robô terminar este job (pela previsão), ou None se não há previsão."""
+    previsao = job["previsao_robo"]
+    if previsao is None:
+        return None
+    inicio = job["_inicio_etapas"].get("robo")
+    if job["etapas"].get("robo") == "executando" and inicio is not None:
+        return max(0.0, previsao["esperado_s"] - (agora - inicio))
+    return previsao["esperado_s"]
+
+
+def _eta_robo(job):
+    """
+    Previsão (s) para o robô terminar este job: o que falta dele mais o dos
+    jobs na frente dele na fila. None se algum deles não tem previsão.
+    """
+    estado = job["etapas"].get("robo")
+    if estado not in ("aguardando", "na_fila", "executando"):
+        return None
+    agora = time.time()
+    if estado == "executando":
+        restante = _robo_restante(job, agora)
+        return None if restante is None else round(restante)
+    na_frente = [j for j in JOBS.values()
+                 if j is not job and (j["etapas"].get("robo") == "executando"
+                                      or (j["etapas"].get("robo") == "na_fila" and j["criado_em"] < job["criado_em"]))]
+    restantes = [_robo_restante(j, agora) for j in na_frente + [job]]
+    if any(r is None for r in restantes):
+        return None
+    return round(sum(restantes))
+
+
+def _job_publico(job):
+    """Versão do job que vai para o frontend (sem os campos internos '_')."""
+    dados = {k: v for k, v in job.items() if not k.startswith("_")}
+    if job["etapas"].get("robo") == "na_fila":
+        na_fila = [j for j in JOBS.values() if j["etapas"].get("robo") == "na_fila"]
+        dados["posicao_fila"] = sorted(na_fila, key=lambda j: j["criado_em"]).index(job) + 1
+    dados["eta_robo_s"] = _eta_robo(job)
+    return dados
+
+
+def _prever_robo(path_sped_txt):
+    """Soma das previsões de tempo do robô para o SPED ({"esperado_s", "pior_caso_s"}) ou None."""
+    _, previsao = tempos_pva.prever_tempos(path_sped_txt)
+    if tempos_pva.total_esperado(previsao) is None:
+        return None
+    return {"esperado_s": tempos_pva.total_esperado(previsao),
+            "pior_caso_s": round(sum(p["pior_caso_s"] for p in previsao.values()), 1)}
+
+
+def _etapas_do_job(path_sped_txt, path_livro_pdf, caminhos_relatorios=None, validar_com_pva=ler_pdf.VALIDAR_TOTAIS_COM_PVA,
+                   relatorios_em_cache=None):
+    """
+    O pipeline de um job:
+      bloco_e ----> livro               (Livro x códigos E111 e valores do Bloco E
+                                         caçados no Livro, numa extração só)
+      totais_sped ---+                   (Entradas/Saídas calculadas do .txt)
+      apuracao_sped -+-> relatorios_sped (E110 recalculado do .txt)
+      robo ----------+                   (só com validação cruzada no PVA)
+    Sem a validação cruzada, o robô nem entra no job. Os relatórios do PVA
+    vão para 'caminhos_relatorios' (área de trabalho do job) e os caminhos
+    seguem do robô para relatorios_sped: nada é procurado pelo nome.
+    Com 'relatorios_em_cache' (mesmo SPED já validado antes), o robô também
+    não entra: relatorios_sped usa os relatórios guardados.
+    """
+    etapas = [
+        Etapa("bloco_e", analisar_detalhes.extrair_bloco_e_do_sped, POOL_ANALISE,
+              argumentos=lambda r: (path_sped_txt,)),
+        Etapa("livro", analisar_detalhes.analisar_livro_e_detalhes, POOL_ANALISE, depende_de=["bloco_e"],
+              argumentos=lambda r: (path_sped_txt, path_livro_pdf, r["bloco_e"][1])),
+        Etapa("totais_sped", totais_sped.calcular_totais_es, POOL_ANALISE,
+              argumentos=lambda r: (path_sped_txt,)),
+        Etapa("apuracao_sped", apuracao_sped.recalcular_apuracao, POOL_ANALISE,
+              argumentos=lambda r: (path_sped_txt,)),
+    ]
+    depende_de = ["totais_sped", "apuracao_sped"]
+    if validar_com_pva and relatorios_em_cache is None:
+        etapas.append(Etapa("robo", _executar_wall_e, POOL_ROBO, trava=TRAVA_ROBO,
+                            argumentos=lambda r: (path_sped_txt, caminhos_relatorios)))
+        depende_de.append("robo")
+    etapas.append(Etapa("relatorios_sped", ler_pdf.analisar_relatorios_sped, POOL_ANALISE, depende_de=depende_de,
+                        argumentos=lambda r: ((r.get("robo") or {}).get("caminhos"), r["totais_sped"], r["apuracao_sped"],
+                                              validar_com_pva, relatorios_em_cache or (r.get("robo") or {}).get("lidos"))))
+    return etapas
+
+
+async def _executar_job(job):
+    """Roda todas as etapas de um job e guarda o JSON final em job['resultado']."""
+    path_sped_txt, path_livro_pdf = job["_arquivos"]
+    print(f"\n=== JOB {job['job_id']} INICIADO ===", file=sys.stderr)
+
+    def _ao_mudar_estado(nome, estado):
+        job["etapas"][nome] = estado
+        if estado == "executando":
+            job["_inicio_etapas"][nome] = time.time()
+
+    try:
+        job["empresa"] = await asyncio.to_thread(identificar_empresa, path_sped_txt)
+        validar_com_pva = ler_pdf.VALIDAR_TOTAIS_COM_PVA
+        relatorios_em_cache = None
+        if validar_com_pva:
+            relatorios_em_cache = await asyncio.to_thread(
+                cache_relatorios_pva.buscar_relatorios, job["arquivos"].get("sped"), job["_forcar_robo"]
+            )
+            if relatorios_em_cache is not None:
+                job["robo_em_cache"] = True
+                job["etapas"]["robo"] = "em_cache"
+            else:
+                job["previsao_robo"] = await asyncio.to_thread(_prever_robo, path_sped_txt)
+        caminhos_relatorios = None
+        if validar_com_pva and relatorios_em_cache is None:
+            # Só o robô usa a área de trabalho: sem ele (sem validação ou com cache), nem cria a pasta
+            job["_area"] = await asyncio.to_thread(area_trabalho.AreaTrabalho, job["job_id"])
+            caminhos_relatorios = job["_area"].caminhos_relatorios()
+        etapas = _etapas_do_job(path_sped_txt, path_livro_pdf, caminhos_relatorios, validar_com_pva,
+                                relatorios_em_cache)
+        r = await executar_etapas(etapas, _ao_mudar_estado, job["tempos"])
+        if r.get("robo"):
+            # O próximo job com este mesmo SPED não precisa do robô
+            await asyncio.to_thread(cache_relatorios_pva.guardar_relatorios, job["arquivos"].get("sped"), r["robo"]["lidos"])
+        texto_bloco_e = r["bloco_e"][0]
+        dados_livro, detalhes = r["livro"]
+        job["resultado"] = {
+            "conciliacao_totais": ler_pdf.montar_resultados(dados_livro, r["relatorios_sped"]),
+            "conciliacao_detalhes": detalhes,
+            "bloco_e_texto": texto_bloco_e if texto_bloco_e else "Bloco E não encontrado ou vazio."
+        }
+        job["status"] = "concluido"
+        print(f"=== JOB {job['job_id']} CONCLUÍDO ===", file=sys.stderr)
     except Exception as e:
-        print(f"Erro inesperado no servidor ao rodar {log_name}: {e}", file=sys.stderr)
-        raise Exception(f"Erro inesperado no {log_name}: {e}")
+        print(f"ERRO no job {job['job_id']}: {e}", file=sys.stderr)
+        job["status"] = "erro"
+        job["erro"] = str(e)
+    finally:
+        job["finalizado_em"] = time.time()
+        # A gravação no banco e a limpeza rodam numa thread para não travar o event loop
+        await asyncio.to_thread(
+            resultados_db.registrar_job, job["job_id"], job["empresa"], job["resultado"], job["tempos"],
+            job["criado_em"], job["finalizado_em"], job["erro"]
+        )
+        await asyncio.to_thread(_liberar_arquivos, job["_arquivos"])
+        if job["_area"] is not None:
+            await asyncio.to_thread(job["_area"].remover)
 
 
-# --- O ÚNICO ENDPOINT "MESTRE" (AGORA CORRIGIDO) ---
-@app.post("/processar-tudo/")
-async def processar_tudo(
-    background_tasks: BackgroundTasks, # Para limpeza
-    file_sped: UploadFile = File(...), 
-    file_livro: UploadFile = File(...)
-):
+def _iniciar_job(path_sped_txt, path_livro_pdf, hashes=None, forcar_robo=False):
+    job = _novo_job(path_sped_txt, path_livro_pdf, hashes, forcar_robo)
+    job["_tarefa"] = asyncio.create_task(_executar_job(job))
+    print(f"Arquivos recebidos. Job {job['job_id']} iniciado.", file=sys.stderr)
+    return job
+
+
+@app.on_event("startup")
+async def _iniciar_trava_robo():
+    global TRAVA_ROBO
+    TRAVA_ROBO = asyncio.Lock()
+
+
+@app.on_event("startup")
+async def _faxina_do_armazem():
+    """Na subida, nenhum job usa o armazém: limpa sobras e aplica a cota."""
+    await asyncio.to_thread(ARMAZEM.faxina)
+
+
+@app.on_event("startup")
+async def _faxina_das_areas():
+    """Na subida, nenhum job está rodando: apaga as áreas de trabalho que sobraram."""
+    await asyncio.to_thread(area_trabalho.faxina, area_trabalho.PASTA_AREAS, 0)
+
+
+async def _receber_uploads(file_sped, file_livro):
     """
-    (Endpoint Mestre)
-    1. Salva os arquivos.
-    2. Roda o Wall-E (lento).
-    3. Roda o Ler_PDF (rápido).
-    4. Roda o Analisar_Detalhes (rápido).
-    5. Junta os JSONs e retorna.
-    """
-    id_unico = str(uuid.uuid4())
-    path_sped_txt = os.path.abspath(os.path.join(PASTA_UPLOADS, f"{id_unico}_sped.txt"))
-    path_livro_pdf = os.path.abspath(os.path.join(PASTA_UPLOADS, f"{id_unico}_livro.pdf"))
-    
-    # Adiciona os arquivos à lista de limpeza
-    background_tasks.add_task(_limpar_arquivos, [path_sped_txt, path_livro_pdf])
-    
+    Guarda os dois arquivos no armazém (numa thread) e devolve
+    (path_sped_txt, path_livro_pdf, {"sped": sha256, "livro": sha256}).
+    """
+    guardados = []
     try:
-        with open(path_sped_txt, "wb") as buffer: shutil.copyfileobj(file_sped.file, buffer)
-        with open(path_livro_pdf, "wb") as buffer: shutil.copyfileobj(file_livro.file, buffer)
+        for upload, extensao in ((file_sped, ".txt"), (file_livro, ".pdf")):
+            guardados.append(await asyncio.to_thread(ARMAZEM.guardar, upload.file, extensao))
     except Exception as e:
+        await asyncio.to_thread(_liberar_arquivos, [caminho for _, caminho in guardados])
         raise HTTPException(status_code=500, detail=f"Erro ao salvar arquivos: {e}")
     finally:
         file_sped.file.close()
         file_livro.file.close()
+    (hash_sped, path_sped_txt), (hash_livro, path_livro_pdf) = guardados
+    return path_sped_txt, path_livro_pdf, {"sped": hash_sped, "livro": hash_livro}
 
-    print(f"Arquivos recebidos. Iniciando Processo Completo...", file=sys.stderr)
 
-    try:
-        # --- AÇÃO 1: RODAR O WALL-E (NÃO ESPERA JSON) ---
-        print("\n--- ETAPA 1: RODANDO O ROBÔ (WALL-E) ---", file=sys.stderr)
-        await _executar_wall_e([sys.executable, CAMINHO_WALL_E, path_sped_txt, path_livro_pdf], "Wall-E")
-        print("--- ETAPA 1 (WALL-E) CONCLUÍDA ---", file=sys.stderr)
-
-        # --- AÇÃO 2: RODAR O ANALISADOR DE TOTAIS (ESPERA JSON) ---
-        print("\n--- ETAPA 2: RODANDO O ANALISADOR DE TOTAIS (LER_PDF) ---", file=sys.stderr)
-        json_totais = await _executar_script_com_json([sys.executable, CAMINHO_LER_PDF, path_livro_pdf], "Ler_PDF (Totais)")
-        print("--- ETAPA 2 (LER_PDF) CONCLUÍDA ---", file=sys.stderr)
-
-        # --- AÇÃO 3: RODAR O EXTRATOR DE DETALHES (ESPERA JSON) ---
-        print("\n--- ETAPA 3: RODANDO O CONCILIADOR DE DETALHES (BLOCO E) ---", file=sys.stderr)
-        # --- CORREÇÃO FINAL: Passando o path_livro_pdf (o segundo argumento) ---
-        json_detalhes = await _executar_script_com_json(
-            [sys.executable, CAMINHO_ANALISAR_DETALHES, path_sped_txt, path_livro_pdf], 
-            "Analisar_Detalhes (Bloco E)"
-        )
-        print("--- ETAPA 3 (ANALISAR_DETALHES) CONCLUÍDA ---", file=sys.stderr)
-        
-        # --- AÇÃO 4: COMBINAR OS JSONS ---
-        json_final = {
-            "conciliacao_totais": json_totais,
-            "conciliacao_detalhes": json_detalhes
-        }
-        
-        print("\nProcesso completo finalizado. Enviando JSON final para o frontend.", file=sys.stderr)
-        return JSONResponse(content=json_final)
+@app.post("/jobs", status_code=202)
+async def criar_job(
+    file_sped: UploadFile = File(...), 
+    file_livro: UploadFile = File(...),
+    forcar_robo: bool = Form(False)
+):
+    """
+    Salva os arquivos, inicia o job e responde na hora com o 'job_id'.
+    'forcar_robo': roda o robô mesmo que este SPED já esteja no cache do PVA.
+    """
+    path_sped_txt, path_livro_pdf, hashes = await _receber_uploads(file_sped, file_livro)
+    job = _iniciar_job(path_sped_txt, path_livro_pdf, hashes, forcar_robo)
+    return _job_publico(job)
 
-    except Exception as e:
-        # Pega qualquer erro que as funções _executar_script lançarem
-        print(f"ERRO no fluxo principal: {e}", file=sys.stderr)
-        raise HTTPException(status_code=500, detail=str(e))
-    # (A limpeza já está agendada no background_tasks)
+
+@app.get("/jobs/{job_id}")
+async def consultar_job(job_id: str):
+    """
+    Retorna o status do job ('processando', 'concluido' ou 'erro'), o estado de
+    cada etapa, a posição na fila do robô e, quando concluído, o JSON final em 'resultado'.
+    """
+    job = JOBS.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} não encontrado.")
+    return _job_publico(job)
+
+
+# --- ENDPOINT "MESTRE" (COMPATIBILIDADE) ---
+@app.post("/processar-tudo/")
+async def processar_tudo(
+    file_sped: UploadFile = File(...), 
+    file_livro: UploadFile = File(...),
+    forcar_robo: bool = Form(False)
+):
+    """
+    (Endpoint Mestre)
+    Mesmo fluxo do POST /jobs, mas espera o job terminar e devolve o JSON final.
+    Vários envios ao mesmo tempo esperam a vez do robô (TRAVA_ROBO).
+    """
+    path_sped_txt, path_livro_pdf, hashes = await _receber_uploads(file_sped, file_livro)
+    job = _iniciar_job(path_sped_txt, path_livro_pdf, hashes, forcar_robo)
+
+    await job["_tarefa"]
+    if job["status"] == "erro":
+        raise HTTPException(status_code=500, detail=job["erro"])
+
+    print("\nProcesso completo finalizado. Enviando JSON final para o frontend.", file=sys.stderr)
+    return JSONResponse(content=job["resultado"])
+
+
+# --- PAINEL DE PROGRESSO ---
+# Consultas sobre o banco de resultados (resultados_db.py). Tudo vem das
+# tabelas de resumo, então não depende de quantos jobs já foram gravados.
+
+def _banco_ou_503():
+    banco = resultados_db.banco_padrao()
+    if banco is None:
+        raise HTTPException(status_code=503, detail="Banco de resultados indisponível.")
+    return banco
+
+
+@app.get("/progresso", response_class=HTMLResponse)
+async def get_progresso_page():
+    caminho_html = os.path.join(CAMINHO_FRONTEND, "progresso.html")
+    if not os.path.exists(caminho_html):
+        return HTMLResponse("<html><body><h1>Erro 404: Arquivo progresso.html não encontrado.</h1></body></html>", status_code=404)
+    with open(caminho_html, "r", encoding="utf-8") as f:
+        return HTMLResponse(content=f.read())
+
+
+@app.get("/dashboard/status")
+async def dashboard_status():
+    """
+    Quantas empresas/competências estão 'ok', 'divergente' ou 'erro' (pela
+    última conciliação de cada uma) e quantos jobs estão rodando agora.
+    """
+    contagem = await asyncio.to_thread(_banco_ou_503().contagem_status)
+    contagem["em_andamento"] = sum(1 for job in JOBS.values() if job["status"] == "processando")
+    contagem["total"] = sum(contagem[s] for s in resultados_db.STATUS_POSSIVEIS)
+    return contagem
+
+
+@app.get("/dashboard/evolucao")
+async def dashboard_evolucao(meses: int = 12):
+    """Status por competência (AAAA-MM) das últimas 'meses' competências."""
+    return await asyncio.to_thread(_banco_ou_503().evolucao_mensal, max(1, min(meses, 120)))
+
+
+@app.get("/dashboard/divergentes")
+async def dashboard_divergentes(limite: int = 50):
+    """Empresas cuja última conciliação divergiu ou deu erro (mais recentes primeiro)."""
+    return await asyncio.to_thread(_banco_ou_503().empresas_divergentes, max(1, min(limite, 500)))
 
 
 # --- Monta o site ---
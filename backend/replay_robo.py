@@ -0,0 +1,334 @@
+import os
+import sys
+import json
+import time
+import tempfile
+import threading
+import cv2
+import numpy as np
+
+import wall_e
+import tempos_pva
+from visao_robo import MotorTemplates, FonteTelaPyautogui, AcoesPyautogui, RelogioReal, em_cinza
+
+# --- GRAVAÇÃO E REPLAY DO WALL-E ---
+# Gravar (no Windows, com o PVA de verdade): enquanto o robô roda, uma thread
+# tira print da tela a cada INTERVALO_GRAVACAO e salva só os quadros que
+# mudaram; cada ação do robô (clique, tecla, texto...) vai para o
+# roteiro.jsonl com o instante em que aconteceu.
+#
+#   gravacao/roteiro.jsonl
+#   gravacao/quadro_00001.png ...
+#
+# Reproduzir (no Linux, sem o PVA): o robô roda com um relógio virtual (as
+# esperas não dormem de verdade) e a "tela" vem dos quadros
+# gravados. Os quadros gravados depois da N-ésima ação só aparecem depois
+# que o robô faz a N-ésima ação no replay, com o mesmo atraso da gravação:
+# o PVA continua demorando o que demorava, mas o robô pode ser mais rápido.
+# O relatório diz:
+#   - tempo total da execução (virtual, inclui o tempo real das buscas de imagem);
+#   - por espera da tela assentar (wall_e.aguardar_tela), o tempo gasto e a pausa fixa que existia antes;
+#   - por espera de imagem, a latência entre a tela mudar e o robô perceber.
+# O log do PVA não é reproduzido: as esperas longas caem para a tela.
+
+INTERVALO_GRAVACAO = 0.25
+LIMIAR_PIXEL = 16         # Diferença de cinza para um pixel contar como mudado
+MIN_PIXELS_MUDADOS = 200  # Menos que isso (cursor piscando) não vira quadro novo
+ARQUIVO_ROTEIRO = "roteiro.jsonl"
+NOME_SPED_REPLAY = "sped_replay.txt"
+
+
+def tela_mudou(anterior, atual):
+    if anterior is None or anterior.shape != atual.shape:
+        return True
+    return int(np.count_nonzero(cv2.absdiff(anterior, atual) > LIMIAR_PIXEL)) >= MIN_PIXELS_MUDADOS
+
+
+# --- GRAVAÇÃO ---
+
+class Gravador:
+    """
+    Grava uma execução do robô na pasta. Use com 'with': troca as ações e o
+    relógio do wall_e pelos gravados e liga a thread de captura.
+    """
+
+    def __init__(self, pasta, fonte=None, acoes=None, relogio=None):
+        self.pasta = pasta
+        self.fonte = fonte or FonteTelaPyautogui()
+        self._acoes = acoes or AcoesPyautogui()
+        self._relogio = relogio or RelogioReal()
+        self._trava = threading.Lock()
+        self._parar = threading.Event()
+        self._thread = None
+        self._roteiro = None
+        self._inicio = None
+        self.quadros = 0
+
+    def registrar(self, tipo, **dados):
+        with self._trava:
+            linha = {"t": round(time.monotonic() - self._inicio, 3), "tipo": tipo, **dados}
+            self._roteiro.write(json.dumps(linha, ensure_ascii=False) + "\n")
+            self._roteiro.flush()
+
+    # Interface de ações (a mesma do AcoesPyautogui)
+    def _acao(self, nome, *args):
+        self.registrar("acao", acao=nome, args=list(args))
+        return getattr(self._acoes, nome)(*args)
+
+    def clicar(self, x, y): return self._acao("clicar", x, y)
+    def escrever(self, texto): return self._acao("escrever", texto)
+    def tecla(self, nome): return self._acao("tecla", nome)
+    def atalho(self, *teclas): return self._acao("atalho", *teclas)
+    def copiar(self, texto): return self._acao("copiar", texto)
+    def abrir_programa(self, caminho, pasta): return self._acao("abrir_programa", caminho, pasta)
+
+    # Interface de relógio (a mesma do RelogioReal)
+    def agora(self): return self._relogio.agora()
+    def dormir(self, segundos): self._relogio.dormir(segundos)
+
+    def _capturar_em_loop(self):
+        anterior = None
+        while not self._parar.is_set():
+            try:
+                tela = em_cinza(self.fonte.capturar())
+            except Exception as e:
+                print(f"   > (GRAVAÇÃO) Falha ao capturar a tela: {e}", file=sys.stderr)
+                tela = None
+            if tela is not None and tela_mudou(anterior, tela):
+                anterior = tela
+                self.quadros += 1
+                arquivo = f"quadro_{self.quadros:05d}.png"
+                cv2.imwrite(os.path.join(self.pasta, arquivo), tela)
+                self.registrar("quadro", arquivo=arquivo)
+            self._parar.wait(INTERVALO_GRAVACAO)
+
+    def __enter__(self):
+        os.makedirs(self.pasta, exist_ok=True)
+        self._roteiro = open(os.path.join(self.pasta, ARQUIVO_ROTEIRO), "w", encoding="utf-8")
+        self._inicio = time.monotonic()
+        self._antigos = (wall_e.ACOES, wall_e.RELOGIO)
+        wall_e.ACOES, wall_e.RELOGIO = self, self
+        self._thread = threading.Thread(target=self._capturar_em_loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *erro):
+        self._parar.set()
+        self._thread.join()
+        wall_e.ACOES, wall_e.RELOGIO = self._antigos
+        self.registrar("fim")
+        self._roteiro.close()
+        print(f"   > (GRAVAÇÃO) {self.quadros} quadros gravados em {self.pasta}.", file=sys.stderr)
+
+
+def gravar_execucao(caminho_sped, pasta):
+    """Roda wall_e.executar_robo(caminho_sped) de verdade, gravando tudo em 'pasta'."""
+    with Gravador(pasta) as gravador:
+        gravador.registrar("inicio", sped=caminho_sped, tamanho_sped=os.path.getsize(caminho_sped))
+        return wall_e.executar_robo(caminho_sped)
+
+
+# --- REPLAY ---
+
+def ler_roteiro(pasta):
+    """
+    (inicio, segmentos, acoes) do roteiro.jsonl. segmentos[n] são os quadros
+    [(atraso_desde_a_acao, arquivo)] gravados depois da n-ésima ação
+    (segmentos[0]: antes da primeira); acoes[n] = (nome, args).
+    """
+    inicio, segmentos, acoes = {}, [[]], []
+    ultima_acao = 0.0
+    with open(os.path.join(pasta, ARQUIVO_ROTEIRO), encoding="utf-8") as arquivo:
+        for linha in arquivo:
+            registro = json.loads(linha)
+            if registro["tipo"] == "inicio":
+                inicio = registro
+            elif registro["tipo"] == "acao":
+                acoes.append((registro["acao"], registro["args"]))
+                segmentos.append([])
+                ultima_acao = registro["t"]
+            elif registro["tipo"] == "quadro":
+                segmentos[-1].append((registro["t"] - ultima_acao, registro["arquivo"]))
+    return inicio, segmentos, acoes
+
+
+class Reproducao:
+    """
+    Relógio virtual + tela gravada + ações de mentira, tudo num objeto só
+    (tem a interface do RelogioReal, do AcoesPyautogui e de uma fonte de tela).
+    """
+
+    def __init__(self, pasta):
+        self.pasta = pasta
+        self.inicio_gravacao, self._segmentos, self._acoes_gravadas = ler_roteiro(pasta)
+        self.t = 0.0
+        self._inicio_segmento = [0.0]  # Instante (virtual) em que cada segmento começou no replay
+        self._cache = {}
+        self.quadro_desde = 0.0        # Desde quando o último quadro capturado estava na tela
+        self.acoes = []
+        self.divergencias = []
+        self.passos = []
+
+    # Relógio
+    def agora(self):
+        return self.t
+
+    def dormir(self, segundos):
+        self.t += segundos
+
+    # Ações
+    def _acao(self, nome, *args):
+        indice = len(self.acoes)
+        self.acoes.append((nome, list(args)))
+        if indice >= len(self._acoes_gravadas):
+            self.divergencias.append({"acao": indice + 1, "replay": nome, "gravado": None})
+        elif self._acoes_gravadas[indice][0] != nome:
+            self.divergencias.append({"acao": indice + 1, "replay": [nome, list(args)], "gravado": list(self._acoes_gravadas[indice])})
+        self._inicio_segmento.append(self.t)
+
+    def clicar(self, x, y): self._acao("clicar", x, y)
+    def escrever(self, texto): self._acao("escrever", texto)
+    def tecla(self, nome): self._acao("tecla", nome)
+    def atalho(self, *teclas): self._acao("atalho", *teclas)
+    def copiar(self, texto): self._acao("copiar", texto)
+    def abrir_programa(self, caminho, pasta): self._acao("abrir_programa", caminho, pasta)
+
+    # Tela
+    def _quadros_programados(self):
+        """[(instante_virtual, arquivo)] dos segmentos que o replay já alcançou."""
+        alcancados = min(len(self._inicio_segmento), len(self._segmentos))
+        for n in range(alcancados):
+            for atraso, arquivo in self._segmentos[n]:
+                yield self._inicio_segmento[n] + atraso, arquivo
+
+    def capturar(self):
+        visiveis = [q for q in self._quadros_programados() if q[0] <= self.t]
+        if not visiveis:
+            raise RuntimeError(f"Gravação em '{self.pasta}' não tem nenhum quadro.")
+        self.quadro_desde, arquivo = max(visiveis)
+        if arquivo not in self._cache:
+            self._cache[arquivo] = cv2.imread(os.path.join(self.pasta, arquivo), cv2.IMREAD_GRAYSCALE)
+        return self._cache[arquivo]
+
+
+class MotorMedido(MotorTemplates):
+    """
+    O motor de sempre, que: soma ao relógio virtual o tempo REAL das buscas
+    de imagem e anota, para cada espera, a latência entre a imagem aparecer
+    e o robô perceber.
+    """
+
+    def _procurar(self, template, captura, confianca):
+        inicio = time.perf_counter()
+        try:
+            return super()._procurar(template, captura, confianca)
+        finally:
+            self.relogio.t += time.perf_counter() - inicio
+
+    def _medir(self, passo, espera):
+        inicio = self.relogio.t
+        resultado = espera()
+        achou = resultado not in (None, False, (None, None))
+        fim = self.relogio.t
+        self.relogio.passos.append({
+            "passo": passo,
+            "inicio": round(inicio, 3),
+            "duracao": round(fim - inicio, 3),
+            "achou": achou,
+            "latencia": round(fim - max(inicio, self.relogio.quadro_desde), 3) if achou else None
+        })
+        return resultado
+
+    def esperar(self, caminho_imagem, timeout, *args, **kwargs):
+        return self._medir(os.path.basename(caminho_imagem), lambda: super(MotorMedido, self).esperar(caminho_imagem, timeout, *args, **kwargs))
+
+    def esperar_estado(self, estados, timeout, *args, **kwargs):
+        return self._medir(" | ".join(estados), lambda: super(MotorMedido, self).esperar_estado(estados, timeout, *args, **kwargs))
+
+    def esperar_sumir(self, caminho_imagem, timeout, *args, **kwargs):
+        return self._medir(f"sumir {os.path.basename(caminho_imagem)}", lambda: super(MotorMedido, self).esperar_sumir(caminho_imagem, timeout, *args, **kwargs))
+
+    def esperar_tela_estavel(self, timeout, *args, **kwargs):
+        return self._medir("tela assentar", lambda: super(MotorMedido, self).esperar_tela_estavel(timeout, *args, **kwargs))
+
+
+def reproduzir_execucao(pasta, funcao=None):
+    """
+    Roda o robô contra a gravação da 'pasta' com o relógio virtual.
+    'funcao(caminho_sped)' é o que rodar (padrão: wall_e.executar_robo).
+    Retorna o relatório (dict).
+    """
+    reproducao = Reproducao(pasta)
+    motor = MotorMedido(reproducao, relogio=reproducao)
+    motor.carregar_pasta(wall_e.PASTA_IMAGENS)
+    motor.carregar_pasta(wall_e.PASTA_IMAGENS_PDF)
+
+    antigos = (wall_e.ACOES, wall_e.RELOGIO, wall_e._MOTOR_VISAO, wall_e.CAMINHO_LOG_PVA, wall_e.HISTORICO_TEMPOS)
+    tempos_passos_antigos = list(wall_e.TEMPOS_PASSOS)
+    wall_e.TEMPOS_PASSOS.clear()
+    wall_e.ACOES, wall_e.RELOGIO, wall_e._MOTOR_VISAO = reproducao, reproducao, motor
+    wall_e.CAMINHO_LOG_PVA = os.path.join(pasta, "sem_log_no_replay")
+    # Os tempos virtuais do replay não entram no histórico de verdade (e nem o histórico muda os timeouts)
+    wall_e.HISTORICO_TEMPOS = tempos_pva.HistoricoTempos(":memory:")
+    erro = None
+    pasta_relatorios_antiga = wall_e.PASTA_RELATORIOS
+    with tempfile.TemporaryDirectory() as pasta_temp:
+        wall_e.PASTA_RELATORIOS = pasta_temp
+        # Um SPED "vazio" do mesmo tamanho: configurar_tempos escolhe os mesmos timeouts da gravação
+        caminho_sped = os.path.join(pasta_temp, NOME_SPED_REPLAY)
+        with open(caminho_sped, "wb") as arquivo:
+            arquivo.truncate(reproducao.inicio_gravacao.get("tamanho_sped", 0))
+        try:
+            (funcao or wall_e.executar_robo)(caminho_sped)
+        except RuntimeError as e:
+            erro = str(e)
+        finally:
+            wall_e.ACOES, wall_e.RELOGIO, wall_e._MOTOR_VISAO, wall_e.CAMINHO_LOG_PVA, wall_e.HISTORICO_TEMPOS = antigos
+            wall_e.PASTA_RELATORIOS = pasta_relatorios_antiga
+            esperas_tela = [{"passo": passo, "segundos": round(gasto, 3), "pausa_fixa": fixo}
+                            for passo, gasto, fixo in wall_e.TEMPOS_PASSOS]
+            wall_e.TEMPOS_PASSOS[:] = tempos_passos_antigos
+
+    return {
+        "erro": erro,
+        "tempo_total_s": round(reproducao.t, 3),
+        "tempo_esperando_tela_s": round(sum(e["segundos"] for e in esperas_tela), 3),
+        "pausas_fixas_somariam_s": round(sum(e["pausa_fixa"] for e in esperas_tela), 3),
+        "acoes": len(reproducao.acoes),
+        "acoes_gravadas": len(reproducao._acoes_gravadas),
+        "divergencias": reproducao.divergencias,
+        "capturas": motor.estatisticas["capturas"],
+        "esperas_tela": esperas_tela,
+        "passos": reproducao.passos
+    }
+
+
+def imprimir_relatorio(relatorio):
+    print(f"{'passo':<58} {'início':>8} {'duração':>8} {'latência':>9}")
+    for passo in relatorio["passos"]:
+        latencia = f"{passo['latencia']:.2f}s" if passo["achou"] else "TIMEOUT"
+        print(f"{passo['passo'][:58]:<58} {passo['inicio']:>7.1f}s {passo['duracao']:>7.2f}s {latencia:>9}")
+    print(f"\nTempo total (virtual):   {relatorio['tempo_total_s']:.1f} s")
+    print(f"Esperando a tela:        {relatorio['tempo_esperando_tela_s']:.1f} s ({len(relatorio['esperas_tela'])} esperas;"
+          f" as pausas fixas somariam {relatorio['pausas_fixas_somariam_s']:.0f} s)")
+    print(f"Capturas de tela:        {relatorio['capturas']}")
+    print(f"Ações: {relatorio['acoes']} no replay, {relatorio['acoes_gravadas']} na gravação, {len(relatorio['divergencias'])} divergentes")
+    if relatorio["erro"]:
+        print(f"ERRO: {relatorio['erro']}")
+
+
+if __name__ == "__main__":
+    # python replay_robo.py gravar C:\caminho\sped.txt pasta_gravacao   (Windows, com o PVA)
+    # python replay_robo.py reproduzir pasta_gravacao [--json]          (qualquer lugar)
+    if len(sys.argv) < 3 or sys.argv[1] not in ("gravar", "reproduzir"):
+        print("Uso: python replay_robo.py gravar <sped.txt> <pasta>  |  reproduzir <pasta> [--json]")
+        sys.exit(1)
+    if sys.argv[1] == "gravar":
+        gravar_execucao(sys.argv[2], sys.argv[3])
+    else:
+        relatorio = reproduzir_execucao(sys.argv[2])
+        if "--json" in sys.argv:
+            print(json.dumps(relatorio, indent=2, ensure_ascii=False))
+        else:
+            imprimir_relatorio(relatorio)
+        sys.exit(1 if relatorio["erro"] else 0)
@@ -0,0 +1,245 @@
+import os
+import sys
+import json
+import time
+import sqlite3
+import threading
+
+# --- BANCO DE RESULTADOS (PAINEL DE PROGRESSO) ---
+# Guarda em SQLite (modo WAL) o resumo de cada conciliação: empresa, período,
+# status de Entradas/Saídas/Apuração e o tempo de cada etapa. O painel
+# (progresso.html) não varre a tabela de jobs: a cada job gravado, na mesma
+# transação, são atualizadas as tabelas de resumo:
+#   empresas      -> último status de cada empresa (CNPJ) em cada competência
+#   rollup_status -> quantas empresas/competências estão ok, divergente, erro
+#   rollup_mensal -> o mesmo, por competência (para o gráfico de evolução)
+# Assim as consultas do painel custam o mesmo com 10 ou 100 mil jobs.
+
+CAMINHO_DO_SCRIPT = os.path.dirname(os.path.abspath(__file__))
+CAMINHO_DB = os.environ.get("RESULTADOS_DB", os.path.join(CAMINHO_DO_SCRIPT, "dados", "resultados.sqlite3"))
+
+STATUS_OK = "ok"
+STATUS_DIVERGENTE = "divergente"
+STATUS_ERRO = "erro"
+STATUS_POSSIVEIS = (STATUS_OK, STATUS_DIVERGENTE, STATUS_ERRO)
+
+
+def resumir_conciliacao(resultado):
+    """
+    A partir do JSON final de um job, retorna os status resumidos:
+    {"status", "status_entradas", "status_saidas", "status_apuracao"}.
+    """
+    if not resultado:
+        return {"status": STATUS_ERRO, "status_entradas": None, "status_saidas": None, "status_apuracao": None}
+    totais = resultado["conciliacao_totais"]
+    apuracao = totais["apuracao"]
+    status_apuracao = "OK"
+    if apuracao["status_recolher"] != "OK" or apuracao["status_saldo_credor"] != "OK":
+        status_apuracao = "Divergente"
+    resumo = {
+        "status_entradas": totais["entradas"]["status"],
+        "status_saidas": totais["saidas"]["status"],
+        "status_apuracao": status_apuracao
+    }
+    tudo_ok = all(s == "OK" for s in resumo.values())
+    resumo["status"] = STATUS_OK if tudo_ok else STATUS_DIVERGENTE
+    return resumo
+
+
+class BancoResultados:
+    """Conexão com o banco de resultados. Pode ser usada por várias threads."""
+
+    def __init__(self, caminho_db):
+        self.caminho_db = caminho_db
+        self._trava = threading.Lock()
+        self._conexao = sqlite3.connect(caminho_db, timeout=30, check_same_thread=False)
+        self._conexao.row_factory = sqlite3.Row
+        self._conexao.execute("PRAGMA journal_mode=WAL")
+        self._conexao.execute("PRAGMA synchronous=NORMAL")
+        with self._conexao:
+            self._conexao.executescript("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    origem TEXT NOT NULL,
+                    cnpj TEXT,
+                    nome TEXT,
+                    competencia TEXT,
+                    dt_ini TEXT,
+                    dt_fin TEXT,
+                    status TEXT NOT NULL,
+                    status_entradas TEXT,
+                    status_saidas TEXT,
+                    status_apuracao TEXT,
+                    criado_em REAL,
+                    finalizado_em REAL NOT NULL,
+                    duracao_s REAL,
+                    tempos TEXT,
+                    erro TEXT
+                );
+                CREATE INDEX IF NOT EXISTS idx_jobs_empresa ON jobs (cnpj, competencia, finalizado_em);
+                CREATE INDEX IF NOT EXISTS idx_jobs_finalizado ON jobs (finalizado_em);
+
+                CREATE TABLE IF NOT EXISTS empresas (
+                    cnpj TEXT NOT NULL,
+                    competencia TEXT NOT NULL,
+                    nome TEXT,
+                    status TEXT NOT NULL,
+                    ultimo_job_id TEXT NOT NULL,
+                    atualizado_em REAL NOT NULL,
+                    PRIMARY KEY (cnpj, competencia)
+                );
+                CREATE INDEX IF NOT EXISTS idx_empresas_status ON empresas (status, atualizado_em);
+
+                CREATE TABLE IF NOT EXISTS rollup_status (
+                    status TEXT PRIMARY KEY,
+                    quantidade INTEGER NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS rollup_mensal (
+                    competencia TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    quantidade INTEGER NOT NULL,
+                    PRIMARY KEY (competencia, status)
+                );
+            """)
+
+    def _somar_rollups(self, competencia, status, delta):
+        self._conexao.execute(
+            "INSERT INTO rollup_status (status, quantidade) VALUES (?, ?) "
+            "ON CONFLICT(status) DO UPDATE SET quantidade = quantidade + excluded.quantidade",
+            (status, delta)
+        )
+        self._conexao.execute(
+            "INSERT INTO rollup_mensal (competencia, status, quantidade) VALUES (?, ?, ?) "
+            "ON CONFLICT(competencia, status) DO UPDATE SET quantidade = quantidade + excluded.quantidade",
+            (competencia, status, delta)
+        )
+
+    def registrar_job(self, job_id, empresa, resultado, tempos=None, criado_em=None, finalizado_em=None,
+                      erro=None, origem="web"):
+        """
+        Grava o resumo de um job e atualiza as tabelas de resumo.
+        'empresa' é o dicionário de leitor_sped.identificar_empresa (ou None);
+        'resultado' é o JSON final do job (None se deu erro).
+        """
+        empresa = empresa or {}
+        resumo = resumir_conciliacao(resultado) if erro is None else resumir_conciliacao(None)
+        finalizado_em = finalizado_em or time.time()
+        duracao = round(finalizado_em - criado_em, 3) if criado_em else None
+        cnpj, competencia = empresa.get("cnpj"), empresa.get("competencia")
+
+        with self._trava, self._conexao:
+            self._conexao.execute(
+                "INSERT OR REPLACE INTO jobs (job_id, origem, cnpj, nome, competencia, dt_ini, dt_fin, status,"
+                " status_entradas, status_saidas, status_apuracao, criado_em, finalizado_em, duracao_s, tempos, erro)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, origem, cnpj, empresa.get("nome"), competencia, empresa.get("dt_ini"), empresa.get("dt_fin"),
+                 resumo["status"], resumo["status_entradas"], resumo["status_saidas"], resumo["status_apuracao"],
+                 criado_em, finalizado_em, duracao, json.dumps(tempos or {}), erro)
+            )
+            if not cnpj or not competencia:
+                return  # Sem empresa identificada não dá para entrar no painel
+
+            atual = self._conexao.execute(
+                "SELECT status, atualizado_em FROM empresas WHERE cnpj = ? AND competencia = ?",
+                (cnpj, competencia)
+            ).fetchone()
+            if atual is not None and atual["atualizado_em"] > finalizado_em:
+                return  # Já existe um job mais novo para esta empresa/competência
+            if atual is not None:
+                self._somar_rollups(competencia, atual["status"], -1)
+            self._conexao.execute(
+                "INSERT OR REPLACE INTO empresas (cnpj, competencia, nome, status, ultimo_job_id, atualizado_em)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (cnpj, competencia, empresa.get("nome"), resumo["status"], job_id, finalizado_em)
+            )
+            self._somar_rollups(competencia, resumo["status"], 1)
+
+    def recalcular_rollups(self):
+        """Refaz 'empresas' e os rollups a partir da tabela de jobs (para corrigir um banco antigo)."""
+        with self._trava, self._conexao:
+            self._conexao.executescript("""
+                DELETE FROM empresas;
+                DELETE FROM rollup_status;
+                DELETE FROM rollup_mensal;
+                INSERT INTO empresas (cnpj, competencia, nome, status, ultimo_job_id, atualizado_em)
+                    SELECT cnpj, competencia, nome, status, job_id, MAX(finalizado_em)
+                    FROM jobs WHERE cnpj IS NOT NULL AND competencia IS NOT NULL
+                    GROUP BY cnpj, competencia;
+                INSERT INTO rollup_status (status, quantidade)
+                    SELECT status, COUNT(*) FROM empresas GROUP BY status;
+                INSERT INTO rollup_mensal (competencia, status, quantidade)
+                    SELECT competencia, status, COUNT(*) FROM empresas GROUP BY competencia, status;
+            """)
+
+    # --- CONSULTAS DO PAINEL ---
+
+    def contagem_status(self):
+        """{"ok": n, "divergente": n, "erro": n} (última conciliação de cada empresa/competência)."""
+        with self._trava:
+            linhas = self._conexao.execute("SELECT status, quantidade FROM rollup_status").fetchall()
+        contagem = dict.fromkeys(STATUS_POSSIVEIS, 0)
+        contagem.update({linha["status"]: linha["quantidade"] for linha in linhas})
+        return contagem
+
+    def evolucao_mensal(self, meses=12):
+        """[{"competencia": "2025-08", "ok": n, "divergente": n, "erro": n}, ...] das últimas 'meses' competências."""
+        with self._trava:
+            linhas = self._conexao.execute(
+                "SELECT competencia, status, quantidade FROM rollup_mensal"
+                " WHERE competencia IN (SELECT DISTINCT competencia FROM rollup_mensal"
+                "                       ORDER BY competencia DESC LIMIT ?)"
+                " ORDER BY competencia", (meses,)
+            ).fetchall()
+        por_mes = {}
+        for linha in linhas:
+            mes = por_mes.setdefault(linha["competencia"], dict(competencia=linha["competencia"], **dict.fromkeys(STATUS_POSSIVEIS, 0)))
+            mes[linha["status"]] = linha["quantidade"]
+        return list(por_mes.values())
+
+    def empresas_divergentes(self, limite=50):
+        """Empresas cuja última conciliação divergiu (ou deu erro), da mais recente para a mais antiga."""
+        with self._trava:
+            linhas = self._conexao.execute(
+                "SELECT e.cnpj, e.competencia, e.nome, e.status, e.atualizado_em, e.ultimo_job_id,"
+                "       j.status_entradas, j.status_saidas, j.status_apuracao, j.erro"
+                " FROM empresas e JOIN jobs j ON j.job_id = e.ultimo_job_id"
+                " WHERE e.status IN (?, ?)"
+                " ORDER BY e.atualizado_em DESC LIMIT ?",
+                (STATUS_DIVERGENTE, STATUS_ERRO, limite)
+            ).fetchall()
+        return [dict(linha) for linha in linhas]
+
+    def fechar(self):
+        self._conexao.close()
+
+
+_banco_padrao = None
+_pid_banco_padrao = None
+
+
+def banco_padrao():
+    """
+    Retorna o banco de resultados do processo (ou None se não puder ser aberto).
+    Cada processo abre a sua própria conexão com o mesmo arquivo.
+    """
+    global _banco_padrao, _pid_banco_padrao
+    if _banco_padrao is None or _pid_banco_padrao != os.getpid():
+        try:
+            os.makedirs(os.path.dirname(CAMINHO_DB), exist_ok=True)
+            _banco_padrao = BancoResultados(CAMINHO_DB)
+            _pid_banco_padrao = os.getpid()
+        except Exception as e:
+            print(f"   > (RESULTADOS) AVISO: Não foi possível abrir o banco de resultados: {e}", file=sys.stderr)
+            return None
+    return _banco_padrao
+
+
+def registrar_job(*args, **kwargs):
+    """Atalho: grava no banco padrão sem derrubar o job se o banco falhar."""
+    banco = banco_padrao()
+    if banco is None:
+        return
+    try:
+        banco.registrar_job(*args, **kwargs)
+    except Exception as e:
+        print(f"   > (RESULTADOS) AVISO: Não foi possível gravar o job: {e}", file=sys.stderr)
@@ -0,0 +1,173 @@
+import os
+import sys
+import threading
+
+# --- SESSÃO DO PVA REAPROVEITADA ENTRE JOBS ---
+# Abrir o SpedEFD.exe custa ~25 s por job. A sessão abre o PVA na primeira
+# vez, confere antes de cada job se ele continua saudável (processo vivo e
+# tela principal visível) e roda importação + relatórios de um SPED atrás do
+# outro no MESMO PVA. Só fecha e reabre depois de uma falha.
+#
+# Quem mexe no PVA é um "driver" com esta interface:
+#   abrir()                  -> abre o PVA (RuntimeError se não conseguir)
+#   saudavel()               -> True se dá para rodar o próximo job
+#   processar(caminho_sped, ao_salvar, caminhos_relatorios)
+#                            -> {"entradas", "saidas", "apuracao"} (RuntimeError se falhar);
+#                               ao_salvar(chave, caminho) a cada PDF salvo (pode ser None);
+#                               caminhos_relatorios: onde salvar cada PDF (None: padrão do wall_e)
+#   fechar()                 -> fecha o PVA
+# DriverWallE usa o wall_e (Windows); DriverFalso serve para testar a
+# lógica da sessão em qualquer lugar.
+
+SESSAO_QUENTE = os.environ.get("PVA_SESSAO_QUENTE", "1") != "0"  # "0": fecha o PVA depois de cada job
+TENTATIVAS_POR_JOB = int(os.environ.get("PVA_TENTATIVAS_POR_JOB", "1"))  # >1: reabre o PVA e tenta de novo
+
+
+class DriverWallE:
+    """O PVA de verdade, controlado pelo wall_e (o import fica aqui: só carrega quando usado)."""
+
+    def abrir(self):
+        import wall_e
+        if not wall_e.abrir_pva():
+            raise RuntimeError("Wall-E falhou em abrir o PVA.")
+
+    def saudavel(self):
+        import wall_e
+        return wall_e.pva_pronto()
+
+    def processar(self, caminho_sped, ao_salvar=None, caminhos_relatorios=None):
+        import wall_e
+        relatorios = wall_e.processar_sped(caminho_sped, ao_salvar, caminhos_relatorios)
+        wall_e.voltar_tela_inicial()
+        return relatorios
+
+    def fechar(self):
+        import wall_e
+        wall_e.fechar_pva()
+
+
+class DriverFalso:
+    """
+    PVA de mentira. 'falhas': números dos jobs (1, 2, ...) que devem falhar
+    em processar(). quebrar() faz o próximo saudavel() retornar False, como
+    um PVA que travou entre dois jobs.
+    """
+
+    def __init__(self, falhas=(), relatorios=None):
+        self.falhas = set(falhas)
+        self.relatorios = relatorios or {"entradas": None, "saidas": None, "apuracao": None}
+        self.aberto = False
+        self.aberturas = 0
+        self.fechamentos = 0
+        self.processados = []
+        self._quebrado = False
+
+    def abrir(self):
+        self.aberto, self._quebrado = True, False
+        self.aberturas += 1
+
+    def saudavel(self):
+        return self.aberto and not self._quebrado
+
+    def quebrar(self):
+        self._quebrado = True
+
+    def processar(self, caminho_sped, ao_salvar=None, caminhos_relatorios=None):
+        if not self.aberto:
+            raise RuntimeError("PVA fechado.")
+        self.processados.append(caminho_sped)
+        if len(self.processados) in self.falhas:
+            raise RuntimeError(f"Falha simulada no job {len(self.processados)}.")
+        relatorios = dict(self.relatorios)
+        if caminhos_relatorios is not None:
+            relatorios = {chave: caminhos_relatorios[chave] if caminho is not None else None
+                          for chave, caminho in relatorios.items()}
+        if ao_salvar is not None:
+            for chave, caminho in relatorios.items():
+                if caminho is not None:
+                    ao_salvar(chave, caminho)
+        return relatorios
+
+    def fechar(self):
+        if self.aberto:
+            self.fechamentos += 1
+        self.aberto = False
+
+
+class SessaoPVA:
+    """Um PVA aberto, usado por um job de cada vez (thread-safe)."""
+
+    def __init__(self, driver, quente=SESSAO_QUENTE, tentativas=TENTATIVAS_POR_JOB):
+        self.driver = driver
+        self.quente = quente
+        self.tentativas = max(1, tentativas)
+        self.aberta = False
+        self._trava = threading.Lock()
+        self.estatisticas = {"aberturas": 0, "reinicios": 0, "jobs": 0, "falhas": 0}
+
+    def _garantir_aberta(self):
+        if self.aberta:
+            if self.driver.saudavel():
+                print("   > (PVA) Reaproveitando o PVA já aberto.", file=sys.stderr)
+                return
+            print("   > (PVA) O PVA aberto não está respondendo: reiniciando.", file=sys.stderr)
+            self.estatisticas["reinicios"] += 1
+            self._fechar()
+        self.driver.abrir()
+        self.aberta = True
+        self.estatisticas["aberturas"] += 1
+        if not self.driver.saudavel():
+            self._fechar()
+            raise RuntimeError("O PVA abriu mas não chegou na tela principal.")
+
+    def _fechar(self):
+        if not self.aberta:
+            return
+        self.aberta = False
+        try:
+            self.driver.fechar()
+        except Exception as e:
+            print(f"   > (PVA) AVISO: Erro ao fechar o PVA: {e}", file=sys.stderr)
+
+    def processar(self, caminho_sped, ao_salvar=None, caminhos_relatorios=None):
+        """Roda importação + relatórios do SPED no PVA da sessão. Mesmo retorno de wall_e.processar_sped."""
+        with self._trava:
+            for tentativa in range(1, self.tentativas + 1):
+                try:
+                    self._garantir_aberta()
+                    relatorios = self.driver.processar(caminho_sped, ao_salvar, caminhos_relatorios)
+                    self.estatisticas["jobs"] += 1
+                    return relatorios
+                except Exception as e:
+                    # Depois de uma falha o estado do PVA é desconhecido: o próximo job abre outro
+                    self.estatisticas["falhas"] += 1
+                    self._fechar()
+                    if tentativa == self.tentativas:
+                        raise
+                    print(f"   > (PVA) Tentativa {tentativa} falhou ({e}). Reabrindo o PVA...", file=sys.stderr)
+                finally:
+                    if not self.quente:
+                        self._fechar()
+
+    def fechar(self):
+        with self._trava:
+            self._fechar()
+
+
+_sessao_padrao = None
+_trava_padrao = threading.Lock()
+
+
+def sessao_padrao():
+    """A sessão do processo, com o PVA de verdade (criada na primeira chamada)."""
+    global _sessao_padrao
+    with _trava_padrao:
+        if _sessao_padrao is None:
+            _sessao_padrao = SessaoPVA(DriverWallE())
+        return _sessao_padrao
+
+
+def encerrar_sessao_padrao():
+    """Fecha o PVA da sessão do processo, se ela chegou a ser criada (desligamento do servidor)."""
+    if _sessao_padrao is not None:
+        _sessao_padrao.fechar()
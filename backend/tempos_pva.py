@@ -0,0 +1,203 @@
+import os
+import sys
+import json
+import time
+import sqlite3
+import threading
+import numpy as np
+
+from leitor_sped import abrir_sped
+
+# --- PREVISÃO DOS TEMPOS DO PVA A PARTIR DAS EXECUÇÕES ANTERIORES ---
+# Cada execução do robô grava quanto durou cada passo longo (importação com
+# validação e cada relatório) junto com as características do SPED: tamanho
+# em bytes e quantidade de registros dos blocos que pesam no PVA (C100, C170,
+# D100...). Para o próximo arquivo, uma regressão linear (ridge, numpy) por
+# passo estima:
+#   esperado_s   -> duração prevista
+#   pior_caso_s  -> (previsão + resíduo do quantil QUANTIL_PIOR_CASO) * MARGEM_PIOR_CASO
+#   extrapolado  -> SPED maior que todos do histórico (previsão menos confiável)
+# O wall_e usa o pior caso como timeout e o esperado para o intervalo de
+# busca; o servidor usa o esperado para mostrar a previsão de término (ETA).
+# Com menos de MIN_EXECUCOES de um passo, não há previsão para ele (None) e o
+# robô volta à regra antiga (SPED maior ou menor que 5 MB).
+
+CAMINHO_DO_SCRIPT = os.path.dirname(os.path.abspath(__file__))
+CAMINHO_DB = os.environ.get("PVA_TEMPOS_DB", os.path.join(CAMINHO_DO_SCRIPT, "dados", "tempos_pva.sqlite3"))
+
+PASSO_IMPORTACAO = "importacao"
+PASSO_ENTRADAS = "relatorio_entradas"
+PASSO_SAIDAS = "relatorio_saidas"
+PASSO_APURACAO = "relatorio_apuracao"
+PASSOS = (PASSO_IMPORTACAO, PASSO_ENTRADAS, PASSO_SAIDAS, PASSO_APURACAO)
+
+# Registros que mais pesam na validação e nos relatórios do PVA
+REGISTROS_MEDIDOS = ("C100", "C170", "C190", "D100", "D190", "E111")
+
+MIN_EXECUCOES = int(os.environ.get("PVA_TEMPOS_MIN_EXECUCOES", "20"))
+MAX_EXECUCOES = 500          # Só as últimas execuções de cada passo entram na regressão
+QUANTIL_PIOR_CASO = 0.95
+MARGEM_PIOR_CASO = 1.5
+REGULARIZACAO = 1e-2         # Ridge: segura os coeficientes com poucas execuções
+
+
+def caracteristicas_sped(caminho_ou_indice):
+    """{"bytes": n, "C100": n, "C170": n, ...} do SPED (uma passada do IndiceSped)."""
+    indice, deve_fechar = abrir_sped(caminho_ou_indice)
+    try:
+        caracteristicas = {"bytes": indice.tamanho_bytes}
+        for registro in REGISTROS_MEDIDOS:
+            caracteristicas[registro] = indice.contagem(registro)
+        return caracteristicas
+    finally:
+        if deve_fechar:
+            indice.fechar()
+
+
+def _vetor(caracteristicas):
+    """Linha da regressão: 1, MB e milhares de cada registro (escalas parecidas)."""
+    linha = [1.0, caracteristicas.get("bytes", 0) / (1024 * 1024)]
+    linha.extend(caracteristicas.get(registro, 0) / 1000 for registro in REGISTROS_MEDIDOS)
+    return linha
+
+
+def ajustar(amostras):
+    """
+    Ajusta a regressão de um passo. 'amostras': [(caracteristicas, duracao_s)].
+    Retorna (coeficientes, resíduo do quantil de pior caso, menor duração vista,
+    maior SPED visto em bytes).
+    """
+    x = np.array([_vetor(c) for c, _ in amostras])
+    y = np.array([d for _, d in amostras], dtype=float)
+    # Ridge como mínimos quadrados aumentados (sem penalizar o termo constante)
+    penalidade = np.sqrt(REGULARIZACAO * len(y)) * np.eye(x.shape[1])[1:]
+    coeficientes = np.linalg.lstsq(np.vstack([x, penalidade]),
+                                   np.concatenate([y, np.zeros(len(penalidade))]), rcond=None)[0]
+    residuos = y - x @ coeficientes
+    return (coeficientes, float(max(0.0, np.quantile(residuos, QUANTIL_PIOR_CASO))), float(y.min()),
+            max(c.get("bytes", 0) for c, _ in amostras))
+
+
+def prever(modelo, caracteristicas):
+    """
+    {"esperado_s", "pior_caso_s", "extrapolado"} de um passo, a partir do
+    resultado de ajustar(). "extrapolado": o SPED é maior que todos do
+    histórico, então a previsão vale menos (o wall_e não baixa o timeout).
+    """
+    coeficientes, residuo, minimo, maior_bytes = modelo
+    esperado = max(float(np.dot(_vetor(caracteristicas), coeficientes)), minimo)
+    return {"esperado_s": round(esperado, 1), "pior_caso_s": round((esperado + residuo) * MARGEM_PIOR_CASO, 1),
+            "extrapolado": caracteristicas.get("bytes", 0) > maior_bytes}
+
+
+class HistoricoTempos:
+    """Tempos das execuções do robô em SQLite. Pode ser usado por várias threads."""
+
+    def __init__(self, caminho_db):
+        self.caminho_db = caminho_db
+        self._trava = threading.Lock()
+        self._conexao = sqlite3.connect(caminho_db, timeout=30, check_same_thread=False)
+        self._conexao.row_factory = sqlite3.Row
+        with self._conexao:
+            self._conexao.executescript("""
+                CREATE TABLE IF NOT EXISTS tempos_passos (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    passo TEXT NOT NULL,
+                    duracao_s REAL NOT NULL,
+                    caracteristicas TEXT NOT NULL,
+                    registrado_em REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_tempos_passo ON tempos_passos (passo, id);
+            """)
+        self._modelos = {}    # {passo: modelo}
+        self._ultimo_id = -1  # Refaz os modelos quando alguém (qualquer processo) grava uma execução
+
+    def registrar(self, caracteristicas, duracoes):
+        """Grava a duração (s) de cada passo de uma execução: {passo: segundos}."""
+        agora = time.time()
+        texto = json.dumps(caracteristicas, sort_keys=True)
+        with self._trava, self._conexao:
+            self._conexao.executemany(
+                "INSERT INTO tempos_passos (passo, duracao_s, caracteristicas, registrado_em) VALUES (?, ?, ?, ?)",
+                [(passo, float(duracao), texto, agora) for passo, duracao in duracoes.items()]
+            )
+
+    def _ajustar_modelos(self):
+        modelos = {}
+        for passo in PASSOS:
+            linhas = self._conexao.execute(
+                "SELECT duracao_s, caracteristicas FROM tempos_passos WHERE passo = ? ORDER BY id DESC LIMIT ?",
+                (passo, MAX_EXECUCOES)
+            ).fetchall()
+            if len(linhas) >= MIN_EXECUCOES:
+                modelos[passo] = ajustar([(json.loads(l["caracteristicas"]), l["duracao_s"]) for l in linhas])
+        return modelos
+
+    def prever(self, caracteristicas):
+        """
+        {passo: {"esperado_s", "pior_caso_s"} ou None} para um SPED com essas
+        características. None: ainda não há execuções suficientes do passo.
+        """
+        with self._trava:
+            ultimo_id = self._conexao.execute("SELECT COALESCE(MAX(id), 0) FROM tempos_passos").fetchone()[0]
+            if ultimo_id != self._ultimo_id:
+                self._modelos, self._ultimo_id = self._ajustar_modelos(), ultimo_id
+            modelos = self._modelos
+        return {passo: prever(modelos[passo], caracteristicas) if passo in modelos else None for passo in PASSOS}
+
+    def fechar(self):
+        self._conexao.close()
+
+
+def total_esperado(previsao):
+    """Soma do tempo esperado de todos os passos, ou None se faltar a previsão de algum."""
+    if not previsao or any(p is None for p in previsao.values()):
+        return None
+    return round(sum(p["esperado_s"] for p in previsao.values()), 1)
+
+
+_historico_padrao = None
+_trava_padrao = threading.Lock()
+
+
+def historico_padrao():
+    """O histórico do processo (ou None se o banco não puder ser aberto)."""
+    global _historico_padrao
+    with _trava_padrao:
+        if _historico_padrao is None:
+            try:
+                os.makedirs(os.path.dirname(CAMINHO_DB), exist_ok=True)
+                _historico_padrao = HistoricoTempos(CAMINHO_DB)
+            except Exception as e:
+                print(f"   > (TEMPOS PVA) AVISO: Não foi possível abrir o histórico de tempos: {e}", file=sys.stderr)
+                return None
+        return _historico_padrao
+
+
+def prever_tempos(caminho_sped, historico=None):
+    """
+    (caracteristicas, previsao) do SPED. A previsão é None se o histórico não
+    estiver disponível. Não lança exceção: sem previsão o robô usa a regra antiga.
+    """
+    try:
+        caracteristicas = caracteristicas_sped(caminho_sped)
+    except Exception as e:
+        print(f"   > (TEMPOS PVA) AVISO: Não foi possível ler o SPED para prever os tempos: {e}", file=sys.stderr)
+        return None, None
+    historico = historico or historico_padrao()
+    if historico is None:
+        return caracteristicas, None
+    try:
+        return caracteristicas, historico.prever(caracteristicas)
+    except Exception as e:
+        print(f"   > (TEMPOS PVA) AVISO: Não foi possível prever os tempos: {e}", file=sys.stderr)
+        return caracteristicas, None
+
+
+if __name__ == "__main__":
+    # python tempos_pva.py sped.txt  -> mostra as características e a previsão de cada passo
+    if len(sys.argv) < 2:
+        print("Uso: python tempos_pva.py <sped.txt>")
+        sys.exit(1)
+    caracteristicas, previsao = prever_tempos(sys.argv[1])
+    print(json.dumps({"caracteristicas": caracteristicas, "previsao": previsao}, indent=2, ensure_ascii=False))
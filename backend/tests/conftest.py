@@ -0,0 +1,22 @@
+import os
+import sys
+
+import pytest
+
+# Os módulos do backend são planos (import ler_pdf, import dinheiro...)
+PASTA_BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PASTA_BACKEND)
+
+# Nada de cache em disco nem bancos de verdade durante os testes
+os.environ.setdefault("CACHE_PAGINAS_DESATIVADO", "1")
+os.environ.setdefault("CACHE_RELATORIOS_PVA_DESATIVADO", "1")
+
+
+@pytest.fixture
+def escrever_sped(tmp_path):
+    """Grava um SPED sintético (lista de linhas '|REG|...|') e devolve o caminho."""
+    def _escrever(linhas, nome="sped.txt", prefixo=b""):
+        caminho = tmp_path / nome
+        caminho.write_bytes(prefixo + "\r\n".join(linhas + ["|9999|%d|" % (len(linhas) + 1)]).encode("latin-1") + b"\r\n")
+        return str(caminho)
+    return _escrever
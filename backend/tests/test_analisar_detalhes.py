@@ -0,0 +1,25 @@
+from analisar_detalhes import extrair_valores_chave_do_TXT
+
+ABERTURA = ["|0000|017|0|01012024|31012024|EMPRESA TESTE|12345678000190||MG|0|3106200||A|1|"]
+
+
+def test_valores_chave_do_bloco_e(escrever_sped):
+    # E110: VL_ICMS_RECOLHER (campo 12) = 570,00; VL_SLD_CREDOR_TRANSPORTAR (campo 13) = 33,00
+    linhas = ABERTURA + [
+        "|E110|1000,00|0|0|0|400,00|0|0|0|0|600,00|30,00|570,00|33,00|0|",
+        "|E111|MG020002|outros créditos|15,00|",
+        "|E111|MG040001|zerado|0|",
+        "|E116|000|570,00|10022024|1234||||01012024|",
+        "|E116|090|1234,50|10022024|1234||||01012024|",
+    ]
+    valores = extrair_valores_chave_do_TXT(escrever_sped(linhas))
+    assert valores == {
+        "570,00": "E116 - 000 (570,00)",  # Mesmo valor do E110: a descrição do último vence
+        "15,00": "E111 - MG020002 (15,00)",
+        "1.234,50": "E116 - 090 (1.234,50)",
+    }
+
+
+def test_e110_busca_o_recolher_e_nao_o_saldo_credor(escrever_sped):
+    linhas = ABERTURA + ["|E110|1000,00|0|0|0|400,00|0|0|0|0|600,00|30,00|570,00|33,00|0|"]
+    assert extrair_valores_chave_do_TXT(escrever_sped(linhas)) == {"570,00": "E110 - ICMS a Recolher (570,00)"}
@@ -0,0 +1,108 @@
+import pytest
+
+from apuracao_sped import recalcular_apuracao, AJUSTES_DOCUMENTO, TRIBUTOS_ICMS_PROPRIO
+
+ABERTURA = ["|0000|017|0|01012024|31012024|EMPRESA TESTE|12345678000190||MG|0|3106200||A|1|"]
+
+
+def e110(valores):
+    """Linha E110 com os 14 campos na ordem do leiaute (valores em texto '1234,56')."""
+    return "|E110|" + "|".join(valores) + "|"
+
+
+def test_tabela_5_3_cada_digito_do_c197(escrever_sped):
+    # Um C197 de ICMS próprio (4º caractere '0') por dígito do 3º caractere, com valores diferentes
+    linhas = ABERTURA + [f"|C197|MG{d}0999999|ajuste {d}||0|0|{d + 1}00,00|0|" for d in range(10)]
+    linhas.append(e110(["0,00"] * 14))
+    resultado = recalcular_apuracao(escrever_sped(linhas))
+    campos = resultado["campos"]
+    # 0/1/2: créditos e estorno de débito; 3/4/5: débitos e estorno de crédito; 7: débitos especiais
+    assert campos["VL_AJ_CREDITOS"]["calculado"] == "600,00"   # 100 + 200 + 300
+    assert campos["VL_AJ_DEBITOS"]["calculado"] == "1.500,00"  # 400 + 500 + 600
+    assert campos["DEB_ESP"]["calculado"] == "800,00"
+    # '6', '8' e '9' são informativos: não entram em lugar nenhum
+    assert set(AJUSTES_DOCUMENTO) == set("0123457")
+
+
+@pytest.mark.parametrize("digito, campo", [
+    ("0", "VL_AJ_CREDITOS"), ("1", "VL_AJ_CREDITOS"), ("2", "VL_AJ_CREDITOS"),
+    ("3", "VL_AJ_DEBITOS"), ("4", "VL_AJ_DEBITOS"), ("5", "VL_AJ_DEBITOS"),
+    ("7", "DEB_ESP"),
+])
+def test_d197_segue_a_mesma_tabela(escrever_sped, digito, campo):
+    linhas = ABERTURA + [f"|D197|SP{digito}0000001|||0|0|12,34|0|", e110(["0,00"] * 14)]
+    resultado = recalcular_apuracao(escrever_sped(linhas))
+    assert resultado["campos"][campo]["calculado"] == "12,34"
+
+
+@pytest.mark.parametrize("tributo, conta", [
+    ("0", True), ("1", False), ("2", False), ("3", True), ("5", True), ("8", True), ("9", False),
+])
+def test_so_ajustes_de_icms_proprio_entram_no_e110(escrever_sped, tributo, conta):
+    # 4º caractere: '1' é ICMS ST (E210) e '2' é DIFAL/FCP (E310)
+    linhas = ABERTURA + [
+        f"|C197|MG0{tributo}000001|crédito||0|0|10,00|0|",
+        f"|C197|MG3{tributo}000001|débito||0|0|20,00|0|",
+        f"|D197|MG7{tributo}000001|débito especial||0|0|30,00|0|",
+        e110(["0,00"] * 14),
+    ]
+    campos = recalcular_apuracao(escrever_sped(linhas))["campos"]
+    esperado = ("10,00", "20,00", "30,00") if conta else ("0,00", "0,00", "0,00")
+    assert (campos["VL_AJ_CREDITOS"]["calculado"], campos["VL_AJ_DEBITOS"]["calculado"],
+            campos["DEB_ESP"]["calculado"]) == esperado
+    assert (tributo in TRIBUTOS_ICMS_PROPRIO) == conta
+
+
+def test_ajuste_st_nao_infla_o_e110(escrever_sped):
+    linhas = ABERTURA + [
+        "|C190|000|5102|18,00|1000,00|1000,00|180,00|0|0|0|0||",
+        "|C197|MG31000001|débito de ST||0|0|99,00|0|",
+        "|C197|MG32000001|débito de DIFAL||0|0|11,00|0|",
+        e110(["180,00", "0,00", "0,00", "0,00", "0,00", "0,00", "0,00", "0,00",
+              "0,00", "180,00", "0,00", "180,00", "0,00", "0,00"]),
+        "|E116|000|180,00|10022024|1234||||01012024|",
+    ]
+    resultado = recalcular_apuracao(escrever_sped(linhas))
+    assert resultado["status"] == "OK"
+    assert resultado["sped_recolher"] == "180,00"
+
+
+def test_e110_recalculado_fecha_com_o_declarado(escrever_sped):
+    linhas = ABERTURA + [
+        "|C190|000|5102|18,00|5555,55|5555,55|1000,00|0|0|0|0||",   # saída: débito
+        "|C197|MG30999999|outro débito||0|0|10,00|0|",
+        "|C190|000|1102|18,00|2222,22|2222,22|400,00|0|0|0|0||",    # entrada: crédito
+        "|C197|MG00999999|outro crédito||0|0|5,00|0|",
+        e110(["1000,00", "10,00", "0,00", "0,00", "400,00", "5,00", "15,00", "0,00",
+              "0,00", "590,00", "20,00", "570,00", "0,00", "0,00"]),
+        "|E111|MG020001|outros créditos|15,00|",
+        "|E111|MG040001|dedução|20,00|",
+        "|E116|000|570,00|10022024|1234||||01012024|",
+    ]
+    resultado = recalcular_apuracao(escrever_sped(linhas))
+    divergentes = {nome: c for nome, c in resultado["campos"].items() if c["status"] != "OK"}
+    assert divergentes == {}
+    assert resultado["status"] == "OK"
+    assert resultado["sped_recolher"] == "570,00"
+    assert resultado["sped_saldo_credor"] == "0,00"
+    assert resultado["avisos"] == []
+
+
+def test_saldo_credor_quando_creditos_superam_debitos(escrever_sped):
+    linhas = ABERTURA + [
+        "|C190|000|5102|18,00|100,00|100,00|100,00|0|0|0|0||",
+        "|C190|000|1102|18,00|300,00|300,00|300,00|0|0|0|0||",
+        "|C197|MG10999999|estorno de débito||0|0|50,00|0|",
+        e110(["0,00"] * 14),
+    ]
+    resultado = recalcular_apuracao(escrever_sped(linhas))
+    assert resultado["sped_recolher"] == "0,00"
+    assert resultado["sped_saldo_credor"] == "250,00"
+    assert resultado["status"] == "Divergente"  # O E110 declarado (zerado) não bate
+
+
+def test_sem_e110_falha(escrever_sped):
+    resultado = recalcular_apuracao(escrever_sped(ABERTURA))
+    assert resultado["status"] == "Falha"
+    assert resultado["sped_recolher"] is None
+
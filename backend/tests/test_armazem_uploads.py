@@ -0,0 +1,70 @@
+import io
+import os
+import time
+
+import armazem_uploads
+from armazem_uploads import ArmazemUploads
+
+
+def envelhecer(caminho, segundos):
+    momento = time.time() - segundos
+    os.utime(caminho, (momento, momento))
+
+
+def test_mesmo_conteudo_vira_um_blob_so(tmp_path):
+    armazem = ArmazemUploads(str(tmp_path), cota_bytes=10_000)
+    digest, caminho = armazem.guardar(io.BytesIO(b"|0000|sped|"), ".txt")
+    digest_2, caminho_2 = armazem.guardar(io.BytesIO(b"|0000|sped|"), ".txt")
+    assert (digest_2, caminho_2) == (digest, caminho)
+    assert open(caminho, "rb").read() == b"|0000|sped|"
+    assert armazem.uso()["arquivos"] == 1
+    assert os.listdir(tmp_path / "tmp") == []  # O reenvio não gravou nada
+
+    _, outro = armazem.guardar(io.BytesIO(b"|0000|outro|"), ".txt")
+    assert outro != caminho
+    assert armazem.uso()["arquivos"] == 2
+
+
+def test_arquivo_em_uso_nao_e_despejado(tmp_path):
+    armazem = ArmazemUploads(str(tmp_path), cota_bytes=100)
+    _, caminho = armazem.guardar(io.BytesIO(b"a" * 80), ".txt")
+    armazem.guardar(io.BytesIO(b"a" * 80), ".txt")  # Segundo job, mesma referência
+    armazem.liberar(caminho)
+    envelhecer(caminho, 60)
+
+    armazem.guardar(io.BytesIO(b"b" * 80), ".txt")  # Passa da cota
+    assert os.path.exists(caminho)  # Ainda tem um job usando
+
+    armazem.liberar(caminho)
+    assert not os.path.exists(caminho)
+    assert armazem.uso()["bytes"] == 80
+
+
+def test_faxina_apaga_os_usados_ha_mais_tempo(tmp_path):
+    armazem = ArmazemUploads(str(tmp_path), cota_bytes=10_000)
+    caminhos = []
+    for i, idade in enumerate((30, 10, 20)):
+        _, caminho = armazem.guardar(io.BytesIO(bytes([i]) * 100), ".txt")
+        armazem.liberar(caminho)
+        envelhecer(caminho, idade)
+        caminhos.append(caminho)
+    armazem.cota_bytes = 250
+    assert armazem.faxina() == 100
+    assert [os.path.exists(c) for c in caminhos] == [False, True, True]
+
+    armazem.guardar(io.BytesIO(bytes([0]) * 100), ".txt")  # Volta; sai o de 20 s
+    assert [os.path.exists(c) for c in caminhos] == [True, True, False]
+    assert armazem.uso() == {"arquivos": 2, "bytes": 200, "em_uso": 1, "cota_bytes": 250}
+
+
+def test_faxina_apaga_temporarios_velhos(tmp_path):
+    armazem = ArmazemUploads(str(tmp_path), cota_bytes=10_000)
+    velho = tmp_path / "tmp" / "123_456_789.txt"
+    novo = tmp_path / "tmp" / "123_456_790.txt"
+    velho.write_bytes(b"upload interrompido")
+    novo.write_bytes(b"upload em andamento")
+    envelhecer(velho, armazem_uploads.IDADE_MAXIMA_TEMPORARIO_S + 60)
+
+    assert armazem.faxina() == 0  # Não conta como blob liberado
+    assert not velho.exists()
+    assert novo.exists()
@@ -0,0 +1,59 @@
+import random
+import re
+
+import pytest
+
+from busca_codigos import BuscadorCodigos
+
+
+def ingenuo(codigos, texto):
+    """Referência: cada código com regex, isolado por caracteres que não são letra nem dígito."""
+    achados = []
+    for codigo in dict.fromkeys(c for c in codigos if c):
+        for achou in re.finditer(f"(?=(?<![^\\W_]){re.escape(codigo)}(?![^\\W_]))", texto):
+            achados.append((codigo, achou.start()))
+    return sorted(achados, key=lambda a: (a[1] + len(a[0]), -len(a[0])))
+
+
+@pytest.mark.parametrize("texto, esperado", [
+    ("MG020002", [("MG020002", 0)]),
+    ("cod. MG020002 - valor", [("MG020002", 5)]),
+    ("XMG0200021", []),                       # Dentro de um token maior não conta
+    ("MG0200021", []),
+    ("XMG020002", []),
+    ("(MG020002)", [("MG020002", 1)]),
+    ("MG020002/MG020002", [("MG020002", 0), ("MG020002", 9)]),
+    ("_MG020002_", [("MG020002", 1)]),         # '_' não é letra nem dígito
+    ("ÇMG020002", []),                         # Letra acentuada também gruda
+])
+def test_codigo_isolado(texto, esperado):
+    assert list(BuscadorCodigos(["MG020002"]).buscar(texto)) == esperado
+
+
+def test_codigos_sobrepostos():
+    buscador = BuscadorCodigos(["MG02", "MG020002", "020002", "MG02", ""])
+    assert buscador.codigos == ["MG02", "MG020002", "020002"]  # Sem vazios e sem repetidos, na ordem
+    assert list(buscador.buscar("MG020002 MG02 020002")) == [("MG020002", 0), ("MG02", 9), ("020002", 14)]
+    # Um código que é sufixo de outro só conta se estiver isolado
+    assert list(buscador.buscar("XMG020002")) == []
+    assert list(BuscadorCodigos(["AB", "BAB"]).buscar("BAB AB")) == [("BAB", 0), ("AB", 4)]
+
+
+def test_igual_a_busca_ingenua():
+    rng = random.Random(12)
+    codigos = ["MG020002", "MG02", "020002", "MG1", "MG10", "G0", "00"]
+    for _ in range(2000):
+        texto = "".join(rng.choice("MG0210 -X\n") for _ in range(rng.randrange(40)))
+        assert sorted(BuscadorCodigos(codigos).buscar(texto), key=lambda a: (a[1] + len(a[0]), -len(a[0]))) \
+            == ingenuo(codigos, texto), texto
+
+
+def test_localizar_em_paginas():
+    paginas = enumerate(["nada aqui", "MG020002 e MG020003", "XMG0200021", "de novo MG020002 MG020002"])
+    encontrados = BuscadorCodigos(["MG020002", "MG020003", "MG999999"]).localizar_em_paginas(paginas)
+    assert encontrados == {"MG020002": [2, 4], "MG020003": [2], "MG999999": []}
+
+
+def test_sem_codigos():
+    assert list(BuscadorCodigos([]).buscar("MG020002")) == []
+    assert BuscadorCodigos(["", ""]).localizar_em_paginas([(0, "texto")]) == {}
@@ -0,0 +1,52 @@
+import sqlite3
+
+from cache_paginas import CachePaginas
+
+
+def soma_no_banco(caminho_db):
+    with sqlite3.connect(caminho_db) as conexao:
+        return conexao.execute("SELECT COALESCE(SUM(tamanho), 0) FROM paginas").fetchone()[0]
+
+
+def test_total_acompanha_insercao_troca_e_despejo(tmp_path):
+    caminho_db = str(tmp_path / "paginas.sqlite3")
+    cache = CachePaginas(caminho_db, tamanho_maximo_bytes=10_000)
+    for i in range(20):
+        cache.salvar(f"p{i}", f"pagina {i} " * 50, [(0, 0, 1, 1, "x", 0, 0, 0)] * i)
+        assert cache.tamanho_total() == soma_no_banco(caminho_db)
+    cache.salvar("p19", "trocada")  # Mesma chave, tamanho menor
+    assert cache.tamanho_total() == soma_no_banco(caminho_db)
+    assert cache.buscar("p19") == ("trocada", None)
+
+    for i in range(20, 400):
+        cache.salvar(f"p{i}", "".join(str(j * i) for j in range(200)))
+    assert cache.tamanho_total() == soma_no_banco(caminho_db) <= 10_000
+    assert cache.buscar("p0") is None  # As mais antigas foram despejadas
+    assert cache.buscar("p399") is not None
+    cache.fechar()
+
+
+def test_total_compartilhado_entre_conexoes(tmp_path):
+    caminho_db = str(tmp_path / "paginas.sqlite3")
+    a = CachePaginas(caminho_db, tamanho_maximo_bytes=10 ** 9)
+    b = CachePaginas(caminho_db, tamanho_maximo_bytes=10 ** 9)
+    a.salvar("x", "texto da página x")
+    b.salvar("y", "texto da página y")
+    b.salvar("x", "outro texto")
+    assert a.tamanho_total() == b.tamanho_total() == soma_no_banco(caminho_db)
+    a.fechar()
+    b.fechar()
+
+
+def test_banco_antigo_sem_tabela_de_uso(tmp_path):
+    caminho_db = str(tmp_path / "paginas.sqlite3")
+    cache = CachePaginas(caminho_db, tamanho_maximo_bytes=10 ** 9)
+    cache.salvar("x", "texto da página x")
+    cache.salvar("y", "texto da página y")
+    cache.fechar()
+    with sqlite3.connect(caminho_db) as conexao:  # Como um cache gravado antes da tabela 'uso'
+        conexao.executescript("DROP TRIGGER uso_inserir; DROP TRIGGER uso_remover; "
+                              "DROP TRIGGER uso_atualizar; DROP TABLE uso;")
+    cache = CachePaginas(caminho_db, tamanho_maximo_bytes=10 ** 9)
+    assert cache.tamanho_total() == soma_no_banco(caminho_db) > 0
+    cache.fechar()
@@ -0,0 +1,92 @@
+import time
+
+import pytest
+
+import cache_relatorios_pva
+from cache_relatorios_pva import CacheRelatoriosPVA, relatorios_completos
+
+LIDOS = {"entradas": {"total": "1.000,00"}, "saidas": {"total": "2.000,00"},
+         "apuracao": {"recolher": "570,00", "saldo_credor": "0,00"}}
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    """time.time() parado, que só anda quando o teste manda."""
+    agora = [1_000_000.0]
+    monkeypatch.setattr(time, "time", lambda: agora[0])
+
+    def avancar(segundos=1.0):
+        agora[0] += segundos
+    return avancar
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = CacheRelatoriosPVA(str(tmp_path / "relatorios.sqlite3"), max_entradas=3, idade_maxima_s=100)
+    yield cache
+    cache.fechar()
+
+
+@pytest.mark.parametrize("lidos", [
+    None,
+    {"entradas": LIDOS["entradas"], "saidas": LIDOS["saidas"]},  # Sem a apuração
+    {**LIDOS, "saidas": None},  # PDF que falhou
+    {**LIDOS, "apuracao": {"recolher": "570,00", "saldo_credor": None}},
+])
+def test_leitura_incompleta_nao_entra_no_cache(cache, lidos):
+    assert not relatorios_completos(lidos)
+    assert cache.salvar("abc", lidos) is False
+    assert cache.buscar("abc") is None
+
+
+def test_guarda_e_devolve_so_os_tres_relatorios(cache):
+    assert cache.salvar("abc", {**LIDOS, "paginas": 12}) is True
+    assert cache.buscar("abc") == LIDOS
+    assert cache.buscar("outro") is None
+
+
+def test_entrada_vencida_e_apagada(cache, relogio):
+    cache.salvar("velho", LIDOS)
+    relogio(60)
+    cache.salvar("novo", LIDOS)
+    relogio(60)  # "velho" tem 120 s, "novo" 60 s
+    assert cache.buscar("velho") is None
+    assert cache.buscar("novo") == LIDOS
+    relogio(60)
+    cache.salvar("outro", LIDOS)  # Gravar também despeja as vencidas
+    assert cache._conexao.execute("SELECT hash_sped FROM relatorios_pva").fetchall() == [("outro",)]
+
+
+def test_passando_do_maximo_sai_a_usada_ha_mais_tempo(cache, relogio):
+    for hash_sped in ("a", "b", "c"):
+        cache.salvar(hash_sped, LIDOS)
+        relogio()
+    cache.buscar("a")  # "a" foi usada agora: "b" é a mais antiga
+    relogio()
+    cache.salvar("d", LIDOS)
+    assert [h for h in "abcd" if cache.buscar(h) is not None] == ["a", "c", "d"]
+
+
+@pytest.fixture
+def cache_do_processo(monkeypatch, cache):
+    monkeypatch.setattr(cache_relatorios_pva, "CACHE_DESATIVADO", False)
+    monkeypatch.setattr(cache_relatorios_pva, "_cache_padrao", cache)
+    return cache
+
+
+def test_forcar_ignora_o_cache_e_regrava(cache_do_processo):
+    assert cache_relatorios_pva.guardar_relatorios("abc", LIDOS)
+    assert cache_relatorios_pva.buscar_relatorios("abc") == LIDOS
+    assert cache_relatorios_pva.buscar_relatorios("abc", forcar=True) is None
+
+    # O robô rodou de novo: o resultado novo substitui o antigo
+    novos = {**LIDOS, "apuracao": {"recolher": "600,00", "saldo_credor": "0,00"}}
+    assert cache_relatorios_pva.guardar_relatorios("abc", novos)
+    assert cache_relatorios_pva.buscar_relatorios("abc") == novos
+
+
+def test_desativado_nao_guarda_nem_busca(cache_do_processo, monkeypatch):
+    monkeypatch.setattr(cache_relatorios_pva, "CACHE_DESATIVADO", True)
+    assert not cache_relatorios_pva.guardar_relatorios("abc", LIDOS)
+    assert cache_relatorios_pva.buscar_relatorios("abc") is None
+    assert cache_do_processo.buscar("abc") is None
@@ -0,0 +1,140 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import fitz
+import pytest
+
+import conciliar_lote
+from conciliar_lote import montar_pares, carregar_progresso, concluidas_do_mesmo_par
+
+CNPJ_A = "11222333000144"
+CNPJ_B = "55666777000188"
+
+
+def gravar_sped(caminho, cnpj, dt_ini, dt_fin, mtime=None):
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    with open(caminho, "wb") as f:
+        f.write(f"|0000|017|0|{dt_ini}|{dt_fin}|EMPRESA {cnpj[:4]}|{cnpj}||MG|0|3106200||A|1|\r\n".encode("latin-1"))
+    if mtime:
+        os.utime(caminho, (mtime, mtime))
+    return os.path.abspath(caminho)
+
+
+def gravar_livro(caminho, cnpj, dt_ini, dt_fin, mtime=None):
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    cnpj_formatado = f"{cnpj[:2]}.{cnpj[2:5]}.{cnpj[5:8]}/{cnpj[8:12]}-{cnpj[12:]}"
+    periodo = f"{dt_ini[:2]}.{dt_ini[2:4]}.{dt_ini[4:]} - {dt_fin[:2]}.{dt_fin[2:4]}.{dt_fin[4:]}"
+    doc = fitz.open()
+    pagina = doc.new_page()
+    pagina.insert_text((72, 72), f"CNPJ: {cnpj_formatado}")
+    pagina.insert_text((72, 90), f"Periodo/Ano: {periodo}")
+    doc.save(caminho)
+    doc.close()
+    if mtime:
+        os.utime(caminho, (mtime, mtime))
+    return os.path.abspath(caminho)
+
+
+@pytest.fixture
+def pasta(tmp_path):
+    """Empresa A (jan) com par, SPED repetido e Livro numa subpasta; A (fev) só SPED; B só Livro."""
+    raiz = tmp_path / "lote"
+    arquivos = {
+        "sped_a_jan_velho": gravar_sped(str(raiz / "a_jan_v1.txt"), CNPJ_A, "01012025", "31012025", mtime=1000),
+        "sped_a_jan": gravar_sped(str(raiz / "a_jan_v2.txt"), CNPJ_A, "01012025", "31012025", mtime=2000),
+        "livro_a_jan": gravar_livro(str(raiz / "livros" / "a_jan.pdf"), CNPJ_A, "01012025", "31012025"),
+        "sped_a_fev": gravar_sped(str(raiz / "a_fev.txt"), CNPJ_A, "01022025", "28022025"),
+        "livro_b_jan": gravar_livro(str(raiz / "b_jan.pdf"), CNPJ_B, "01012025", "31012025"),
+    }
+    (raiz / "leia-me.txt").write_text("não é um SPED", encoding="utf-8")
+    return str(raiz), arquivos
+
+
+def test_montar_pares(pasta):
+    raiz, arquivos = pasta
+    pares, sem_par, duplicados = montar_pares(raiz)
+    assert [(p["chave"], p["sped"], p["livro"]) for p in pares] == [
+        (f"{CNPJ_A}_01012025_31012025", arquivos["sped_a_jan"], arquivos["livro_a_jan"])]
+    assert pares[0]["empresa"]["competencia"] == "2025-01"
+    assert sem_par == {"sped": [arquivos["sped_a_fev"]], "livro": [arquivos["livro_b_jan"]],
+                       "nao_identificados": [os.path.join(raiz, "leia-me.txt")]}
+    assert duplicados == [arquivos["sped_a_jan_velho"]]  # O mais recente da mesma empresa/período ganha
+
+
+def test_carregar_progresso_com_a_ultima_linha_cortada(tmp_path):
+    caminho = str(tmp_path / "resultado.json.progresso.jsonl")
+    assert carregar_progresso(caminho) == {}
+    registro = json.dumps({"chave": "A", "sped": "a.txt", "livro": "a.pdf"})
+    with open(caminho, "w", encoding="utf-8") as f:
+        f.write(registro + "\n" + registro[:-7])  # Interrompido no meio da 2ª linha
+    assert list(carregar_progresso(caminho)) == ["A"]
+
+    # O próximo registro não gruda na linha cortada
+    with conciliar_lote._abrir_progresso(caminho) as f:
+        conciliar_lote._gravar_progresso(f, {"chave": "B", "sped": "b.txt", "livro": "b.pdf"})
+    assert list(carregar_progresso(caminho)) == ["A", "B"]
+
+
+def test_so_reaproveita_o_mesmo_par_de_arquivos():
+    pares = [{"chave": "A", "sped": "a2.txt", "livro": "a.pdf"}, {"chave": "B", "sped": "b.txt", "livro": "b.pdf"}]
+    concluidas = {"A": {"chave": "A", "sped": "a1.txt", "livro": "a.pdf"},   # SPED novo: refaz
+                  "B": {"chave": "B", "sped": "b.txt", "livro": "b.pdf"},
+                  "C": {"chave": "C", "sped": "c.txt", "livro": "c.pdf"}}   # Saiu da pasta
+    assert list(concluidas_do_mesmo_par(concluidas, pares)) == ["B"]
+
+
+@pytest.fixture
+def lote_sem_analise(monkeypatch):
+    """conciliar_pasta com threads e uma conciliação de mentira; devolve as chaves conciliadas."""
+    conciliadas = []
+
+    def conciliar_empresa(par):
+        conciliadas.append(par["chave"])
+        totais = {"entradas": {"status": "OK"}, "saidas": {"status": "OK"},
+                  "apuracao": {"status_recolher": "OK", "status_saldo_credor": "OK"}}
+        return dict(par, status="concluido", erro=None, tempos={"total": 0.1},
+                    resultado={"conciliacao_totais": totais})
+
+    monkeypatch.setattr(conciliar_lote, "ProcessPoolExecutor", ThreadPoolExecutor)
+    monkeypatch.setattr(conciliar_lote, "_inicializar_worker_lote", lambda caminho_log: None)
+    monkeypatch.setattr(conciliar_lote, "conciliar_empresa", conciliar_empresa)
+    monkeypatch.setattr(conciliar_lote.resultados_db, "registrar_job", lambda *args, **kwargs: None)
+    return conciliadas
+
+
+def test_rodar_de_novo_pula_as_empresas_concluidas(tmp_path, pasta, lote_sem_analise):
+    raiz, arquivos = pasta
+    gravar_livro(os.path.join(raiz, "a_fev.pdf"), CNPJ_A, "01022025", "28022025")
+    saida = str(tmp_path / "resultado.json")
+    progresso = saida + ".progresso.jsonl"
+
+    resultado = conciliar_lote.conciliar_pasta(raiz, saida, num_workers=2)
+    assert sorted(lote_sem_analise) == [f"{CNPJ_A}_01012025_31012025", f"{CNPJ_A}_01022025_28022025"]
+    assert resultado["resumo"] == {"empresas": 2, "ok": 2, "divergentes": 0, "erros": 0}
+
+    # Interrompido enquanto gravava a última empresa
+    with open(progresso, "r+", encoding="utf-8") as f:
+        linhas = f.readlines()
+        f.seek(0)
+        f.truncate()
+        f.write(linhas[0] + linhas[1][:20])
+    interrompida = json.loads(linhas[1])["chave"]
+    lote_sem_analise.clear()
+    resultado = conciliar_lote.conciliar_pasta(raiz, saida, num_workers=2)
+    assert lote_sem_analise == [interrompida]
+    assert resultado["resumo"]["ok"] == 2
+
+    lote_sem_analise.clear()
+    conciliar_lote.conciliar_pasta(raiz, saida, num_workers=2)
+    assert lote_sem_analise == []
+    assert len(carregar_progresso(progresso)) == 2
+
+    # SPED corrigido para janeiro: só janeiro é refeito
+    gravar_sped(os.path.join(raiz, "a_jan_v3.txt"), CNPJ_A, "01012025", "31012025", mtime=3000)
+    conciliar_lote.conciliar_pasta(raiz, saida, num_workers=2)
+    assert lote_sem_analise == [f"{CNPJ_A}_01012025_31012025"]
+
+    lote_sem_analise.clear()
+    conciliar_lote.conciliar_pasta(raiz, saida, num_workers=2, do_zero=True)
+    assert len(lote_sem_analise) == 2
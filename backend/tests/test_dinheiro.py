@@ -0,0 +1,115 @@
+import random
+
+import numpy as np
+import pytest
+
+from dinheiro import (centavos, centavos_ou_zero, centavos_do_sped, centavos_em_lote, formatar_centavos,
+                      DIGITOS_MAXIMOS, TAMANHO_BLOCO_LOTE)
+
+LIMITE_INT64 = 2 ** 63
+
+
+@pytest.mark.parametrize("texto, esperado", [
+    ("1.234.567,89", 123456789),
+    ("1234567,89", 123456789),
+    ("0,01", 1),
+    ("-1.234,56", -123456),
+    ("-0,00", 0),
+    ("10,5", 1050),      # Uma casa decimal
+    ("10,", 1000),       # Vírgula sem decimais
+    (",50", 50),
+    (" 2,00 ", 200),     # Espaços em volta
+    ("R$1.234,56", 123456),
+    ("(1.234,56)", 123456),
+    ("R$ -7,00", -700),
+    ("1,234", None),     # 3 decimais não é dinheiro
+    ("1.234", None),     # Sem vírgula não é dinheiro (código, página...)
+    ("1,2,3", None),
+    ("abc", None),
+    ("-", None),
+    ("", None),
+    (None, None),
+    ("١٢,٣٤", None),     # Dígitos que não são ASCII
+])
+def test_centavos(texto, esperado):
+    assert centavos(texto) == esperado
+    assert centavos_ou_zero(texto) == (esperado or 0)
+
+
+@pytest.mark.parametrize("texto, esperado", [
+    ("1234,56", 123456), ("1234", 123400), ("-10", -1000), ("0,5", 50), ("", 0), ("lixo", 0), ("1,234", 0),
+])
+def test_centavos_do_sped(texto, esperado):
+    assert centavos_do_sped(texto) == esperado
+    assert centavos(texto, exigir_virgula=False) == (esperado if texto not in ("", "lixo", "1,234") else None)
+
+
+def test_valores_grandes():
+    dezesseis = "9" * DIGITOS_MAXIMOS + ",99"
+    dezessete = "1" + "0" * DIGITOS_MAXIMOS + ",00"
+    enorme = "1" + "0" * 20 + ",00"
+    assert centavos(dezesseis) == int("9" * DIGITOS_MAXIMOS + "99")
+    assert centavos(enorme) == 10 ** 22  # O leitor escalar usa int do Python: não estoura
+    valores, validos = centavos_em_lote([dezesseis, dezessete, enorme, "-" + enorme])
+    assert valores.tolist()[:2] == [int("9" * DIGITOS_MAXIMOS + "99"), 10 ** 18]
+    assert validos.tolist() == [True, True, False, False]  # Não cabe em int64: fica inválido no lote
+    assert valores.dtype == np.int64
+
+
+def test_lote_igual_ao_escalar_exemplos():
+    textos = ["1.234,56", "-1,5", "1,", "1,234", " 2,00 ", "R$1.234,56", "abc", "", "12,00x", "-", "1.2.3,45"]
+    for exigir_virgula in (True, False):
+        valores, validos = centavos_em_lote(textos, exigir_virgula)
+        esperados = [centavos(t, exigir_virgula) for t in textos]
+        assert [v if ok else None for v, ok in zip(valores.tolist(), validos.tolist())] == esperados
+
+
+def _texto_aleatorio(rng):
+    if rng.random() < 0.5:  # Parecido com dinheiro: dígitos, milhar, vírgula e 0-3 decimais
+        inteiro = str(rng.randrange(10 ** rng.randrange(1, 20)))
+        if rng.random() < 0.5:
+            inteiro = f"{int(inteiro):,}".replace(",", ".")
+        texto = inteiro + rng.choice(["", ","]) + "".join(rng.choice("0123456789") for _ in range(rng.randrange(4)))
+        if rng.random() < 0.3:
+            texto = "-" + texto
+        if rng.random() < 0.2:
+            texto = rng.choice([" ", "R$", "(", "x"]) + texto + rng.choice(["", " ", ")", "\n"])
+        return texto
+    return "".join(rng.choice("0123456789.,,- R$()abç\t") for _ in range(rng.randrange(0, 24)))
+
+
+@pytest.mark.parametrize("exigir_virgula", [True, False])
+def test_lote_igual_ao_escalar_fuzz(exigir_virgula):
+    rng = random.Random(2025)
+    textos = [_texto_aleatorio(rng) for _ in range(20000)]
+    valores, validos = centavos_em_lote(textos, exigir_virgula)
+    for texto, valor, valido in zip(textos, valores.tolist(), validos.tolist()):
+        esperado = centavos(texto, exigir_virgula)
+        if esperado is not None and abs(esperado) >= LIMITE_INT64:
+            esperado = None
+        assert (valor if valido else None) == esperado, texto
+
+
+def test_lote_em_varios_blocos():
+    textos = [f"{i},{i % 100:02d}" for i in range(TAMANHO_BLOCO_LOTE + 10)]
+    valores, validos = centavos_em_lote(textos)
+    assert validos.all()
+    assert valores[-1] == (TAMANHO_BLOCO_LOTE + 9) * 100 + (TAMANHO_BLOCO_LOTE + 9) % 100
+    assert centavos_em_lote([])[0].shape == (0,)
+
+
+@pytest.mark.parametrize("valor, texto", [
+    (0, "0,00"), (5, "0,05"), (100, "1,00"), (123456, "1.234,56"), (-123456, "-1.234,56"),
+    (100000000, "1.000.000,00"), (-1, "-0,01"),
+])
+def test_formatar_centavos(valor, texto):
+    assert formatar_centavos(valor) == texto
+
+
+def test_formatar_ida_e_volta():
+    rng = random.Random(7)
+    for _ in range(5000):
+        valor = rng.randrange(-10 ** rng.randrange(1, 19), 10 ** rng.randrange(1, 19))
+        texto = formatar_centavos(valor)
+        assert centavos(texto) == valor
+        assert centavos_do_sped(texto.replace(".", "")) == valor
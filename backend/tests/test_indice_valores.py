@@ -0,0 +1,64 @@
+import fitz
+import pytest
+
+from indice_valores import IndiceValores, PADRAO_VALOR, _valores_no_texto, montar_indice_valores
+from analisar_detalhes import buscar_valores_no_LIVRO
+
+
+@pytest.fixture
+def indice():
+    # (centavos, página, linha, texto) na ordem do documento
+    ocorrencias = [
+        (123456, 1, 3, "1.234,56"),
+        (123457, 1, 9, "1.234,57"),
+        (123455, 2, 1, "1.234,55"),
+        (123456, 2, 7, "1234,56"),
+        (-500, 3, 2, "-5,00"),
+        (123458, 3, 4, "1.234,58"),
+    ]
+    return IndiceValores(*map(list, zip(*ocorrencias)))
+
+
+def test_busca_exata_em_ordem_do_documento(indice):
+    achados = indice.buscar(123456)
+    assert [(o["pagina"], o["linha"], o["texto"]) for o in achados] == [(1, 3, "1.234,56"), (2, 7, "1234,56")]
+    assert all(o["diferenca_centavos"] == 0 for o in achados)
+    assert indice.buscar(-500)[0]["texto"] == "-5,00"
+    assert indice.buscar(999) == []
+
+
+def test_busca_com_tolerancia_do_mais_proximo_ao_mais_distante(indice):
+    achados = indice.buscar(123456, tolerancia=2)
+    assert [(o["texto"], o["diferenca_centavos"]) for o in achados] == [
+        ("1.234,56", 0), ("1234,56", 0), ("1.234,55", -1), ("1.234,57", 1), ("1.234,58", 2),
+    ]
+    assert [o["diferenca_centavos"] for o in indice.buscar(123460, tolerancia=2)] == [-2]
+    assert len(indice) == 6
+
+
+def test_valores_no_texto_igual_ao_regex():
+    texto = ("Total 1.234,56 e -10,00; 1234,56. Código 1,234 e 12,345 não; 3.2,10 sim? "
+             "2.360.524,26|0,00 7,5 99,99x 1.000.000,001 -0,01")
+    assert [a.group() for a in _valores_no_texto(texto)] == [a.group() for a in PADRAO_VALOR.finditer(texto)]
+    # '3.2,10' tem '.' grudado antes do '2' e '1.000.000,001' tem 3 decimais: nenhum dos dois é valor
+    assert [a.group() for a in _valores_no_texto(texto)] == [
+        "1.234,56", "-10,00", "1234,56", "2.360.524,26", "0,00", "99,99", "-0,01"]
+
+
+def test_montar_indice_do_pdf_e_buscar(tmp_path):
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), "Livro Fiscal\nEntradas\nTotal 2.360.524,26")
+    doc.new_page().insert_text((72, 72), "Apuração\nSaldo credor -1.000,00\nValor 2360524,27")
+    caminho = str(tmp_path / "livro.pdf")
+    doc.save(caminho)
+    doc.close()
+
+    indice = montar_indice_valores(caminho)
+    assert [(o["pagina"], o["linha"]) for o in indice.buscar(236052426)] == [(1, 3)]
+    assert indice.buscar(-100000)[0]["pagina"] == 2
+
+    resultados = buscar_valores_no_LIVRO(caminho, {"2.360.524,26": "E110", "2.360.524,25": "E116", "1,00": "C197"})
+    assert resultados["2.360.524,26"]["status"] == "Encontrado"
+    assert resultados["2.360.524,25"]["status"] == "Encontrado (aproximado)"
+    assert resultados["2.360.524,25"]["ocorrencias"][0]["diferenca_centavos"] == 1
+    assert resultados["1,00"] == {"status": "Não Encontrado", "ocorrencias": []}
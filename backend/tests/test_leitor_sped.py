@@ -0,0 +1,45 @@
+import pytest
+
+from leitor_sped import IndiceSped, identificar_empresa, BOM_UTF8
+
+LINHAS = [
+    "|0000|017|0|01032024|31032024|EMPRESA TESTE LTDA|12.345.678/0001-90||MG|0|3106200||A|1|",
+    "|C100|0|1|PART|55|00|1|123||01032024|01032024|100,00|",
+    "|C190|000|5102|18,00|100,00|100,00|18,00|0|0|0|0||",
+    "|C190|000|1102|18,00|50,00|50,00|9,00|0|0|0|0||",
+    "|E110|0|0|0|0|0|0|0|0|0|0|0|0|0|0|",
+]
+
+
+@pytest.mark.parametrize("prefixo", [b"", BOM_UTF8])
+def test_indice_com_e_sem_bom(escrever_sped, prefixo):
+    caminho = escrever_sped(LINHAS, prefixo=prefixo)
+    with IndiceSped(caminho) as indice:
+        assert indice.contagem("0000") == 1
+        assert indice.contagem("C190") == 2
+        assert [r.campo(2) for r in indice.registros("C190")] == ["5102", "1102"]
+        assert indice.primeiro("0000").campo(5) == "EMPRESA TESTE LTDA"
+
+
+@pytest.mark.parametrize("prefixo", [b"", BOM_UTF8])
+def test_identificar_empresa_com_e_sem_bom(escrever_sped, prefixo):
+    caminho = escrever_sped(LINHAS, prefixo=prefixo)
+    esperado = {"cnpj": "12345678000190", "nome": "EMPRESA TESTE LTDA", "dt_ini": "01032024",
+                "dt_fin": "31032024", "competencia": "2024-03"}
+    assert identificar_empresa(caminho) == esperado
+    with IndiceSped(caminho) as indice:
+        assert identificar_empresa(indice) == esperado
+
+
+def test_registros_em_ordem_do_arquivo(escrever_sped):
+    with IndiceSped(escrever_sped(LINHAS)) as indice:
+        assert [r.tipo for r in indice.registros("E110", "C190", "C100")] == ["C100", "C190", "C190", "E110"]
+        assert indice.linhas_entre("E110", "9999")[0].startswith("|E110|")
+
+
+def test_arquivo_vazio(tmp_path):
+    caminho = tmp_path / "vazio.txt"
+    caminho.write_bytes(b"")
+    with IndiceSped(str(caminho)) as indice:
+        assert indice.tipos() == []
+    assert identificar_empresa(str(caminho)) is None
@@ -0,0 +1,102 @@
+import os
+
+import pytest
+
+import log_pva
+from log_pva import LeitorLogPVA, reproduzir_log, pva_terminou
+
+LOG_GRAVADO = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "loggerReport.log")
+
+
+def eventos_de_uma_vez():
+    return LeitorLogPVA(LOG_GRAVADO, do_fim=False).ler_novos()
+
+
+def test_eventos_do_log_gravado():
+    eventos = eventos_de_uma_vez()
+    assert [e["tipo"] for e in eventos if e["tipo"] != log_pva.MENSAGEM] == [
+        log_pva.AGUARDE_ABERTO, log_pva.AGUARDE_FECHADO, log_pva.AGUARDE_ABERTO,
+        log_pva.DIALOGO_ABERTO, log_pva.ERRO, log_pva.PVA_ENCERRADO,
+    ]
+    dialogo = next(e for e in eventos if e["tipo"] == log_pva.DIALOGO_ABERTO)
+    assert (dialogo["janela"], dialogo["titulo"], dialogo["hora"]) == ("dialog4", "Erro", "10/28/25 12:59:14")
+    assert eventos[0]["texto"] == "Verificando versão do PVA..."  # cp1252
+
+
+def test_linhas_cortadas_no_meio(tmp_path):
+    destino = tmp_path / "loggerReport.log"
+    destino.write_bytes(b"")
+    leitor = LeitorLogPVA(str(destino))
+    dados = open(LOG_GRAVADO, "rb").read()
+    eventos = []
+    with open(destino, "ab") as saida:
+        for inicio in range(0, len(dados), 997):  # Pedaços que cortam linhas (e o '\r\n') ao meio
+            saida.write(dados[inicio:inicio + 997])
+            saida.flush()
+            eventos.extend(leitor.ler_novos())
+    assert eventos == eventos_de_uma_vez()
+
+
+def test_reproduzir_log_enquanto_o_leitor_acompanha(tmp_path):
+    destino = tmp_path / "loggerReport.log"
+    destino.write_bytes(b"")
+    leitor = LeitorLogPVA(str(destino))
+    eventos, esperas = [], []
+
+    def dormir(segundos):
+        esperas.append(segundos)
+        eventos.extend(leitor.ler_novos())  # O leitor roda entre um segundo do log e o próximo
+
+    reproduzir_log(LOG_GRAVADO, str(destino), velocidade=10, dormir=dormir)
+    eventos.extend(leitor.ler_novos())
+    assert eventos == eventos_de_uma_vez()
+    assert esperas and all(s > 0 for s in esperas)
+    assert sum(esperas) == pytest.approx(0.6)  # 12:59:09 -> 12:59:15, dez vezes mais rápido
+
+
+def test_aguarde_aberto_acompanha_as_janelas(tmp_path):
+    destino = tmp_path / "loggerReport.log"
+    destino.write_bytes(b"")
+    leitor = LeitorLogPVA(str(destino))
+    estados = []
+    with open(LOG_GRAVADO, "rb") as origem, open(destino, "ab") as saida:
+        for linha in origem:
+            saida.write(linha)
+            saida.flush()
+            for evento in leitor.ler_novos():
+                if evento["tipo"] in (log_pva.AGUARDE_ABERTO, log_pva.AGUARDE_FECHADO):
+                    estados.append(leitor.aguarde_aberto)
+    assert estados == [True, False, True]
+
+
+def test_do_fim_e_log_recriado(tmp_path):
+    destino = tmp_path / "loggerReport.log"
+    destino.write_bytes(open(LOG_GRAVADO, "rb").read())
+    leitor = LeitorLogPVA(str(destino))  # Começa do fim: o que já estava no log não conta
+    assert leitor.ler_novos() == []
+    # O PVA abriu de novo e recriou o log (menor que o offset lido até aqui)
+    linhas = open(LOG_GRAVADO, "rb").read().splitlines(keepends=True)
+    destino.write_bytes(b"".join(linhas[:len(linhas) // 2]))
+    parcial = leitor.ler_novos()
+    assert parcial and parcial == eventos_de_uma_vez()[:len(parcial)]
+
+
+def test_esperar_pva_terminou(tmp_path):
+    destino = tmp_path / "loggerReport.log"
+    destino.write_bytes(b"")
+    leitor = LeitorLogPVA(str(destino))
+    relogio = {"t": 0.0}
+
+    def dormir(segundos):
+        relogio["t"] += segundos
+
+    assert leitor.esperar(pva_terminou, timeout=3, intervalo=1, relogio=lambda: relogio["t"], dormir=dormir) is None
+    assert relogio["t"] == 3
+    reproduzir_log(LOG_GRAVADO, str(destino))
+    evento = leitor.esperar(pva_terminou, timeout=3, relogio=lambda: relogio["t"], dormir=dormir)
+    assert evento["tipo"] == log_pva.AGUARDE_FECHADO
+
+
+def test_log_ainda_nao_existe(tmp_path):
+    leitor = LeitorLogPVA(str(tmp_path / "nao_existe.log"))
+    assert leitor.offset == 0 and leitor.ler_novos() == []
@@ -0,0 +1,103 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from main_web import Etapa, executar_etapas
+
+
+@pytest.fixture
+def pool():
+    pool = ThreadPoolExecutor(max_workers=4)
+    yield pool
+    pool.shutdown(wait=True)
+
+
+def rodar(etapas, **kwargs):
+    estados = []
+    resultados = asyncio.run(executar_etapas(etapas, lambda nome, estado: estados.append((nome, estado)), **kwargs))
+    return resultados, estados
+
+
+def test_respeita_as_dependencias(pool):
+    ordem = []
+
+    def etapa(nome, *entradas):
+        ordem.append(nome)
+        return f"{nome}({','.join(entradas)})"
+
+    # Declaradas fora de ordem: a ordem de execução vem das dependências
+    etapas = [
+        Etapa("apuracao", etapa, pool, depende_de=("robo", "livro"),
+              argumentos=lambda r: ("apuracao", r["robo"], r["livro"])),
+        Etapa("robo", etapa, pool, depende_de=("sped",), argumentos=lambda r: ("robo", r["sped"])),
+        Etapa("sped", etapa, pool, argumentos=lambda r: ("sped",)),
+        Etapa("livro", etapa, pool, argumentos=lambda r: ("livro",)),
+    ]
+    tempos = {}
+    resultados, estados = rodar(etapas, tempos=tempos)
+    assert resultados["apuracao"] == "apuracao(robo(sped()),livro())"
+    assert ordem.index("sped") < ordem.index("robo") < ordem.index("apuracao")
+    assert ordem.index("livro") < ordem.index("apuracao")
+    assert set(tempos) == {"apuracao", "robo", "sped", "livro"}
+    assert [e for n, e in estados if n == "robo"] == ["aguardando", "executando", "concluida"]
+
+
+def test_etapas_independentes_rodam_ao_mesmo_tempo(pool):
+    # Cada uma só passa da barreira se a outra estiver rodando junto
+    barreira = threading.Barrier(2, timeout=5)
+    etapas = [Etapa(nome, barreira.wait, pool) for nome in ("livro", "robo")]
+    resultados, _ = rodar(etapas)
+    assert set(resultados) == {"livro", "robo"}
+
+
+def test_trava_deixa_uma_etapa_por_vez(pool):
+    rodando, maximo = [0], [0]
+    contador = threading.Lock()
+
+    def robo():
+        with contador:
+            rodando[0] += 1
+            maximo[0] = max(maximo[0], rodando[0])
+        time.sleep(0.05)
+        with contador:
+            rodando[0] -= 1
+
+    async def com_trava():
+        trava = asyncio.Lock()
+        estados = []
+        await executar_etapas([Etapa(f"robo{i}", robo, pool, trava=trava) for i in range(3)],
+                              lambda nome, estado: estados.append(estado))
+        return estados
+
+    estados = asyncio.run(com_trava())
+    assert maximo[0] == 1
+    assert estados.count("na_fila") == 3
+
+
+def test_falha_cancela_as_dependentes(pool):
+    liberar_lenta = threading.Event()
+    executadas = []
+
+    def falhar():
+        raise ValueError("PDF ilegível")
+
+    def lenta():
+        liberar_lenta.wait(5)
+
+    etapas = [
+        Etapa("livro", falhar, pool),
+        Etapa("detalhes", executadas.append, pool, depende_de=("livro",), argumentos=lambda r: ("detalhes",)),
+        Etapa("final", executadas.append, pool, depende_de=("detalhes",), argumentos=lambda r: ("final",)),
+        Etapa("robo", lenta, pool),
+    ]
+    estados = []
+    with pytest.raises(Exception, match="Erro no livro: PDF ilegível"):
+        asyncio.run(executar_etapas(etapas, lambda nome, estado: estados.append((nome, estado))))
+    liberar_lenta.set()
+
+    assert executadas == []
+    finais = {nome: estado for nome, estado in estados}
+    assert finais == {"livro": "erro", "detalhes": "cancelada", "final": "cancelada", "robo": "cancelada"}
@@ -0,0 +1,110 @@
+import json
+import os
+
+import cv2
+import numpy as np
+import pytest
+from PIL import Image
+
+import visao_robo
+import wall_e
+from replay_robo import reproduzir_execucao, ler_roteiro, tela_mudou
+
+MENU = os.path.join(wall_e.PASTA_IMAGENS, "menu_escrituracao.png")
+NOVA = os.path.join(wall_e.PASTA_IMAGENS, "submenu_nova.png")
+
+
+def tela(coladas, semente):
+    rng = np.random.default_rng(semente)
+    cinza = rng.integers(150, 255, (600, 900), dtype=np.uint8)
+    for caminho, (x, y) in coladas.items():
+        imagem = np.asarray(Image.open(caminho).convert("L"))
+        cinza[y:y + imagem.shape[0], x:x + imagem.shape[1]] = imagem
+    return cinza
+
+
+@pytest.fixture
+def gravacao(tmp_path):
+    """Menu na tela; clique; o PVA leva 2 s para mostrar o submenu; clique."""
+    pasta = tmp_path / "gravacao"
+    pasta.mkdir()
+    cv2.imwrite(str(pasta / "quadro_00001.png"), tela({MENU: (50, 40)}, 1))
+    cv2.imwrite(str(pasta / "quadro_00002.png"), tela({MENU: (50, 40), NOVA: (60, 200)}, 2))
+    roteiro = [
+        {"t": 0.0, "tipo": "inicio", "sped": "C:\\sped.txt", "tamanho_sped": 1234},
+        {"t": 0.0, "tipo": "quadro", "arquivo": "quadro_00001.png"},
+        {"t": 1.0, "tipo": "acao", "acao": "clicar", "args": [131, 56]},
+        {"t": 3.0, "tipo": "quadro", "arquivo": "quadro_00002.png"},
+        {"t": 3.5, "tipo": "acao", "acao": "clicar", "args": [266, 220]},
+        {"t": 8.5, "tipo": "fim"},
+    ]
+    (pasta / "roteiro.jsonl").write_text("".join(json.dumps(r) + "\n" for r in roteiro), encoding="utf-8")
+    return str(pasta)
+
+
+def abrir_menu(caminho_sped):
+    if not wall_e.esperar_e_clicar_imagem("menu_escrituracao.png", wall_e.PASTA_IMAGENS):
+        raise RuntimeError("menu")
+    if not wall_e.esperar_e_clicar_imagem("submenu_nova.png", wall_e.PASTA_IMAGENS, timeout=10):
+        raise RuntimeError("submenu")
+    # Nada muda depois do último clique
+    wall_e.aguardar_tela("submenu Nova", 5)
+    wall_e.aguardar_tela("ação às cegas", 5, espera_mudanca=5)
+
+
+def test_ler_roteiro(gravacao):
+    inicio, segmentos, acoes = ler_roteiro(gravacao)
+    assert inicio["tamanho_sped"] == 1234
+    assert segmentos == [[(0.0, "quadro_00001.png")], [(2.0, "quadro_00002.png")], []]
+    assert acoes == [("clicar", [131, 56]), ("clicar", [266, 220])]
+
+
+def test_replay_com_relogio_virtual(gravacao):
+    antigos = (wall_e.ACOES, wall_e.RELOGIO, wall_e._MOTOR_VISAO, wall_e.PASTA_RELATORIOS)
+    relatorio = reproduzir_execucao(gravacao, abrir_menu)
+    assert (wall_e.ACOES, wall_e.RELOGIO, wall_e._MOTOR_VISAO, wall_e.PASTA_RELATORIOS) == antigos
+
+    assert relatorio["erro"] is None
+    assert (relatorio["acoes"], relatorio["acoes_gravadas"], relatorio["divergencias"]) == (2, 2, [])
+    menu, nova, *assentar = relatorio["passos"]
+    assert menu["achou"] and nova["achou"]
+    assert [p["passo"] for p in assentar] == ["tela assentar"] * 2
+    # O submenu só aparece 2 s (virtuais) depois do clique, e o robô percebe na tentativa seguinte
+    assert 2.0 <= nova["duracao"] < 2.0 + wall_e.INTERVALO_BUSCA + 1.0
+    assert 0 <= nova["latencia"] < wall_e.INTERVALO_BUSCA + 1.0
+    # Sem mudança, a espera padrão volta em ESPERA_MUDANCA; antes de uma ação às cegas, espera o timeout todo
+    curta, cega = relatorio["esperas_tela"]
+    assert (curta["passo"], curta["pausa_fixa"], cega["pausa_fixa"]) == ("submenu Nova", 5, 5)
+    assert curta["segundos"] == pytest.approx(visao_robo.ESPERA_MUDANCA, abs=wall_e.INTERVALO_ESTABILIDADE + 0.01)
+    assert cega["segundos"] == pytest.approx(5.0, abs=wall_e.INTERVALO_ESTABILIDADE + 0.01)
+    assert relatorio["tempo_esperando_tela_s"] == pytest.approx(curta["segundos"] + cega["segundos"])
+    assert relatorio["pausas_fixas_somariam_s"] == 10
+    assert relatorio["tempo_total_s"] == pytest.approx(nova["inicio"] + nova["duracao"] + relatorio["tempo_esperando_tela_s"],
+                                                       abs=0.05)
+    assert wall_e.TEMPOS_PASSOS == []  # As esperas do replay não ficam no wall_e
+
+
+def test_replay_divergente_e_timeout(gravacao):
+    def outro_caminho(caminho_sped):
+        wall_e.ACOES.tecla("enter")  # A gravação clicou no menu
+        wall_e.esperar_imagem_aparecer("submenu_nova.png", wall_e.PASTA_IMAGENS)
+        if not wall_e.esperar_e_clicar_imagem("ok_abrir.png", wall_e.PASTA_IMAGENS, timeout=3):
+            raise RuntimeError("OK não apareceu.")
+
+    relatorio = reproduzir_execucao(gravacao, outro_caminho)
+    assert relatorio["erro"] == "OK não apareceu."
+    assert relatorio["divergencias"] == [{"acao": 1, "replay": ["tecla", ["enter"]], "gravado": ["clicar", [131, 56]]}]
+    submenu, ok = relatorio["passos"]
+    assert submenu["achou"]  # O quadro gravado depois da 1ª ação aparece depois da 1ª ação do replay
+    assert not ok["achou"] and ok["latencia"] is None
+    assert 3.0 <= ok["duracao"] < 3.0 + wall_e.INTERVALO_BUSCA + 1.0
+
+
+def test_tela_mudou():
+    a = np.zeros((50, 50), np.uint8)
+    b = a.copy()
+    b[:5, :5] = 255  # 25 pixels: cursor piscando
+    assert tela_mudou(None, a)
+    assert not tela_mudou(a, b)
+    b[:20, :20] = 255
+    assert tela_mudou(a, b)
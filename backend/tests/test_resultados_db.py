@@ -0,0 +1,86 @@
+import random
+
+import pytest
+
+from resultados_db import BancoResultados
+
+
+def resultado(entradas="OK", saidas="OK", recolher="OK", saldo_credor="OK"):
+    return {"conciliacao_totais": {"entradas": {"status": entradas}, "saidas": {"status": saidas},
+                                   "apuracao": {"status_recolher": recolher, "status_saldo_credor": saldo_credor}}}
+
+
+OK = resultado()
+DIVERGENTE = resultado(saidas="Divergente")
+
+
+def empresa(cnpj="11222333000144", competencia="2025-01"):
+    return {"cnpj": cnpj, "competencia": competencia, "nome": f"EMPRESA {cnpj[:4]}"}
+
+
+@pytest.fixture
+def banco(tmp_path):
+    banco = BancoResultados(str(tmp_path / "resultados.sqlite3"))
+    yield banco
+    banco.fechar()
+
+
+def ultimo_job(banco, cnpj="11222333000144", competencia="2025-01"):
+    return banco._conexao.execute("SELECT ultimo_job_id FROM empresas WHERE cnpj = ? AND competencia = ?",
+                                  (cnpj, competencia)).fetchone()[0]
+
+
+def fotografia(banco):
+    empresas = banco._conexao.execute(
+        "SELECT cnpj, competencia, status, ultimo_job_id, atualizado_em FROM empresas ORDER BY cnpj, competencia"
+    ).fetchall()
+    return [tuple(e) for e in empresas], banco.contagem_status(), banco.evolucao_mensal()
+
+
+def test_job_mais_novo_substitui_o_anterior(banco):
+    banco.registrar_job("j1", empresa(), DIVERGENTE, finalizado_em=100)
+    banco.registrar_job("j2", empresa(), OK, finalizado_em=200)
+    assert banco.contagem_status() == {"ok": 1, "divergente": 0, "erro": 0}
+    assert banco.evolucao_mensal() == [{"competencia": "2025-01", "ok": 1, "divergente": 0, "erro": 0}]
+    assert ultimo_job(banco) == "j2"
+    assert banco.empresas_divergentes() == []
+
+
+def test_job_que_termina_fora_de_ordem_e_ignorado(banco):
+    banco.registrar_job("novo", empresa(), OK, finalizado_em=200)
+    banco.registrar_job("velho", empresa(), None, erro="PVA travou", finalizado_em=100)
+    assert banco.contagem_status() == {"ok": 1, "divergente": 0, "erro": 0}
+    assert ultimo_job(banco) == "novo"
+    # O job continua no histórico
+    assert banco._conexao.execute("SELECT COUNT(*) FROM jobs").fetchone()[0] == 2
+
+
+def test_registrar_o_mesmo_job_de_novo_nao_conta_duas_vezes(banco):
+    banco.registrar_job("j1", empresa(), DIVERGENTE, finalizado_em=100)
+    banco.registrar_job("j1", empresa(), OK, finalizado_em=100)
+    assert banco.contagem_status() == {"ok": 1, "divergente": 0, "erro": 0}
+    assert banco._conexao.execute("SELECT COUNT(*) FROM jobs").fetchone()[0] == 1
+
+
+def test_job_sem_empresa_nao_entra_no_painel(banco):
+    banco.registrar_job("j1", None, OK, finalizado_em=100)
+    banco.registrar_job("j2", {"cnpj": "11222333000144"}, OK, finalizado_em=100)
+    assert banco.contagem_status() == {"ok": 0, "divergente": 0, "erro": 0}
+    assert banco._conexao.execute("SELECT COUNT(*) FROM jobs").fetchone()[0] == 2
+
+
+def test_recalcular_rollups_bate_com_o_incremental(banco):
+    sorteio = random.Random(7)
+    resultados = [OK, DIVERGENTE, None]
+    for i in range(300):
+        cnpj = f"{sorteio.randrange(12):02d}222333000144"
+        competencia = f"2025-{sorteio.randrange(1, 7):02d}"
+        escolhido = sorteio.choice(resultados)
+        banco.registrar_job(f"j{i}", empresa(cnpj, competencia), escolhido,
+                            erro=None if escolhido else "falhou",
+                            finalizado_em=1000 + sorteio.random() * 1000)  # Terminam fora de ordem
+    incremental = fotografia(banco)
+    assert sum(incremental[1].values()) == len(incremental[0])
+
+    banco.recalcular_rollups()
+    assert fotografia(banco) == incremental
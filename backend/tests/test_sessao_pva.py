@@ -0,0 +1,89 @@
+import threading
+
+import pytest
+
+from sessao_pva import SessaoPVA, DriverFalso
+
+RELATORIOS = {"entradas": "e.pdf", "saidas": "s.pdf", "apuracao": "a.pdf"}
+
+
+def test_reaproveita_o_pva_entre_jobs():
+    driver = DriverFalso(relatorios=RELATORIOS)
+    sessao = SessaoPVA(driver, quente=True)
+    for i in range(3):
+        assert sessao.processar(f"sped{i}.txt") == RELATORIOS
+    assert (driver.aberturas, driver.fechamentos) == (1, 0)
+    assert sessao.estatisticas == {"aberturas": 1, "reinicios": 0, "jobs": 3, "falhas": 0}
+
+
+def test_reabre_so_depois_de_uma_falha():
+    driver = DriverFalso(falhas={2}, relatorios=RELATORIOS)
+    sessao = SessaoPVA(driver, quente=True, tentativas=1)
+    sessao.processar("sped1.txt")
+    with pytest.raises(RuntimeError, match="job 2"):
+        sessao.processar("sped2.txt")
+    assert not sessao.aberta and driver.fechamentos == 1
+    sessao.processar("sped3.txt")
+    sessao.processar("sped4.txt")
+    assert driver.aberturas == 2  # Uma na subida e uma depois da falha
+    assert sessao.estatisticas == {"aberturas": 2, "reinicios": 0, "jobs": 3, "falhas": 1}
+
+
+def test_pva_travado_entre_jobs_e_reiniciado():
+    driver = DriverFalso(relatorios=RELATORIOS)
+    sessao = SessaoPVA(driver, quente=True)
+    sessao.processar("sped1.txt")
+    driver.quebrar()
+    sessao.processar("sped2.txt")
+    assert (driver.aberturas, driver.fechamentos) == (2, 1)
+    assert sessao.estatisticas["reinicios"] == 1
+
+
+def test_tentativas_reabrem_o_pva_no_mesmo_job():
+    driver = DriverFalso(falhas={1}, relatorios=RELATORIOS)
+    sessao = SessaoPVA(driver, quente=True, tentativas=2)
+    assert sessao.processar("sped.txt") == RELATORIOS
+    assert driver.processados == ["sped.txt", "sped.txt"]
+    assert sessao.estatisticas["falhas"] == 1 and driver.aberturas == 2
+
+
+def test_sessao_fria_fecha_depois_de_cada_job():
+    driver = DriverFalso(relatorios=RELATORIOS)
+    sessao = SessaoPVA(driver, quente=False)
+    sessao.processar("sped1.txt")
+    sessao.processar("sped2.txt")
+    assert (driver.aberturas, driver.fechamentos) == (2, 2)
+    assert not driver.aberto
+
+
+def test_caminhos_e_ao_salvar():
+    driver = DriverFalso(relatorios=dict(RELATORIOS, apuracao=None))
+    sessao = SessaoPVA(driver)
+    salvos = []
+    caminhos = {"entradas": "/job/e.pdf", "saidas": "/job/s.pdf", "apuracao": "/job/a.pdf"}
+    relatorios = sessao.processar("sped.txt", lambda chave, caminho: salvos.append((chave, caminho)), caminhos)
+    assert relatorios == {"entradas": "/job/e.pdf", "saidas": "/job/s.pdf", "apuracao": None}
+    assert salvos == [("entradas", "/job/e.pdf"), ("saidas", "/job/s.pdf")]
+
+
+def test_um_job_de_cada_vez():
+    class DriverLento(DriverFalso):
+        def __init__(self):
+            super().__init__(relatorios=RELATORIOS)
+            self.ao_mesmo_tempo = self.maximo = 0
+
+        def processar(self, *args):
+            self.ao_mesmo_tempo += 1
+            self.maximo = max(self.maximo, self.ao_mesmo_tempo)
+            threading.Event().wait(0.01)
+            self.ao_mesmo_tempo -= 1
+            return super().processar(*args)
+
+    driver = DriverLento()
+    sessao = SessaoPVA(driver)
+    threads = [threading.Thread(target=sessao.processar, args=(f"sped{i}.txt",)) for i in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert driver.maximo == 1 and sessao.estatisticas["jobs"] == 6 and driver.aberturas == 1
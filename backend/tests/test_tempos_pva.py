@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+
+import tempos_pva
+import wall_e
+from tempos_pva import HistoricoTempos, ajustar, prever
+
+MB = 1024 * 1024
+
+
+def caracteristicas(mb, **registros):
+    return {"bytes": int(mb * MB), **{r: registros.get(r, 0) for r in tempos_pva.REGISTROS_MEDIDOS}}
+
+
+def duracoes_iguais(segundos):
+    return {passo: segundos for passo in tempos_pva.PASSOS}
+
+
+def test_recupera_um_modelo_linear():
+    rng = np.random.default_rng(0)
+    amostras = []
+    for _ in range(40):
+        c = caracteristicas(rng.integers(1, 50), **{r: int(rng.integers(0, 20000)) for r in tempos_pva.REGISTROS_MEDIDOS})
+        amostras.append((c, 5 + 20 * c["bytes"] / MB + 3 * c["C170"] / 1000))
+    modelo = ajustar(amostras)
+    coeficientes = modelo[0]
+    assert coeficientes[1] == pytest.approx(20, abs=0.05)  # s por MB
+    assert coeficientes[3] == pytest.approx(3, abs=0.05)   # s por mil C170
+
+    previsao = prever(modelo, caracteristicas(30, C170=10_000))
+    assert previsao["esperado_s"] == pytest.approx(635, abs=1)
+    assert previsao["esperado_s"] <= previsao["pior_caso_s"]
+    assert not previsao["extrapolado"]
+    assert prever(modelo, caracteristicas(60))["extrapolado"]  # Maior que todos do histórico
+
+
+def test_esperado_nunca_fica_abaixo_da_menor_duracao():
+    modelo = ajustar([(caracteristicas(mb), 10 + mb) for mb in range(1, 21)])
+    assert prever(modelo, caracteristicas(0))["esperado_s"] == 11.0
+
+
+def test_sem_previsao_abaixo_do_minimo_de_execucoes():
+    historico = HistoricoTempos(":memory:")
+    for _ in range(tempos_pva.MIN_EXECUCOES - 1):
+        historico.registrar(caracteristicas(2), duracoes_iguais(60))
+    assert historico.prever(caracteristicas(2)) == {passo: None for passo in tempos_pva.PASSOS}
+    assert tempos_pva.total_esperado(historico.prever(caracteristicas(2))) is None
+
+    historico.registrar(caracteristicas(2), {tempos_pva.PASSO_IMPORTACAO: 60})
+    previsao = historico.prever(caracteristicas(2))
+    assert previsao[tempos_pva.PASSO_IMPORTACAO]["esperado_s"] == 60
+    assert previsao[tempos_pva.PASSO_ENTRADAS] is None  # Cada passo conta as suas execuções
+
+
+def test_refaz_o_modelo_depois_de_registrar(tmp_path):
+    caminho_db = str(tmp_path / "tempos.sqlite3")
+    historico = HistoricoTempos(caminho_db)
+    for mb in range(1, tempos_pva.MIN_EXECUCOES + 1):
+        historico.registrar(caracteristicas(mb), duracoes_iguais(60))
+    assert historico.prever(caracteristicas(5))[tempos_pva.PASSO_SAIDAS]["esperado_s"] == 60
+
+    # Outro processo (outra conexão) grava execuções mais lentas
+    outro = HistoricoTempos(caminho_db)
+    for mb in range(1, 2 * tempos_pva.MIN_EXECUCOES + 1):
+        outro.registrar(caracteristicas(mb), duracoes_iguais(120))
+    outro.fechar()
+    assert historico.prever(caracteristicas(5))[tempos_pva.PASSO_SAIDAS]["esperado_s"] > 60
+    historico.fechar()
+
+
+@pytest.fixture
+def tempos_do_robo(monkeypatch):
+    """Devolve os timeouts globais do wall_e ao fim do teste."""
+    for nome in ("TIMEOUT_VALIDACAO", "TIMEOUT_RELATORIO", "DELAY_PADRAO", "DELAY_LONGO", "INTERVALO_VALIDACAO",
+                 "INTERVALO_RELATORIO", "CARACTERISTICAS_SPED", "PREVISAO_TEMPOS", "HISTORICO_TEMPOS"):
+        monkeypatch.setattr(wall_e, nome, getattr(wall_e, nome))
+    historico = HistoricoTempos(":memory:")
+    wall_e.HISTORICO_TEMPOS = historico
+    return historico
+
+
+@pytest.mark.parametrize("mb_historico, timeout_validacao, timeout_relatorio", [
+    (10, 120, 90),   # SPED dentro do histórico: o timeout cai para o pior caso previsto (com os limites)
+    (0, 900, 120),   # SPED maior que todos do histórico: a previsão não baixa a regra pelo tamanho
+])
+def test_configurar_tempos(tempos_do_robo, escrever_sped, mb_historico, timeout_validacao, timeout_relatorio):
+    for _ in range(tempos_pva.MIN_EXECUCOES):
+        tempos_do_robo.registrar(caracteristicas(mb_historico), duracoes_iguais(60))
+    wall_e.configurar_tempos(escrever_sped(["|0000|017|0|01012024|31012024|EMPRESA|"]))
+    assert (wall_e.TIMEOUT_VALIDACAO, wall_e.TIMEOUT_RELATORIO) == (timeout_validacao, timeout_relatorio)
+    assert wall_e.INTERVALO_VALIDACAO == wall_e.INTERVALO_RELATORIO == 0.6  # 1% do esperado
+
+
+def test_configurar_tempos_sem_historico(tempos_do_robo, escrever_sped):
+    wall_e.configurar_tempos(escrever_sped(["|0000|017|0|01012024|31012024|EMPRESA|"]))
+    assert (wall_e.TIMEOUT_VALIDACAO, wall_e.TIMEOUT_RELATORIO) == (900, 120)
+    assert wall_e.PREVISAO_TEMPOS == {passo: None for passo in tempos_pva.PASSOS}
+    assert wall_e.INTERVALO_VALIDACAO == wall_e.INTERVALO_BUSCA
@@ -0,0 +1,38 @@
+from ler_pdf import CHAVES_COMPLETAS_ES
+from totais_sped import calcular_totais_es
+
+ABERTURA = ["|0000|017|0|01012024|31012024|EMPRESA TESTE|12345678000190||MG|0|3106200||A|1|"]
+
+
+def test_soma_por_lado_do_cfop(escrever_sped):
+    caminho = escrever_sped(ABERTURA + [
+        # C190: CST|CFOP|ALIQ|VL_OPR|VL_BC|VL_ICMS|VL_BC_ST|VL_ST|VL_RED|VL_IPI
+        "|C190|000|1102|18,00|1000,00|1000,00|180,00|0|0|0|50,00||",
+        "|C190|060|2403|0|500,50|0|0|300,00|54,00|0|0||",
+        "|C190|000|5102|18,00|2000,00|2000,00|360,00|0|0|0|0||",
+        "|C590|000|1253|18,00|100,00|100,00|18,00|0|0|0||",
+        "|D190|000|6353|12,00|300,00|300,00|36,00|0||",
+        "|D590|000|5303|25,00|200,00|200,00|50,00|0||",
+        "|C190|000|9999|18,00|999,00|999,00|99,00|0|0|0|0||",  # CFOP inválido: ignorado
+        "|C190|000||18,00|999,00|999,00|99,00|0|0|0|0||",
+    ])
+    totais = calcular_totais_es(caminho)
+    assert set(totais["entradas"]) == set(CHAVES_COMPLETAS_ES) == set(totais["saidas"])
+    assert totais["entradas"]["total_operacao"] == "1.600,50"
+    assert totais["entradas"]["base_de_calculo_icms"] == "1.100,00"
+    assert totais["entradas"]["total_icms"] == "198,00"
+    assert totais["entradas"]["base_de_calculo_icms_st"] == "300,00"
+    assert totais["entradas"]["total_icms_st"] == "54,00"
+    assert totais["entradas"]["total_ipi"] == "50,00"
+    assert totais["saidas"]["total_operacao"] == "2.500,00"
+    assert totais["saidas"]["total_icms"] == "446,00"
+    assert totais["saidas"]["total_ipi"] == "0,00"
+
+
+def test_sped_sem_registros_analiticos(escrever_sped):
+    totais = calcular_totais_es(escrever_sped(ABERTURA))
+    assert all(valor == "0,00" for lado in totais.values() for valor in lado.values())
+
+
+def test_arquivo_inexistente(tmp_path):
+    assert calcular_totais_es(str(tmp_path / "nao_existe.txt")) == {"entradas": {}, "saidas": {}}
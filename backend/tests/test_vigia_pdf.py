@@ -0,0 +1,109 @@
+import threading
+
+import fitz
+import pytest
+
+from vigia_pdf import VigiaPDFs, esperar_pdf_completo, escrever_aos_poucos, pdf_completo
+
+
+@pytest.fixture
+def pdf_origem(tmp_path):
+    doc = fitz.open()
+    for i in range(20):
+        doc.new_page().insert_text((72, 72), f"Relatório das entradas - página {i + 1}")
+    caminho = tmp_path / "origem.pdf"
+    doc.save(str(caminho))
+    doc.close()
+    return str(caminho)
+
+
+class RelogioFalso:
+    def __init__(self):
+        self.t = 0.0
+
+    def agora(self):
+        return self.t
+
+
+def test_pdf_completo(tmp_path, pdf_origem):
+    dados = open(pdf_origem, "rb").read()
+    assert pdf_completo(pdf_origem)
+    (tmp_path / "espacos.pdf").write_bytes(dados + b"\r\n  \n")
+    assert pdf_completo(str(tmp_path / "espacos.pdf"))
+    (tmp_path / "cortado.pdf").write_bytes(dados[:len(dados) // 2])
+    assert not pdf_completo(str(tmp_path / "cortado.pdf"))
+    (tmp_path / "texto.pdf").write_bytes(b"nao sou PDF %%EOF")
+    assert not pdf_completo(str(tmp_path / "texto.pdf"))
+    assert not pdf_completo(str(tmp_path / "nao_existe.pdf"))
+
+
+def test_esperar_pdf_escrito_aos_poucos(tmp_path, pdf_origem):
+    destino = str(tmp_path / "relatorio.pdf")
+    relogio = RelogioFalso()
+    # O "PVA" grava um pedaço a cada 0,3 s; o vigia olha a cada 0,1 s (relógio virtual)
+    pedacos = iter(range(6))
+    dados = open(pdf_origem, "rb").read()
+    tamanho = -(-len(dados) // 6)
+
+    def dormir(segundos):
+        relogio.t += segundos
+        if round(relogio.t * 10) % 3 == 0:
+            i = next(pedacos, None)
+            if i is not None:
+                with open(destino, "ab") as saida:
+                    saida.write(dados[i * tamanho:(i + 1) * tamanho])
+
+    assert esperar_pdf_completo(destino, timeout=10, tempo_estavel=0.5, intervalo=0.1,
+                                relogio=relogio.agora, dormir=dormir)
+    assert open(destino, "rb").read() == dados
+    assert relogio.t == pytest.approx(1.8 + 0.5, abs=0.15)  # Último pedaço em 1,8 s e mais o tempo parado
+
+
+def test_esperar_pdf_truncado_estoura_o_timeout(tmp_path, pdf_origem):
+    destino = tmp_path / "relatorio.pdf"
+    destino.write_bytes(open(pdf_origem, "rb").read()[:-200])  # O PVA morreu antes do trailer
+    relogio = RelogioFalso()
+
+    def dormir(segundos):
+        relogio.t += segundos
+
+    assert not esperar_pdf_completo(str(destino), timeout=3, intervalo=0.1, relogio=relogio.agora, dormir=dormir)
+    assert relogio.t == pytest.approx(3.0, abs=0.11)
+
+
+def test_vigia_le_cada_pdf_quando_fica_completo(tmp_path, pdf_origem):
+    completados = []
+
+    def ao_completar(chave, caminho):
+        completados.append(chave)
+        return len(fitz.open(caminho))
+
+    vigia = VigiaPDFs(ao_completar, timeout=10)
+    caminhos = {chave: str(tmp_path / f"{chave}.pdf") for chave in ("entradas", "saidas")}
+    for chave, caminho in caminhos.items():
+        vigia.vigiar(chave, caminho)
+    escritores = [threading.Thread(target=escrever_aos_poucos, args=(pdf_origem, caminho, 5, 0.05))
+                  for caminho in caminhos.values()]
+    for escritor in escritores:
+        escritor.start()
+    assert vigia.resultados(timeout=15) == {"entradas": 20, "saidas": 20}
+    assert sorted(completados) == ["entradas", "saidas"]
+
+
+def test_vigia_pdf_truncado_fica_de_fora(tmp_path, pdf_origem):
+    dados = open(pdf_origem, "rb").read()
+    (tmp_path / "entradas.pdf").write_bytes(dados)
+    (tmp_path / "saidas.pdf").write_bytes(dados[:len(dados) // 3])
+    vigia = VigiaPDFs(lambda chave, caminho: chave.upper(), timeout=1)
+    vigia.vigiar("entradas", str(tmp_path / "entradas.pdf"))
+    vigia.vigiar("saidas", str(tmp_path / "saidas.pdf"))
+    assert vigia.resultados(timeout=5) == {"entradas": "ENTRADAS"}
+    assert isinstance(vigia._erros["saidas"], TimeoutError)
+
+
+def test_escrever_aos_poucos(tmp_path, pdf_origem):
+    esperas = []
+    destino = str(tmp_path / "copia.pdf")
+    escrever_aos_poucos(pdf_origem, destino, pedacos=4, intervalo=0.2, dormir=esperas.append)
+    assert esperas == [0.2, 0.2, 0.2]
+    assert open(destino, "rb").read() == open(pdf_origem, "rb").read()
@@ -0,0 +1,115 @@
+import os
+
+import cv2
+import numpy as np
+import pytest
+from PIL import Image
+
+from visao_robo import MotorTemplates, FonteTelaArquivos, Captura, em_cinza
+
+PASTA_IMAGENS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "imagens_robo")
+ABRIR = os.path.join(PASTA_IMAGENS, "abrir.png")
+SIM = os.path.join(PASTA_IMAGENS, "sim_intermediario.png")
+AVISO = os.path.join(PASTA_IMAGENS, "aviso_visualizacao.png")
+
+
+class RelogioFalso:
+    def __init__(self):
+        self.t = 0.0
+
+    def agora(self):
+        return self.t
+
+    def dormir(self, segundos):
+        self.t += segundos
+
+    pausa = dormir
+
+
+def salvar_tela(tmp_path, nome, coladas, semente=0):
+    """Print 1280x720 com as imagens coladas em {caminho: (x, y)}; retorna o caminho do PNG."""
+    rng = np.random.default_rng(semente)
+    tela = np.full((720, 1280, 3), 235, np.uint8)
+    for _ in range(120):
+        x, y = int(rng.integers(0, 1200)), int(rng.integers(0, 700))
+        tela[y:y + int(rng.integers(5, 30)), x:x + int(rng.integers(20, 200))] = rng.integers(0, 255, 3)
+    for _ in range(150):
+        posicao = (int(rng.integers(0, 1150)), int(rng.integers(20, 710)))
+        cv2.putText(tela, f"Registro {int(rng.integers(1e6))}", posicao, cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 1)
+    for caminho_imagem, (x, y) in coladas.items():
+        imagem = np.asarray(Image.open(caminho_imagem).convert("RGB"))
+        tela[y:y + imagem.shape[0], x:x + imagem.shape[1]] = imagem
+    caminho = tmp_path / nome
+    Image.fromarray(tela).save(caminho)
+    return str(caminho)
+
+
+def test_localizar_na_tela_inteira_e_depois_na_regiao(tmp_path):
+    tela = salvar_tela(tmp_path, "tela.png", {ABRIR: (301, 155)})
+    motor = MotorTemplates(FonteTelaArquivos([tela]), relogio=RelogioFalso())
+    assert motor.carregar_pasta(PASTA_IMAGENS) == len(os.listdir(PASTA_IMAGENS))
+
+    largura, altura = Image.open(ABRIR).size
+    assert motor.localizar(ABRIR) == (301, 155, largura, altura)
+    assert motor.estatisticas["achados_na_tela"] == 1
+    assert motor.localizar_centro(ABRIR) == (301 + largura // 2, 155 + altura // 2)
+    assert motor.estatisticas["achados_na_regiao"] == 1
+    assert motor.localizar(SIM) is None
+
+
+def test_imagem_mudou_de_lugar(tmp_path):
+    telas = [salvar_tela(tmp_path, "a.png", {ABRIR: (100, 100)}),
+             salvar_tela(tmp_path, "b.png", {ABRIR: (900, 500)})]
+    motor = MotorTemplates(FonteTelaArquivos(telas), relogio=RelogioFalso())
+    assert motor.localizar(ABRIR)[:2] == (100, 100)
+    assert motor.localizar(ABRIR)[:2] == (900, 500)  # Não achou na última região: tela inteira
+    assert motor.estatisticas["achados_na_tela"] == 2
+
+
+def test_mesmo_resultado_em_uma_captura_compartilhada(tmp_path):
+    tela = salvar_tela(tmp_path, "tela.png", {ABRIR: (40, 600), AVISO: (700, 80)})
+    fonte = FonteTelaArquivos([tela])
+    motor = MotorTemplates(fonte, relogio=RelogioFalso())
+    captura = motor.capturar()
+    assert motor.localizar(ABRIR, tela=captura)[:2] == (40, 600)
+    assert motor.localizar(AVISO, tela=captura)[:2] == (700, 80)
+    assert fonte.capturas == 1
+
+
+def test_detectar_escolhe_o_estado_que_aparece(tmp_path):
+    telas = [salvar_tela(tmp_path, "nada.png", {}),
+             salvar_tela(tmp_path, "aviso.png", {AVISO: (512, 300)})]
+    fonte = FonteTelaArquivos(telas)
+    motor = MotorTemplates(fonte, relogio=RelogioFalso())
+    estados = {"sim": (SIM, 0.8), "aviso": (AVISO, 0.8)}
+    assert motor.detectar(estados) == (None, None)
+    nome, caixa = motor.detectar(estados)
+    assert nome == "aviso" and caixa[:2] == (512, 300)
+    assert fonte.capturas == 2  # Uma captura por chamada, para todos os estados
+
+
+def test_esperar_estado_com_timeout(tmp_path):
+    relogio = RelogioFalso()
+    fonte = FonteTelaArquivos([salvar_tela(tmp_path, "nada.png", {})])
+    motor = MotorTemplates(fonte, relogio=relogio)
+    assert motor.esperar_estado({"sim": (SIM, 0.8)}, timeout=2.0, intervalo=0.5) == (None, None)
+    assert relogio.t == pytest.approx(2.0)
+    assert fonte.capturas == 5
+
+
+def test_esperar_tela_estavel(tmp_path):
+    antes = salvar_tela(tmp_path, "antes.png", {})
+    depois = salvar_tela(tmp_path, "depois.png", {AVISO: (512, 300)})
+    relogio = RelogioFalso()
+    motor = MotorTemplates(FonteTelaArquivos([antes, depois, depois]), relogio=relogio)
+    referencia = motor.capturar()
+    assert motor.esperar_tela_estavel(timeout=5, referencia=referencia, tempo_estavel=0.3, intervalo=0.1)
+    assert relogio.t == pytest.approx(0.3)
+
+
+def test_em_cinza_aceita_pil_e_arrays():
+    rgba = np.zeros((4, 5, 4), np.uint8)
+    rgba[..., 0] = 255
+    assert em_cinza(rgba).shape == (4, 5)
+    assert em_cinza(Image.fromarray(rgba[..., :3])).tolist() == em_cinza(rgba[..., :3]).tolist()
+    assert Captura(rgba).reduzida(0.5).shape == (2, 2)
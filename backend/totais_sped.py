@@ -0,0 +1,107 @@
+import sys
+import json
+from leitor_sped import abrir_sped
+from ler_pdf import CHAVES_COMPLETAS_ES
+from dinheiro import centavos_do_sped, formatar_centavos
+
+# --- TOTAIS DE ENTRADAS/SAÍDAS CALCULADOS DIRETO DO SPED ---
+# Em vez de esperar o robô gerar 'relatorio_das_entradas.pdf' e
+# 'relatorio_das_saidas.pdf' no PVA, soma os registros analíticos
+# C190 (NF-e), C590 (energia/água/gás), D190 (transporte) e D590 (comunicação)
+# do próprio .txt.
+# O lado (entrada/saída) vem do 1º dígito do CFOP.
+#
+# O resultado usa as mesmas chaves (CHAVES_COMPLETAS_ES) e o mesmo formato de
+# texto ("1.234,56") que 'ler_pdf.encontrar_e_extrair_totais_es' devolve para
+# os relatórios do PVA, então entra direto em 'montar_resultados'.
+
+CFOP_ENTRADA = ('1', '2', '3')
+CFOP_SAIDA = ('5', '6', '7')
+
+# Índice de cada campo por registro (campo 0 = nome do registro).
+# C590 não tem IPI; D190 e D590 não têm ST nem IPI.
+CAMPOS_ANALITICOS = {
+    'C190': {
+        'CFOP': 2,
+        'total_operacao': 4,
+        'base_de_calculo_icms': 5,
+        'total_icms': 6,
+        'base_de_calculo_icms_st': 7,
+        'total_icms_st': 8,
+        'total_ipi': 10
+    },
+    'C590': {
+        'CFOP': 2,
+        'total_operacao': 4,
+        'base_de_calculo_icms': 5,
+        'total_icms': 6,
+        'base_de_calculo_icms_st': 7,
+        'total_icms_st': 8
+    },
+    'D190': {
+        'CFOP': 2,
+        'total_operacao': 4,
+        'base_de_calculo_icms': 5,
+        'total_icms': 6
+    },
+    'D590': {
+        'CFOP': 2,
+        'total_operacao': 4,
+        'base_de_calculo_icms': 5,
+        'total_icms': 6
+    }
+}
+
+
+def calcular_totais_es(caminho_sped_txt):
+    """
+    Soma C190/C590/D190/D590 do SPED por lado do CFOP numa única passada.
+    Retorna {"entradas": {chave: "1.234,56"}, "saidas": {...}} com as chaves
+    de CHAVES_COMPLETAS_ES (ou dicionários vazios se o .txt não puder ser lido).
+    """
+    print(f"Calculando totais de Entradas/Saídas (C190/C590/D190/D590) de: {caminho_sped_txt}", file=sys.stderr)
+    somas = {
+        "entradas": dict.fromkeys(CHAVES_COMPLETAS_ES, 0),
+        "saidas": dict.fromkeys(CHAVES_COMPLETAS_ES, 0)
+    }
+    contagem = {"entradas": 0, "saidas": 0, "ignorados": 0}
+
+    try:
+        sped, deve_fechar = abrir_sped(caminho_sped_txt)
+        try:
+            for registro in sped.registros(*CAMPOS_ANALITICOS):
+                campos = CAMPOS_ANALITICOS[registro.tipo]
+                cfop = registro.campo(campos['CFOP']) or ''
+                if cfop.startswith(CFOP_ENTRADA):
+                    lado = "entradas"
+                elif cfop.startswith(CFOP_SAIDA):
+                    lado = "saidas"
+                else:
+                    contagem["ignorados"] += 1
+                    continue
+                contagem[lado] += 1
+                soma_lado = somas[lado]
+                for chave in CHAVES_COMPLETAS_ES:
+                    if chave in campos:
+                        soma_lado[chave] += centavos_do_sped(registro.campo(campos[chave]))
+        finally:
+            if deve_fechar:
+                sped.fechar()
+    except Exception as e:
+        print(f"  > (SPED) ERRO ao calcular os totais de E/S: {e}", file=sys.stderr)
+        return {"entradas": {}, "saidas": {}}
+
+    print(f"  > (SPED) {contagem['entradas']} registros de entrada, {contagem['saidas']} de saída"
+          f" ({contagem['ignorados']} com CFOP inválido ignorados).", file=sys.stderr)
+    return {
+        lado: {chave: formatar_centavos(valor) for chave, valor in soma_lado.items()}
+        for lado, soma_lado in somas.items()
+    }
+
+
+# --- PONTO DE PARTIDA (LINHA DE COMANDO) ---
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(json.dumps({"error": "Caminho do SPED .txt não fornecido."}))
+        sys.exit(1)
+    print(json.dumps(calcular_totais_es(sys.argv[1]), indent=2))
@@ -0,0 +1,129 @@
+import os
+import sys
+import time
+import threading
+
+# --- VIGIA DOS PDFs GERADOS PELO PVA ---
+# Depois que a janela "Salvar Como" fecha, o PVA ainda leva um tempo para
+# gravar o PDF. Em vez de esperar um tempo fixo e torcer, o vigia olha o
+# arquivo até ele estar COMPLETO:
+#   - começa com '%PDF-' e termina (fora espaços) com o trailer '%%EOF';
+#   - tamanho e data de modificação parados por TEMPO_ESTAVEL_PDF segundos.
+# VigiaPDFs acompanha vários arquivos ao mesmo tempo (uma thread por arquivo)
+# e chama ao_completar(chave, caminho) assim que cada um fica pronto: o
+# relatório de entradas já é lido enquanto o robô gera saídas e apuração.
+#
+# Para testar no Linux: escrever_aos_poucos() grava um PDF em pedaços, como o
+# PVA faria, enquanto o vigia acompanha.
+
+TEMPO_ESTAVEL_PDF = 0.5
+INTERVALO_VIGIA = 0.1
+TIMEOUT_PDF = int(os.environ.get("PVA_TIMEOUT_PDF", "300"))
+TAMANHO_TRAILER = 1024  # O '%%EOF' fica nos últimos bytes do arquivo
+
+
+def pdf_completo(caminho):
+    """True se o arquivo existe, começa com '%PDF-' e termina com '%%EOF'."""
+    try:
+        with open(caminho, "rb") as arquivo:
+            if arquivo.read(5) != b"%PDF-":
+                return False
+            arquivo.seek(0, os.SEEK_END)
+            tamanho = arquivo.tell()
+            arquivo.seek(max(0, tamanho - TAMANHO_TRAILER))
+            return arquivo.read().rstrip().endswith(b"%%EOF")
+    except OSError:
+        return False  # Ainda não existe ou o PVA está com ele aberto
+
+
+def esperar_pdf_completo(caminho, timeout=TIMEOUT_PDF, tempo_estavel=TEMPO_ESTAVEL_PDF, intervalo=INTERVALO_VIGIA,
+                         relogio=time.monotonic, dormir=time.sleep):
+    """
+    Espera o PDF ficar completo (trailer válido e arquivo parado por
+    'tempo_estavel' segundos). True se ficou, False no timeout.
+    """
+    inicio = relogio()
+    ultimo, parado_desde = None, None
+    while True:
+        agora = relogio()
+        try:
+            estado = os.stat(caminho)
+            assinatura = (estado.st_size, estado.st_mtime_ns)
+        except OSError:
+            assinatura = None
+        if assinatura is None or assinatura != ultimo:
+            ultimo, parado_desde = assinatura, agora
+        elif agora - parado_desde >= tempo_estavel and pdf_completo(caminho):
+            return True
+        if agora - inicio >= timeout:
+            return False
+        dormir(intervalo)
+
+
+class VigiaPDFs:
+    """
+    Acompanha os PDFs que o robô vai salvando. vigiar(chave, caminho) começa
+    a olhar um arquivo; quando ele fica completo, ao_completar(chave, caminho)
+    roda na thread do vigia e o retorno vira o resultado daquela chave.
+    """
+
+    def __init__(self, ao_completar, timeout=TIMEOUT_PDF):
+        self.ao_completar = ao_completar
+        self.timeout = timeout
+        self._threads = {}
+        self._resultados = {}
+        self._erros = {}
+
+    def vigiar(self, chave, caminho):
+        thread = threading.Thread(target=self._acompanhar, args=(chave, caminho), name=f"vigia-{chave}", daemon=True)
+        self._threads[chave] = thread
+        thread.start()
+
+    def _acompanhar(self, chave, caminho):
+        inicio = time.monotonic()
+        try:
+            if not esperar_pdf_completo(caminho, self.timeout):
+                raise TimeoutError(f"O PDF '{caminho}' não ficou completo em {self.timeout}s.")
+            print(f"   > (VIGIA PDF) '{os.path.basename(caminho)}' completo em {time.monotonic() - inicio:.1f}s.",
+                  file=sys.stderr)
+            self._resultados[chave] = self.ao_completar(chave, caminho)
+        except Exception as e:
+            print(f"   > (VIGIA PDF) AVISO: Falha em '{chave}': {e}", file=sys.stderr)
+            self._erros[chave] = e
+
+    def resultados(self, timeout=None):
+        """
+        Espera os arquivos vigiados e devolve {chave: resultado de ao_completar}.
+        Chaves que falharam (ou não terminaram no 'timeout') ficam de fora.
+        """
+        limite = None if timeout is None else time.monotonic() + timeout
+        for thread in self._threads.values():
+            thread.join(None if limite is None else max(0.0, limite - time.monotonic()))
+        return dict(self._resultados)
+
+
+def escrever_aos_poucos(origem, destino, pedacos=10, intervalo=0.2, dormir=time.sleep):
+    """
+    Copia o PDF 'origem' para 'destino' em 'pedacos' partes, com 'intervalo'
+    segundos entre elas, como um programa gravando o arquivo. O '%%EOF' só
+    chega no último pedaço. Serve para testar o vigia sem o PVA.
+    """
+    with open(origem, "rb") as arquivo:
+        dados = arquivo.read()
+    tamanho = max(1, -(-len(dados) // pedacos))
+    with open(destino, "wb") as saida:
+        for inicio in range(0, len(dados), tamanho):
+            saida.write(dados[inicio:inicio + tamanho])
+            saida.flush()
+            if inicio + tamanho < len(dados):
+                dormir(intervalo)
+
+
+if __name__ == "__main__":
+    # python vigia_pdf.py arquivo.pdf [timeout]  -> espera o PDF ficar completo
+    if len(sys.argv) < 2:
+        print("Uso: python vigia_pdf.py <arquivo.pdf> [timeout]")
+        sys.exit(1)
+    ok = esperar_pdf_completo(sys.argv[1], float(sys.argv[2]) if len(sys.argv) > 2 else TIMEOUT_PDF)
+    print("completo" if ok else "timeout")
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,395 @@
+import os
+import sys
+import time
+import subprocess
+import cv2
+import numpy as np
+from PIL import Image
+
+# --- MOTOR DE BUSCA DE IMAGENS NA TELA (WALL-E) ---
+# O pyautogui.locateOnScreen relia o PNG do disco a cada tentativa e
+# comparava na resolução cheia contra a tela inteira. Aqui:
+#   - os PNGs são carregados UMA vez, em tons de cinza, e já reduzidos;
+#   - a busca na tela inteira é feita na imagem reduzida (ESCALA_BUSCA) e só
+#     o melhor candidato é conferido na resolução cheia;
+#   - cada imagem lembra onde foi vista da última vez: a próxima busca começa
+#     por essa região (o PVA abre janelas e menus sempre no mesmo lugar) e só
+#     cai para a tela inteira se não achar ali;
+#   - detectar() testa UMA captura contra várias imagens e diz qual "estado"
+#     da tela apareceu: o robô decide o próximo passo pela tela, sem esperas
+#     fixas entre um ramo e outro. O que é compartilhado é a captura (e a
+#     tela em cinza e reduzida); cada imagem ainda faz o seu matchTemplate
+#     (ver detectar());
+#   - esperar_tela_estavel() substitui as pausas fixas: compara capturas
+#     bem reduzidas e volta assim que a tela mudou e parou de mudar;
+#   - a captura de tela vem de uma "fonte" plugável: a do pyautogui no robô,
+#     ou prints salvos em disco para testar e medir no Linux, sem o PVA.
+# A comparação é a mesma do pyautogui com 'confidence' (TM_CCOEFF_NORMED).
+
+ESCALA_BUSCA = float(os.environ.get("WALLE_ESCALA_BUSCA", "0.5"))
+MARGEM_REGIAO = 40          # Pixels em volta da última posição conhecida
+LADO_MINIMO_REDUZIDO = 12   # Imagens menores que isso (já reduzidas) são buscadas na resolução cheia
+FOLGA_CANDIDATO = 0.3       # Na imagem reduzida a nota cai (texto fino, meio pixel de deslocamento)
+MAX_CANDIDATOS = 5          # Candidatos conferidos na resolução cheia (a conferência decide)
+EXTENSOES_IMAGEM = (".png", ".jpg", ".jpeg", ".bmp")
+
+# Estabilidade da tela (comparação de quadros reduzidos)
+ESCALA_ESTABILIDADE = 0.25
+LIMIAR_PIXEL_ESTABILIDADE = 12   # Diferença de cinza para um pixel contar como mudado
+FRACAO_MUDANCA = 0.0005          # Menos que isso da tela (cursor piscando) não conta como mudança
+TEMPO_ESTAVEL = 0.5              # A tela precisa ficar parada por esse tempo
+ESPERA_MUDANCA = 1.0             # Padrão: se nada mudar nesse tempo, a ação não mexe na tela (o próximo passo espera uma imagem)
+
+
+def em_cinza(imagem):
+    """PIL.Image ou array (cinza, RGB ou RGBA) -> array uint8 em tons de cinza."""
+    if isinstance(imagem, Image.Image):
+        return np.asarray(imagem.convert("L"))
+    imagem = np.asarray(imagem)
+    if imagem.ndim == 2:
+        return imagem
+    if imagem.shape[2] == 4:
+        return cv2.cvtColor(imagem, cv2.COLOR_RGBA2GRAY)
+    return cv2.cvtColor(imagem, cv2.COLOR_RGB2GRAY)
+
+
+def _reduzir(imagem, escala):
+    if escala == 1.0:
+        return imagem
+    altura, largura = imagem.shape[:2]
+    return cv2.resize(imagem, (max(1, round(largura * escala)), max(1, round(altura * escala))), interpolation=cv2.INTER_AREA)
+
+
+# --- RELÓGIO E AÇÕES DO ROBÔ ---
+# O robô não chama time.sleep nem o pyautogui direto: passa por estes objetos,
+# que o replay_robo.py troca por um relógio virtual e ações gravadas para
+# rodar uma execução gravada no Linux, sem o PVA.
+
+class RelogioReal:
+    """agora() para medir e dormir() entre tentativas de busca e capturas."""
+
+    def agora(self):
+        return time.monotonic()
+
+    def dormir(self, segundos):
+        time.sleep(segundos)
+
+
+class AcoesPyautogui:
+    """Mouse, teclado, área de transferência e o processo do PVA (bibliotecas importadas só quando usadas)."""
+
+    def clicar(self, x, y):
+        import pyautogui
+        pyautogui.click(x=x, y=y)
+
+    def escrever(self, texto):
+        import pyautogui
+        pyautogui.write(texto, interval=0.01)
+
+    def tecla(self, nome):
+        import pyautogui
+        pyautogui.press(nome)
+
+    def atalho(self, *teclas):
+        import pyautogui
+        pyautogui.hotkey(*teclas)
+
+    def copiar(self, texto):
+        import pyperclip
+        pyperclip.copy(texto)
+
+    def abrir_programa(self, caminho, pasta):
+        return subprocess.Popen([caminho], cwd=pasta)
+
+
+# --- FONTES DE CAPTURA DE TELA ---
+
+class FonteTelaPyautogui:
+    """Captura a tela de verdade (o pyautogui só é importado quando usado)."""
+
+    def capturar(self):
+        import pyautogui
+        return em_cinza(pyautogui.screenshot())
+
+
+class FonteTelaArquivos:
+    """
+    Prints salvos em disco, um por captura (o último se repete). Serve para
+    testar e medir o motor sem o PVA.
+    """
+
+    def __init__(self, caminhos):
+        self.caminhos = list(caminhos)
+        self.capturas = 0
+        self._cache = {}
+
+    def capturar(self):
+        caminho = self.caminhos[min(self.capturas, len(self.caminhos) - 1)]
+        self.capturas += 1
+        if caminho not in self._cache:
+            self._cache[caminho] = em_cinza(Image.open(caminho))
+        return self._cache[caminho]
+
+
+# --- MOTOR ---
+
+class Captura:
+    """
+    Uma captura de tela já em cinza. A versão reduzida é calculada uma vez
+    e reaproveitada por todas as imagens testadas nessa captura.
+    """
+
+    def __init__(self, imagem):
+        self.cinza = em_cinza(imagem)
+        self._reduzidas = {}
+
+    def reduzida(self, escala):
+        if escala not in self._reduzidas:
+            self._reduzidas[escala] = _reduzir(self.cinza, escala)
+        return self._reduzidas[escala]
+
+
+class Template:
+    """Uma imagem procurada na tela, já em cinza e na versão reduzida."""
+
+    def __init__(self, nome, imagem_cinza, escala):
+        self.nome = nome
+        self.imagem = imagem_cinza
+        self.altura, self.largura = imagem_cinza.shape
+        if min(self.altura, self.largura) * escala >= LADO_MINIMO_REDUZIDO:
+            self.escala = escala
+        else:
+            self.escala = 1.0
+        self.reduzida = _reduzir(imagem_cinza, self.escala)
+        self.ultima_posicao = None  # (x, y) do canto superior esquerdo, na resolução cheia
+
+    @classmethod
+    def do_arquivo(cls, caminho, escala):
+        return cls(os.path.basename(caminho), em_cinza(Image.open(caminho)), escala)
+
+
+class MotorTemplates:
+    """
+    Guarda os templates carregados e faz as buscas. 'fonte' é qualquer objeto
+    com capturar() -> imagem (PIL ou array).
+    """
+
+    def __init__(self, fonte=None, escala=ESCALA_BUSCA, relogio=None):
+        self.fonte = fonte or FonteTelaPyautogui()
+        self.escala = escala
+        self.relogio = relogio or RelogioReal()
+        self.ultima_captura = None  # A tela de antes da última ação (base para esperar_tela_estavel)
+        self._templates = {}  # caminho normalizado -> Template
+        self.estatisticas = {"capturas": 0, "buscas": 0, "achados_na_regiao": 0, "achados_na_tela": 0}
+
+    @staticmethod
+    def _chave(caminho):
+        return os.path.normcase(os.path.abspath(caminho)).lower()
+
+    def carregar_pasta(self, pasta):
+        """Pré-carrega todas as imagens de uma pasta. Retorna quantas foram carregadas."""
+        carregadas = 0
+        for nome in sorted(os.listdir(pasta)):
+            if nome.lower().endswith(EXTENSOES_IMAGEM):
+                caminho = os.path.join(pasta, nome)
+                self._templates[self._chave(caminho)] = Template.do_arquivo(caminho, self.escala)
+                carregadas += 1
+        print(f"   > (VISÃO) {carregadas} imagens pré-carregadas de {pasta}.", file=sys.stderr)
+        return carregadas
+
+    def template(self, caminho):
+        """O Template de um arquivo (carregado na hora se ainda não estiver na memória)."""
+        chave = self._chave(caminho)
+        if chave not in self._templates:
+            self._templates[chave] = Template.do_arquivo(caminho, self.escala)
+        return self._templates[chave]
+
+    def capturar(self):
+        """Uma captura da fonte (Captura), para ser usada em várias buscas."""
+        self.estatisticas["capturas"] += 1
+        self.ultima_captura = Captura(self.fonte.capturar())
+        return self.ultima_captura
+
+    @staticmethod
+    def _melhor(tela, imagem):
+        """(nota, (x, y)) do melhor encaixe de 'imagem' em 'tela', ou (-1, None) se não couber."""
+        if tela.shape[0] < imagem.shape[0] or tela.shape[1] < imagem.shape[1]:
+            return -1.0, None
+        resultado = cv2.matchTemplate(tela, imagem, cv2.TM_CCOEFF_NORMED)
+        _, nota, _, posicao = cv2.minMaxLoc(resultado)
+        return nota, posicao
+
+    def _conferir(self, tela, template, x, y, margem):
+        """Busca na resolução cheia só na janela [x-margem, y-margem, +tamanho+margem]."""
+        x0, y0 = max(0, x - margem), max(0, y - margem)
+        x1 = min(tela.shape[1], x + template.largura + margem)
+        y1 = min(tela.shape[0], y + template.altura + margem)
+        nota, posicao = self._melhor(tela[y0:y1, x0:x1], template.imagem)
+        if posicao is None:
+            return -1.0, None
+        return nota, (x0 + posicao[0], y0 + posicao[1])
+
+    def _buscar_na_tela_inteira(self, captura, template, confianca):
+        """Busca na tela reduzida e confere os melhores candidatos na resolução cheia."""
+        tela = captura.cinza
+        if template.escala == 1.0:
+            nota, posicao = self._melhor(tela, template.imagem)
+            return (nota, posicao) if posicao is not None and nota >= confianca else (nota, None)
+
+        tela_reduzida = captura.reduzida(template.escala)
+        if tela_reduzida.shape[0] < template.reduzida.shape[0] or tela_reduzida.shape[1] < template.reduzida.shape[1]:
+            return -1.0, None
+        resultado = cv2.matchTemplate(tela_reduzida, template.reduzida, cv2.TM_CCOEFF_NORMED)
+        margem = int(2 / template.escala) + 2
+        melhor_nota = -1.0
+        for _ in range(MAX_CANDIDATOS):
+            _, nota_reduzida, _, (xr, yr) = cv2.minMaxLoc(resultado)
+            if nota_reduzida < confianca - FOLGA_CANDIDATO:
+                break
+            nota, posicao = self._conferir(tela, template, round(xr / template.escala), round(yr / template.escala), margem)
+            if posicao is not None and nota >= confianca:
+                return nota, posicao
+            melhor_nota = max(melhor_nota, nota)
+            # Apaga a vizinhança desse candidato para pegar o próximo
+            altura_r, largura_r = template.reduzida.shape
+            resultado[max(0, yr - altura_r // 2):yr + altura_r // 2 + 1, max(0, xr - largura_r // 2):xr + largura_r // 2 + 1] = -1.0
+        return melhor_nota, None
+
+    def _procurar(self, template, captura, confianca):
+        """(nota, caixa) do template na captura: primeiro na última região, depois na tela inteira."""
+        self.estatisticas["buscas"] += 1
+        nota = -1.0
+        if template.ultima_posicao is not None:
+            nota, posicao = self._conferir(captura.cinza, template, *template.ultima_posicao, MARGEM_REGIAO)
+            if posicao is not None and nota >= confianca:
+                self.estatisticas["achados_na_regiao"] += 1
+                template.ultima_posicao = posicao
+                return nota, (posicao[0], posicao[1], template.largura, template.altura)
+
+        nota_tela, posicao = self._buscar_na_tela_inteira(captura, template, confianca)
+        if posicao is None:
+            return max(nota, nota_tela), None
+        self.estatisticas["achados_na_tela"] += 1
+        template.ultima_posicao = posicao
+        return nota_tela, (posicao[0], posicao[1], template.largura, template.altura)
+
+    def _captura(self, tela):
+        if tela is None:
+            return self.capturar()
+        return tela if isinstance(tela, Captura) else Captura(tela)
+
+    def localizar(self, caminho_imagem, confianca=0.8, tela=None):
+        """
+        Procura a imagem na tela (ou em 'tela', uma Captura ou imagem já
+        capturada: uma captura pode servir para várias buscas).
+        Retorna (x, y, largura, altura) na resolução cheia, ou None.
+        """
+        template = self.template(caminho_imagem)
+        return self._procurar(template, self._captura(tela), confianca)[1]
+
+    def detectar(self, estados, tela=None):
+        """
+        Testa UMA captura contra todas as imagens de 'estados'
+        ({nome: (caminho_imagem, confianca)}) e retorna o estado que melhor
+        casou: (nome, caixa), ou (None, None) se nenhum passou da confiança.
+        A captura, a conversão para cinza e a redução são feitas uma vez só
+        para todos os estados; a comparação em si é um matchTemplate por
+        imagem (primeiro na última região dela) sobre essa tela reduzida.
+        Não há uma passada única para todas: as imagens têm tamanhos
+        diferentes, e correlacionar todas por uma FFT só da tela (espectro
+        da tela uma vez, o de cada imagem guardado) mediu ~1,5x mais lento
+        que os matchTemplate separados numa tela 960x540, por causa da
+        normalização e da FFT inversa do tamanho da tela inteira por imagem.
+        """
+        captura = self._captura(tela)
+        melhor = (None, None, -1.0)
+        for nome, (caminho_imagem, confianca) in estados.items():
+            nota, caixa = self._procurar(self.template(caminho_imagem), captura, confianca)
+            if caixa is not None and nota > melhor[2]:
+                melhor = (nome, caixa, nota)
+        return melhor[0], melhor[1]
+
+    def localizar_centro(self, caminho_imagem, confianca=0.8, tela=None):
+        """Como localizar(), mas retorna o centro (x, y) da imagem encontrada, ou None."""
+        caixa = self.localizar(caminho_imagem, confianca, tela)
+        if caixa is None:
+            return None
+        x, y, largura, altura = caixa
+        return (x + largura // 2, y + altura // 2)
+
+    def esperar_estado(self, estados, timeout, intervalo=0.2, relogio=None, dormir=None):
+        """detectar() a cada 'intervalo' segundos até algum estado aparecer ou estourar o timeout ((None, None))."""
+        relogio, dormir = relogio or self.relogio.agora, dormir or self.relogio.dormir
+        inicio = relogio()
+        while True:
+            nome, caixa = self.detectar(estados)
+            if nome is not None:
+                return nome, caixa
+            if relogio() - inicio >= timeout:
+                return None, None
+            dormir(intervalo)
+
+    def esperar_sumir(self, caminho_imagem, timeout, confianca=0.8, intervalo=0.2, relogio=None, dormir=None):
+        """Espera a imagem sair da tela (ex: a janela que acabou de ser clicada fechar). True se sumiu."""
+        relogio, dormir = relogio or self.relogio.agora, dormir or self.relogio.dormir
+        inicio = relogio()
+        while self.localizar(caminho_imagem, confianca) is not None:
+            if relogio() - inicio >= timeout:
+                return False
+            dormir(intervalo)
+        return True
+
+    def esperar(self, caminho_imagem, timeout, confianca=0.8, intervalo=0.2, relogio=None, dormir=None):
+        """Tenta a cada 'intervalo' segundos até achar (retorna a caixa) ou estourar o timeout (None)."""
+        relogio, dormir = relogio or self.relogio.agora, dormir or self.relogio.dormir
+        inicio = relogio()
+        while True:
+            caixa = self.localizar(caminho_imagem, confianca)
+            if caixa is not None:
+                return caixa
+            if relogio() - inicio >= timeout:
+                return None
+            dormir(intervalo)
+
+    @staticmethod
+    def _miniatura(captura, regiao):
+        if regiao is None:
+            return captura.reduzida(ESCALA_ESTABILIDADE)
+        x, y, largura, altura = regiao
+        return _reduzir(captura.cinza[y:y + altura, x:x + largura], ESCALA_ESTABILIDADE)
+
+    @staticmethod
+    def _mudou(anterior, atual):
+        if anterior.shape != atual.shape:
+            return True
+        mudados = np.count_nonzero(cv2.absdiff(anterior, atual) > LIMIAR_PIXEL_ESTABILIDADE)
+        return mudados > FRACAO_MUDANCA * atual.size
+
+    def esperar_tela_estavel(self, timeout, regiao=None, referencia=None, tempo_estavel=TEMPO_ESTAVEL,
+                             espera_mudanca=ESPERA_MUDANCA, intervalo=0.1, relogio=None, dormir=None):
+        """
+        Espera a tela (ou 'regiao' = (x, y, largura, altura)) mudar em relação
+        a 'referencia' (padrão: a última captura do motor, de antes da ação) e
+        depois ficar parada por 'tempo_estavel' segundos. Se nada mudar em
+        'espera_mudanca' segundos, basta a tela estar parada.
+        True se assentou, False se estourou o timeout ainda mudando.
+        """
+        relogio, dormir = relogio or self.relogio.agora, dormir or self.relogio.dormir
+        inicio = relogio()
+        referencia = referencia or self.ultima_captura
+        base = self._miniatura(referencia, regiao) if referencia is not None else None
+        mudou = base is None
+        anterior, parada_desde = None, inicio
+        while True:
+            atual = self._miniatura(self.capturar(), regiao)
+            agora = relogio()
+            if not mudou:
+                mudou = self._mudou(base, atual) or agora - inicio >= espera_mudanca
+            if anterior is not None and self._mudou(anterior, atual):
+                parada_desde = agora
+            anterior = atual
+            if mudou and agora - parada_desde >= tempo_estavel:
+                return True
+            if agora - inicio >= timeout:
+                return False
+            dormir(intervalo)
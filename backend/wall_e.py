@@ -0,0 +1,592 @@
+import os
+from visao_robo import MotorTemplates, FonteTelaPyautogui, AcoesPyautogui, RelogioReal, ESPERA_MUDANCA
+from log_pva import LeitorLogPVA, pva_terminou
+import tempos_pva
+from area_trabalho import NOMES_RELATORIOS
+
+# --- CONFIGURAÇÕES DO ROBÔ ---
+CAMINHO_PVA = r"C:\Arquivos de Programas RFB\Programas SPED\Fiscal\SpedEFD.exe"
+PASTA_DO_PVA = os.path.dirname(CAMINHO_PVA)
+CAMINHO_DO_SCRIPT = os.path.dirname(os.path.abspath(__file__))
+# Log do PVA (Java): avisa quando as janelas "Aguarde..." abrem e fecham
+CAMINHO_LOG_PVA = os.environ.get("PVA_LOG", os.path.join(PASTA_DO_PVA, "loggerReport.log"))
+
+# --- CAMINHOS DAS IMAGENS (SIMPLIFICADO) ---
+PASTA_IMAGENS = os.path.join(CAMINHO_DO_SCRIPT, "imagens_robo")
+PASTA_IMAGENS_PDF = os.path.join(CAMINHO_DO_SCRIPT, "imagens_pdf") # UMA PASTA SÓ!
+
+
+def _pasta_documentos():
+    pasta_documentos = os.path.join(os.path.expanduser("~"), "OneDrive", "Documentos")
+    if not os.path.exists(pasta_documentos):
+        pasta_documentos = os.path.join(os.path.expanduser("~"), "Documentos")
+    return pasta_documentos
+
+
+# --- ONDE O PVA SALVA OS RELATÓRIOS ---
+# O robô digita o caminho COMPLETO na janela "Salvar Como", então o PDF vai
+# exatamente para onde quem chamou pediu (no servidor, a área de trabalho do
+# job: area_trabalho.py). Sem caminhos, vai para esta pasta.
+PASTA_RELATORIOS = os.environ.get("PVA_PASTA_RELATORIOS") or _pasta_documentos()
+
+
+def caminhos_relatorios_padrao():
+    """{"entradas", "saidas", "apuracao"} -> PDFs na PASTA_RELATORIOS (uso fora do servidor)."""
+    return {chave: os.path.join(PASTA_RELATORIOS, nome) for chave, nome in NOMES_RELATORIOS.items()}
+
+# --- VARIÁVEIS GLOBAIS DE DELAY (Serão definidas em configurar_tempos) ---
+# DELAY_PADRAO/DELAY_LONGO não são mais pausas fixas: são o tempo MÁXIMO de
+# cada espera pela tela assentar (aguardar_tela), que volta assim que o PVA
+# termina de redesenhar.
+TIMEOUT_VALIDACAO = 900 
+TIMEOUT_RELATORIO = 120 
+DELAY_PADRAO = 7
+DELAY_LONGO = 9
+TIMEOUT_ABERTURA_PVA = 90
+INTERVALO_VALIDACAO = 0.25  # Intervalos de busca das esperas longas (a previsão de tempos aumenta)
+INTERVALO_RELATORIO = 0.25
+
+
+# --- MOUSE/TECLADO E RELÓGIO ---
+# Trocados pelo replay_robo.py para rodar uma execução gravada sem o PVA.
+ACOES = AcoesPyautogui()
+RELOGIO = RelogioReal()
+
+
+# --- FUNÇÕES DE APOIO (IMAGEM) ---
+# As buscas passam pelo motor de visao_robo.py: as imagens das duas pastas são
+# carregadas uma vez e cada busca começa pela região onde a imagem foi vista.
+INTERVALO_BUSCA = 0.25
+_MOTOR_VISAO = None
+
+
+def motor_visao():
+    """O motor de busca de imagens do robô (criado e pré-carregado no primeiro uso)."""
+    global _MOTOR_VISAO
+    if _MOTOR_VISAO is None:
+        _MOTOR_VISAO = MotorTemplates(FonteTelaPyautogui(), relogio=RELOGIO)
+        _MOTOR_VISAO.carregar_pasta(PASTA_IMAGENS)
+        _MOTOR_VISAO.carregar_pasta(PASTA_IMAGENS_PDF)
+    return _MOTOR_VISAO
+
+
+# --- ESPERA PELA TELA ASSENTAR (NO LUGAR DAS PAUSAS FIXAS) ---
+INTERVALO_ESTABILIDADE = 0.1
+TEMPOS_PASSOS = []  # [(passo, segundos esperados, pausa fixa que existia antes)] da execução atual
+
+
+def aguardar_tela(passo, timeout, espera_mudanca=ESPERA_MUDANCA):
+    """
+    Espera a tela mudar (em relação à captura de antes da última ação) e
+    parar de mudar, por no máximo 'timeout' segundos, e registra o tempo do
+    passo. 'timeout' é a pausa fixa que existia antes, para comparar.
+    Se a tela não mudar em 'espera_mudanca' segundos, basta ela estar parada:
+    o padrão (curto) é para passos seguidos de uma espera por imagem. Antes
+    de uma ação às cegas (coordenada fixa, texto digitado sem conferir),
+    passe espera_mudanca=timeout: sem mudança, espera o tempo todo, como a
+    pausa fixa fazia.
+    """
+    inicio = RELOGIO.agora()
+    assentou = motor_visao().esperar_tela_estavel(timeout, espera_mudanca=espera_mudanca,
+                                                  intervalo=INTERVALO_ESTABILIDADE)
+    gasto = RELOGIO.agora() - inicio
+    TEMPOS_PASSOS.append((passo, gasto, timeout))
+    aviso = "" if assentou else " (a tela não parou de mudar: seguindo assim mesmo)"
+    print(f"(TEMPO) {passo}: {gasto:.1f}s em vez de {timeout}s{aviso}")
+    return assentou
+
+
+def resumo_tempos():
+    """Imprime quanto o robô esperou pela tela nesta execução e quanto as pausas fixas teriam custado."""
+    esperado = sum(p[1] for p in TEMPOS_PASSOS)
+    fixo = sum(p[2] for p in TEMPOS_PASSOS)
+    print(f"(TEMPO) {len(TEMPOS_PASSOS)} esperas pela tela: {esperado:.1f}s no total (as pausas fixas somariam {fixo:.0f}s).")
+
+
+def esperar_e_clicar_imagem(nome_imagem, pasta_base, timeout=30, confianca=0.7):
+    caminho_completo = os.path.join(pasta_base, nome_imagem)
+    print(f"Procurando por '{caminho_completo}' (confiança: {confianca}) por até {timeout} segundos...")
+    try:
+        caixa = motor_visao().esperar(caminho_completo, timeout, confianca, intervalo=INTERVALO_BUSCA)
+    except Exception as e:
+        print(f"ERRO: Falha ao ler o arquivo de imagem '{caminho_completo}'.")
+        print(f"Detalhe do erro: {e}")
+        return False
+    if caixa:
+        x, y, largura, altura = caixa
+        posicao = (x + largura // 2, y + altura // 2)
+        ACOES.clicar(*posicao)
+        print(f"Imagem '{nome_imagem}' encontrada e clicada em {posicao}.")
+        return True
+    print(f"ERRO: Imagem '{nome_imagem}' não encontrada na tela após {timeout} segundos.")
+    return False
+
+def esperar_imagem_aparecer(nome_imagem, pasta_base, timeout=60, confianca=0.8, intervalo=None):
+    timeout_dinamico = max(timeout, TIMEOUT_RELATORIO) 
+    caminho_completo = os.path.join(pasta_base, nome_imagem)
+    print(f"Aguardando imagem aparecer: {caminho_completo} (Timeout: {timeout_dinamico}s, Confiança: {confianca})")
+    try:
+        caixa = motor_visao().esperar(caminho_completo, timeout_dinamico, confianca, intervalo=intervalo or INTERVALO_BUSCA)
+    except Exception as e:
+        print(f"Erro ao tentar localizar a imagem: {e}")
+        return False
+    if caixa:
+        print(f"Imagem encontrada: {nome_imagem}")
+        return True
+    print(f"Erro: Timeout! Imagem não encontrada: {nome_imagem}")
+    return False
+
+# --- FUNÇÕES DE APOIO (MÁQUINA DE ESTADOS) ---
+# Um passo da máquina espera, com UMA captura por tentativa, qualquer um dos
+# estados possíveis da tela e segue a transição do que apareceu. Cada fase:
+#   {"timeout": s, "estados": {nome: (imagem, confianca, acao, proxima_fase)}}
+# 'acao(caminho_imagem, caixa)' retorna True/False; proxima_fase FIM encerra.
+# Fases com "log": True (esperas longas, como a validação) não ficam tirando
+# print: leem o log do PVA e só olham a tela quando ele avisa que terminou.
+FIM = "fim"
+TIMEOUT_SUMIR = 10  # Quanto esperar a janela clicada fechar antes de olhar a próxima
+INTERVALO_LOG = 0.5
+TIMEOUT_TELA_APOS_LOG = 10  # O log avisou: quanto esperar a janela aparecer na tela
+VERIFICACAO_TELA_S = 30     # Mesmo esperando pelo log, confere a tela de tempos em tempos
+
+
+def clicar_estado(caminho_imagem, caixa):
+    """Clica no centro da imagem e espera ela sumir (a janela fechou ou o menu abriu)."""
+    x, y, largura, altura = caixa
+    ACOES.clicar(x + largura // 2, y + altura // 2)
+    if not motor_visao().esperar_sumir(caminho_imagem, TIMEOUT_SUMIR, intervalo=INTERVALO_BUSCA):
+        print(f"Aviso: '{os.path.basename(caminho_imagem)}' continua na tela após o clique.")
+    return True
+
+
+def abrir_log_pva():
+    """Leitor do log do PVA a partir do fim atual, ou None se o log não existe (espera só pela tela)."""
+    if not os.path.exists(CAMINHO_LOG_PVA):
+        print(f"Aviso: Log do PVA não encontrado em '{CAMINHO_LOG_PVA}'. Esperas longas serão pela tela.")
+        return None
+    return LeitorLogPVA(CAMINHO_LOG_PVA)
+
+
+def esperar_estado_pelo_log(leitor, estados, timeout):
+    """Como motor.esperar_estado, mas entre uma olhada e outra na tela espera um aviso do log."""
+    motor = motor_visao()
+    inicio = RELOGIO.agora()
+    while True:
+        nome, caixa = motor.detectar(estados)
+        if nome is not None:
+            return nome, caixa
+        restante = timeout - (RELOGIO.agora() - inicio)
+        if restante <= 0:
+            return None, None
+        evento = leitor.esperar(pva_terminou, min(restante, VERIFICACAO_TELA_S), intervalo=INTERVALO_LOG,
+                                relogio=RELOGIO.agora, dormir=RELOGIO.dormir)
+        if evento is not None:
+            print(f"(LOG DO PVA) {evento['hora']} {evento['tipo']} {evento['titulo'] or ''} {evento['texto'] or ''}".rstrip())
+            nome, caixa = motor.esperar_estado(estados, TIMEOUT_TELA_APOS_LOG, intervalo=INTERVALO_BUSCA)
+            if nome is not None:
+                return nome, caixa
+
+
+def executar_fases(fases, fase_inicial, pasta_base, leitor_log=None, visitados=None):
+    """
+    Roda a máquina de estados a partir de 'fase_inicial'. True se chegou em FIM.
+    Se 'visitados' for uma lista, recebe (fase, estado detectado) de cada passo.
+    """
+    motor = motor_visao()
+    fase = fase_inicial
+    while fase != FIM:
+        passo = fases[fase]
+        estados = {nome: (os.path.join(pasta_base, imagem), confianca)
+                   for nome, (imagem, confianca, _, _) in passo["estados"].items()}
+        print(f"[{fase}] Aguardando {' OU '.join(estados)} (até {passo['timeout']}s)...")
+        try:
+            if passo.get("log") and leitor_log is not None:
+                nome, caixa = esperar_estado_pelo_log(leitor_log, estados, passo["timeout"])
+            else:
+                nome, caixa = motor.esperar_estado(estados, passo["timeout"], intervalo=passo.get("intervalo", INTERVALO_BUSCA))
+        except Exception as e:
+            print(f"Erro ao tentar localizar as imagens: {e}")
+            return False
+        if nome is None:
+            print(f"ERRO: Timeout na fase '{fase}': nenhum de {list(estados)} apareceu.")
+            return False
+        _, _, acao, proxima = passo["estados"][nome]
+        print(f"[{fase}] Estado detectado: '{nome}' -> {proxima}")
+        if visitados is not None:
+            visitados.append((fase, nome))
+        if not acao(estados[nome][0], caixa):
+            return False
+        fase = proxima
+    return True
+
+
+# --- LÓGICA DO ROBÔ ---
+
+PROCESSO_PVA = None       # O processo aberto por abrir_pva (para a sessão saber se ainda está vivo)
+TIMEOUT_TELA_INICIAL = 10
+
+
+def abrir_pva():
+    global PROCESSO_PVA
+    print(f"Iniciando o Wall-E...")
+    try:
+        PROCESSO_PVA = ACOES.abrir_programa(CAMINHO_PVA, PASTA_DO_PVA)
+        print("Comando para abrir o PVA executado.")
+    except Exception as e:
+        print(f"Ocorreu um erro inesperado ao tentar abrir o PVA: {e}")
+        return False
+    print(f"Aguardando a tela principal do PVA carregar (até {TIMEOUT_ABERTURA_PVA}s)...")
+    inicio = RELOGIO.agora()
+    if not esperar_imagem_aparecer('menu_escrituracao.png', pasta_base=PASTA_IMAGENS, timeout=TIMEOUT_ABERTURA_PVA):
+        print("ERRO: A tela principal do PVA não apareceu.")
+        return False
+    aguardar_tela("PVA terminar de abrir", DELAY_PADRAO)
+    print(f"(TEMPO) PVA aberto em {RELOGIO.agora() - inicio:.1f}s (antes: pausa fixa de 25s).")
+    return True
+
+
+def pva_pronto(timeout=TIMEOUT_TELA_INICIAL):
+    """True se o PVA está rodando e na tela principal (o menu 'Escrituração' aparece)."""
+    if PROCESSO_PVA is not None and PROCESSO_PVA.poll() is not None:
+        print(f"O processo do PVA terminou (código {PROCESSO_PVA.returncode}).")
+        return False
+    caminho_menu = os.path.join(PASTA_IMAGENS, "menu_escrituracao.png")
+    return motor_visao().esperar(caminho_menu, timeout, 0.8, intervalo=INTERVALO_BUSCA) is not None
+
+
+def voltar_tela_inicial():
+    """Fecha com Esc os menus que os relatórios deixam abertos, para o próximo SPED começar do zero."""
+    for _ in range(3):
+        ACOES.tecla('esc')
+        aguardar_tela("Esc", 1)
+
+
+def fechar_pva():
+    """Fecha o PVA aberto por abrir_pva (se ainda estiver rodando)."""
+    global PROCESSO_PVA
+    if PROCESSO_PVA is None:
+        return
+    if PROCESSO_PVA.poll() is None:
+        print("Fechando o PVA...")
+        PROCESSO_PVA.terminate()
+        try:
+            PROCESSO_PVA.wait(timeout=15)
+        except Exception:
+            PROCESSO_PVA.kill()
+    PROCESSO_PVA = None
+
+
+def _clicar_item_da_janela_abrir(caminho_imagem, caixa):
+    # O item da lista não tem imagem própria: a lista carrega depois da janela
+    print("Janela 'Abrir' detectada. Aguardando a lista carregar...")
+    aguardar_tela("lista da janela 'Abrir'", DELAY_LONGO, espera_mudanca=DELAY_LONGO)
+    COORDENADA_X_ITEM = 584
+    COORDENADA_Y_ITEM = 471
+    print(f"Clicando na coordenada fixa: x={COORDENADA_X_ITEM}, y={COORDENADA_Y_ITEM}")
+    ACOES.clicar(COORDENADA_X_ITEM, COORDENADA_Y_ITEM)
+    return True
+
+
+def clicar_ok_visualizacao(caminho_imagem, caixa):
+    """O aviso de visualização fecha pelo botão 'OK' (ok_visu.png), não clicando no aviso."""
+    caminho_ok = os.path.join(PASTA_IMAGENS, "ok_visu.png")
+    caixa_ok = motor_visao().esperar(caminho_ok, 5, 0.7, intervalo=INTERVALO_BUSCA)
+    if not caixa_ok:
+        print("ERRO: Botão 'OK' do aviso de visualização não encontrado.")
+        return False
+    return clicar_estado(caminho_ok, caixa_ok)
+
+
+def fases_importacao():
+    """Tabela de estados da importação, a partir do primeiro 'Sim' (os timeouts dependem do arquivo)."""
+    return {
+        "confirmando": {"timeout": 10, "estados": {
+            "sim": ("sim_intermediario.png", 0.7, clicar_estado, "classificando")}},
+        "classificando": {"timeout": 20 + DELAY_LONGO, "estados": {
+            "novo_arquivo": ("sim_intermediario.png", 0.8, clicar_estado, "validando"),
+            "arquivo_existente": ("aviso_visualizacao.png", 0.8, clicar_ok_visualizacao, "abrindo_menu")}},
+        "validando": {"timeout": TIMEOUT_VALIDACAO, "intervalo": INTERVALO_VALIDACAO, "log": True, "estados": {
+            "ok": ("ok_intermediario.png", 0.7, clicar_estado, FIM)}},
+        "abrindo_menu": {"timeout": 30, "estados": {
+            "menu": ("menu_escrituracao.png", 0.8, clicar_estado, "abrindo_escrituracao")}},
+        "abrindo_escrituracao": {"timeout": 10, "estados": {
+            "abrir": ("abrir.png", 0.7, clicar_estado, "escolhendo_arquivo")}},
+        "escolhendo_arquivo": {"timeout": 10, "estados": {
+            "janela_abrir": ("janela_abrir.png", 0.8, _clicar_item_da_janela_abrir, "confirmando_abertura")}},
+        "confirmando_abertura": {"timeout": 10, "estados": {
+            "ok": ("ok_abrir.png", 0.7, clicar_estado, FIM)}},
+    }
+
+
+def importar_sped(caminho_do_arquivo_txt):
+    global TIMEOUT_VALIDACAO, DELAY_PADRAO, DELAY_LONGO, IMPORTACAO_VALIDOU
+    print("\n--- INICIANDO SEQUÊNCIA DE IMPORTAÇÃO INTELIGENTE ---")
+    IMPORTACAO_VALIDOU = False
+
+    if not esperar_e_clicar_imagem('menu_escrituracao.png', pasta_base=PASTA_IMAGENS, confianca=0.8):
+        return False
+    aguardar_tela("menu Escrituração", DELAY_PADRAO)
+    
+    if not esperar_e_clicar_imagem('submenu_nova.png', pasta_base=PASTA_IMAGENS):
+        return False
+    aguardar_tela("submenu Nova", DELAY_PADRAO)
+
+    if not esperar_e_clicar_imagem('submenu_importar.png', pasta_base=PASTA_IMAGENS):
+        return False
+    aguardar_tela("janela de importação", DELAY_PADRAO, espera_mudanca=DELAY_PADRAO)
+    
+    leitor_log = abrir_log_pva()  # Antes do 'enter': a validação começa logo depois
+
+    print(f"Digitando o caminho do arquivo: {caminho_do_arquivo_txt}")
+    ACOES.escrever(caminho_do_arquivo_txt)
+    aguardar_tela("caminho digitado", DELAY_PADRAO, espera_mudanca=DELAY_PADRAO)
+    ACOES.tecla('enter')
+    
+    # Do primeiro 'Sim' em diante, a tela decide o caminho:
+    #   Caminho 1 (novo arquivo): Sim -> Sim -> validação longa -> OK
+    #   Caminho 2 (já importado): Sim -> aviso de visualização -> abrir a escrituração existente
+    visitados = []
+    if not executar_fases(fases_importacao(), "confirmando", PASTA_IMAGENS, leitor_log, visitados):
+        print("ERRO: Robô não conseguiu concluir a importação/abertura.")
+        return False
+    IMPORTACAO_VALIDOU = ("validando", "ok") in visitados
+
+    print("\n--- PROCESSO DE IMPORTAÇÃO/ABERTURA FINALIZADO COM SUCESSO! ---")
+    return True
+
+
+# --- FUNÇÕES DE GERAR PDF ---
+
+def _salvar_pdf(caminho_salvo):
+    global DELAY_LONGO
+    print("Janela 'Salvar Como' detectada. Aguardando a janela ficar pronta...")
+    aguardar_tela("janela 'Salvar Como'", DELAY_LONGO, espera_mudanca=DELAY_LONGO)
+    
+    try:
+        os.makedirs(os.path.dirname(caminho_salvo), exist_ok=True)
+        # O PDF de um SPED anterior sairia do vigia como "completo" na hora
+        # (e o PVA ainda perguntaria se pode substituir)
+        if os.path.exists(caminho_salvo):
+            os.remove(caminho_salvo)
+
+        print(f"Digitando o caminho do arquivo: {caminho_salvo}")
+        ACOES.copiar(caminho_salvo)
+        ACOES.atalho('ctrl', 'v') 
+        aguardar_tela("nome colado", 1)
+        
+        ACOES.tecla('enter')
+        
+        # O PDF termina de ser gravado em segundo plano: quem precisa dele
+        # completo espera pelo arquivo (vigia_pdf), não o robô
+        print("Aguardando a janela 'Salvar Como' fechar...")
+        caminho_janela = os.path.join(PASTA_IMAGENS_PDF, 'janela_salvar_como.png')
+        motor_visao().esperar_sumir(caminho_janela, DELAY_LONGO, 0.8, intervalo=INTERVALO_BUSCA)
+        aguardar_tela("PVA após salvar", DELAY_PADRAO)
+        
+        print(f"PDF sendo salvo em: {caminho_salvo}")
+        return caminho_salvo
+        
+    except Exception as e:
+        print(f"Erro crítico ao tentar colar o nome ou salvar o arquivo: {e}")
+        return None
+
+def gerar_relatorio_entradas(caminho_pdf):
+    global DELAY_PADRAO, DELAY_LONGO, TIMEOUT_RELATORIO
+    print("\n--- INICIANDO GERAÇÃO DO RELATÓRIO DE ENTRADAS ---")
+    print("Aguardando o PVA se estabilizar após a importação...")
+    aguardar_tela("PVA após a importação", DELAY_LONGO + 2)
+    if not esperar_e_clicar_imagem('menu_relatorios.png', pasta_base=PASTA_IMAGENS_PDF, timeout=10):
+        return None
+    aguardar_tela("menu Relatórios", DELAY_PADRAO)
+    if not esperar_e_clicar_imagem('documentos.png', pasta_base=PASTA_IMAGENS_PDF, timeout=5):
+        return None
+    aguardar_tela("menu Documentos", DELAY_PADRAO)
+    if not esperar_e_clicar_imagem('menu_entradas.png', pasta_base=PASTA_IMAGENS_PDF, timeout=5):
+        return None
+    aguardar_tela("relatório de entradas", DELAY_LONGO)
+    if not esperar_e_clicar_imagem('botao_imprimir_pva.png', pasta_base=PASTA_IMAGENS_PDF, timeout=5):
+        return None
+    aguardar_tela("janela Imprimir", DELAY_PADRAO)
+    if not esperar_e_clicar_imagem('ok_imprimir.png', pasta_base=PASTA_IMAGENS_PDF, timeout=5):
+        return None
+    if not esperar_imagem_aparecer('janela_salvar_como.png', pasta_base=PASTA_IMAGENS_PDF, timeout=TIMEOUT_RELATORIO,
+                                   intervalo=INTERVALO_RELATORIO):
+        return None
+    return _salvar_pdf(caminho_pdf)
+
+def gerar_relatorio_saidas(caminho_pdf):
+    global DELAY_PADRAO, DELAY_LONGO, TIMEOUT_RELATORIO
+    print("\n--- INICIANDO GERAÇÃO DO RELATÓRIO DE SAÍDAS ---")
+    print("Assumindo que o menu 'Documentos' já está aberto...")
+    if not esperar_e_clicar_imagem('menu_saidas.png', pasta_base=PASTA_IMAGENS_PDF, timeout=5):
+        return None
+    aguardar_tela("relatório de saídas", DELAY_LONGO)
+    if not esperar_e_clicar_imagem('botao_imprimir_pva.png', pasta_base=PASTA_IMAGENS_PDF, timeout=5):
+        return None
+    aguardar_tela("janela Imprimir", DELAY_PADRAO)
+    if not esperar_e_clicar_imagem('ok_imprimir.png', pasta_base=PASTA_IMAGENS_PDF, timeout=5):
+        return None
+    if not esperar_imagem_aparecer('janela_salvar_como.png', pasta_base=PASTA_IMAGENS_PDF, timeout=TIMEOUT_RELATORIO,
+                                   intervalo=INTERVALO_RELATORIO):
+        return None
+    return _salvar_pdf(caminho_pdf)
+
+def gerar_relatorio_apuracao(caminho_pdf):
+    global DELAY_PADRAO, DELAY_LONGO, TIMEOUT_RELATORIO
+    print("\n--- INICIANDO GERAÇÃO DO RELATÓRIO DE APURAÇÃO DO ICMS ---")
+    print("Assumindo que o menu 'Relatórios' principal já está aberto...")
+    if not esperar_e_clicar_imagem('menu_apuracao_icms.png', pasta_base=PASTA_IMAGENS_PDF, timeout=5):
+        return None
+    aguardar_tela("menu Apuração do ICMS", DELAY_PADRAO)
+    if not esperar_e_clicar_imagem('operacoes_proprias.png', pasta_base=PASTA_IMAGENS_PDF, timeout=5):
+        return None
+    aguardar_tela("relatório de apuração", DELAY_PADRAO)
+    if not esperar_e_clicar_imagem('botao_imprimir_pva.png', pasta_base=PASTA_IMAGENS_PDF, timeout=5):
+        return None
+    aguardar_tela("janela Imprimir", DELAY_PADRAO)
+    if not esperar_e_clicar_imagem('ok_imprimir.png', pasta_base=PASTA_IMAGENS_PDF, timeout=5):
+        return None
+    if not esperar_imagem_aparecer('janela_salvar_como.png', pasta_base=PASTA_IMAGENS_PDF, timeout=TIMEOUT_RELATORIO,
+                                   intervalo=INTERVALO_RELATORIO):
+        return None
+    return _salvar_pdf(caminho_pdf)
+
+
+# --- AJUSTE DE TEMPOS PELO ARQUIVO ---
+# Com histórico suficiente (tempos_pva.py), os timeouts são o pior caso
+# previsto para ESTE SPED e os intervalos de busca crescem com o tempo
+# esperado. Sem histórico, vale a regra antiga pelo tamanho (5 MB).
+HISTORICO_TEMPOS = None      # None: tempos_pva.historico_padrao() (o replay troca por um em memória)
+CARACTERISTICAS_SPED = None  # Do SPED da execução atual (gravadas junto com os tempos)
+PREVISAO_TEMPOS = None
+IMPORTACAO_VALIDOU = False   # False: o SPED já estava no PVA e não houve validação para medir
+LIMITES_TIMEOUT_VALIDACAO = (120, 3600)
+LIMITES_TIMEOUT_RELATORIO = (30, 900)
+FRACAO_INTERVALO = 0.01      # Intervalo de busca = 1% do tempo esperado...
+INTERVALO_MAXIMO = 2.0       # ...no máximo 2 s
+
+
+def _limitar(valor, limites):
+    return max(limites[0], min(limites[1], valor))
+
+
+def _intervalo_para(esperado_s):
+    return round(_limitar(esperado_s * FRACAO_INTERVALO, (INTERVALO_BUSCA, INTERVALO_MAXIMO)), 2)
+
+
+def configurar_tempos(caminho_sped):
+    """
+    Define os timeouts e delays globais do robô de acordo com o SPED: pela
+    previsão do histórico de tempos quando existe, senão pelo tamanho.
+    """
+    global TIMEOUT_VALIDACAO, TIMEOUT_RELATORIO, DELAY_PADRAO, DELAY_LONGO
+    global INTERVALO_VALIDACAO, INTERVALO_RELATORIO, CARACTERISTICAS_SPED, PREVISAO_TEMPOS
+    print("Verificando tamanho do arquivo para definir timeouts e delays...")
+    try:
+        TAMANHO_LIMITE_MB = 5
+        tamanho_arquivo_bytes = os.path.getsize(caminho_sped)
+        tamanho_arquivo_mb = tamanho_arquivo_bytes / (1024 * 1024)
+        
+        if tamanho_arquivo_mb > TAMANHO_LIMITE_MB:
+            print(f"Arquivo GRANDE detectado ({tamanho_arquivo_mb:.2f} MB). Usando timeouts e delays longos.")
+            TIMEOUT_VALIDACAO = 1800
+            TIMEOUT_RELATORIO = 300
+            DELAY_PADRAO = 7
+            DELAY_LONGO = 9
+        else:
+            print(f"Arquivo normal ({tamanho_arquivo_mb:.2f} MB). Usando timeouts e delays padrão.")
+            TIMEOUT_VALIDACAO = 900
+            TIMEOUT_RELATORIO = 120
+            DELAY_PADRAO = 7
+            DELAY_LONGO = 7
+    except Exception as e:
+        print(f"Aviso: Não foi possível ler o tamanho do arquivo. Usando timeouts/delays padrão. Erro: {e}")
+    INTERVALO_VALIDACAO = INTERVALO_RELATORIO = INTERVALO_BUSCA
+
+    CARACTERISTICAS_SPED, PREVISAO_TEMPOS = tempos_pva.prever_tempos(caminho_sped, HISTORICO_TEMPOS)
+    previsao = PREVISAO_TEMPOS or {}
+    importacao = previsao.get(tempos_pva.PASSO_IMPORTACAO)
+    if importacao:
+        # Maior que todos do histórico: a previsão só pode AUMENTAR o timeout da regra pelo tamanho
+        piso = TIMEOUT_VALIDACAO if importacao["extrapolado"] else 0
+        TIMEOUT_VALIDACAO = round(max(piso, _limitar(importacao["pior_caso_s"], LIMITES_TIMEOUT_VALIDACAO)))
+        INTERVALO_VALIDACAO = _intervalo_para(importacao["esperado_s"])
+        print(f"Importação prevista: {importacao['esperado_s']}s (pior caso {importacao['pior_caso_s']}s). "
+              f"Timeout da validação: {TIMEOUT_VALIDACAO}s.")
+    relatorios = [previsao.get(p) for p in (tempos_pva.PASSO_ENTRADAS, tempos_pva.PASSO_SAIDAS, tempos_pva.PASSO_APURACAO)]
+    if all(relatorios):
+        piso = TIMEOUT_RELATORIO if any(r["extrapolado"] for r in relatorios) else 0
+        TIMEOUT_RELATORIO = round(max(piso, _limitar(max(r["pior_caso_s"] for r in relatorios), LIMITES_TIMEOUT_RELATORIO)))
+        INTERVALO_RELATORIO = _intervalo_para(max(r["esperado_s"] for r in relatorios))
+        print(f"Relatórios previstos: {', '.join(str(r['esperado_s']) + 's' for r in relatorios)}. "
+              f"Timeout dos relatórios: {TIMEOUT_RELATORIO}s.")
+    if not importacao:
+        print("Sem histórico suficiente para prever a importação deste SPED: usando a regra pelo tamanho.")
+
+
+def registrar_tempos(duracoes):
+    """Grava no histórico as durações ({passo: s}) desta execução, para as próximas previsões."""
+    historico = HISTORICO_TEMPOS or tempos_pva.historico_padrao()
+    if historico is None or CARACTERISTICAS_SPED is None or not duracoes:
+        return
+    try:
+        historico.registrar(CARACTERISTICAS_SPED, {passo: round(d, 3) for passo, d in duracoes.items()})
+    except Exception as e:
+        print(f"Aviso: Não foi possível gravar os tempos desta execução. Erro: {e}")
+
+
+# --- EXECUÇÃO COMPLETA DO ROBÔ (CHAMADA PELO SERVIDOR OU PELA LINHA DE COMANDO) ---
+
+def processar_sped(caminho_sped, ao_salvar=None, caminhos_relatorios=None):
+    """
+    Com o PVA JÁ ABERTO na tela principal: importa o SPED e gera os 3
+    relatórios em PDF, salvos em 'caminhos_relatorios' ({"entradas", "saidas",
+    "apuracao"} -> caminho; padrão: caminhos_relatorios_padrao()). Retorna o
+    mesmo dicionário com None para um relatório que não pôde ser gerado.
+    'ao_salvar(chave, caminho)' é chamada logo que cada "Salvar Como" fecha
+    (o PDF ainda pode estar sendo gravado: ver vigia_pdf.py).
+    Lança RuntimeError se a importação falhar.
+    """
+    configurar_tempos(caminho_sped)
+    TEMPOS_PASSOS.clear()
+    duracoes = {}  # {passo do tempos_pva: s}, só dos passos que deram certo
+    inicio = RELOGIO.agora()
+    if not importar_sped(caminho_sped):
+        raise RuntimeError("Wall-E encontrou um problema durante a IMPORTAÇÃO/ABERTURA.")
+    if IMPORTACAO_VALIDOU:
+        duracoes[tempos_pva.PASSO_IMPORTACAO] = RELOGIO.agora() - inicio
+
+    print("\nImportação concluída. Iniciando geração de relatórios...")
+    
+    # (Gerar os 3 relatórios)
+    caminhos_relatorios = caminhos_relatorios or caminhos_relatorios_padrao()
+    relatorios = {}
+    for chave, passo, gerar in (("entradas", tempos_pva.PASSO_ENTRADAS, gerar_relatorio_entradas),
+                                ("saidas", tempos_pva.PASSO_SAIDAS, gerar_relatorio_saidas),
+                                ("apuracao", tempos_pva.PASSO_APURACAO, gerar_relatorio_apuracao)):
+        inicio = RELOGIO.agora()
+        relatorios[chave] = gerar(caminhos_relatorios[chave])
+        if relatorios[chave] is not None:
+            duracoes[passo] = RELOGIO.agora() - inicio
+            if ao_salvar is not None:
+                ao_salvar(chave, relatorios[chave])
+    
+    print("\n--- ROBÔ FINALIZOU A GERAÇÃO DE RELATÓRIOS! ---")
+    resumo_tempos()
+    registrar_tempos(duracoes)
+    return relatorios
+
+
+def executar_robo(caminho_sped, ao_salvar=None, caminhos_relatorios=None):
+    """
+    Abre o PVA, importa o SPED e gera os 3 relatórios em PDF (o PVA fica
+    aberto). Para vários SPEDs seguidos, use a sessao_pva.SessaoPVA, que
+    abre o PVA uma vez só. Retorna o mesmo que processar_sped.
+    Lança RuntimeError se o PVA não abrir ou a importação falhar.
+    """
+    print(f"Iniciando processo para:")
+    print(f"  SPED: {caminho_sped}")
+
+    if not abrir_pva():
+        raise RuntimeError("Wall-E falhou em abrir o PVA.")
+    return processar_sped(caminho_sped, ao_salvar, caminhos_relatorios)
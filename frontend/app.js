@@ -3,6 +3,7 @@ document.addEventListener("DOMContentLoaded", () => {
     // --- Seletores ---
     const fileSpedInput = document.getElementById("file_sped");
     const fileLivroInput = document.getElementById("file_livro");
+    const forcarRoboInput = document.getElementById("forcar_robo");
     const btnProcessar = document.getElementById("btn-processar-tudo");
     const btnText = document.getElementById("btn-text-processar");
     const loader = document.getElementById("loader-processar");
@@ -116,9 +117,11 @@ document.addEventListener("DOMContentLoaded", () => {
         const formData = new FormData();
         formData.append("file_sped", fileSpedInput.files[0]);
         formData.append("file_livro", fileLivroInput.files[0]);
+        formData.append("forcar_robo", forcarRoboInput && forcarRoboInput.checked ? "true" : "false");
         
         try {
-            const response = await fetch("/upload-e-processar/", {
+            // 1. Envia os arquivos: o servidor responde na hora com o id do job
+            const response = await fetch("/jobs", {
                 method: "POST",
                 body: formData
             });
@@ -128,7 +131,12 @@ document.addEventListener("DOMContentLoaded", () => {
                 throw new Error(`Erro no Processamento: ${extractError(errorText)}`);
             }
             
-            const resultados = await response.json();
+            const job = await response.json();
+
+            // 2. Acompanha o job até ele terminar
+            const jobFinal = await aguardarJob(job.job_id);
+            const resultados = jobFinal.resultado.conciliacao_totais;
+            resultados.bloco_e_texto = jobFinal.resultado.bloco_e_texto;
             
             statusTotais.textContent = "Análise CONCLUÍDA! Verificando resultados...";
             
@@ -155,6 +163,50 @@ document.addEventListener("DOMContentLoaded", () => {
         }
     });
     
+    // --- Acompanha um job (GET /jobs/{id}) até ele terminar ---
+    const NOMES_ETAPAS = {
+        bloco_e: "Lendo o Bloco E do SPED",
+        livro: "Analisando o Livro Fiscal e conciliando os detalhes do Bloco E",
+        totais_sped: "Somando Entradas/Saídas do SPED (C190/D190)",
+        apuracao_sped: "Recalculando a apuração do ICMS (E110)",
+        robo: "Robô (Wall-E) validando no PVA (vários minutos)",
+        relatorios_sped: "Montando o lado SPED da conciliação"
+    };
+
+    async function aguardarJob(jobId) {
+        while (true) {
+            const response = await fetch(`/jobs/${jobId}`);
+            if (!response.ok) {
+                const errorText = await response.text();
+                throw new Error(`Erro ao consultar o job: ${extractError(errorText)}`);
+            }
+            const job = await response.json();
+            if (job.status === "concluido") {
+                return job;
+            }
+            if (job.status === "erro") {
+                throw new Error(`Erro no Processamento: ${job.erro}`);
+            }
+            // Várias etapas rodam ao mesmo tempo: mostra todas as que estão em execução
+            const emExecucao = Object.keys(job.etapas || {})
+                .filter(nome => job.etapas[nome] === "executando")
+                .map(nome => NOMES_ETAPAS[nome] || nome);
+            let mensagem = emExecucao.length > 0 ? `${emExecucao.join(" | ")}...` : "Processando...";
+            if (job.robo_em_cache) {
+                mensagem += " SPED já validado no PVA antes: o robô não vai rodar.";
+            }
+            if (job.posicao_fila) {
+                mensagem += ` Aguardando o robô (posição ${job.posicao_fila} na fila).`;
+            }
+            if (job.eta_robo_s !== null && job.eta_robo_s !== undefined) {
+                const minutos = Math.max(1, Math.round(job.eta_robo_s / 60));
+                mensagem += ` Previsão do robô: ~${minutos} min.`;
+            }
+            statusTotais.textContent = mensagem;
+            await new Promise(resolve => setTimeout(resolve, 3000));
+        }
+    }
+    
     function extractError(errorText) {
         try {
             const errorJson = JSON.parse(errorText);
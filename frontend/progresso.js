@@ -1,20 +1,82 @@
 // Este evento garante que o script só rode depois que a página (progresso.html)
 // estiver totalmente carregada.
-document.addEventListener("DOMContentLoaded", () => {
+document.addEventListener("DOMContentLoaded", async () => {
 
     // --- DADOS PARA OS GRÁFICOS ---
-    const dadosStatus = {
-        concluidas: 10,
-        emProgresso: 5,
-        paradas: 5
-    };
+    // Vêm do banco de resultados do backend (resultados_db.py), que guarda
+    // a última conciliação de cada empresa/competência.
+    const MESES = ["Jan", "Fev", "Mar", "Abr", "Mai", "Jun", "Jul", "Ago", "Set", "Out", "Nov", "Dez"];
 
-    const dadosEvolucao = {
-        // Meses (rótulos do eixo X)
-        labels: ["Jun", "Jul", "Ago", "Set", "Out", "Nov"],
-        // Dados (eixo Y)
-        data: [1, 2, 4, 6, 8, 10] // Evolução de empresas concluídas
-    };
+    async function buscarJson(url) {
+        const response = await fetch(url);
+        if (!response.ok) {
+            throw new Error(`HTTP ${response.status} em ${url}`);
+        }
+        return response.json();
+    }
+
+    // "2025-08" -> "Ago/2025"
+    function rotuloCompetencia(competencia) {
+        const [ano, mes] = competencia.split("-");
+        return `${MESES[parseInt(mes, 10) - 1]}/${ano}`;
+    }
+
+    function preencherCards(status) {
+        document.getElementById("valor-concluidas").textContent = status.ok;
+        document.getElementById("valor-progresso").textContent = status.em_andamento;
+        document.getElementById("valor-paradas").textContent = status.divergente + status.erro;
+        document.getElementById("valor-total").textContent = status.total;
+    }
+
+    function preencherTabelaDivergentes(empresas) {
+        const tbody = document.querySelector("#tabela-divergentes tbody");
+        tbody.innerHTML = "";
+        if (empresas.length === 0) {
+            tbody.innerHTML = '<tr><td colspan="7">Nenhuma empresa com divergência.</td></tr>';
+            return;
+        }
+        empresas.forEach(empresa => {
+            const tr = document.createElement("tr");
+            const celulas = [
+                empresa.nome || "-",
+                empresa.cnpj,
+                rotuloCompetencia(empresa.competencia),
+                empresa.status_entradas || "Erro",
+                empresa.status_saidas || "Erro",
+                empresa.status_apuracao || "Erro",
+                new Date(empresa.atualizado_em * 1000).toLocaleString("pt-BR")
+            ];
+            celulas.forEach((texto, i) => {
+                const td = document.createElement("td");
+                td.textContent = texto;
+                if (i >= 3 && i <= 5) {
+                    td.className = texto === "OK" ? "status-ok" : "status-divergente";
+                }
+                if (i === 5 && empresa.erro) {
+                    td.title = empresa.erro;
+                }
+                tr.appendChild(td);
+            });
+            tbody.appendChild(tr);
+        });
+    }
+
+    let dadosStatus, dadosEvolucao, divergentes;
+    try {
+        [dadosStatus, dadosEvolucao, divergentes] = await Promise.all([
+            buscarJson("/dashboard/status"),
+            buscarJson("/dashboard/evolucao?meses=12"),
+            buscarJson("/dashboard/divergentes?limite=50")
+        ]);
+    } catch (error) {
+        console.error("Erro ao carregar o painel de progresso:", error);
+        document.querySelector("#tabela-divergentes tbody").innerHTML =
+            '<tr><td colspan="7">Não foi possível carregar os dados do painel.</td></tr>';
+        return;
+    }
+
+    preencherCards(dadosStatus);
+    preencherTabelaDivergentes(divergentes);
 
     // --- 1. CONFIGURAÇÃO DO GRÁFICO DE PIZZA (STATUS GERAL) ---
     const ctxPizza = document.getElementById('graficoPizza');
@@ -23,21 +85,24 @@ document.addEventListener("DOMContentLoaded", () => {
             type: 'doughnut', // Tipo "Rosquinha" (mais moderno que pizza)
             data: {
                 labels: [
-                    'Concluídas',
+                    'Conciliadas (OK)',
                     'Em Progresso',
-                    'Paradas'
+                    'Divergentes',
+                    'Com Erro'
                 ],
                 datasets: [{
                     label: 'Status das Empresas',
                     data: [
-                        dadosStatus.concluidas, 
-                        dadosStatus.emProgresso, 
-                        dadosStatus.paradas
+                        dadosStatus.ok,
+                        dadosStatus.em_andamento,
+                        dadosStatus.divergente,
+                        dadosStatus.erro
                     ],
                     backgroundColor: [
-                        '#107c10', // Verde (Concluídas - var(--success-color))
+                        '#107c10', // Verde (OK - var(--success-color))
                         '#ffc600', // Amarelo (Em Progresso)
-                        '#d83b01'  // Laranja (Paradas - var(--warning-color))
+                        '#d83b01', // Laranja (Divergentes - var(--warning-color))
+                        '#a4262c'  // Vermelho (Com Erro)
                     ],
                     borderColor: '#2d2d2d', // Cor de fundo do card (var(--card-color))
                     borderWidth: 4
@@ -66,10 +131,10 @@ document.addEventListener("DOMContentLoaded", () => {
         new Chart(ctxLinha, {
             type: 'line',
             data: {
-                labels: dadosEvolucao.labels,
+                labels: dadosEvolucao.map(mes => rotuloCompetencia(mes.competencia)),
                 datasets: [{
-                    label: 'Empresas Concluídas',
-                    data: dadosEvolucao.data,
+                    label: 'Empresas Conciliadas (OK)',
+                    data: dadosEvolucao.map(mes => mes.ok),
                     fill: true,
                     backgroundColor: 'rgba(0, 120, 212, 0.2)', // Azul transparente (var(--accent-color))
                     borderColor: '#0078d4', // Azul sólido (var(--accent-color))
@@ -111,5 +176,5 @@ document.addEventListener("DOMContentLoaded", () => {
 
     // NOTA: O 'app.js' (carregado no progresso.html) 
     // já cuida da lógica do menu hambúrguer. 
-    // Este script cuida apenas dos gráficos.
+    // Este script cuida apenas do painel (cards, gráficos e tabela).
 });
\ No newline at end of file